@@ -0,0 +1,67 @@
+"""
+Вимірювання швидкості індексу схожих автомобілів на синтетичному каталозі
+
+Запуск: python -m app.analytics.benchmark [кількість автомобілів]
+"""
+import sys
+import time
+
+import numpy as np
+
+from app.analytics.similar import CATEGORICAL_FEATURES, SimilarCarsIndex
+
+MAKES = ["BMW", "Audi", "Toyota", "Volkswagen", "Skoda", "Renault", "Hyundai", "Kia", "Ford", "Mercedes-Benz"]
+
+
+def synthetic_cars(count: int, seed: int = 0):
+    """Каталог з правдоподібним розподілом ціни, року, пробігу та об'єму двигуна"""
+    rng = np.random.default_rng(seed)
+    years = rng.integers(1995, 2025, count)
+    prices = np.exp(rng.normal(9.5, 0.8, count)).astype(int)
+    mileages = rng.integers(0, 400, count) * 1000
+    volumes = rng.choice([1.2, 1.4, 1.6, 2.0, 2.5, 3.0], count)
+    makes = rng.integers(0, len(MAKES), count)
+    fuels = CATEGORICAL_FEATURES[0][1]
+    transmissions = CATEGORICAL_FEATURES[1][1]
+    fuel_codes = rng.integers(0, len(fuels), count)
+    transmission_codes = rng.integers(0, len(transmissions), count)
+    return [
+        {
+            "_id": f"{i:024x}",
+            "make": MAKES[makes[i]],
+            "price": int(prices[i]),
+            "year": int(years[i]),
+            "mileage": int(mileages[i]),
+            "engine_volume": float(volumes[i]),
+            "engine_type": fuels[fuel_codes[i]],
+            "transmission": transmissions[transmission_codes[i]],
+        }
+        for i in range(count)
+    ]
+
+
+def measure(index: SimilarCarsIndex, ids, same_make: bool):
+    timings = []
+    for car_id in ids:
+        started = time.perf_counter()
+        index.similar(car_id, 10, same_make)
+        timings.append((time.perf_counter() - started) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def main(count: int):
+    cars = synthetic_cars(count)
+    index = SimilarCarsIndex()
+    started = time.perf_counter()
+    index.build(cars)
+    print(f"Побудова індексу з {count} автомобілів: {time.perf_counter() - started:.2f} с")
+
+    ids = [cars[i]["_id"] for i in np.random.default_rng(1).integers(0, count, 200)]
+    for same_make in (False, True):
+        p50, p99 = measure(index, ids, same_make)
+        scope = "тієї ж марки" if same_make else "усього каталогу"
+        print(f"Пошук 10 схожих серед {scope}: p50 {p50:.2f} мс, p99 {p99:.2f} мс")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
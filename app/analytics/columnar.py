@@ -0,0 +1,364 @@
+"""
+Колонковий каталог у пам'яті для фільтрів списку автомобілів
+
+Поля, за якими фільтрується та сортується список (ціна, рік, пробіг, дати,
+марка, тип пального, коробка передач, область), зберігаються в кожному
+процесі як масиви NumPy: числа - float64 (NaN - значення відсутнє), рядки -
+коди словника. Для кожного поля сортування тримається впорядкована
+перестановка рядків. Фільтр обчислюється векторизованою маскою, сторінка
+вибирається з перестановки, кількість - сумою маски; з бази читаються лише
+документи сторінки за _id.
+
+Каталог розуміє підмножину запитів MongoDB, яку будує build_cars_query
+(діапазони, рівність, $in, $regex для словникових полів). Для будь-якого
+іншого запиту або сортування query повертає None, і запит виконує MongoDB.
+
+Зміни в межах процесу надходять одразу (app.db.changes), зміни інших
+процесів - при періодичному оновленні з бази.
+"""
+import asyncio
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.db import changes
+from app.db.compact import decode_value
+
+NUMERIC_COLUMNS = ("price", "year", "mileage", "created_at", "updated_at")
+DICTIONARY_COLUMNS = ("make", "engine_type", "transmission", "region_code")
+SORT_FIELDS = NUMERIC_COLUMNS
+
+PROJECTION = {field: 1 for field in NUMERIC_COLUMNS + DICTIONARY_COLUMNS}
+
+RANGE_OPERATORS = {"$gte": np.greater_equal, "$gt": np.greater, "$lte": np.less_equal, "$lt": np.less}
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _number(value: Any) -> float:
+    """Числове значення колонки; дати - секунди від епохи, інші типи - NaN"""
+    if isinstance(value, bool):
+        return np.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return (value.replace(tzinfo=None) - _EPOCH).total_seconds()
+    return np.nan
+
+
+class ColumnarCatalog:
+    """Колонки каталогу з векторизованими фільтрами, сортуванням і підрахунком"""
+
+    def __init__(self):
+        self.loaded = False
+        self.refreshed_at: Optional[datetime] = None
+        self.served = 0
+        self.fallbacks = 0
+        self._loading: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._numeric: Dict[str, np.ndarray] = {field: np.zeros(0) for field in NUMERIC_COLUMNS}
+        self._codes: Dict[str, np.ndarray] = {field: np.zeros(0, dtype=np.int32) for field in DICTIONARY_COLUMNS}
+        # Код 0 у кожному словнику - відсутнє значення
+        self._dictionaries: Dict[str, List[Optional[str]]] = {field: [None] for field in DICTIONARY_COLUMNS}
+        self._dictionary_codes: Dict[str, Dict[str, int]] = {field: {} for field in DICTIONARY_COLUMNS}
+        # Перестановки рядків за зростанням поля та рядки, змінені після їх побудови
+        self._sorted: Dict[str, np.ndarray] = {}
+        self._stale = np.zeros(0, dtype=bool)
+
+    def __len__(self) -> int:
+        return int(self._alive[:len(self._ids)].sum())
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        # Створюється в циклі подій, при першому використанні
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def stats(self) -> Dict[str, Any]:
+        return {"loaded": self.loaded, "cars": len(self), "served": self.served, "fallbacks": self.fallbacks}
+
+    # Побудова та зміни
+
+    def _code(self, field: str, value: Any) -> int:
+        value = decode_value(field, value)
+        if value is None:
+            return 0
+        value = str(value)
+        codes = self._dictionary_codes[field]
+        if value not in codes:
+            codes[value] = len(self._dictionaries[field])
+            self._dictionaries[field].append(value)
+        return codes[value]
+
+    def _prepare(self, cars: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Обчислює новий стан каталогу, не змінюючи поточний (може виконуватись в окремому потоці)"""
+        builder = ColumnarCatalog()
+        ids = [str(car["_id"]) for car in cars]
+        return {
+            "_ids": ids,
+            "_rows": {car_id: row for row, car_id in enumerate(ids)},
+            "_alive": np.ones(len(cars), dtype=bool),
+            "_numeric": {
+                field: np.fromiter((_number(car.get(field)) for car in cars), dtype=np.float64, count=len(cars))
+                for field in NUMERIC_COLUMNS
+            },
+            "_codes": {
+                field: np.fromiter((builder._code(field, car.get(field)) for car in cars), dtype=np.int32, count=len(cars))
+                for field in DICTIONARY_COLUMNS
+            },
+            "_dictionaries": builder._dictionaries,
+            "_dictionary_codes": builder._dictionary_codes,
+            "_sorted": {},
+            "_stale": np.zeros(len(cars), dtype=bool),
+        }
+
+    def build(self, cars: Iterable[Dict[str, Any]]):
+        """Будує каталог з нуля"""
+        self.__dict__.update(self._prepare(list(cars)))
+        self.loaded = True
+
+    def _reserve(self, size: int):
+        """Гарантує місце для size рядків; масиви ростуть з запасом, щоб не копіювати їх на кожну вставку"""
+        capacity = len(self._alive)
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 3 // 2, 64)
+
+        def grown(array: np.ndarray) -> np.ndarray:
+            result = np.zeros(capacity, dtype=array.dtype)
+            result[:len(array)] = array
+            return result
+
+        self._alive = grown(self._alive)
+        self._stale = grown(self._stale)
+        self._numeric = {field: grown(array) for field, array in self._numeric.items()}
+        self._codes = {field: grown(array) for field, array in self._codes.items()}
+
+    def upsert(self, cars: Iterable[Dict[str, Any]]):
+        """Додає нові або оновлює змінені автомобілі (повні документи)"""
+        cars = list(cars)
+        # До завантаження зміни не потрібні - їх врахує завантаження з бази
+        if not cars or not self.loaded:
+            return
+        for car in cars:
+            car_id = str(car["_id"])
+            row = self._rows.get(car_id)
+            if row is None:
+                self._reserve(len(self._ids) + 1)
+                row = self._rows[car_id] = len(self._ids)
+                self._ids.append(car_id)
+            for field in NUMERIC_COLUMNS:
+                self._numeric[field][row] = _number(car.get(field))
+            for field in DICTIONARY_COLUMNS:
+                self._codes[field][row] = self._code(field, car.get(field))
+            self._alive[row] = True
+            # Рядок змінився - до перебудови перестановок він сортується окремо
+            self._stale[row] = True
+
+    def remove(self, car_ids: Iterable[Any]):
+        """Виключає автомобілі з результатів"""
+        if not self.loaded:
+            return
+        for car_id in car_ids:
+            row = self._rows.get(str(car_id))
+            if row is not None:
+                self._alive[row] = False
+
+    # Запити
+
+    def _dictionary_mask(self, field: str, condition: Any) -> Optional[np.ndarray]:
+        """Таблиця "код словника -> підходить" для умови на рядкове поле"""
+        dictionary = self._dictionaries[field]
+        matches = np.zeros(len(dictionary), dtype=bool)
+        if isinstance(condition, dict) and set(condition) <= {"$regex", "$options"}:
+            options = condition.get("$options", "")
+            if set(options) - {"i"}:
+                return None
+            try:
+                pattern = re.compile(condition["$regex"], re.IGNORECASE if "i" in options else 0)
+            except re.error:
+                return None
+            for code, value in enumerate(dictionary):
+                matches[code] = value is not None and pattern.search(value) is not None
+            return matches
+        if isinstance(condition, dict):
+            if set(condition) != {"$in"}:
+                return None
+            values = condition["$in"]
+        elif isinstance(condition, (str, int)) and not isinstance(condition, bool):
+            values = [condition]
+        else:
+            return None
+        codes = self._dictionary_codes[field]
+        for value in values:
+            code = codes.get(str(decode_value(field, value)))
+            if code is not None:
+                matches[code] = True
+        return matches
+
+    def _mask(self, query: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Векторизована маска рядків, що відповідають запиту; None - запит не підтримується"""
+        size = len(self._ids)
+        mask = self._alive[:size].copy()
+        for field, condition in query.items():
+            if field in NUMERIC_COLUMNS:
+                column = self._numeric[field][:size]
+                if isinstance(condition, dict):
+                    if not condition or set(condition) - set(RANGE_OPERATORS):
+                        return None
+                    for operator, bound in condition.items():
+                        bound = _number(bound)
+                        if np.isnan(bound):
+                            return None
+                        mask &= RANGE_OPERATORS[operator](column, bound)
+                else:
+                    value = _number(condition)
+                    if np.isnan(value):
+                        return None
+                    mask &= column == value
+            elif field in DICTIONARY_COLUMNS:
+                matches = self._dictionary_mask(field, condition)
+                if matches is None:
+                    return None
+                mask &= matches[self._codes[field][:size]]
+            else:
+                return None
+        return mask
+
+    def _sort_key(self, field: str) -> np.ndarray:
+        # Як у MongoDB: відсутні значення менші за будь-яке число
+        column = self._numeric[field][:len(self._ids)]
+        return np.where(np.isnan(column), -np.inf, column)
+
+    def _permutation(self, field: str) -> np.ndarray:
+        """Рядки за зростанням поля; перебудовується, коли змінених рядків стало забагато"""
+        size = len(self._ids)
+        stale = self._stale[:size]
+        stale_count = int(stale.sum())
+        if field not in self._sorted or stale_count > max(1024, size // 100):
+            if stale_count:
+                # Нова перестановка враховує всі зміни - інші теж будуються заново
+                self._sorted = {}
+                stale[:] = False
+            self._sorted[field] = np.argsort(self._sort_key(field), kind="stable")
+        return self._sorted[field]
+
+    def _first_rows(self, field: str, sort_order: int, mask: np.ndarray, count: int) -> np.ndarray:
+        """
+        Перші count рядків маски в порядку сортування
+
+        Перші сторінки - найчастіші запити, тож перестановка переглядається блоками
+        лише до набору потрібної кількості. Рядки, змінені після побудови
+        перестановки, сортуються окремо і вливаються в результат.
+        """
+        permutation = self._permutation(field)
+        if sort_order < 0:
+            permutation = permutation[::-1]
+        stale = self._stale[:len(self._ids)]
+        has_stale = bool(stale.any())
+        clean = mask & ~stale if has_stale else mask
+
+        found = []
+        collected = 0
+        block = max(4096, count * 4)
+        start = 0
+        while start < len(permutation) and collected < count:
+            rows = permutation[start:start + block]
+            rows = rows[clean[rows]]
+            found.append(rows)
+            collected += len(rows)
+            start += block
+            block *= 2
+        rows = np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+
+        if has_stale:
+            extra = np.flatnonzero(mask & stale)
+            if extra.size:
+                rows = np.concatenate([rows, extra])
+                key = self._sort_key(field)[rows]
+                rows = rows[np.argsort(key if sort_order > 0 else -key, kind="stable")]
+        return rows[:count]
+
+    def query(self, query: Dict[str, Any], sort_by: str, sort_order: int, skip: int,
+              limit: int) -> Optional[Tuple[int, List[str]]]:
+        """
+        Кількість автомобілів за запитом та ID сторінки
+
+        Returns:
+            (кількість, ID сторінки в порядку сортування) або None, якщо каталог
+            не завантажений або запит не підтримується
+        """
+        if not self.loaded or sort_by not in SORT_FIELDS:
+            self.fallbacks += 1
+            return None
+        mask = self._mask(query)
+        if mask is None:
+            self.fallbacks += 1
+            return None
+
+        self.served += 1
+        rows = self._first_rows(sort_by, sort_order, mask, skip + limit)
+        return int(mask.sum()), [self._ids[row] for row in rows[skip:skip + limit]]
+
+    # Завантаження з бази
+
+    async def _load(self, db):
+        started = datetime.utcnow()
+        cars = await db.cars.find({}, PROJECTION).to_list(None)
+        # Побудова колонок не блокує цикл подій; готовий стан підміняється одразу цілком
+        state = await asyncio.get_running_loop().run_in_executor(None, self._prepare, cars)
+        self.__dict__.update(state)
+        self.loaded = True
+        self.refreshed_at = started
+        logger.info(f"Колонковий каталог побудовано: {len(self)} автомобілів")
+
+    async def load(self, db):
+        """Повне завантаження каталогу з бази"""
+        async with self.lock:
+            await self._load(db)
+
+    def start_loading(self, db):
+        """Запускає завантаження у фоні; до його завершення запити виконує MongoDB"""
+        if self.loaded or (self._loading and not self._loading.done()):
+            return
+        self._loading = asyncio.create_task(self._load_in_background(db))
+
+    async def _load_in_background(self, db):
+        try:
+            await self.load(db)
+        except Exception as e:
+            logger.error(f"Помилка при побудові колонкового каталогу: {e}")
+
+    async def refresh(self, db):
+        """Застосовує зміни інших процесів з моменту останнього оновлення"""
+        if not self.loaded:
+            return
+        async with self.lock:
+            started = datetime.utcnow()
+            since = self.refreshed_at
+            changed = await db.cars.find(
+                {"$or": [{"created_at": {"$gte": since}}, {"updated_at": {"$gte": since}}]}, PROJECTION
+            ).to_list(None)
+            archived = await db.cars_archive.find({"archived_at": {"$gte": since}}, {"_id": 1}).to_list(None)
+            self.upsert(changed)
+            self.remove(car["_id"] for car in archived)
+            self.refreshed_at = started
+
+
+_catalog: Optional[ColumnarCatalog] = None
+
+
+def get_columnar_catalog() -> ColumnarCatalog:
+    """Повертає колонковий каталог процесу (підписаний на зміни в колекції cars)"""
+    global _catalog
+    if _catalog is None:
+        _catalog = ColumnarCatalog()
+        changes.add_listener(_catalog)
+    return _catalog
@@ -0,0 +1,281 @@
+"""
+Оцінка ринкової ціни автомобіля
+
+Для кожного сегмента (модель, марка, увесь ринок) підбирається лінійна регресія
+логарифма ціни за роком, пробігом та об'ємом двигуна. Коефіцієнти всіх
+сегментів рахуються пакетно (NumPy) після кожного запуску скрапера і
+зберігаються в колекції price_models - кілька чисел на сегмент. Процеси API
+тримають таблицю в пам'яті, тож оцінка - це пошук сегмента і скалярний добуток,
+без агрегацій по колекції cars.
+
+Сегменти з малою кількістю оголошень стягуються до батьківського сегмента
+(модель -> марка -> ринок), а сегменти з менш ніж PRICE_MODEL_MIN_SAMPLES
+оголошеннями не зберігаються - для них використовується батьківський.
+
+Одноразовий перерахунок: python -m app.analytics.pricing
+"""
+import asyncio
+import math
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+from pymongo import ReplaceOne
+
+from app.config import settings
+
+# Сегмент "увесь ринок"
+GLOBAL_KEY = "*"
+# Рік, відносно якого рахується вік (щоб вільний член лишався в розумних межах)
+BASE_YEAR = 2010
+FEATURES = ("intercept", "year", "mileage", "engine_volume")
+# Вага коефіцієнтів батьківського сегмента, в "оголошеннях"
+PRIOR_STRENGTH = 10.0
+# Частка оголошень сегмента, що потрапляє в діапазон оцінки (±1.28 σ - 80%)
+RANGE_Z = 1.28
+
+PROJECTION = {"make": 1, "model": 1, "year": 1, "price": 1, "mileage": 1, "engine_volume": 1}
+
+RATING_LOW = "низька"
+RATING_FAIR = "справедлива"
+RATING_HIGH = "висока"
+
+
+def segment_key(make: Any, model: Any = None) -> str:
+    """Ключ сегмента: "bmw|x5" для моделі, "bmw" для марки"""
+    make = str(make or "").strip().lower()
+    if model is None:
+        return make
+    return f"{make}|{str(model).strip().lower()}"
+
+
+def _number(value: Any) -> float:
+    return float(value) if isinstance(value, (int, float)) and value >= 0 else np.nan
+
+
+def design_matrix(cars: List[Dict[str, Any]], defaults: Dict[str, float]) -> np.ndarray:
+    """Рядки ознак [1, рік, log(пробіг), об'єм]; відсутні пробіг та об'єм замінюються типовими"""
+    def column(field: str) -> np.ndarray:
+        values = np.fromiter((_number(car.get(field)) for car in cars), dtype=np.float64, count=len(cars))
+        return np.where(np.isnan(values), defaults.get(field, 0.0), values)
+
+    matrix = np.empty((len(cars), len(FEATURES)), dtype=np.float64)
+    matrix[:, 0] = 1.0
+    matrix[:, 1] = column("year") - BASE_YEAR
+    matrix[:, 2] = np.log1p(column("mileage") / 1000)
+    matrix[:, 3] = column("engine_volume")
+    return matrix
+
+
+def _group_solve(X: np.ndarray, y: np.ndarray, codes: np.ndarray, groups: int,
+                 prior: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Гребенева регресія для всіх груп одночасно, зі стягуванням до коефіцієнтів prior
+
+    Returns:
+        (коефіцієнти [groups, features], СКВ залишків [groups], кількість [groups])
+    """
+    features = X.shape[1]
+    counts = np.bincount(codes, minlength=groups).astype(np.float64)
+    # Суми XᵀX та Xᵀy по групах: по одному bincount на елемент матриці
+    xtx = np.empty((groups, features, features))
+    for i in range(features):
+        for j in range(i, features):
+            xtx[:, i, j] = xtx[:, j, i] = np.bincount(codes, weights=X[:, i] * X[:, j], minlength=groups)
+    xty = np.stack([np.bincount(codes, weights=X[:, i] * y, minlength=groups) for i in range(features)], axis=1)
+
+    xtx += PRIOR_STRENGTH * np.eye(features)
+    xty += PRIOR_STRENGTH * prior
+    coefficients = np.linalg.solve(xtx, xty[..., None])[..., 0]
+
+    residuals = y - np.einsum("ij,ij->i", X, coefficients[codes])
+    squares = np.bincount(codes, weights=residuals ** 2, minlength=groups)
+    rmse = np.sqrt(squares / np.maximum(counts, 1))
+    return coefficients, rmse, counts
+
+
+def fit_models(cars: List[Dict[str, Any]], min_samples: int) -> Dict[str, Dict[str, Any]]:
+    """Підбирає коефіцієнти для ринку, марок та моделей (може виконуватись в окремому потоці)"""
+    cars = [
+        car for car in cars
+        if isinstance(car.get("price"), (int, float)) and car["price"] > 0
+        and isinstance(car.get("year"), int) and car.get("make")
+    ]
+    if not cars:
+        return {}
+
+    defaults = {}
+    for field in ("mileage", "engine_volume"):
+        values = np.array([_number(car.get(field)) for car in cars])
+        defaults[field] = float(np.nanmedian(values)) if np.isfinite(values).any() else 0.0
+
+    X = design_matrix(cars, defaults)
+    y = np.log(np.array([car["price"] for car in cars], dtype=np.float64))
+
+    models: Dict[str, Dict[str, Any]] = {}
+
+    def keep(keys: List[str], coefficients, rmse, counts, minimum: int):
+        for key, beta, sigma, count in zip(keys, coefficients, rmse, counts):
+            if count >= minimum:
+                models[key] = {"coefficients": beta.tolist(), "rmse": float(sigma), "count": int(count)}
+
+    # Ринок: стягування до нуля лише стабілізує розв'язок
+    global_codes = np.zeros(len(cars), dtype=np.int64)
+    coefficients, rmse, counts = _group_solve(X, y, global_codes, 1, np.zeros(len(FEATURES)))
+    keep([GLOBAL_KEY], coefficients, rmse, counts, 1)
+    models[GLOBAL_KEY]["defaults"] = defaults
+    global_beta = coefficients[0]
+
+    make_keys, make_codes = np.unique([segment_key(car["make"]) for car in cars], return_inverse=True)
+    make_beta, rmse, counts = _group_solve(X, y, make_codes, len(make_keys), global_beta)
+    keep(list(make_keys), make_beta, rmse, counts, min_samples)
+
+    model_keys, model_codes = np.unique(
+        [segment_key(car["make"], car.get("model")) for car in cars], return_inverse=True
+    )
+    # Батьківський сегмент моделі - її марка
+    parents = np.zeros(len(model_keys), dtype=np.int64)
+    parents[model_codes] = make_codes
+    coefficients, rmse, counts = _group_solve(X, y, model_codes, len(model_keys), make_beta[parents])
+    keep(list(model_keys), coefficients, rmse, counts, min_samples)
+    return models
+
+
+class PriceModels:
+    """Таблиця коефіцієнтів сегментів у пам'яті"""
+
+    def __init__(self):
+        self.loaded_at: Optional[float] = None
+        self.fitted_at: Optional[datetime] = None
+        self._models: Dict[str, Dict[str, Any]] = {}
+        self._lock: Optional[asyncio.Lock] = None
+
+    def __len__(self) -> int:
+        return len(self._models)
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        # Створюється в циклі подій, при першому використанні
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _set(self, models: Dict[str, Dict[str, Any]], fitted_at: Optional[datetime]):
+        for model in models.values():
+            model["coefficients"] = np.asarray(model["coefficients"], dtype=np.float64)
+        self._models = models
+        self.fitted_at = fitted_at
+        self.loaded_at = time.monotonic()
+
+    def _segment(self, make: Any, model: Any) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Найточніший сегмент, для якого є модель"""
+        for level, key in (("model", segment_key(make, model)), ("make", segment_key(make)), ("all", GLOBAL_KEY)):
+            if key in self._models:
+                return level, self._models[key]
+        return "all", None
+
+    def estimate(self, car: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Оцінка ринкової ціни автомобіля
+
+        Returns:
+            Оцінка, діапазон та сегмент; якщо в автомобіля є ціна - також відхилення
+            від оцінки та рейтинг ціни. None, якщо оцінити неможливо.
+        """
+        if not isinstance(car.get("year"), int):
+            return None
+        level, model = self._segment(car.get("make"), car.get("model"))
+        if model is None:
+            return None
+
+        defaults = self._models[GLOBAL_KEY].get("defaults", {})
+        features = design_matrix([car], defaults)[0]
+        log_price = float(features @ model["coefficients"])
+        spread = RANGE_Z * model["rmse"]
+        result = {
+            "estimate": round(math.exp(log_price)),
+            "range": {"low": round(math.exp(log_price - spread)), "high": round(math.exp(log_price + spread))},
+            "segment": level,
+            "sample_size": model["count"],
+            "fitted_at": self.fitted_at,
+        }
+
+        price = car.get("price")
+        if isinstance(price, (int, float)) and price > 0:
+            result["price"] = price
+            result["difference_percent"] = round((price / result["estimate"] - 1) * 100, 1)
+            if price < result["range"]["low"]:
+                result["rating"] = RATING_LOW
+            elif price > result["range"]["high"]:
+                result["rating"] = RATING_HIGH
+            else:
+                result["rating"] = RATING_FAIR
+        return result
+
+    async def load(self, db):
+        """Завантажує таблицю коефіцієнтів з бази"""
+        documents = await db.price_models.find({}).to_list(None)
+        models = {document.pop("_id"): document for document in documents}
+        fitted_at = max((document.get("fitted_at") for document in documents if document.get("fitted_at")), default=None)
+        self._set(models, fitted_at)
+
+    async def ensure_loaded(self, db):
+        """Завантажує таблицю при першому зверненні та перечитує її після PRICE_MODEL_CACHE_TTL"""
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at < settings.PRICE_MODEL_CACHE_TTL:
+            return
+        async with self.lock:
+            if self.loaded_at is None or time.monotonic() - self.loaded_at >= settings.PRICE_MODEL_CACHE_TTL:
+                await self.load(db)
+
+    async def fit(self, db) -> int:
+        """
+        Перераховує коефіцієнти всіх сегментів і зберігає їх у price_models
+
+        Returns:
+            Кількість збережених сегментів
+        """
+        async with self.lock:
+            fitted_at = datetime.utcnow()
+            cars = await db.cars.find({"price": {"$gt": 0}}, PROJECTION).to_list(None)
+            models = await asyncio.get_running_loop().run_in_executor(
+                None, fit_models, cars, settings.PRICE_MODEL_MIN_SAMPLES
+            )
+            if not models:
+                return 0
+
+            await db.price_models.bulk_write(
+                [ReplaceOne({"_id": key}, {**model, "fitted_at": fitted_at}, upsert=True) for key, model in models.items()],
+                ordered=False,
+            )
+            # Сегменти, яких більше немає (або замало оголошень), видаляються
+            await db.price_models.delete_many({"fitted_at": {"$lt": fitted_at}})
+            self._set(models, fitted_at)
+            logger.info(f"Моделі ціни перераховано: {len(cars)} оголошень, {len(models)} сегментів")
+            return len(models)
+
+
+_models: Optional[PriceModels] = None
+
+
+def get_price_models() -> PriceModels:
+    """Повертає спільну для процесу таблицю моделей ціни"""
+    global _models
+    if _models is None:
+        _models = PriceModels()
+    return _models
+
+
+async def main():
+    from app.db.database import get_database, init_db, close_db
+
+    await init_db()
+    try:
+        await get_price_models().fit(await get_database())
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,301 @@
+"""
+Пошук схожих автомобілів
+
+Каталог тримається в пам'яті як матриця ознак NumPy (ціна, рік, пробіг, об'єм
+двигуна, тип пального, коробка передач). Числові ознаки стандартизуються,
+категоріальні кодуються one-hot з вагою, тож відстань між рядками - зважена
+евклідова відстань. Найближчі сусіди шукаються одним векторизованим множенням
+матриці на вектор і np.argpartition, без запитів до бази.
+
+Індекс завантажується з бази при першому запиті, далі оновлюється інкрементально:
+записи процесу надходять одразу (app.db.changes), зміни інших процесів - при
+періодичному оновленні з бази.
+"""
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.api.models import FuelType, TransmissionType
+from app.db import changes
+from app.db.compact import encode_value
+
+# Числові ознаки та їх ваги; ціна і пробіг логарифмуються (різниця в 10% важить однаково для дешевих і дорогих авто)
+NUMERIC_FEATURES: Tuple[Tuple[str, float, bool], ...] = (
+    ("price", 2.0, True),
+    ("year", 1.5, False),
+    ("mileage", 1.0, True),
+    ("engine_volume", 1.0, False),
+)
+# Категоріальні ознаки: значення та вага розбіжності
+CATEGORICAL_FEATURES: Tuple[Tuple[str, Tuple[str, ...], float], ...] = (
+    ("engine_type", tuple(item.value for item in FuelType), 1.0),
+    ("transmission", tuple(item.value for item in TransmissionType), 0.7),
+)
+DIMENSIONS = len(NUMERIC_FEATURES) + sum(len(values) for _, values, _ in CATEGORICAL_FEATURES)
+
+# Поля документа, потрібні для побудови індексу
+PROJECTION = {field: 1 for field in ["make"] + [name for name, _, _ in NUMERIC_FEATURES] +
+              [name for name, _, _ in CATEGORICAL_FEATURES]}
+
+
+def _number(value: Any) -> float:
+    return float(value) if isinstance(value, (int, float)) and value >= 0 else np.nan
+
+
+def raw_numeric(cars: List[Dict[str, Any]]) -> np.ndarray:
+    """Числові ознаки до стандартизації; відсутні значення - NaN"""
+    raw = np.empty((len(cars), len(NUMERIC_FEATURES)), dtype=np.float64)
+    for column, (field, _, logarithmic) in enumerate(NUMERIC_FEATURES):
+        values = np.fromiter((_number(car.get(field)) for car in cars), dtype=np.float64, count=len(cars))
+        raw[:, column] = np.log1p(values) if logarithmic else values
+    return raw
+
+
+def _category_positions(field: str, values: Tuple[str, ...], offset: int) -> Dict[Any, int]:
+    """Стовпець one-hot для значення категорії (в звичайній та компактній формі зберігання)"""
+    positions = {}
+    for index, value in enumerate(values):
+        positions[value] = offset + index
+        positions[encode_value(field, value)] = offset + index
+    return positions
+
+
+class SimilarCarsIndex:
+    """Матриця ознак каталогу з векторизованим пошуком найближчих сусідів"""
+
+    def __init__(self):
+        self.loaded = False
+        self.refreshed_at: Optional[datetime] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._matrix = np.zeros((0, DIMENSIONS), dtype=np.float32)
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._makes = np.zeros(0, dtype=np.int32)
+        self._make_codes: Dict[str, int] = {}
+        self._partitions: Optional[Dict[int, np.ndarray]] = None
+        self._mean = np.zeros(len(NUMERIC_FEATURES))
+        self._scale = np.ones(len(NUMERIC_FEATURES))
+
+    def __len__(self) -> int:
+        return int(self._alive.sum())
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        # Створюється в циклі подій, при першому використанні
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _features(self, cars: List[Dict[str, Any]]) -> np.ndarray:
+        """Нормалізовані та зважені вектори ознак"""
+        # Матриця зберігається по стовпцях: множення на вектор запиту читає пам'ять послідовно
+        features = np.zeros((len(cars), DIMENSIONS), dtype=np.float32, order="F")
+        numeric = (raw_numeric(cars) - self._mean) / self._scale
+        # Відсутнє значення дорівнює середньому і не впливає на відстань
+        numeric = np.nan_to_num(numeric, nan=0.0)
+        features[:, :len(NUMERIC_FEATURES)] = numeric * [weight for _, weight, _ in NUMERIC_FEATURES]
+
+        offset = len(NUMERIC_FEATURES)
+        for field, values, weight in CATEGORICAL_FEATURES:
+            positions = _category_positions(field, values, offset)
+            columns = np.fromiter((positions.get(car.get(field), -1) for car in cars), dtype=np.int64, count=len(cars))
+            rows = np.flatnonzero(columns >= 0)
+            # Розбіжність категорії додає weight² до квадрата відстані
+            features[rows, columns[rows]] = weight / np.sqrt(2)
+            offset += len(values)
+        return features
+
+    def _make_code(self, make: Any) -> int:
+        key = str(make or "").strip().lower()
+        if key not in self._make_codes:
+            self._make_codes[key] = len(self._make_codes)
+        return self._make_codes[key]
+
+    def _prepare(self, cars: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Обчислює новий стан індексу, не змінюючи поточний (може виконуватись в окремому потоці)"""
+        builder = SimilarCarsIndex()
+        cars = list(cars)
+        raw = raw_numeric(cars)
+        if cars:
+            with np.errstate(all="ignore"):
+                mean = np.nanmean(raw, axis=0)
+                scale = np.nanstd(raw, axis=0)
+            builder._mean = np.nan_to_num(mean, nan=0.0)
+            builder._scale = np.where(np.nan_to_num(scale, nan=0.0) > 0, scale, 1.0)
+
+        matrix = builder._features(cars)
+        ids = [str(car["_id"]) for car in cars]
+        return {
+            "_mean": builder._mean,
+            "_scale": builder._scale,
+            "_ids": ids,
+            "_rows": {car_id: row for row, car_id in enumerate(ids)},
+            "_matrix": matrix,
+            "_norms": np.einsum("ij,ij->i", matrix, matrix),
+            "_alive": np.ones(len(cars), dtype=bool),
+            "_makes": np.array([builder._make_code(car.get("make")) for car in cars], dtype=np.int32),
+            "_make_codes": builder._make_codes,
+            "_partitions": None,
+        }
+
+    def build(self, cars: Iterable[Dict[str, Any]]):
+        """Будує індекс з нуля (з новими параметрами нормалізації)"""
+        self.__dict__.update(self._prepare(cars))
+        self.loaded = True
+
+    def upsert(self, cars: Iterable[Dict[str, Any]]):
+        """Додає нові або оновлює змінені автомобілі (параметри нормалізації не змінюються)"""
+        cars = list(cars)
+        # До завантаження зміни не потрібні - їх врахує завантаження з бази
+        if not cars or not self.loaded:
+            return
+        features = self._features(cars)
+        new_ids = list(dict.fromkeys(str(car["_id"]) for car in cars if str(car["_id"]) not in self._rows))
+        if new_ids:
+            self._reserve(len(self._ids) + len(new_ids))
+            for car_id in new_ids:
+                self._rows[car_id] = len(self._ids)
+                self._ids.append(car_id)
+
+        for vector, car in zip(features, cars):
+            row = self._rows[str(car["_id"])]
+            self._matrix[row] = vector
+            self._norms[row] = vector @ vector
+            self._alive[row] = True
+            self._makes[row] = self._make_code(car.get("make"))
+        self._partitions = None
+
+    def _reserve(self, size: int):
+        """Гарантує місце для size рядків; масиви ростуть з запасом, щоб не копіювати їх на кожну вставку"""
+        capacity = len(self._matrix)
+        if size <= capacity:
+            return
+        capacity = max(size, capacity * 3 // 2, 64)
+
+        def grown(array: np.ndarray) -> np.ndarray:
+            result = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype, order="F")
+            result[:len(array)] = array
+            return result
+
+        self._matrix = grown(self._matrix)
+        self._norms = grown(self._norms)
+        self._alive = grown(self._alive)
+        self._makes = grown(self._makes)
+
+    def remove(self, car_ids: Iterable[Any]):
+        """Виключає автомобілі з пошуку"""
+        if not self.loaded:
+            return
+        for car_id in car_ids:
+            row = self._rows.get(str(car_id))
+            if row is not None:
+                self._alive[row] = False
+        self._partitions = None
+
+    def _partition(self, make_code: int) -> np.ndarray:
+        """Рядки однієї марки (розбиття будується ліниво і скидається при змінах)"""
+        if self._partitions is None:
+            makes = self._makes[:len(self._ids)]
+            order = np.argsort(makes, kind="stable")
+            boundaries = np.flatnonzero(np.diff(makes[order])) + 1
+            self._partitions = {
+                int(makes[group[0]]): group for group in np.split(order, boundaries) if len(group)
+            }
+        return self._partitions.get(make_code, np.zeros(0, dtype=np.int64))
+
+    def similar(self, car_id: str, k: int = 10, same_make: bool = False) -> Optional[List[Tuple[str, float]]]:
+        """
+        Найближчі до car_id автомобілі
+
+        Returns:
+            Список (ID, відстань) за зростанням відстані або None, якщо автомобіля немає в індексі
+        """
+        row = self._rows.get(str(car_id))
+        if row is None or not self._alive[row]:
+            return None
+
+        size = len(self._ids)
+        query = self._matrix[row]
+        candidates = self._partition(int(self._makes[row])) if same_make else None
+        matrix = self._matrix[:size] if candidates is None else self._matrix[candidates]
+        norms = self._norms[:size] if candidates is None else self._norms[candidates]
+        alive = self._alive[:size] if candidates is None else self._alive[candidates]
+
+        # |a - q|² = |a|² - 2·a·q + |q|²; |q|² однаковий для всіх і додається лише до результатів
+        distances = matrix @ query
+        distances *= -2
+        distances += norms
+        distances[~alive] = np.inf
+        if candidates is None:
+            distances[row] = np.inf
+        else:
+            distances[candidates == row] = np.inf
+
+        k = min(k, int(np.isfinite(distances).sum()))
+        if k <= 0:
+            return []
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind="stable")]
+        rows = top if candidates is None else candidates[top]
+        query_norm = float(self._norms[row])
+        return [
+            (self._ids[row], float(np.sqrt(max(distance + query_norm, 0.0))))
+            for row, distance in zip(rows, distances[top])
+        ]
+
+    async def _load(self, db):
+        started = datetime.utcnow()
+        cars = await db.cars.find({}, PROJECTION).to_list(None)
+        # Побудова матриці не блокує цикл подій; готовий стан підміняється одразу цілком
+        state = await asyncio.get_running_loop().run_in_executor(None, self._prepare, cars)
+        self.__dict__.update(state)
+        self.loaded = True
+        self.refreshed_at = started
+        logger.info(f"Індекс схожих автомобілів побудовано: {len(self)} автомобілів")
+
+    async def load(self, db):
+        """Повне завантаження каталогу з бази (з перерахунком параметрів нормалізації)"""
+        async with self.lock:
+            await self._load(db)
+
+    async def ensure_loaded(self, db):
+        """Завантажує індекс при першому зверненні; одночасні запити чекають одного завантаження"""
+        if self.loaded:
+            return
+        async with self.lock:
+            if not self.loaded:
+                await self._load(db)
+
+    async def refresh(self, db):
+        """Застосовує зміни з моменту останнього оновлення: нові, змінені та архівовані автомобілі"""
+        if not self.loaded:
+            return
+        async with self.lock:
+            started = datetime.utcnow()
+            since = self.refreshed_at
+            changed = await db.cars.find(
+                {"$or": [{"created_at": {"$gte": since}}, {"updated_at": {"$gte": since}}]}, PROJECTION
+            ).to_list(None)
+            archived = await db.cars_archive.find({"archived_at": {"$gte": since}}, {"_id": 1}).to_list(None)
+            self.upsert(changed)
+            self.remove(car["_id"] for car in archived)
+            self.refreshed_at = started
+            if changed or archived:
+                logger.info(f"Індекс схожих автомобілів оновлено: змінено {len(changed)}, в архіві {len(archived)}")
+
+
+_index: Optional[SimilarCarsIndex] = None
+
+
+def get_similar_index() -> SimilarCarsIndex:
+    """Повертає спільний для процесу індекс схожих автомобілів (підписаний на зміни в колекції cars)"""
+    global _index
+    if _index is None:
+        _index = SimilarCarsIndex()
+        changes.add_listener(_index)
+    return _index
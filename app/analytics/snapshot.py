@@ -0,0 +1,274 @@
+"""
+Колонкові знімки каталогу для аналітики
+
+Знімок - це повна копія колекції cars на певну дату у форматі Arrow IPC
+(файл відображається в пам'ять, читання без копіювання) або Parquet (менший
+розмір). Колонки типізовані, марка, модель та інші повторювані рядки
+закодовані словником. Знімки розкладаються по каталогах за датою:
+
+    snapshots/cars/snapshot_date=2024-05-01/cars.arrow
+
+Така структура читається як розбитий на частини набір даних
+(pyarrow.dataset, DuckDB, Polars), тож аналітика працює з файлами, а не
+з робочою базою. Колекція читається потоково серверним курсором, пакетами,
+з вторинного вузла, якщо він є.
+
+Одноразовий запуск: python -m app.analytics.snapshot [arrow|parquet]
+"""
+import asyncio
+import os
+import shutil
+import sys
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+from pymongo import ReadPreference
+
+from app.config import settings
+from app.db.compact import decode_car
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - pyarrow є необов'язковою залежністю
+    pa = None
+    pq = None
+
+FORMATS = {"arrow": "cars.arrow", "parquet": "cars.parquet"}
+PARTITION_PREFIX = "snapshot_date="
+
+# Колонки знімка та їх типи; "dictionary" - рядки, закодовані словником
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("id", "string"),
+    ("make", "dictionary"),
+    ("model", "dictionary"),
+    ("year", "int16"),
+    ("price", "int64"),
+    ("mileage", "int32"),
+    ("engine_type", "dictionary"),
+    ("engine_volume", "float32"),
+    ("transmission", "dictionary"),
+    ("drive_type", "dictionary"),
+    ("location", "string"),
+    ("region_code", "dictionary"),
+    ("url", "string"),
+    ("image_url", "string"),
+    ("created_at", "timestamp"),
+    ("updated_at", "timestamp"),
+    ("last_seen_at", "timestamp"),
+)
+
+PROJECTION = {name: 1 for name, _ in COLUMNS if name != "id"}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Для знімків каталогу потрібен пакет pyarrow")
+
+
+def _arrow_type(kind: str):
+    if kind == "dictionary":
+        return pa.dictionary(pa.int32(), pa.string())
+    if kind == "timestamp":
+        return pa.timestamp("ms")
+    return getattr(pa, kind)()
+
+
+def snapshot_schema(snapshot_at: Optional[datetime] = None):
+    """Схема знімка (час знімка зберігається в метаданих)"""
+    _require_pyarrow()
+    metadata = {"snapshot_at": snapshot_at.isoformat()} if snapshot_at else None
+    return pa.schema([(name, _arrow_type(kind)) for name, kind in COLUMNS], metadata=metadata)
+
+
+def _clean(kind: str, value: Any) -> Any:
+    """Значення потрібного типу; значення іншого типу (старі записи) стають null"""
+    if value is None:
+        return None
+    if kind.startswith("int"):
+        return int(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    if kind == "float32":
+        return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+    if kind == "timestamp":
+        return value if isinstance(value, datetime) else None
+    return str(value)
+
+
+class ColumnDictionary:
+    """
+    Словник рядкової колонки, спільний для всіх пакетів знімка
+
+    Нові значення лише дописуються в кінець, тож кожен наступний пакет
+    розширює словник попереднього (у файлі Arrow це дельта словника).
+    """
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def encode(self, values: List[Optional[str]]):
+        indices = []
+        for value in values:
+            if value is None:
+                indices.append(None)
+                continue
+            code = self._codes.get(value)
+            if code is None:
+                code = self._codes[value] = len(self.values)
+                self.values.append(value)
+            indices.append(code)
+        return pa.DictionaryArray.from_arrays(pa.array(indices, pa.int32()), pa.array(self.values, pa.string()))
+
+
+class SnapshotWriter:
+    """Записує пакети документів у файл знімка"""
+
+    def __init__(self, path: str, fmt: str, snapshot_at: datetime):
+        _require_pyarrow()
+        self.schema = snapshot_schema(snapshot_at)
+        self.rows = 0
+        self._dictionaries = {name: ColumnDictionary() for name, kind in COLUMNS if kind == "dictionary"}
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            # Без стиснення файл можна відобразити в пам'ять і читати без копіювання
+            options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+            self._writer = pa.ipc.new_file(path, self.schema, options=options)
+
+    def write(self, cars: List[Dict[str, Any]]):
+        """Перетворює документи на пакет колонок і записує його"""
+        arrays = []
+        for name, kind in COLUMNS:
+            values = [_clean(kind, str(car["_id"]) if name == "id" else car.get(name)) for car in cars]
+            if kind == "dictionary":
+                arrays.append(self._dictionaries[name].encode(values))
+            else:
+                arrays.append(pa.array(values, _arrow_type(kind)))
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self.rows += len(cars)
+
+    def close(self):
+        self._writer.close()
+
+
+def partition_path(directory: str, snapshot_date: date) -> str:
+    return os.path.join(directory, f"{PARTITION_PREFIX}{snapshot_date.isoformat()}")
+
+
+def list_snapshots(directory: Optional[str] = None) -> List[str]:
+    """Дати наявних знімків (РРРР-ММ-ДД) за зростанням"""
+    directory = directory or settings.SNAPSHOT_DIR
+    if not os.path.isdir(directory):
+        return []
+    return sorted(
+        name[len(PARTITION_PREFIX):] for name in os.listdir(directory)
+        if name.startswith(PARTITION_PREFIX) and "." not in name
+    )
+
+
+def _remove_old(directory: str, keep: int):
+    """Видаляє найстаріші знімки понад keep"""
+    for snapshot_date in list_snapshots(directory)[:-keep] if keep > 0 else []:
+        shutil.rmtree(os.path.join(directory, PARTITION_PREFIX + snapshot_date), ignore_errors=True)
+
+
+async def export_snapshot(db, directory: Optional[str] = None, fmt: Optional[str] = None,
+                          batch_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Записує знімок колекції cars за поточну дату
+
+    Знімок спершу пишеться в тимчасовий каталог і з'являється під своєю датою
+    лише повністю записаним; повторний запуск того ж дня замінює знімок.
+
+    Returns:
+        Шлях до файлу знімка та кількість рядків
+    """
+    _require_pyarrow()
+    directory = directory or settings.SNAPSHOT_DIR
+    fmt = fmt or settings.SNAPSHOT_FORMAT
+    batch_size = batch_size or settings.SNAPSHOT_BATCH_SIZE
+    if fmt not in FORMATS:
+        raise ValueError(f"Невідомий формат знімка: {fmt}")
+
+    snapshot_at = datetime.utcnow()
+    target = partition_path(directory, snapshot_at.date())
+    staging = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    loop = asyncio.get_running_loop()
+    writer = SnapshotWriter(os.path.join(staging, FORMATS[fmt]), fmt, snapshot_at)
+    try:
+        # Аналітичне читання не навантажує основний вузол, якщо є вторинний
+        cars = db.cars.with_options(read_preference=ReadPreference.SECONDARY_PREFERRED)
+        batch = []
+        async for car in cars.find({}, PROJECTION).batch_size(batch_size):
+            batch.append(decode_car(car))
+            if len(batch) >= batch_size:
+                await loop.run_in_executor(None, writer.write, batch)
+                batch = []
+        if batch:
+            await loop.run_in_executor(None, writer.write, batch)
+        writer.close()
+    except BaseException:
+        writer.close()
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(staging, target)
+    _remove_old(directory, settings.SNAPSHOT_KEEP)
+
+    path = os.path.join(target, FORMATS[fmt])
+    logger.info(f"Знімок каталогу записано: {path}, {writer.rows} автомобілів")
+    return {"path": path, "rows": writer.rows, "snapshot_at": snapshot_at}
+
+
+def open_snapshot(snapshot_date: Optional[str] = None, directory: Optional[str] = None):
+    """
+    Відкриває знімок як таблицю Arrow (за замовчуванням - останній)
+
+    Файл Arrow відображається в пам'ять: колонки читаються з файлу без копіювання.
+    """
+    _require_pyarrow()
+    directory = directory or settings.SNAPSHOT_DIR
+    snapshots = list_snapshots(directory)
+    if snapshot_date is None and snapshots:
+        snapshot_date = snapshots[-1]
+    if snapshot_date not in snapshots:
+        raise FileNotFoundError(f"Знімок не знайдено: {snapshot_date}")
+
+    partition = os.path.join(directory, PARTITION_PREFIX + snapshot_date)
+    if os.path.exists(os.path.join(partition, FORMATS["arrow"])):
+        return pa.ipc.open_file(pa.memory_map(os.path.join(partition, FORMATS["arrow"]), "r")).read_all()
+    return pq.read_table(os.path.join(partition, FORMATS["parquet"]), memory_map=True)
+
+
+async def run_snapshots(get_db, interval: float):
+    """Фонове завдання: періодично записує знімок каталогу"""
+    while True:
+        try:
+            await export_snapshot(await get_db())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Помилка запису знімка каталогу: {e}")
+        await asyncio.sleep(interval)
+
+
+async def main(fmt: Optional[str]):
+    from app.db.database import get_database, init_db, close_db
+
+    await init_db()
+    try:
+        await export_snapshot(await get_database(), fmt=fmt)
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    fmt = sys.argv[1] if len(sys.argv) > 1 else None
+    if fmt is not None and fmt not in FORMATS:
+        sys.exit("Використання: python -m app.analytics.snapshot [arrow|parquet]")
+    asyncio.run(main(fmt))
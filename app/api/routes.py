@@ -8,7 +8,7 @@ from app.api.models import (
     Car, CarCreate, CarUpdate, PaginatedCars, 
     FuelType, TransmissionType, SearchParams
 )
-from app.db.database import get_database
+from app.db.repository import CarRepository, get_repository
 from app.config import settings
 
 router = APIRouter(tags=["cars"])
@@ -21,7 +21,7 @@ def convert_to_car_model(car_doc) -> Car:
 
 @router.get("/cars", response_model=PaginatedCars)
 async def get_cars(
-    db=Depends(get_database),
+    repository: CarRepository = Depends(get_repository),
     page: int = Query(1, ge=1, description="Номер сторінки"),
     size: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE, description="Кількість елементів на сторінці"),
     sort_by: str = Query("created_at", description="Поле для сортування"),
@@ -31,17 +31,11 @@ async def get_cars(
     Отримання списку всіх автомобілів з пагінацією
     """
     try:
-        # Рахуємо загальну кількість записів
-        total = await db.cars.count_documents({})
-        
-        # Отримуємо дані з пагінацією
-        cursor = db.cars.find({}) \
-            .sort(sort_by, sort_order) \
-            .skip((page - 1) * size) \
-            .limit(size)
+        # Загальна кількість записів і сторінка даних
+        total, docs = await repository.find_page({}, sort_by, sort_order, (page - 1) * size, size)
         
         # Конвертуємо у список моделей
-        cars = [convert_to_car_model(car) for car in await cursor.to_list(length=size)]
+        cars = [convert_to_car_model(car) for car in docs]
         
         return PaginatedCars(
             total=total,
@@ -56,7 +50,7 @@ async def get_cars(
 @router.get("/cars/{car_id}", response_model=Car)
 async def get_car(
     car_id: str = Path(..., description="ID автомобіля"),
-    db=Depends(get_database)
+    repository: CarRepository = Depends(get_repository)
 ):
     """
     Отримання інформації про конкретний автомобіль за ID
@@ -67,7 +61,7 @@ async def get_car(
             raise HTTPException(status_code=400, detail="Невірний формат ID")
         
         # Шукаємо автомобіль
-        car = await db.cars.find_one({"_id": ObjectId(car_id)})
+        car = await repository.get(car_id)
         
         if not car:
             raise HTTPException(status_code=404, detail="Автомобіль не знайдено")
@@ -82,7 +76,7 @@ async def get_car(
 @router.get("/cars/make/{make}", response_model=PaginatedCars)
 async def get_cars_by_make(
     make: str = Path(..., description="Марка автомобіля"),
-    db=Depends(get_database),
+    repository: CarRepository = Depends(get_repository),
     page: int = Query(1, ge=1, description="Номер сторінки"),
     size: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE, description="Кількість елементів на сторінці"),
     sort_by: str = Query("created_at", description="Поле для сортування"),
@@ -92,17 +86,11 @@ async def get_cars_by_make(
     Отримання списку автомобілів за маркою
     """
     try:
-        # Рахуємо загальну кількість записів за маркою
-        total = await db.cars.count_documents({"make": {"$regex": f"^{make}$", "$options": "i"}})
-        
-        # Отримуємо дані з пагінацією
-        cursor = db.cars.find({"make": {"$regex": f"^{make}$", "$options": "i"}}) \
-            .sort(sort_by, sort_order) \
-            .skip((page - 1) * size) \
-            .limit(size)
+        # Загальна кількість записів за маркою і сторінка даних
+        total, docs = await repository.find_page({"make": {"$regex": f"^{make}$", "$options": "i"}}, sort_by, sort_order, (page - 1) * size, size)
         
         # Конвертуємо у список моделей
-        cars = [convert_to_car_model(car) for car in await cursor.to_list(length=size)]
+        cars = [convert_to_car_model(car) for car in docs]
         
         return PaginatedCars(
             total=total,
@@ -117,7 +105,7 @@ async def get_cars_by_make(
 @router.get("/cars/year/{year}", response_model=PaginatedCars)
 async def get_cars_by_year(
     year: int = Path(..., ge=1900, le=datetime.now().year, description="Рік випуску"),
-    db=Depends(get_database),
+    repository: CarRepository = Depends(get_repository),
     page: int = Query(1, ge=1, description="Номер сторінки"),
     size: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE, description="Кількість елементів на сторінці"),
     sort_by: str = Query("created_at", description="Поле для сортування"),
@@ -127,17 +115,11 @@ async def get_cars_by_year(
     Отримання списку автомобілів за роком випуску
     """
     try:
-        # Рахуємо загальну кількість записів за роком
-        total = await db.cars.count_documents({"year": year})
-        
-        # Отримуємо дані з пагінацією
-        cursor = db.cars.find({"year": year}) \
-            .sort(sort_by, sort_order) \
-            .skip((page - 1) * size) \
-            .limit(size)
+        # Загальна кількість записів за роком і сторінка даних
+        total, docs = await repository.find_page({"year": year}, sort_by, sort_order, (page - 1) * size, size)
         
         # Конвертуємо у список моделей
-        cars = [convert_to_car_model(car) for car in await cursor.to_list(length=size)]
+        cars = [convert_to_car_model(car) for car in docs]
         
         return PaginatedCars(
             total=total,
@@ -152,7 +134,7 @@ async def get_cars_by_year(
 @router.post("/cars", response_model=Car, status_code=status.HTTP_201_CREATED)
 async def create_car(
     car: CarCreate = Body(...),
-    db=Depends(get_database)
+    repository: CarRepository = Depends(get_repository)
 ):
     """
     Створення нового оголошення про автомобіль
@@ -164,10 +146,10 @@ async def create_car(
         car_data["updated_at"] = car_data["created_at"]
         
         # Вставка в БД
-        result = await db.cars.insert_one(car_data)
+        car_id = await repository.insert(car_data)
         
         # Отримання створеного документа
-        created_car = await db.cars.find_one({"_id": result.inserted_id})
+        created_car = await repository.get(car_id)
         
         return convert_to_car_model(created_car)
     except Exception as e:
@@ -178,7 +160,7 @@ async def create_car(
 async def update_car(
     car_id: str = Path(..., description="ID автомобіля"),
     car_update: CarUpdate = Body(...),
-    db=Depends(get_database)
+    repository: CarRepository = Depends(get_repository)
 ):
     """
     Оновлення існуючого оголошення про автомобіль
@@ -189,7 +171,7 @@ async def update_car(
             raise HTTPException(status_code=400, detail="Невірний формат ID")
         
         # Перевіряємо наявність автомобіля
-        car = await db.cars.find_one({"_id": ObjectId(car_id)})
+        car = await repository.get(car_id)
         if not car:
             raise HTTPException(status_code=404, detail="Автомобіль не знайдено")
         
@@ -202,13 +184,10 @@ async def update_car(
             return convert_to_car_model(car)
         
         # Оновлення документа
-        await db.cars.update_one(
-            {"_id": ObjectId(car_id)},
-            {"$set": update_data}
-        )
+        await repository.update(car_id, update_data)
         
         # Отримання оновленого документа
-        updated_car = await db.cars.find_one({"_id": ObjectId(car_id)})
+        updated_car = await repository.get(car_id)
         
         return convert_to_car_model(updated_car)
     except HTTPException:
@@ -220,7 +199,7 @@ async def update_car(
 @router.delete("/cars/{car_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_car(
     car_id: str = Path(..., description="ID автомобіля"),
-    db=Depends(get_database)
+    repository: CarRepository = Depends(get_repository)
 ):
     """
     Видалення оголошення про автомобіль
@@ -231,12 +210,12 @@ async def delete_car(
             raise HTTPException(status_code=400, detail="Невірний формат ID")
         
         # Перевіряємо наявність автомобіля
-        car = await db.cars.find_one({"_id": ObjectId(car_id)})
+        car = await repository.get(car_id)
         if not car:
             raise HTTPException(status_code=404, detail="Автомобіль не знайдено")
         
         # Видалення документа
-        await db.cars.delete_one({"_id": ObjectId(car_id)})
+        await repository.delete(car_id)
         
         return None
     except HTTPException:
@@ -249,7 +228,7 @@ async def delete_car(
 @router.post("/cars/search", response_model=PaginatedCars)
 async def search_cars(
     search_params: SearchParams = Body(...),
-    db=Depends(get_database),
+    repository: CarRepository = Depends(get_repository),
     page: int = Query(1, ge=1, description="Номер сторінки"),
     size: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE, description="Кількість елементів на сторінці"),
     sort_by: str = Query("created_at", description="Поле для сортування"),
@@ -302,17 +281,11 @@ async def search_cars(
         if search_params.location:
             filter_query["location"] = {"$regex": search_params.location, "$options": "i"}
         
-        # Рахуємо загальну кількість записів за фільтром
-        total = await db.cars.count_documents(filter_query)
-        
-        # Отримуємо дані з пагінацією
-        cursor = db.cars.find(filter_query) \
-            .sort(sort_by, sort_order) \
-            .skip((page - 1) * size) \
-            .limit(size)
+        # Загальна кількість записів за фільтром і сторінка даних
+        total, docs = await repository.find_page(filter_query, sort_by, sort_order, (page - 1) * size, size)
         
         # Конвертуємо у список моделей
-        cars = [convert_to_car_model(car) for car in await cursor.to_list(length=size)]
+        cars = [convert_to_car_model(car) for car in docs]
         
         return PaginatedCars(
             total=total,
@@ -0,0 +1,94 @@
+"""
+Збірка статичних файлів веб-інтерфейсу
+
+Для CSS та JS створюються копії з хешем вмісту в імені (styles.3f2a9c1b0d.css),
+поруч кладуться попередньо стиснуті варіанти .gz та .br, а index.html
+переписується так, щоб посилатися на хешовані імена. Результат записується
+в окрему директорію, вихідні файли не змінюються.
+
+Запуск: python -m app.assets.build
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict
+
+from loguru import logger
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli є необов'язковою залежністю
+    brotli = None
+
+# Файли, що отримують хеш в імені, відносно директорії статичних файлів
+FINGERPRINTED_ASSETS = ("css/styles.css", "js/app.js")
+HASH_LENGTH = 10
+MANIFEST_NAME = "manifest.json"
+
+
+def fingerprint(name: str, data: bytes) -> str:
+    """Додає хеш вмісту до імені файлу: css/styles.css -> css/styles.<хеш>.css"""
+    digest = hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+    base, extension = os.path.splitext(name)
+    return f"{base}.{digest}{extension}"
+
+
+def write_variants(path: str, data: bytes):
+    """Записує файл та його стиснуті варіанти (.gz, а за наявності brotli - .br)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+    # mtime=0 робить результат відтворюваним між збірками
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(data, quality=11))
+
+
+def build(source_dir: str, output_dir: str, url_prefix: str = "/static/dist/") -> Dict[str, str]:
+    """
+    Збирає статичні файли
+
+    Args:
+        source_dir: Директорія вихідних статичних файлів
+        output_dir: Директорія результату збірки (попередній вміст видаляється)
+        url_prefix: URL, за яким доступна директорія результату
+
+    Returns:
+        Маніфест: вихідне ім'я -> хешоване ім'я
+    """
+    if os.path.isdir(output_dir):
+        shutil.rmtree(output_dir)
+
+    manifest = {}
+    for name in FINGERPRINTED_ASSETS:
+        with open(os.path.join(source_dir, name), "rb") as f:
+            data = f.read()
+        hashed_name = fingerprint(name, data)
+        write_variants(os.path.join(output_dir, hashed_name), data)
+        manifest[name] = hashed_name
+
+    with open(os.path.join(source_dir, "index.html"), "r", encoding="utf-8") as f:
+        index_html = f.read()
+    for name, hashed_name in manifest.items():
+        index_html = index_html.replace(f"/static/{name}", url_prefix + hashed_name)
+    write_variants(os.path.join(output_dir, "index.html"), index_html.encode("utf-8"))
+
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    if brotli is None:
+        logger.warning("Модуль brotli не встановлено, створено лише gzip-варіанти")
+    logger.info(f"Зібрано статичні файли в {output_dir}: {', '.join(manifest.values())}")
+    return manifest
+
+
+if __name__ == "__main__":
+    build(settings.STATIC_DIR, settings.STATIC_BUILD_DIR)
@@ -0,0 +1,83 @@
+import os
+import re
+import stat
+from mimetypes import guess_type
+from typing import Set
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+# Стиснуті варіанти файлів у порядку переваги
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+# Ім'я з хешем вмісту, наприклад styles.3f2a9c1b0d.css
+HASHED_NAME = re.compile(r"\.[0-9a-f]{10}\.[A-Za-z0-9]+$")
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Файли без хешу (index.html) кешуються, але перевіряються при кожному відкритті
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def accepted_encodings(header: str) -> Set[str]:
+    """Розбирає заголовок Accept-Encoding (кодування з q=0 не враховуються)"""
+    encodings = set()
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        encodings.add(name)
+    return encodings
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    Статичні файли з підтримкою попередньо стиснутих варіантів
+
+    Якщо клієнт приймає br або gzip і поруч із файлом є відповідний варіант
+    (.br / .gz, створюються збіркою app.assets.build), віддається він із
+    заголовком Content-Encoding. Файли з хешем вмісту в імені кешуються
+    назавжди, решта - з обов'язковою повторною перевіркою.
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope,
+                      status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = str(full_path)
+        headers = {
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if HASHED_NAME.search(full_path) else REVALIDATE_CACHE_CONTROL,
+            "Vary": "Accept-Encoding",
+        }
+        media_type = guess_type(full_path)[0] or "text/plain"
+
+        path, encoding = full_path, None
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        for name, suffix in ENCODINGS:
+            if name not in accepted:
+                continue
+            try:
+                variant_stat = os.stat(full_path + suffix)
+            except OSError:
+                continue
+            if stat.S_ISREG(variant_stat.st_mode):
+                path, stat_result, encoding = full_path + suffix, variant_stat, name
+                break
+        if encoding:
+            headers["Content-Encoding"] = encoding
+
+        response = FileResponse(
+            path, status_code=status_code, headers=headers, media_type=media_type,
+            method=scope["method"], stat_result=stat_result,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
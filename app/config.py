@@ -10,6 +10,12 @@ class Settings(BaseSettings):
     MONGO_URL: str = os.getenv("MONGO_URL", "mongodb://mongodb:27017")
     MONGO_DB_NAME: str = os.getenv("MONGO_DB_NAME", "car_marketplace")
     
+    # Сховище каталогу: mongodb або sqlite (вбудована база для розгортання на одному сервері)
+    DATABASE_BACKEND: str = os.getenv("DATABASE_BACKEND", "mongodb")
+    SQLITE_PATH: str = os.getenv("SQLITE_PATH", "data/cars.db")
+    SQLITE_THREADS: int = 4  # Потоки (і з'єднання) для запитів до SQLite
+    SQLITE_BUSY_TIMEOUT: float = 5.0  # Очікування блокування запису іншим процесом, с
+    
     # Загальні налаштування додатку
     APP_NAME: str = "Авто Маркетплейс API"
     APP_DESCRIPTION: str = "API для доступу до даних про автомобілі, зібрані з auto.ria.com"
@@ -26,7 +32,111 @@ class Settings(BaseSettings):
     JWT_SECRET: str = os.getenv("JWT_SECRET", "your-secret-key")  # Змінити у продакшені
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRES_MINUTES: int = 60 * 24  # 24 години
+
+    # Налаштування кешу сторінок скрапера
+    SCRAPER_CACHE_ENABLED: bool = True
+    SCRAPER_CACHE_DIR: str = os.getenv("SCRAPER_CACHE_DIR", "cache/pages")
+    SCRAPER_CACHE_MAX_AGE: int = 60 * 60  # 1 година
+    SCRAPER_CACHE_MAX_BYTES: int = 200 * 1024 * 1024  # 200 МБ
+    SCRAPER_CACHE_REPLAY: bool = False  # Режим відтворення: лише з кешу, без мережі
+    
+    # Інкрементальний скрапінг: зупинка після N поспіль відомих незмінених оголошень
+    SCRAPER_INCREMENTAL_STOP_AFTER: int = 50
+    
+    # Конвеєр скрапера
+    SCRAPER_MAX_PAGES: int = 20  # Максимальна кількість сторінок за один запуск
+    SCRAPER_PAGE_DELAY: float = 2.0  # Затримка між сторінками пошуку, с
+    SCRAPER_DETAIL_CONCURRENCY: int = 4  # Паралельні завантаження сторінок оголошень
+    SCRAPER_QUEUE_SIZE: int = 100  # Розмір черг між етапами
+    SCRAPER_SAVE_BATCH_SIZE: int = 20
+    SCRAPER_STREAMING: bool = False  # Потоковий розбір сторінок пошуку
+    SCRAPER_STREAM_CHUNK_SIZE: int = 16 * 1024
+    
+    # HTTP-клієнт скрапера: пул з'єднань, повторні спроби, запобіжник
+    SCRAPER_REQUEST_TIMEOUT: float = 30.0
+    SCRAPER_CONNECTION_LIMIT: int = 20
+    SCRAPER_CONNECTION_LIMIT_PER_HOST: int = 8
+    SCRAPER_KEEPALIVE_TIMEOUT: float = 30.0
+    SCRAPER_DNS_CACHE_TTL: int = 300
+    SCRAPER_MAX_RETRIES: int = 3
+    SCRAPER_RETRY_BASE_DELAY: float = 1.0
+    SCRAPER_RETRY_MAX_DELAY: float = 30.0
+    SCRAPER_BREAKER_WINDOW: int = 20  # Кількість останніх запитів для оцінки частки помилок
+    SCRAPER_BREAKER_MIN_REQUESTS: int = 5
+    SCRAPER_BREAKER_ERROR_THRESHOLD: float = 0.5
+    SCRAPER_BREAKER_COOLDOWN: float = 30.0  # Пауза при розімкненому запобіжнику, с
+    
+    # Стиснення динамічних відповідей (рівні підібрані на користь затримки, а не ступеня стиснення)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # Менші відповіді не стискаються
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    COMPRESSION_BROTLI_LEVEL: int = 4
+    COMPRESSION_GZIP_LEVEL: int = 5
+    
+    # Контроль допуску: одночасні запити та черга очікування для кожної групи маршрутів
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_READ_CONCURRENCY: int = 50
+    ADMISSION_READ_QUEUE: int = 200
+    ADMISSION_SEARCH_CONCURRENCY: int = 20
+    ADMISSION_SEARCH_QUEUE: int = 50
+    ADMISSION_WRITE_CONCURRENCY: int = 10
+    ADMISSION_WRITE_QUEUE: int = 20
+    ADMISSION_SCRAPER_CONCURRENCY: int = 1
+    ADMISSION_SCRAPER_QUEUE: int = 2
+    ADMISSION_QUEUE_TIMEOUT: float = 5.0  # Максимальний час очікування в черзі, с
+    ADMISSION_RETRY_AFTER: int = 2  # Значення заголовка Retry-After для відхилених запитів, с
+    
+    # Об'єднання однакових одночасних запитів на читання в один запит до бази
+    COALESCING_ENABLED: bool = True
+    
+    # Компактне зберігання документів автомобілів (коди перелічень, стиснуті префікси URL).
+    # Перед вимкненням потрібно виконати python -m app.db.compact expand
+    COMPACT_STORAGE: bool = False
     
+    # Архівування оголошень, яких скрапер не бачив у видачі ARCHIVE_AFTER_DAYS днів
+    ARCHIVE_ENABLED: bool = True
+    ARCHIVE_AFTER_DAYS: int = 30
+    ARCHIVE_INTERVAL: int = 6 * 60 * 60  # Інтервал запуску фонового архівування, с
+    ARCHIVE_BATCH_SIZE: int = 500
+    
+    # Максимальна кількість ID в одному запиті /api/v1/cars/batch
+    BATCH_MAX_IDS: int = 100
+    
+    # Моделі оцінки ціни (перераховуються після кожного запуску скрапера)
+    PRICE_MODEL_MIN_SAMPLES: int = 30  # Менші сегменти оцінюються за моделлю марки або ринку
+    PRICE_MODEL_CACHE_TTL: int = 60 * 60  # Як часто процес перечитує таблицю моделей, с
+    
+    # Колонковий каталог у пам'яті кожного процесу для фільтрів списку автомобілів
+    COLUMNAR_ENABLED: bool = False
+    # Як часто індекси в пам'яті підтягують зміни інших процесів, с
+    INDEX_REFRESH_INTERVAL: int = 30
+    
+    # Колонкові знімки каталогу для аналітики (python -m app.analytics.snapshot).
+    # Фоновий запис вмикається лише в одному процесі
+    SNAPSHOT_ENABLED: bool = False
+    SNAPSHOT_DIR: str = os.getenv("SNAPSHOT_DIR", "snapshots/cars")
+    SNAPSHOT_FORMAT: str = "arrow"  # arrow - читання без копіювання, parquet - менший розмір
+    SNAPSHOT_INTERVAL: int = 24 * 60 * 60  # Інтервал запису знімків, с
+    SNAPSHOT_BATCH_SIZE: int = 10000
+    SNAPSHOT_KEEP: int = 30  # Кількість знімків, що зберігаються
+    
+    # Події про нові оголошення та зміни цін (Server-Sent Events)
+    EVENTS_QUEUE_SIZE: int = 100  # Черга подій одного клієнта; при переповненні старі події відкидаються
+    EVENTS_HEARTBEAT: float = 15.0  # Інтервал службових повідомлень для утримання з'єднання, с
+    
+    # Статичні файли веб-інтерфейсу та результат їх збірки (python -m app.assets.build)
+    STATIC_DIR: str = "app/static"
+    STATIC_BUILD_DIR: str = "app/static/dist"
+    
+    # Кеш мініатюр зображень автомобілів
+    IMAGE_CACHE_DIR: str = os.getenv("IMAGE_CACHE_DIR", "cache/images")
+    IMAGE_CACHE_MAX_BYTES: int = 500 * 1024 * 1024  # 500 МБ
+    IMAGE_REQUEST_TIMEOUT: float = 20.0
+    IMAGE_MAX_BYTES: int = 10 * 1024 * 1024  # Максимальний розмір зображення-джерела, 10 МБ
+    IMAGE_ALLOWED_HOSTS: list = ["riastatic.com", "auto.ria.com"]  # Хости зображень (разом з піддоменами)
+    IMAGE_PREFETCH: bool = True  # Створювати мініатюри під час скрапінгу
+    IMAGE_PREFETCH_CONCURRENCY: int = 4
+
     class Config:
         env_file = ".env"
         case_sensitive = True
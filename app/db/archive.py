@@ -0,0 +1,164 @@
+"""
+Архівування застарілих оголошень
+
+Скрапер оновлює last_seen_at кожного оголошення, яке бачить у видачі. Оголошення,
+яких не було у видачі довше за ARCHIVE_AFTER_DAYS днів (продані або зняті),
+переносяться з колекції cars в cars_archive. Звичайні запити працюють лише
+з "гарячою" колекцією cars; архів додається до результатів за параметром
+include_archived.
+
+Одноразовий запуск (спершу заповнює last_seen_at для старих записів):
+python -m app.db.archive
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+from pymongo import ReplaceOne
+
+from app.config import settings
+from app.db.changes import notify_removed, notify_upserted
+from app.db.compact import decode_car
+
+ARCHIVE_COLLECTION = "cars_archive"
+
+
+async def ensure_archive_indexes(db):
+    """Створює індекси для відбору застарілих оголошень та пошуку в архіві"""
+    await db.cars.create_index("last_seen_at")
+    await db.cars_archive.create_index("url")
+    await db.cars_archive.create_index("archived_at")
+
+
+def stale_query(cutoff: datetime) -> Dict[str, Any]:
+    """
+    Оголошення, не бачені з cutoff
+
+    Записи без last_seen_at не архівуються: старі документи спершу отримують
+    його з backfill_last_seen, інакше перший запуск переніс би в архів
+    більшу частину каталогу.
+    """
+    return {"last_seen_at": {"$lt": cutoff}}
+
+
+async def backfill_last_seen(db) -> int:
+    """
+    Заповнює last_seen_at поточним часом для записів, збережених без нього
+
+    Відлік ARCHIVE_AFTER_DAYS для таких оголошень починається з моменту міграції.
+
+    Returns:
+        Кількість оновлених записів
+    """
+    result = await db.cars.update_many(
+        {"last_seen_at": {"$exists": False}},
+        {"$set": {"last_seen_at": datetime.utcnow()}},
+    )
+    if result.modified_count:
+        logger.info(f"Заповнено last_seen_at для {result.modified_count} оголошень")
+    return result.modified_count
+
+
+async def archive_stale(db, max_age_days: int, batch_size: int = 500) -> int:
+    """
+    Переносить застарілі оголошення в архів пакетами
+
+    Документ спершу копіюється в архів (ідемпотентно, за _id), потім видаляється
+    з cars тією ж умовою. Якщо скрапер встиг побачити оголошення між копіюванням
+    і видаленням, воно лишається в cars, а його копія прибирається з архіву.
+
+    Returns:
+        Кількість перенесених оголошень
+    """
+    cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+    query = stale_query(cutoff)
+    archive = db.cars_archive
+    archived = 0
+
+    while True:
+        cars = await db.cars.find(query).limit(batch_size).to_list(batch_size)
+        if not cars:
+            break
+
+        now = datetime.utcnow()
+        await archive.bulk_write(
+            [ReplaceOne({"_id": car["_id"]}, {**car, "archived_at": now}, upsert=True) for car in cars],
+            ordered=False,
+        )
+        ids = [car["_id"] for car in cars]
+        result = await db.cars.delete_many({"_id": {"$in": ids}, **query})
+        archived += result.deleted_count
+
+        remaining = []
+        if result.deleted_count < len(ids):
+            # Частину оголошень побачили знову - вони лишаються "гарячими"
+            remaining = [car["_id"] async for car in db.cars.find({"_id": {"$in": ids}}, {"_id": 1})]
+            await archive.delete_many({"_id": {"$in": remaining}})
+        notify_removed(car_id for car_id in ids if car_id not in remaining)
+        if remaining and len(remaining) == len(ids):
+            break
+
+    if archived:
+        logger.info(f"Перенесено в архів {archived} оголошень, не бачених {max_age_days} днів")
+    return archived
+
+
+async def restore_car(db, url_condition: Any) -> Optional[Dict[str, Any]]:
+    """Повертає оголошення з архіву в cars (зі збереженням _id та історії цін)"""
+    archive = db.cars_archive
+    car = await archive.find_one({"url": url_condition})
+    if car is None:
+        return None
+    car.pop("archived_at", None)
+    car["last_seen_at"] = datetime.utcnow()
+    await db.cars.replace_one({"_id": car["_id"]}, car, upsert=True)
+    await archive.delete_one({"_id": car["_id"]})
+    notify_upserted([decode_car(car)])
+    logger.info(f"Оголошення знову у видачі, повернуто з архіву: {car.get('url')}")
+    return car
+
+
+async def find_with_archive(db, query: Dict[str, Any], sort_by: str, sort_order: int,
+                            skip: int, limit: int) -> Tuple[int, List[Dict[str, Any]]]:
+    """Кількість і сторінка автомобілів з cars та архіву разом (одним агрегаційним запитом)"""
+    pipeline = [
+        {"$match": query},
+        {"$unionWith": {"coll": ARCHIVE_COLLECTION, "pipeline": [{"$match": query}]}},
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "data": [{"$sort": {sort_by: sort_order}}, {"$skip": skip}, {"$limit": limit}],
+        }},
+    ]
+    result = await db.cars.aggregate(pipeline).to_list(1)
+    facets = result[0] if result else {}
+    total = facets["total"][0]["count"] if facets.get("total") else 0
+    return total, facets.get("data", [])
+
+
+async def run_archiver(get_db, interval: float, max_age_days: int, batch_size: int):
+    """Фонове завдання: періодично переносить застарілі оголошення в архів"""
+    while True:
+        try:
+            await archive_stale(await get_db(), max_age_days, batch_size)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Помилка архівування оголошень: {e}")
+        await asyncio.sleep(interval)
+
+
+async def main():
+    from app.db.database import get_database, init_db, close_db
+
+    await init_db()
+    try:
+        db = await get_database()
+        await backfill_last_seen(db)
+        await archive_stale(db, settings.ARCHIVE_AFTER_DAYS, settings.ARCHIVE_BATCH_SIZE)
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
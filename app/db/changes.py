@@ -0,0 +1,63 @@
+"""
+Сповіщення про зміни в колекції cars
+
+Індекси в пам'яті (схожі автомобілі, колонковий каталог) реєструються тут
+і отримують зміни одразу після запису: від API, скрапера та архівування.
+Сповіщення діють у межах процесу; зміни інших процесів індекси підтягують
+самі, періодично перечитуючи базу.
+"""
+import asyncio
+from typing import Any, Dict, Iterable, List
+
+from loguru import logger
+
+_listeners: List[Any] = []
+
+
+def add_listener(listener: Any):
+    """Реєструє індекс з методами upsert(cars) та remove(car_ids)"""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def remove_listener(listener: Any):
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def notify_upserted(cars: Iterable[Dict[str, Any]]):
+    """Повні документи нових або змінених автомобілів"""
+    cars = list(cars)
+    if not cars:
+        return
+    for listener in list(_listeners):
+        try:
+            listener.upsert(cars)
+        except Exception as e:
+            # Збій індексу не повинен переривати запис у базу
+            logger.error(f"Помилка при оновленні індексу {type(listener).__name__}: {e}")
+
+
+def notify_removed(car_ids: Iterable[Any]):
+    """ID видалених або архівованих автомобілів"""
+    car_ids = [str(car_id) for car_id in car_ids]
+    if not car_ids:
+        return
+    for listener in list(_listeners):
+        try:
+            listener.remove(car_ids)
+        except Exception as e:
+            logger.error(f"Помилка при оновленні індексу {type(listener).__name__}: {e}")
+
+
+async def run_refresher(get_db, interval: float):
+    """Фонове завдання: індекси періодично підтягують зміни, зроблені іншими процесами"""
+    while True:
+        await asyncio.sleep(interval)
+        for listener in list(_listeners):
+            try:
+                await listener.refresh(await get_db())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Помилка при оновленні індексу {type(listener).__name__} з бази: {e}")
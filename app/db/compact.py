@@ -0,0 +1,215 @@
+"""
+Компактне представлення документів автомобілів у MongoDB
+
+Довгі кириличні значення перелічень ("механіка", "гібрид плагін") зберігаються
+як малі цілі числа, а спільні префікси URL - як короткий код ("~a" замість
+"https://auto.ria.com/uk/auto_"). Менші документи та індекс за URL означають,
+що в кеш WiredTiger вміщується більша частина каталогу.
+
+Перетворення виконується лише на межі з базою: encode_car перед записом,
+decode_car після читання. API, події та скрапер працюють зі звичайними
+значеннями, як і раніше. decode_car розуміє обидві форми, тож колекція може
+містити змішані документи під час міграції.
+
+Міграція (онлайн, пакетами):
+    python -m app.db.compact compact   # стиснути збережені документи
+    python -m app.db.compact expand    # повернути звичайну форму (перед вимкненням COMPACT_STORAGE)
+"""
+import asyncio
+import sys
+from typing import Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+from pymongo import UpdateOne
+
+from app.api.models import FuelType, TransmissionType
+from app.config import settings
+
+# Коди значень перелічень; коди не можна змінювати після міграції
+ENUM_CODES: Dict[str, Dict[str, int]] = {
+    "engine_type": {
+        FuelType.GASOLINE.value: 1,
+        FuelType.DIESEL.value: 2,
+        FuelType.GAS.value: 3,
+        FuelType.ELECTRIC.value: 4,
+        FuelType.HYBRID.value: 5,
+        FuelType.PLUGIN_HYBRID.value: 6,
+    },
+    "transmission": {
+        TransmissionType.MANUAL.value: 1,
+        TransmissionType.AUTOMATIC.value: 2,
+        TransmissionType.SEMI_AUTOMATIC.value: 3,
+        TransmissionType.VARIATOR.value: 4,
+        TransmissionType.ROBOT.value: 5,
+    },
+    "drive_type": {"передній": 1, "задній": 2, "повний": 3},
+}
+ENUM_VALUES: Dict[str, Dict[int, str]] = {
+    field: {code: value for value, code in codes.items()} for field, codes in ENUM_CODES.items()
+}
+
+# Коди спільних префіксів URL; коди не можна змінювати після міграції
+URL_PREFIXES: Dict[str, str] = {
+    "a": "https://auto.ria.com/uk/auto_",
+    "b": "https://auto.ria.com/auto_",
+    "c": "https://cdn.riastatic.com/photosnew/auto/photo/",
+    "d": "https://cdn.riastatic.com/photos/",
+    "e": "https://auto.ria.com/",
+}
+URL_FIELDS = ("url", "image_url")
+# Справжній абсолютний URL не може починатися з "~"
+URL_MARKER = "~"
+
+COMPACT_FIELDS = tuple(ENUM_CODES) + URL_FIELDS
+
+# Найдовші префікси перевіряються першими
+_PREFIXES_BY_LENGTH = sorted(URL_PREFIXES.items(), key=lambda item: len(item[1]), reverse=True)
+
+
+def encode_url(url: Any) -> Any:
+    """Замінює відомий префікс URL коротким кодом"""
+    if not isinstance(url, str):
+        return url
+    for code, prefix in _PREFIXES_BY_LENGTH:
+        if url.startswith(prefix):
+            return URL_MARKER + code + url[len(prefix):]
+    return url
+
+
+def decode_url(value: Any) -> Any:
+    """Відновлює повний URL зі стиснутого значення"""
+    if isinstance(value, str) and value.startswith(URL_MARKER) and value[1:2] in URL_PREFIXES:
+        return URL_PREFIXES[value[1]] + value[2:]
+    return value
+
+
+def encode_value(field: str, value: Any) -> Any:
+    """Стиснене значення поля; невідомі значення зберігаються як є"""
+    if field in ENUM_CODES:
+        return ENUM_CODES[field].get(value, value)
+    if field in URL_FIELDS:
+        return encode_url(value)
+    return value
+
+
+def decode_value(field: str, value: Any) -> Any:
+    """Звичайне значення поля з будь-якої форми (стиснутої чи звичайної)"""
+    if field in ENUM_VALUES and isinstance(value, int):
+        return ENUM_VALUES[field].get(value, value)
+    if field in URL_FIELDS:
+        return decode_url(value)
+    return value
+
+
+def encode_car(car: Dict[str, Any], enabled: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Документ для запису в базу (копія; вхідний словник не змінюється)
+
+    Працює і для часткових документів оновлення ($set): стискаються лише наявні поля.
+    """
+    if not (settings.COMPACT_STORAGE if enabled is None else enabled):
+        return dict(car)
+    return {field: encode_value(field, value) for field, value in car.items()}
+
+
+def decode_car(car: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Відновлює звичайні значення в документі з бази (змінює документ на місці)"""
+    if car:
+        for field in COMPACT_FIELDS:
+            if field in car:
+                car[field] = decode_value(field, car[field])
+    return car
+
+
+def url_filter(url: str) -> Any:
+    """
+    Умова пошуку за URL
+
+    Поки ввімкнене компактне зберігання, в колекції можуть бути обидві форми
+    (міграція триває), тож шукаємо обидві - це два ключі в унікальному індексі.
+    """
+    if not settings.COMPACT_STORAGE:
+        return url
+    compact = encode_url(url)
+    return url if compact == url else {"$in": [url, compact]}
+
+
+def value_filter(field: str, value: Any) -> Any:
+    """Умова рівності для поля-переліку (обидві форми, поки ввімкнене компактне зберігання)"""
+    if not settings.COMPACT_STORAGE:
+        return value
+    compact = encode_value(field, value)
+    return value if compact == value else {"$in": [value, compact]}
+
+
+def url_variants(urls: Iterable[str]) -> List[str]:
+    """Усі форми URL для запиту $in"""
+    variants = list(urls)
+    if settings.COMPACT_STORAGE:
+        variants += [compact for compact in map(encode_url, variants) if compact not in variants]
+    return variants
+
+
+def _migrate_fields(car: Dict[str, Any], compact: bool) -> Dict[str, Any]:
+    """Поля документа, які потрібно переписати для переходу в цільову форму"""
+    changes = {}
+    for field in COMPACT_FIELDS:
+        if field not in car:
+            continue
+        value = decode_value(field, car[field])
+        target = encode_value(field, value) if compact else value
+        if target != car[field]:
+            changes[field] = target
+    return changes
+
+
+async def migrate(db, compact: bool = True, batch_size: int = 500) -> int:
+    """
+    Переписує збережені документи в компактну (або звичайну) форму
+
+    Міграція виконується онлайн: документи обробляються пакетами, а кожне
+    оновлення застосовується лише якщо поля не змінились після читання, тож
+    паралельні записи скрапера та API не втрачаються.
+
+    Returns:
+        Кількість переписаних документів
+    """
+    migrated = 0
+    batch = []
+    projection = {field: 1 for field in COMPACT_FIELDS}
+    async for car in db.cars.find({}, projection).sort("_id", 1):
+        changes = _migrate_fields(car, compact)
+        if not changes:
+            continue
+        condition = {"_id": car["_id"], **{field: car[field] for field in changes}}
+        batch.append(UpdateOne(condition, {"$set": changes}))
+        if len(batch) >= batch_size:
+            migrated += (await db.cars.bulk_write(batch, ordered=False)).modified_count
+            logger.info(f"Міграція формату зберігання: переписано {migrated} документів")
+            batch = []
+    if batch:
+        migrated += (await db.cars.bulk_write(batch, ordered=False)).modified_count
+
+    logger.info(f"Міграцію формату зберігання завершено, переписано {migrated} документів")
+    return migrated
+
+
+async def main(direction: str):
+    from app.db.database import get_database, init_db, close_db
+
+    await init_db()
+    try:
+        db = await get_database()
+        before = await db.command("collStats", "cars")
+        await migrate(db, compact=direction == "compact")
+        after = await db.command("collStats", "cars")
+        logger.info(f"Середній розмір документа: {before.get('avgObjSize', 0)} -> {after.get('avgObjSize', 0)} байт")
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    direction = sys.argv[1] if len(sys.argv) > 1 else "compact"
+    if direction not in ("compact", "expand"):
+        sys.exit("Використання: python -m app.db.compact [compact|expand]")
+    asyncio.run(main(direction))
@@ -1,8 +1,11 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi import Depends, HTTPException
 from loguru import logger
 import os
 from typing import Optional
 
+from app.config import settings
+
 # Параметри підключення до MongoDB
 MONGO_URL = os.getenv("MONGODB_URL", "mongodb://mongodb:27017")
 MONGO_DB_NAME = os.getenv("MONGODB_DB_NAME", "car_marketplace")
@@ -10,11 +13,24 @@ MONGO_DB_NAME = os.getenv("MONGODB_DB_NAME", "car_marketplace")
 # Глобальна змінна для зберігання клієнта бази даних
 client: Optional[AsyncIOMotorClient] = None
 
+class MongoUnavailable:
+    """
+    Заміна бази даних MongoDB, коли каталог зберігається в SQLite
+    
+    Випадкове звернення до колекції відповідає 501 замість помилки з'єднання;
+    функції, що працюють лише з MongoDB, оголошують це через get_mongo_database.
+    """
+    def __getattr__(self, name):
+        raise HTTPException(status_code=501, detail="Функція доступна лише зі сховищем MongoDB")
+
 async def get_database():
     """
     Функція-залежність для отримання об'єкту бази даних.
     Використовується з FastAPI Depends для ін'єкції залежностей.
     """
+    if settings.DATABASE_BACKEND == "sqlite":
+        return MongoUnavailable()
+    
     if client is None:
         # Якщо клієнт не створений, автоматично ініціалізуємо його
         await init_db()
@@ -22,11 +38,28 @@ async def get_database():
     # Повертаємо об'єкт бази даних
     return client[MONGO_DB_NAME]
 
+async def get_mongo_database(db = Depends(get_database)):
+    """
+    Функція-залежність для функцій, що працюють лише з MongoDB
+    (схожі автомобілі, оцінка ціни, запуски скрапера).
+    З іншими сховищами відповідає 501 ще до виконання обробника.
+    """
+    if settings.DATABASE_BACKEND != "mongodb":
+        raise HTTPException(status_code=501, detail="Функція доступна лише зі сховищем MongoDB")
+    return db
+
 async def init_db():
     """
-    Ініціалізує підключення до бази даних MongoDB.
+    Ініціалізує підключення до бази даних MongoDB (або відкриває сховище SQLite).
+    
+    Індекси тут не створюються - це окремий крок розгортання (python -m app.db.indexes).
     """
     global client
+    if settings.DATABASE_BACKEND == "sqlite":
+        from app.db.sqlite import get_sqlite_repository
+        await get_sqlite_repository().open()
+        return
+    
     try:
         # Створюємо асинхронного клієнта MongoDB
         client = AsyncIOMotorClient(MONGO_URL)
@@ -34,19 +67,6 @@ async def init_db():
         # Перевіряємо підключення
         await client.admin.command('ping')
         
-        # Отримуємо базу даних
-        db = client[MONGO_DB_NAME]
-        
-        # Створюємо індекси для колекції автомобілів
-        # Індекс по URL для запобігання дублікатів
-        await db.cars.create_index("url", unique=True)
-        
-        # Інші корисні індекси
-        await db.cars.create_index("make")
-        await db.cars.create_index("model")
-        await db.cars.create_index("year")
-        await db.cars.create_index("price")
-        
         logger.info(f"Успішно підключено до MongoDB: {MONGO_URL}, база даних: {MONGO_DB_NAME}")
         
     except Exception as e:
@@ -55,9 +75,12 @@ async def init_db():
 
 async def close_db():
     """
-    Закриває підключення до бази даних MongoDB.
+    Закриває підключення до бази даних MongoDB (та сховище SQLite).
     """
     global client
+    if settings.DATABASE_BACKEND == "sqlite":
+        from app.db.sqlite import close_sqlite_repository
+        close_sqlite_repository()
     if client:
         client.close()
         client = None
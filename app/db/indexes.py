@@ -0,0 +1,59 @@
+"""
+Індекси колекцій MongoDB
+
+Індекси створюються окремим кроком розгортання, а не при запуску кожного
+процесу API: create_index на великій колекції може тривати довго, а новий
+процес має бути готовим до запитів якомога швидше.
+
+Запуск: python -m app.db.indexes
+"""
+import asyncio
+
+from loguru import logger
+
+from app.db.archive import ensure_archive_indexes
+from app.db.price_history import ensure_price_history_indexes
+from app.geo.backfill import ensure_geo_indexes
+
+
+async def ensure_indexes(db):
+    """Створює всі індекси (повторний запуск нічого не змінює)"""
+    # Індекс по URL для запобігання дублікатів
+    await db.cars.create_index("url", unique=True)
+
+    # Інші корисні індекси
+    await db.cars.create_index("make")
+    await db.cars.create_index("model")
+    await db.cars.create_index("year")
+    await db.cars.create_index("price")
+
+    # Покриваючий індекс для інкрементального скрапінгу (URL -> хеш вмісту)
+    await db.cars.create_index([("url", 1), ("content_hash", 1)])
+
+    # Індекси області та координат (фільтр за областю, пошук у радіусі)
+    await ensure_geo_indexes(db)
+
+    # Індекси для архівування застарілих оголошень
+    await ensure_archive_indexes(db)
+
+    # Індекси історії цін
+    await ensure_price_history_indexes(db)
+
+    # Індекс для списку останніх запусків скрапера
+    await db.scrape_runs.create_index("created_at")
+
+    logger.info("Індекси MongoDB створено")
+
+
+async def main():
+    from app.db.database import get_database, init_db, close_db
+
+    await init_db()
+    try:
+        await ensure_indexes(await get_database())
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
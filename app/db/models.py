@@ -74,4 +74,21 @@ class PaginatedCars(BaseModel):
     limit: int = Field(..., description="Кількість елементів на сторінці")
     total: int = Field(..., description="Загальна кількість автомобілів")
     total_pages: int = Field(..., description="Загальна кількість сторінок")
-    data: List[Car] = Field(..., description="Список автомобілів")
\ No newline at end of file
+    data: List[Car] = Field(..., description="Список автомобілів")
+
+
+class CarsBatchRequest(BaseModel):
+    """Запит на отримання кількох автомобілів за ID"""
+    ids: List[str] = Field(..., description="Список ID автомобілів", min_items=1)
+    fields: Optional[List[str]] = Field(None, description="Поля, які потрібно повернути")
+    include_archived: bool = Field(False, description="Шукати відсутні автомобілі в архіві")
+
+
+class PriceEstimateRequest(BaseModel):
+    """Запит на оцінку ринкової ціни автомобіля"""
+    make: str = Field(..., description="Марка автомобіля")
+    model: Optional[str] = Field(None, description="Модель автомобіля")
+    year: int = Field(..., description="Рік випуску", ge=1900, le=datetime.now().year)
+    mileage: Optional[int] = Field(None, description="Пробіг у кілометрах", ge=0)
+    engine_volume: Optional[float] = Field(None, description="Об'єм двигуна у літрах", ge=0)
+    price: Optional[int] = Field(None, description="Ціна для порівняння з оцінкою", ge=0)
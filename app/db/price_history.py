@@ -0,0 +1,162 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from loguru import logger
+
+# Історія цін зберігається в "кошиках": один документ на автомобіль на місяць.
+# Документ містить масив змін ціни за місяць і підсумки (перша/остання/мін/макс ціна),
+# тож історія одного автомобіля - це кілька документів, а тренди рахуються
+# за підсумками кошиків без розгортання окремих спостережень.
+
+
+def month_key(moment: datetime) -> str:
+    """Ключ місячного кошика, наприклад "2024-05" """
+    return moment.strftime("%Y-%m")
+
+
+async def ensure_price_history_indexes(db):
+    """Створює індекси колекції історії цін"""
+    await db.price_history.create_index([("car_id", 1), ("month", 1)], unique=True)
+    await db.price_history.create_index([("make", 1), ("model", 1), ("month", 1)])
+    await db.price_history.create_index("month")
+
+
+async def record_price(db, car_id: ObjectId, price: int, car: Optional[Dict[str, Any]] = None,
+                       observed_at: Optional[datetime] = None):
+    """
+    Додає спостереження ціни в місячний кошик автомобіля
+
+    Викликається лише тоді, коли ціна змінилась (або для нового оголошення).
+
+    Args:
+        db: База даних
+        car_id: ID автомобіля
+        price: Нова ціна
+        car: Дані автомобіля (марка, модель, рік денормалізуються в кошик для трендів)
+        observed_at: Час спостереження (за замовчуванням - поточний)
+    """
+    observed_at = observed_at or datetime.utcnow()
+    car = car or {}
+
+    await db.price_history.update_one(
+        {"car_id": car_id, "month": month_key(observed_at)},
+        {
+            "$push": {"points": {"t": observed_at, "price": price}},
+            "$inc": {"count": 1, "sum_price": price},
+            "$min": {"min_price": price},
+            "$max": {"max_price": price},
+            "$set": {
+                "last_price": price,
+                "end": observed_at,
+                "make": car.get("make"),
+                "model": car.get("model"),
+                "year": car.get("year"),
+            },
+            "$setOnInsert": {"first_price": price, "start": observed_at},
+        },
+        upsert=True,
+    )
+    logger.debug(f"Записано ціну {price} для автомобіля {car_id}")
+
+
+async def get_price_history(db, car_id: ObjectId) -> List[Dict[str, Any]]:
+    """Повертає всі зміни ціни автомобіля в хронологічному порядку"""
+    cursor = db.price_history.find({"car_id": car_id}, {"_id": 0, "points": 1}).sort("month", 1)
+    points = []
+    async for bucket in cursor:
+        points.extend(bucket.get("points", []))
+    return points
+
+
+# Поля кошика, потрібні для трендів (без масиву points)
+TREND_PROJECTION = {"_id": 0, "car_id": 1, "month": 1, "last_price": 1, "min_price": 1, "max_price": 1, "count": 1}
+
+
+def next_month(month: str) -> str:
+    """Ключ наступного місяця: "2024-12" -> "2025-01" """
+    year, number = map(int, month.split("-"))
+    return f"{year + number // 12:04d}-{number % 12 + 1:02d}"
+
+
+class TrendBuilder:
+    """
+    Помісячні тренди з кошиків, відсортованих за місяцем
+
+    Кошик є лише за місяці, в яких ціна змінилась, тож остання відома ціна
+    кожного автомобіля переноситься в наступні місяці (до останнього місяця
+    в даних). Інакше автомобілі зі сталою ціною випадали б з середнього.
+    """
+
+    def __init__(self):
+        self.months: List[Dict[str, Any]] = []
+        self._prices: Dict[Any, int] = {}
+        self._month: Optional[str] = None
+        self._changed: Dict[Any, Dict[str, Any]] = {}
+
+    def add(self, bucket: Dict[str, Any]):
+        month = bucket["month"]
+        if month != self._month:
+            if self._month is not None:
+                self._close()
+                # Місяці без жодної зміни ціни
+                gap = next_month(self._month)
+                while gap < month:
+                    self._month = gap
+                    self._close()
+                    gap = next_month(gap)
+            self._month = month
+        self._changed[bucket["car_id"]] = bucket
+
+    def _close(self):
+        """Підсумки поточного місяця"""
+        changed, self._changed = self._changed, {}
+        for car_id, bucket in changed.items():
+            if bucket.get("last_price") is None:
+                self._prices.pop(car_id, None)
+            else:
+                self._prices[car_id] = bucket["last_price"]
+        if not self._prices:
+            return
+
+        # Для змінених автомобілів - мін/макс за місяць, для решти - перенесена ціна
+        lows, highs = [], []
+        for car_id, price in self._prices.items():
+            bucket = changed.get(car_id)
+            lows.append(bucket.get("min_price", price) if bucket else price)
+            highs.append(bucket.get("max_price", price) if bucket else price)
+        self.months.append({
+            "month": self._month,
+            "avg_price": int(sum(self._prices.values()) / len(self._prices)),
+            "min_price": min(lows),
+            "max_price": max(highs),
+            "cars": len(self._prices),
+            "price_changes": sum(bucket.get("count", 0) for bucket in changed.values()),
+        })
+
+    def result(self, since_month: Optional[str] = None) -> List[Dict[str, Any]]:
+        if self._changed:
+            self._close()
+        return [item for item in self.months if not since_month or item["month"] >= since_month]
+
+
+async def get_price_trends(db, make: Optional[str] = None, model: Optional[str] = None,
+                           since_month: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Помісячний тренд цін за підсумками кошиків
+
+    Для кожного місяця повертає середню ціну на кінець місяця (з урахуванням
+    автомобілів, ціна яких не змінювалась), мінімальну та максимальну ціну,
+    кількість автомобілів з відомою ціною і кількість змін ціни за місяць.
+    """
+    match: Dict[str, Any] = {}
+    if make:
+        match["make"] = make
+    if model:
+        match["model"] = model
+
+    # Кошики до since_month теж читаються: з них переноситься остання відома ціна
+    builder = TrendBuilder()
+    async for bucket in db.price_history.find(match, TREND_PROJECTION).sort("month", 1):
+        builder.add(bucket)
+    return builder.result(since_month)
@@ -0,0 +1,307 @@
+"""
+Сховище автомобілів
+
+Обробники API та скрапер працюють з каталогом через CarRepository, а не
+напряму з Motor. Реалізації: MongoCarRepository (MongoDB, за замовчуванням)
+та SQLiteCarRepository (вбудована база для розгортання на одному сервері,
+див. app.db.sqlite). Сховище обирається параметром DATABASE_BACKEND.
+
+Історія та тренди цін є в обох сховищах; архів оголошень - лише в MongoDB
+(для SQLite методи архіву повертають порожній результат).
+
+Документи повертаються у звичайній формі (компактні значення розкодовані),
+ID автомобіля - у полі _id. Фільтри записуються як запити MongoDB
+(build_cars_query); SQLite перекладає підтримувану підмножину в SQL.
+"""
+import asyncio
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import Depends
+from pymongo.errors import DuplicateKeyError
+
+from app.config import settings
+from app.db.archive import find_with_archive, restore_car
+from app.db.compact import decode_car, decode_url, decode_value, encode_car, url_filter, url_variants
+from app.db.database import get_database
+from app.db.price_history import get_price_history, get_price_trends, record_price
+
+# Поля, за якими виконується повнотекстовий пошук
+SEARCH_FIELDS = ("make", "model", "location")
+
+# Поля, за якими рахується кількість автомобілів для фільтрів головної сторінки
+FACETS = (("make", 20), ("year", 30), ("engine_type", 10), ("transmission", 10))
+
+
+class DuplicateCarError(Exception):
+    """Автомобіль з таким URL вже збережений"""
+
+
+class CarRepository(ABC):
+    """
+    Операції з каталогом автомобілів, спільні для всіх сховищ
+
+    Методи архіву мають реалізацію за замовчуванням для сховищ без архіву.
+    """
+
+    @abstractmethod
+    async def get(self, car_id: Any, projection: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def get_many(self, car_ids: List[Any], projection: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        """Автомобілі за списком ID (порядок не гарантується, відсутні пропускаються)"""
+
+    @abstractmethod
+    async def find_by_url(self, url: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def find(self, query: Dict[str, Any], sort_by: str = "created_at", sort_order: int = -1,
+                   skip: int = 0, limit: int = 10) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def count(self, query: Dict[str, Any]) -> int:
+        ...
+
+    async def find_page(self, query: Dict[str, Any], sort_by: str, sort_order: int,
+                        skip: int, limit: int) -> Tuple[int, List[Dict[str, Any]]]:
+        """Кількість автомобілів за фільтром і сторінка результатів"""
+        total, cars = await asyncio.gather(self.count(query), self.find(query, sort_by, sort_order, skip, limit))
+        return total, cars
+
+    @abstractmethod
+    async def search(self, text: str, skip: int, limit: int) -> Tuple[int, List[Dict[str, Any]]]:
+        """Пошук за словами в марці, моделі та місцезнаходженні"""
+
+    @abstractmethod
+    async def insert(self, car: Dict[str, Any]) -> Any:
+        """Додає автомобіль і повертає його ID; DuplicateCarError, якщо URL вже є"""
+
+    @abstractmethod
+    async def update(self, car_id: Any, fields: Dict[str, Any]) -> bool:
+        """Змінює вказані поля; повертає True, якщо документ змінився"""
+
+    @abstractmethod
+    async def delete(self, car_id: Any) -> bool:
+        ...
+
+    @abstractmethod
+    async def known_hashes(self, urls: List[str]) -> Dict[str, str]:
+        """Хеші вмісту вже збережених оголошень для переданих URL"""
+
+    @abstractmethod
+    async def mark_seen(self, urls: List[str], seen_at) -> None:
+        """Оновлює last_seen_at оголошень"""
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, Any]:
+        """Загальна статистика: кількість, середні ціна, рік і пробіг, популярні марки"""
+
+    @abstractmethod
+    async def facets(self, query: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        """Кількість автомобілів за марками, роками, типами пального та коробки передач в межах фільтру"""
+
+    @abstractmethod
+    async def record_price(self, car_id: Any, price: Optional[int], car: Dict[str, Any]) -> None:
+        """Додає ціну в історію цін"""
+
+    @abstractmethod
+    async def price_history(self, car_id: Any) -> List[Dict[str, Any]]:
+        """Усі зміни ціни автомобіля ({"t", "price"}) в хронологічному порядку"""
+
+    @abstractmethod
+    async def price_trends(self, make: Optional[str] = None, model: Optional[str] = None,
+                           since_month: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Помісячний тренд цін (див. app.db.price_history.TrendBuilder)"""
+
+    async def restore_archived(self, url: str) -> Optional[Dict[str, Any]]:
+        """Повертає оголошення з архіву в каталог (None, якщо його там немає)"""
+        return None
+
+    async def get_archived(self, car_id: Any, projection: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
+        """Автомобіль з архіву"""
+        return None
+
+    async def get_many_archived(self, car_ids: List[Any],
+                                projection: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        """Автомобілі з архіву за списком ID"""
+        return []
+
+    async def find_page_with_archive(self, query: Dict[str, Any], sort_by: str, sort_order: int,
+                                     skip: int, limit: int) -> Tuple[int, List[Dict[str, Any]]]:
+        """Кількість і сторінка автомобілів з каталогу та архіву разом"""
+        return await self.find_page(query, sort_by, sort_order, skip, limit)
+
+
+def _object_id(car_id: Any) -> Any:
+    return ObjectId(car_id) if isinstance(car_id, str) and ObjectId.is_valid(car_id) else car_id
+
+
+def search_words(text: str) -> List[str]:
+    """Слова пошукового запиту"""
+    return re.findall(r"\w+", text or "")
+
+
+class MongoCarRepository(CarRepository):
+    """Каталог у колекції cars MongoDB (архів та історія цін - в окремих колекціях)"""
+
+    def __init__(self, db):
+        self.db = db
+
+    async def get(self, car_id, projection=None):
+        return decode_car(await self.db.cars.find_one({"_id": _object_id(car_id)}, projection))
+
+    async def get_many(self, car_ids, projection=None):
+        cursor = self.db.cars.find({"_id": {"$in": [_object_id(car_id) for car_id in car_ids]}}, projection)
+        return [decode_car(car) async for car in cursor]
+
+    async def find_by_url(self, url):
+        return decode_car(await self.db.cars.find_one({"url": url_filter(url)}))
+
+    async def find(self, query, sort_by="created_at", sort_order=-1, skip=0, limit=10):
+        cars = await self.db.cars.find(query).sort(sort_by, sort_order).skip(skip).limit(limit).to_list(limit)
+        return [decode_car(car) for car in cars]
+
+    async def count(self, query):
+        return await self.db.cars.count_documents(query)
+
+    async def search(self, text, skip, limit):
+        words = search_words(text)
+        if not words:
+            return 0, []
+        # Кожне слово має знайтися хоча б в одному з полів
+        query = {"$and": [
+            {"$or": [{field: {"$regex": re.escape(word), "$options": "i"}} for field in SEARCH_FIELDS]}
+            for word in words
+        ]}
+        return await self.find_page(query, "created_at", -1, skip, limit)
+
+    async def insert(self, car):
+        try:
+            result = await self.db.cars.insert_one(encode_car(car))
+        except DuplicateKeyError as e:
+            raise DuplicateCarError(str(e))
+        return result.inserted_id
+
+    async def update(self, car_id, fields):
+        result = await self.db.cars.update_one({"_id": _object_id(car_id)}, {"$set": encode_car(fields)})
+        return result.modified_count > 0
+
+    async def delete(self, car_id):
+        result = await self.db.cars.delete_one({"_id": _object_id(car_id)})
+        return result.deleted_count > 0
+
+    async def known_hashes(self, urls):
+        if not urls:
+            return {}
+        cursor = self.db.cars.find({"url": {"$in": url_variants(urls)}}, {"_id": 0, "url": 1, "content_hash": 1})
+        return {decode_url(doc["url"]): doc.get("content_hash") async for doc in cursor}
+
+    async def mark_seen(self, urls, seen_at):
+        await self.db.cars.update_many(
+            {"url": {"$in": url_variants(urls)}},
+            {"$set": {"last_seen_at": seen_at}}
+        )
+
+    async def restore_archived(self, url):
+        return decode_car(await restore_car(self.db, url_filter(url)))
+
+    async def get_archived(self, car_id, projection=None):
+        return decode_car(await self.db.cars_archive.find_one({"_id": _object_id(car_id)}, projection))
+
+    async def get_many_archived(self, car_ids, projection=None):
+        cursor = self.db.cars_archive.find({"_id": {"$in": [_object_id(car_id) for car_id in car_ids]}}, projection)
+        return [decode_car(car) async for car in cursor]
+
+    async def find_page_with_archive(self, query, sort_by, sort_order, skip, limit):
+        total, cars = await find_with_archive(self.db, query, sort_by, sort_order, skip, limit)
+        return total, [decode_car(car) for car in cars]
+
+    async def record_price(self, car_id, price, car):
+        await record_price(self.db, car_id, price, car)
+
+    async def price_history(self, car_id):
+        return await get_price_history(self.db, _object_id(car_id))
+
+    async def price_trends(self, make=None, model=None, since_month=None):
+        return await get_price_trends(self.db, make=make, model=model, since_month=since_month)
+
+    async def stats(self):
+        avg_price_pipeline = [
+            {"$match": {"price": {"$gt": 0}}},  # Фільтруємо лише автомобілі з ціною
+            {"$group": {"_id": None, "avg_price": {"$avg": "$price"}}}
+        ]
+        avg_year_pipeline = [
+            {"$match": {"year": {"$gt": 1900}}},  # Фільтруємо валідні роки
+            {"$group": {"_id": None, "avg_year": {"$avg": "$year"}}}
+        ]
+        avg_mileage_pipeline = [
+            {"$match": {"mileage": {"$gt": 0}}},  # Фільтруємо валідний пробіг
+            {"$group": {"_id": None, "avg_mileage": {"$avg": "$mileage"}}}
+        ]
+        popular_makes_pipeline = [
+            {"$group": {"_id": "$make", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}},
+            {"$limit": 5}
+        ]
+
+        total_cars, avg_price_result, avg_year_result, avg_mileage_result, popular_makes = await asyncio.gather(
+            self.db.cars.count_documents({}),
+            self.db.cars.aggregate(avg_price_pipeline).to_list(1),
+            self.db.cars.aggregate(avg_year_pipeline).to_list(1),
+            self.db.cars.aggregate(avg_mileage_pipeline).to_list(1),
+            self.db.cars.aggregate(popular_makes_pipeline).to_list(5),
+        )
+
+        return {
+            "total_cars": total_cars,
+            "avg_price": int(avg_price_result[0]["avg_price"]) if avg_price_result else 0,
+            "avg_year": int(avg_year_result[0]["avg_year"]) if avg_year_result else 0,
+            "avg_mileage": int(avg_mileage_result[0]["avg_mileage"]) if avg_mileage_result else 0,
+            "popular_makes": [{"make": item["_id"], "count": item["count"]} for item in popular_makes]
+        }
+
+    async def facets(self, query):
+        def facet(field: str, limit: int) -> List[Dict[str, Any]]:
+            return [
+                {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1}},
+                {"$limit": limit},
+            ]
+
+        pipeline = [
+            {"$match": query},
+            {"$facet": {name: facet(name, limit) for name, limit in FACETS}},
+        ]
+        result = await self.db.cars.aggregate(pipeline).to_list(1)
+        facets = result[0] if result else {}
+
+        def counts(name: str) -> List[Dict[str, Any]]:
+            # При компактному зберіганні одне значення може бути в двох формах (поки триває міграція)
+            merged: Dict[Any, int] = {}
+            for item in facets.get(name, []):
+                value = decode_value(name, item["_id"])
+                merged[value] = merged.get(value, 0) + item["count"]
+            return [{"value": value, "count": count} for value, count in sorted(merged.items(), key=lambda pair: -pair[1])]
+
+        return {name: counts(name) for name, _ in FACETS}
+
+
+def repository_for(db) -> CarRepository:
+    """Сховище автомобілів за налаштуваннями (db - з'єднання MongoDB)"""
+    if settings.DATABASE_BACKEND == "sqlite":
+        from app.db.sqlite import get_sqlite_repository
+        return get_sqlite_repository()
+    return MongoCarRepository(db)
+
+
+async def get_repository(db = Depends(get_database)) -> CarRepository:
+    """
+    Функція-залежність для отримання сховища автомобілів.
+    Використовується з FastAPI Depends для ін'єкції залежностей.
+    """
+    return repository_for(db)
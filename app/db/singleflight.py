@@ -0,0 +1,77 @@
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from loguru import logger
+
+
+def make_key(name: str, **params) -> str:
+    """Нормалізований ключ запиту: однакові параметри в будь-якому порядку дають однаковий ключ"""
+    normalized = {key: value for key, value in params.items() if value is not None}
+    return f"{name}:{json.dumps(normalized, sort_keys=True, default=str, ensure_ascii=False)}"
+
+
+class _Call:
+    """Запит до бази, що виконується, та кількість клієнтів, які чекають на нього"""
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Об'єднання однакових одночасних запитів
+
+    Перший запит з певним ключем запускає операцію, решта запитів з тим самим
+    ключем чекають на її результат замість виконання власних запитів до бази.
+    Результат не кешується: щойно операція завершилась, наступний запит
+    запускає нову.
+
+    Відключення клієнта, що запустив операцію, не скасовує її для інших
+    клієнтів; операція скасовується лише тоді, коли на неї більше ніхто не чекає.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._calls: Dict[Hashable, _Call] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Виконує func або приєднується до вже запущеного виклику з тим самим ключем"""
+        if not self.enabled:
+            return await func()
+
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.leaders += 1
+        else:
+            self.shared += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                logger.debug(f"Скасовано запит без клієнтів: {key}")
+                # Нові запити з цим ключем мають запускати нову операцію
+                self._forget(key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: Hashable, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "shared": self.shared,
+        }
@@ -0,0 +1,586 @@
+"""
+Вбудоване сховище SQLite для розгортання на одному сервері
+
+Каталог зберігається в одному файлі (SQLITE_PATH) без окремого сервера
+бази даних. Кожен автомобіль - рядок таблиці cars: повний документ у JSON
+та окремі типізовані колонки для фільтрів і сортування. Покриваючі індекси
+дозволяють рахувати автомобілі за типовими фільтрами, не читаючи документів;
+таблиця FTS5 cars_fts (марка, модель, місцезнаходження) підтримується
+тригерами і використовується для пошуку.
+
+База працює в режимі WAL: читання не блокуються записом. Запити виконуються
+у власному пулі потоків (SQLITE_THREADS), кожен потік має своє з'єднання.
+
+Історія цін зберігається, як і в MongoDB, місячними кошиками (таблиця
+price_history). Архів оголошень, контрольні точки скрапера та аналітика
+в пам'яті (схожі автомобілі, оцінка ціни) працюють лише з MongoDB.
+"""
+import asyncio
+import functools
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from loguru import logger
+
+from app.config import settings
+from app.db.price_history import TrendBuilder, month_key
+from app.db.repository import FACETS, CarRepository, DuplicateCarError, search_words
+
+# Типізовані колонки таблиці cars (значення беруться з документа)
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("url", "TEXT"),
+    ("make", "TEXT"),
+    ("model", "TEXT"),
+    ("year", "INTEGER"),
+    ("price", "INTEGER"),
+    ("mileage", "INTEGER"),
+    ("engine_type", "TEXT"),
+    ("engine_volume", "REAL"),
+    ("transmission", "TEXT"),
+    ("drive_type", "TEXT"),
+    ("location", "TEXT"),
+    ("region_code", "TEXT"),
+    ("content_hash", "TEXT"),
+    ("created_at", "TEXT"),
+    ("updated_at", "TEXT"),
+    ("last_seen_at", "TEXT"),
+)
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS cars (
+    pk INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    {", ".join(f"{name} {kind}" for name, kind in COLUMNS)},
+    lat REAL,
+    lon REAL,
+    doc TEXT NOT NULL,
+    UNIQUE (url)
+);
+
+-- Покриваючі індекси: підрахунок за типовими фільтрами не читає рядків таблиці
+CREATE INDEX IF NOT EXISTS cars_created_at ON cars (created_at);
+CREATE INDEX IF NOT EXISTS cars_price ON cars (price, year, mileage);
+CREATE INDEX IF NOT EXISTS cars_year ON cars (year, price, mileage);
+CREATE INDEX IF NOT EXISTS cars_make ON cars (make COLLATE NOCASE, year, price);
+CREATE INDEX IF NOT EXISTS cars_region ON cars (region_code, created_at);
+-- Інкрементальний скрапінг (URL -> хеш вмісту)
+CREATE INDEX IF NOT EXISTS cars_url_hash ON cars (url, content_hash);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS cars_fts USING fts5(
+    make, model, location,
+    content='cars', content_rowid='pk', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS cars_fts_insert AFTER INSERT ON cars BEGIN
+    INSERT INTO cars_fts (rowid, make, model, location) VALUES (new.pk, new.make, new.model, new.location);
+END;
+CREATE TRIGGER IF NOT EXISTS cars_fts_delete AFTER DELETE ON cars BEGIN
+    INSERT INTO cars_fts (cars_fts, rowid, make, model, location) VALUES ('delete', old.pk, old.make, old.model, old.location);
+END;
+CREATE TRIGGER IF NOT EXISTS cars_fts_update AFTER UPDATE OF make, model, location ON cars BEGIN
+    INSERT INTO cars_fts (cars_fts, rowid, make, model, location) VALUES ('delete', old.pk, old.make, old.model, old.location);
+    INSERT INTO cars_fts (rowid, make, model, location) VALUES (new.pk, new.make, new.model, new.location);
+END;
+
+-- Історія цін: один рядок на автомобіль на місяць (як кошики в MongoDB)
+CREATE TABLE IF NOT EXISTS price_history (
+    car_id TEXT NOT NULL,
+    month TEXT NOT NULL,
+    points TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    first_price INTEGER,
+    last_price INTEGER,
+    min_price INTEGER,
+    max_price INTEGER,
+    start_at TEXT,
+    end_at TEXT,
+    make TEXT,
+    model TEXT,
+    year INTEGER,
+    PRIMARY KEY (car_id, month)
+);
+CREATE INDEX IF NOT EXISTS price_history_make ON price_history (make, model, month);
+CREATE INDEX IF NOT EXISTS price_history_month ON price_history (month);
+"""
+
+# Максимальна кількість параметрів в одному IN (обмеження старих збірок SQLite - 999)
+IN_CHUNK = 500
+
+COMPARISONS = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+REGEX_SPECIAL = set("\\^$.|?*+()[]{}")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Значення типу {type(value).__name__} не можна зберегти в JSON")
+
+
+def _json_object(value: Dict[str, Any]) -> Any:
+    if len(value) == 1 and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def _column_value(value: Any) -> Any:
+    """Значення для типізованої колонки (дата - рядок ISO, що сортується як дата)"""
+    if isinstance(value, datetime):
+        return value.isoformat(timespec="microseconds")
+    if isinstance(value, (dict, list)):
+        return None
+    return value
+
+
+def _row(car: Dict[str, Any]) -> Dict[str, Any]:
+    """Колонки рядка таблиці cars для документа"""
+    doc = {field: value for field, value in car.items() if field != "_id"}
+    row = {name: _column_value(doc.get(name)) for name in COLUMN_NAMES}
+    geo = doc.get("geo") or {}
+    lon, lat = geo.get("coordinates") or (None, None)
+    row.update(lat=lat, lon=lon, doc=json.dumps(doc, ensure_ascii=False, default=_json_default))
+    return row
+
+
+def _document(car_id: str, doc: str, projection: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    car = json.loads(doc, object_hook=_json_object)
+    if projection:
+        car = {field: value for field, value in car.items() if field in projection}
+    return {"_id": car_id, **car}
+
+
+@functools.lru_cache(maxsize=256)
+def _compile(pattern: str, options: str):
+    return re.compile(pattern, re.IGNORECASE if "i" in options else 0)
+
+
+def _regexp(pattern: str, options: str, value: Any) -> int:
+    if value is None:
+        return 0
+    return 1 if _compile(pattern, options or "").search(str(value)) else 0
+
+
+def _distance(lat1: float, lon1: float, lat2: float, lon2: float) -> Optional[float]:
+    """Відстань по великому колу в радіанах (як радіус у $centerSphere)"""
+    if lat1 is None or lon1 is None:
+        return None
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * math.asin(min(1.0, math.sqrt(h)))
+
+
+def _param(value: Any) -> Any:
+    return str(value) if isinstance(value, ObjectId) else _column_value(value)
+
+
+def _field_condition(field: str, spec: Any, params: List[Any]) -> str:
+    if field == "geo":
+        center, radius = spec["$geoWithin"]["$centerSphere"]
+        params.extend([center[1], center[0], radius])
+        return "geo_distance(lat, lon, ?, ?) <= ?"
+
+    column = "id" if field == "_id" else field
+    if column != "id" and column not in COLUMN_NAMES:
+        raise ValueError(f"Фільтр за полем {field} не підтримується сховищем SQLite")
+
+    if not isinstance(spec, dict):
+        if spec is None:
+            return f"{column} IS NULL"
+        params.append(_param(spec))
+        return f"{column} = ?"
+
+    conditions = []
+    for op, value in spec.items():
+        if op in COMPARISONS:
+            params.append(_param(value))
+            conditions.append(f"{column} {COMPARISONS[op]} ?")
+        elif op == "$ne":
+            params.append(_param(value))
+            conditions.append(f"({column} IS NULL OR {column} != ?)")
+        elif op == "$in":
+            values = [_param(item) for item in value]
+            params.extend(values)
+            conditions.append(f"{column} IN ({', '.join('?' * len(values))})" if values else "0")
+        elif op == "$exists":
+            conditions.append(f"{column} IS {'NOT ' if value else ''}NULL")
+        elif op == "$regex":
+            options = spec.get("$options", "")
+            literal = value[1:-1] if value.startswith("^") and value.endswith("$") else None
+            if literal is not None and "i" in options and literal.isascii() and not REGEX_SPECIAL & set(literal):
+                # Точний збіг без урахування регістру - за індексом з COLLATE NOCASE
+                params.append(literal)
+                conditions.append(f"{column} = ? COLLATE NOCASE")
+            else:
+                params.extend([value, options])
+                conditions.append(f"regexp_match(?, ?, {column})")
+        elif op != "$options":
+            raise ValueError(f"Оператор {op} не підтримується сховищем SQLite")
+    return " AND ".join(conditions) or "1"
+
+
+def where_clause(query: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """Переклад фільтру MongoDB (підмножина, яку будує API) в умову WHERE"""
+    params: List[Any] = []
+
+    def translate(query: Dict[str, Any]) -> str:
+        conditions = []
+        for field, spec in query.items():
+            if field in ("$and", "$or"):
+                joined = f" {field[1:].upper()} ".join(f"({translate(part)})" for part in spec)
+                conditions.append(f"({joined})" if spec else ("1" if field == "$and" else "0"))
+            else:
+                conditions.append(_field_condition(field, spec, params))
+        return " AND ".join(conditions) or "1"
+
+    return translate(query), params
+
+
+def _chunks(values: List[Any]):
+    for start in range(0, len(values), IN_CHUNK):
+        yield values[start:start + IN_CHUNK]
+
+
+def _placeholders(values: List[Any]) -> str:
+    return ", ".join("?" * len(values))
+
+
+def fts_query(text: str) -> Optional[str]:
+    """Запит FTS5: усі слова, кожне - як префікс"""
+    words = search_words(text)
+    return " ".join(f'"{word}"*' for word in words) if words else None
+
+
+@contextmanager
+def _transaction(conn: sqlite3.Connection, mode: str = "DEFERRED"):
+    conn.execute(f"BEGIN {mode}")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+class SQLiteCarRepository(CarRepository):
+    """Каталог автомобілів у файлі SQLite"""
+
+    def __init__(self, path: str, threads: int = 4, busy_timeout: float = 5.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="sqlite")
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        """З'єднання поточного потоку пулу"""
+        conn = getattr(self._local, "connection", None)
+        if conn is not None:
+            return conn
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Транзакції керуються явно (BEGIN/COMMIT)
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # У режимі WAL достатньо синхронізації при контрольних точках
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.create_function("regexp_match", 3, _regexp, deterministic=True)
+        conn.create_function("geo_distance", 4, _distance, deterministic=True)
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.executescript(SCHEMA)
+                self._schema_ready = True
+            self._connections.append(conn)
+        self._local.connection = conn
+        return conn
+
+    def _call(self, func, *args):
+        return func(self._connection(), *args)
+
+    async def _run(self, func, *args):
+        """Виконує функцію з з'єднанням у пулі потоків сховища"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(self._call, func, *args))
+
+    async def open(self):
+        """Відкриває базу і створює схему (помилки конфігурації видно при запуску)"""
+        mode = await self._run(lambda conn: conn.execute("PRAGMA journal_mode").fetchone()[0])
+        logger.info(f"Сховище SQLite відкрито: {self.path}, журнал {mode}")
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._schema_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    # Синхронні операції; виконуються в пулі потоків
+
+    @staticmethod
+    def _select(conn, where: str, params: List[Any], order: str = "", limit: Optional[int] = None,
+                skip: int = 0, projection=None) -> List[Dict[str, Any]]:
+        sql = f"SELECT id, doc FROM cars WHERE {where}{order}"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params = [*params, limit, skip]
+        return [_document(car_id, doc, projection) for car_id, doc in conn.execute(sql, params)]
+
+    @staticmethod
+    def _order(sort_by: str, sort_order: int) -> str:
+        direction = "ASC" if sort_order == 1 else "DESC"
+        # Поля без колонки відсутні в усіх документах - порядок як у MongoDB, природний
+        if sort_by not in COLUMN_NAMES:
+            return f" ORDER BY pk {direction}"
+        return f" ORDER BY {sort_by} {direction}, pk {direction}"
+
+    def _get_many(self, conn, car_ids: List[str], projection) -> List[Dict[str, Any]]:
+        cars = []
+        for chunk in _chunks(car_ids):
+            cars += self._select(conn, f"id IN ({_placeholders(chunk)})", chunk, projection=projection)
+        return cars
+
+    def _find_page(self, conn, query, sort_by, sort_order, skip, limit):
+        where, params = where_clause(query)
+        # Кількість і сторінка читаються з одного знімка бази
+        with _transaction(conn):
+            total = conn.execute(f"SELECT count(*) FROM cars WHERE {where}", params).fetchone()[0]
+            cars = self._select(conn, where, params, self._order(sort_by, sort_order), limit, skip)
+        return total, cars
+
+    def _search(self, conn, match: str, skip: int, limit: int):
+        with _transaction(conn):
+            total = conn.execute("SELECT count(*) FROM cars_fts WHERE cars_fts MATCH ?", (match,)).fetchone()[0]
+            rows = conn.execute(
+                "SELECT cars.id, cars.doc FROM cars_fts JOIN cars ON cars.pk = cars_fts.rowid "
+                "WHERE cars_fts MATCH ? ORDER BY rank LIMIT ? OFFSET ?",
+                (match, limit, skip),
+            ).fetchall()
+        return total, [_document(car_id, doc) for car_id, doc in rows]
+
+    @staticmethod
+    def _insert(conn, car_id: str, row: Dict[str, Any]):
+        columns = ["id", *row]
+        try:
+            with _transaction(conn, "IMMEDIATE"):
+                conn.execute(
+                    f"INSERT INTO cars ({', '.join(columns)}) VALUES ({_placeholders(columns)})",
+                    [car_id, *row.values()],
+                )
+        except sqlite3.IntegrityError as e:
+            raise DuplicateCarError(str(e))
+
+    @staticmethod
+    def _update(conn, car_id: str, fields: Dict[str, Any]) -> bool:
+        # Читання і запис в одній транзакції запису - паралельні зміни не губляться
+        with _transaction(conn, "IMMEDIATE"):
+            found = conn.execute("SELECT doc FROM cars WHERE id = ?", (car_id,)).fetchone()
+            if found is None:
+                return False
+            car = json.loads(found[0], object_hook=_json_object)
+            updated = {**car, **fields}
+            updated.pop("_id", None)
+            if updated == car:
+                return False
+            row = _row(updated)
+            conn.execute(
+                f"UPDATE cars SET {', '.join(f'{name} = ?' for name in row)} WHERE id = ?",
+                [*row.values(), car_id],
+            )
+        return True
+
+    @staticmethod
+    def _delete(conn, car_id: str) -> bool:
+        with _transaction(conn, "IMMEDIATE"):
+            return conn.execute("DELETE FROM cars WHERE id = ?", (car_id,)).rowcount > 0
+
+    @staticmethod
+    def _known_hashes(conn, urls: List[str]) -> Dict[str, str]:
+        hashes = {}
+        for chunk in _chunks(urls):
+            # Запит читає лише індекс cars_url_hash
+            rows = conn.execute(f"SELECT url, content_hash FROM cars WHERE url IN ({_placeholders(chunk)})", chunk)
+            hashes.update(rows)
+        return hashes
+
+    @staticmethod
+    def _mark_seen(conn, urls: List[str], seen_at: datetime):
+        value = _column_value(seen_at)
+        with _transaction(conn, "IMMEDIATE"):
+            for chunk in _chunks(urls):
+                conn.execute(
+                    "UPDATE cars SET last_seen_at = ?, doc = json_set(doc, '$.last_seen_at', json(?)) "
+                    f"WHERE url IN ({_placeholders(chunk)})",
+                    [value, json.dumps(_json_default(seen_at)), *chunk],
+                )
+
+    @staticmethod
+    def _record_price(conn, car_id: str, price: Optional[int], car: Dict[str, Any], observed_at: datetime):
+        point = json.dumps({"t": observed_at, "price": price}, default=_json_default)
+        at = _column_value(observed_at)
+        with _transaction(conn, "IMMEDIATE"):
+            conn.execute(
+                "INSERT INTO price_history (car_id, month, points, count, first_price, last_price, min_price, max_price, "
+                "start_at, end_at, make, model, year) VALUES (?, ?, json_array(json(?)), 1, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (car_id, month) DO UPDATE SET "
+                "points = json_insert(points, '$[#]', json(?)), count = count + 1, last_price = excluded.last_price, "
+                "min_price = min(min_price, excluded.min_price), max_price = max(max_price, excluded.max_price), "
+                "end_at = excluded.end_at, make = excluded.make, model = excluded.model, year = excluded.year",
+                [car_id, month_key(observed_at), point, price, price, price, price, at, at,
+                 car.get("make"), car.get("model"), car.get("year"), point],
+            )
+
+    @staticmethod
+    def _price_history(conn, car_id: str) -> List[Dict[str, Any]]:
+        points = []
+        for (bucket,) in conn.execute("SELECT points FROM price_history WHERE car_id = ? ORDER BY month", (car_id,)):
+            points.extend(json.loads(bucket, object_hook=_json_object))
+        return points
+
+    @staticmethod
+    def _price_trends(conn, make: Optional[str], model: Optional[str], since_month: Optional[str]):
+        conditions, params = [], []
+        for column, value in (("make", make), ("model", model)):
+            if value:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        # Кошики до since_month теж читаються: з них переноситься остання відома ціна
+        rows = conn.execute(
+            "SELECT car_id, month, last_price, min_price, max_price, count FROM price_history "
+            f"WHERE {' AND '.join(conditions) or '1'} ORDER BY month",
+            params,
+        )
+        builder = TrendBuilder()
+        for car_id, month, last_price, min_price, max_price, count in rows:
+            builder.add({"car_id": car_id, "month": month, "last_price": last_price,
+                         "min_price": min_price, "max_price": max_price, "count": count})
+        return builder.result(since_month)
+
+    @staticmethod
+    def _stats(conn) -> Dict[str, Any]:
+        with _transaction(conn):
+            total, avg_price, avg_year, avg_mileage = conn.execute(
+                "SELECT count(*), avg(CASE WHEN price > 0 THEN price END), "
+                "avg(CASE WHEN year > 1900 THEN year END), avg(CASE WHEN mileage > 0 THEN mileage END) FROM cars"
+            ).fetchone()
+            popular_makes = conn.execute(
+                "SELECT make, count(*) AS count FROM cars GROUP BY make ORDER BY count DESC LIMIT 5"
+            ).fetchall()
+        return {
+            "total_cars": total,
+            "avg_price": int(avg_price or 0),
+            "avg_year": int(avg_year or 0),
+            "avg_mileage": int(avg_mileage or 0),
+            "popular_makes": [{"make": make, "count": count} for make, count in popular_makes],
+        }
+
+    @staticmethod
+    def _facets(conn, query: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        where, params = where_clause(query)
+        facets = {}
+        with _transaction(conn):
+            for name, limit in FACETS:
+                rows = conn.execute(
+                    f"SELECT {name}, count(*) AS count FROM cars WHERE {where} GROUP BY {name} ORDER BY count DESC LIMIT ?",
+                    [*params, limit],
+                )
+                facets[name] = [{"value": value, "count": count} for value, count in rows]
+        return facets
+
+    # Інтерфейс CarRepository
+
+    async def get(self, car_id, projection=None):
+        cars = await self._run(self._get_many, [str(car_id)], projection)
+        return cars[0] if cars else None
+
+    async def get_many(self, car_ids, projection=None):
+        return await self._run(self._get_many, [str(car_id) for car_id in car_ids], projection)
+
+    async def find_by_url(self, url):
+        cars = await self._run(self._select, "url = ?", [url])
+        return cars[0] if cars else None
+
+    async def find(self, query, sort_by="created_at", sort_order=-1, skip=0, limit=10):
+        _, cars = await self.find_page(query, sort_by, sort_order, skip, limit)
+        return cars
+
+    async def count(self, query):
+        where, params = where_clause(query)
+        return await self._run(lambda conn: conn.execute(f"SELECT count(*) FROM cars WHERE {where}", params).fetchone()[0])
+
+    async def find_page(self, query, sort_by, sort_order, skip, limit):
+        return await self._run(self._find_page, query, sort_by, sort_order, skip, limit)
+
+    async def search(self, text, skip, limit):
+        match = fts_query(text)
+        if match is None:
+            return 0, []
+        return await self._run(self._search, match, skip, limit)
+
+    async def insert(self, car):
+        car_id = str(car.get("_id") or ObjectId())
+        await self._run(self._insert, car_id, _row(car))
+        return car_id
+
+    async def update(self, car_id, fields):
+        return await self._run(self._update, str(car_id), fields)
+
+    async def delete(self, car_id):
+        return await self._run(self._delete, str(car_id))
+
+    async def known_hashes(self, urls):
+        if not urls:
+            return {}
+        return await self._run(self._known_hashes, list(urls))
+
+    async def mark_seen(self, urls, seen_at):
+        if urls:
+            await self._run(self._mark_seen, list(urls), seen_at)
+
+    async def record_price(self, car_id, price, car):
+        await self._run(self._record_price, str(car_id), price, car or {}, datetime.utcnow())
+
+    async def price_history(self, car_id):
+        return await self._run(self._price_history, str(car_id))
+
+    async def price_trends(self, make=None, model=None, since_month=None):
+        return await self._run(self._price_trends, make, model, since_month)
+
+    async def stats(self):
+        return await self._run(self._stats)
+
+    async def facets(self, query):
+        return await self._run(self._facets, query)
+
+
+_repository: Optional[SQLiteCarRepository] = None
+
+
+def get_sqlite_repository() -> SQLiteCarRepository:
+    """Повертає спільне сховище SQLite процесу"""
+    global _repository
+    if _repository is None:
+        _repository = SQLiteCarRepository(settings.SQLITE_PATH, settings.SQLITE_THREADS, settings.SQLITE_BUSY_TIMEOUT)
+    return _repository
+
+
+def close_sqlite_repository():
+    global _repository
+    if _repository is not None:
+        _repository.close()
+        _repository = None
+        logger.info("Сховище SQLite закрито")
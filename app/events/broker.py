@@ -0,0 +1,131 @@
+import asyncio
+import itertools
+from typing import Any, Dict, Optional, Set
+
+from loguru import logger
+
+from app.config import settings
+
+# Типи подій
+CAR_CREATED = "car_created"
+PRICE_CHANGED = "price_changed"
+
+
+def car_payload(car: Dict[str, Any], **extra) -> Dict[str, Any]:
+    """Дані автомобіля для події (ObjectId замінюється на рядковий id, як у відповідях API)"""
+    data = {key: value for key, value in car.items() if key != "_id"}
+    if car.get("_id") is not None:
+        data["id"] = str(car["_id"])
+    data.update(extra)
+    return data
+
+
+class Subscription:
+    """
+    Підписка одного клієнта на події
+
+    Кожен підписник має власну обмежену чергу. Якщо клієнт не встигає читати
+    події, найстаріші з них відкидаються, а кількість втрачених подій
+    передається разом з наступною подією - повільний клієнт не гальмує
+    видавця та інших підписників.
+    """
+
+    def __init__(self, broker: "EventBroker", filters: Optional[Dict[str, Any]] = None, maxsize: int = 100):
+        self.broker = broker
+        self.filters = {key: value for key, value in (filters or {}).items() if value is not None}
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        """Перевіряє, чи подія відповідає фільтрам підписника"""
+        car = event["data"]
+        filters = self.filters
+        if "make" in filters and filters["make"].lower() not in str(car.get("make", "")).lower():
+            return False
+        price = car.get("price") or 0
+        if "min_price" in filters and price < filters["min_price"]:
+            return False
+        if "max_price" in filters and price > filters["max_price"]:
+            return False
+        year = car.get("year") or 0
+        if "min_year" in filters and year < filters["min_year"]:
+            return False
+        if "max_year" in filters and year > filters["max_year"]:
+            return False
+        return True
+
+    def offer(self, event: Dict[str, Any]):
+        """Додає подію в чергу без очікування, за потреби витісняючи найстарішу"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            self.broker.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self) -> Dict[str, Any]:
+        event = await self.queue.get()
+        if self.dropped:
+            event = {**event, "dropped": self.dropped}
+            self.dropped = 0
+        return event
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    async def __aenter__(self) -> "Subscription":
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+
+class EventBroker:
+    """
+    Розсилка подій у межах процесу
+
+    Скрапер і API публікують події про нові оголошення та зміни цін один раз,
+    брокер розсилає їх усім підписникам, тож кількість відкритих клієнтів не
+    збільшує навантаження на базу даних.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self.subscribers: Set[Subscription] = set()
+        self.published = 0
+        self.dropped = 0
+        self._ids = itertools.count(1)
+
+    def subscribe(self, filters: Optional[Dict[str, Any]] = None) -> Subscription:
+        subscription = Subscription(self, filters, maxsize=self.queue_size)
+        self.subscribers.add(subscription)
+        logger.debug(f"Новий підписник на події, всього: {len(self.subscribers)}")
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscribers.discard(subscription)
+
+    def publish(self, event_type: str, data: Dict[str, Any]):
+        """Публікує подію всім підписникам, чиї фільтри їй відповідають"""
+        event = {"id": next(self._ids), "type": event_type, "data": data}
+        self.published += 1
+        for subscription in list(self.subscribers):
+            if subscription.matches(event):
+                subscription.offer(event)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+_broker: Optional[EventBroker] = None
+
+
+def get_event_broker() -> EventBroker:
+    """Повертає спільний для процесу брокер подій"""
+    global _broker
+    if _broker is None:
+        _broker = EventBroker(queue_size=settings.EVENTS_QUEUE_SIZE)
+    return _broker
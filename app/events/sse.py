@@ -0,0 +1,38 @@
+import asyncio
+import json
+from typing import Any, AsyncIterator, Dict
+
+from starlette.requests import Request
+
+from app.events.broker import Subscription
+
+
+def format_event(event: Dict[str, Any]) -> str:
+    """Форматує подію у вигляді повідомлення Server-Sent Events"""
+    payload = dict(event["data"])
+    if event.get("dropped"):
+        # Клієнт пропустив частину подій і може оновити дані повністю
+        payload["dropped"] = event["dropped"]
+    data = json.dumps(payload, ensure_ascii=False, default=str)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+async def event_stream(subscription: Subscription, request: Request, heartbeat: float) -> AsyncIterator[str]:
+    """
+    Потік подій для одного клієнта
+
+    Якщо подій немає довше за heartbeat секунд, надсилається коментар, який
+    утримує з'єднання відкритим і дозволяє помітити відключення клієнта.
+    """
+    async with subscription:
+        # Інтервал повторного підключення для EventSource, мс
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": ping\n\n"
+                continue
+            yield format_event(event)
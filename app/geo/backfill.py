@@ -0,0 +1,56 @@
+"""
+Заповнення регіону та координат для вже збережених автомобілів
+
+Нові та змінені оголошення отримують region_code і geo при збереженні,
+цей скрипт доповнює записи, збережені раніше.
+
+Запуск: python -m app.geo.backfill
+"""
+import asyncio
+
+from loguru import logger
+from pymongo import UpdateOne
+
+from app.geo.gazetteer import resolve_location
+
+
+async def ensure_geo_indexes(db):
+    """Створює індекси для фільтра за областю та пошуку в радіусі"""
+    await db.cars.create_index("region_code")
+    await db.cars.create_index([("geo", "2dsphere")])
+
+
+async def backfill_regions(db, batch_size: int = 500) -> int:
+    """
+    Розпізнає місцезнаходження автомобілів, що ще не мають поля region_code
+
+    Returns:
+        Кількість оновлених записів
+    """
+    updated = 0
+    batch = []
+    cursor = db.cars.find({"region_code": {"$exists": False}}, {"location": 1})
+    async for car in cursor:
+        batch.append(UpdateOne({"_id": car["_id"]}, {"$set": resolve_location(car.get("location"))}))
+        if len(batch) >= batch_size:
+            updated += (await db.cars.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        updated += (await db.cars.bulk_write(batch, ordered=False)).modified_count
+
+    logger.info(f"Заповнено регіон для {updated} автомобілів")
+    return updated
+
+
+async def main():
+    from app.db.database import get_database, init_db, close_db
+
+    await init_db()
+    try:
+        await backfill_regions(await get_database())
+    finally:
+        await close_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,193 @@
+"""
+Офлайн-довідник населених пунктів України
+
+Перетворює вільний текст місцезнаходження з оголошення ("Львів",
+"м. Бровари, Київська обл.") на код області ISO 3166-2:UA та точку GeoJSON.
+Дані вбудовані в модуль, тож розпізнавання не потребує мережі.
+"""
+import re
+from typing import Any, Dict, Optional, Tuple
+
+# Середній радіус Землі для запитів $centerSphere, км
+EARTH_RADIUS_KM = 6378.1
+
+# Код області -> (назва області, прикметник у назві області, адміністративний центр)
+REGIONS: Dict[str, Tuple[str, str, str]] = {
+    "UA-05": ("Вінницька область", "вінницька", "Вінниця"),
+    "UA-07": ("Волинська область", "волинська", "Луцьк"),
+    "UA-09": ("Луганська область", "луганська", "Луганськ"),
+    "UA-12": ("Дніпропетровська область", "дніпропетровська", "Дніпро"),
+    "UA-14": ("Донецька область", "донецька", "Донецьк"),
+    "UA-18": ("Житомирська область", "житомирська", "Житомир"),
+    "UA-21": ("Закарпатська область", "закарпатська", "Ужгород"),
+    "UA-23": ("Запорізька область", "запорізька", "Запоріжжя"),
+    "UA-26": ("Івано-Франківська область", "івано-франківська", "Івано-Франківськ"),
+    "UA-30": ("Київ", "київ", "Київ"),
+    "UA-32": ("Київська область", "київська", "Біла Церква"),
+    "UA-35": ("Кіровоградська область", "кіровоградська", "Кропивницький"),
+    "UA-40": ("Севастополь", "севастополь", "Севастополь"),
+    "UA-43": ("Автономна Республіка Крим", "крим", "Сімферополь"),
+    "UA-46": ("Львівська область", "львівська", "Львів"),
+    "UA-48": ("Миколаївська область", "миколаївська", "Миколаїв"),
+    "UA-51": ("Одеська область", "одеська", "Одеса"),
+    "UA-53": ("Полтавська область", "полтавська", "Полтава"),
+    "UA-56": ("Рівненська область", "рівненська", "Рівне"),
+    "UA-59": ("Сумська область", "сумська", "Суми"),
+    "UA-61": ("Тернопільська область", "тернопільська", "Тернопіль"),
+    "UA-63": ("Харківська область", "харківська", "Харків"),
+    "UA-65": ("Херсонська область", "херсонська", "Херсон"),
+    "UA-68": ("Хмельницька область", "хмельницька", "Хмельницький"),
+    "UA-71": ("Черкаська область", "черкаська", "Черкаси"),
+    "UA-74": ("Чернігівська область", "чернігівська", "Чернігів"),
+    "UA-77": ("Чернівецька область", "чернівецька", "Чернівці"),
+}
+
+# Населений пункт -> (код області, широта, довгота)
+CITIES: Dict[str, Tuple[str, float, float]] = {
+    "Вінниця": ("UA-05", 49.2331, 28.4682),
+    "Луцьк": ("UA-07", 50.7472, 25.3254),
+    "Ковель": ("UA-07", 51.2153, 24.7097),
+    "Луганськ": ("UA-09", 48.5740, 39.3078),
+    "Дніпро": ("UA-12", 48.4647, 35.0462),
+    "Кривий Ріг": ("UA-12", 47.9105, 33.3918),
+    "Кам'янське": ("UA-12", 48.5167, 34.6133),
+    "Нікополь": ("UA-12", 47.5712, 34.3964),
+    "Павлоград": ("UA-12", 48.5336, 35.8700),
+    "Донецьк": ("UA-14", 48.0159, 37.8029),
+    "Маріуполь": ("UA-14", 47.0971, 37.5434),
+    "Краматорськ": ("UA-14", 48.7389, 37.5848),
+    "Слов'янськ": ("UA-14", 48.8530, 37.6053),
+    "Житомир": ("UA-18", 50.2547, 28.6587),
+    "Бердичів": ("UA-18", 49.8993, 28.6024),
+    "Ужгород": ("UA-21", 48.6208, 22.2879),
+    "Мукачево": ("UA-21", 48.4393, 22.7178),
+    "Запоріжжя": ("UA-23", 47.8388, 35.1396),
+    "Мелітополь": ("UA-23", 46.8489, 35.3675),
+    "Бердянськ": ("UA-23", 46.7553, 36.7885),
+    "Івано-Франківськ": ("UA-26", 48.9226, 24.7111),
+    "Калуш": ("UA-26", 49.0250, 24.3728),
+    "Коломия": ("UA-26", 48.5310, 25.0339),
+    "Київ": ("UA-30", 50.4501, 30.5234),
+    "Біла Церква": ("UA-32", 49.7968, 30.1311),
+    "Бровари": ("UA-32", 50.5111, 30.7903),
+    "Бориспіль": ("UA-32", 50.3527, 30.9550),
+    "Ірпінь": ("UA-32", 50.5218, 30.2506),
+    "Буча": ("UA-32", 50.5437, 30.2120),
+    "Кропивницький": ("UA-35", 48.5079, 32.2623),
+    "Олександрія": ("UA-35", 48.6696, 33.1159),
+    "Севастополь": ("UA-40", 44.6166, 33.5254),
+    "Сімферополь": ("UA-43", 44.9521, 34.1024),
+    "Львів": ("UA-46", 49.8397, 24.0297),
+    "Дрогобич": ("UA-46", 49.3500, 23.5000),
+    "Стрий": ("UA-46", 49.2622, 23.8561),
+    "Миколаїв": ("UA-48", 46.9750, 31.9946),
+    "Первомайськ": ("UA-48", 48.0441, 30.8506),
+    "Одеса": ("UA-51", 46.4825, 30.7233),
+    "Ізмаїл": ("UA-51", 45.3496, 28.8372),
+    "Чорноморськ": ("UA-51", 46.3009, 30.6552),
+    "Полтава": ("UA-53", 49.5883, 34.5514),
+    "Кременчук": ("UA-53", 49.0659, 33.4204),
+    "Рівне": ("UA-56", 50.6199, 26.2516),
+    "Дубно": ("UA-56", 50.4173, 25.7346),
+    "Суми": ("UA-59", 50.9077, 34.7981),
+    "Конотоп": ("UA-59", 51.2403, 33.2026),
+    "Тернопіль": ("UA-61", 49.5535, 25.5948),
+    "Харків": ("UA-63", 49.9935, 36.2304),
+    "Лозова": ("UA-63", 48.8894, 36.3159),
+    "Херсон": ("UA-65", 46.6354, 32.6169),
+    "Хмельницький": ("UA-68", 49.4229, 26.9871),
+    "Кам'янець-Подільський": ("UA-68", 48.6845, 26.5853),
+    "Черкаси": ("UA-71", 49.4444, 32.0598),
+    "Умань": ("UA-71", 48.7484, 30.2218),
+    "Чернігів": ("UA-74", 51.4982, 31.2893),
+    "Ніжин": ("UA-74", 51.0480, 31.8869),
+    "Чернівці": ("UA-77", 48.2921, 25.9358),
+}
+
+# Російськомовні та латинські варіанти назв, що трапляються в оголошеннях
+ALIASES: Dict[str, str] = {
+    "киев": "Київ", "kyiv": "Київ", "kiev": "Київ",
+    "львов": "Львів", "lviv": "Львів",
+    "харьков": "Харків", "kharkiv": "Харків",
+    "одесса": "Одеса", "odesa": "Одеса", "odessa": "Одеса",
+    "днепр": "Дніпро", "dnipro": "Дніпро", "дніпропетровськ": "Дніпро",
+    "запорожье": "Запоріжжя", "zaporizhzhia": "Запоріжжя",
+    "винница": "Вінниця", "vinnytsia": "Вінниця",
+    "николаев": "Миколаїв", "кировоград": "Кропивницький",
+    "ровно": "Рівне", "чернигов": "Чернігів", "черновцы": "Чернівці",
+    "ивано-франковск": "Івано-Франківськ", "тернополь": "Тернопіль",
+    "хмельницкий": "Хмельницький", "житомир": "Житомир", "кривой рог": "Кривий Ріг",
+}
+
+# Службові слова, що не є частиною назви
+_PREFIX_RE = re.compile(r"^(м|г|смт|с|місто|город)\.?\s+")
+_OBLAST_RE = re.compile(r"\s+(обл\.?|область|р-н|район)$")
+
+
+def normalize_name(name: str) -> str:
+    """Нормалізує назву для пошуку: нижній регістр, єдиний апостроф, без префіксів м./смт"""
+    name = re.sub(r"[’ʼ`´]", "'", name or "").lower().strip(" .")
+    name = re.sub(r"\s+", " ", name)
+    return _PREFIX_RE.sub("", name)
+
+
+_CITY_INDEX: Dict[str, str] = {normalize_name(city): city for city in CITIES}
+_CITY_INDEX.update({normalize_name(alias): city for alias, city in ALIASES.items()})
+_REGION_INDEX: Dict[str, str] = {adjective: code for code, (_, adjective, _) in REGIONS.items()}
+
+
+def geo_point(lat: float, lon: float) -> Dict[str, Any]:
+    """Точка GeoJSON (MongoDB очікує порядок довгота, широта)"""
+    return {"type": "Point", "coordinates": [lon, lat]}
+
+
+def find_city(name: str) -> Optional[str]:
+    """Повертає канонічну назву населеного пункту або None"""
+    return _CITY_INDEX.get(normalize_name(name))
+
+
+def find_region(name: str) -> Optional[str]:
+    """Повертає код області за кодом ("UA-46"), назвою ("Львівська обл.") або обласним центром"""
+    if not name:
+        return None
+    if name.strip().upper() in REGIONS:
+        return name.strip().upper()
+    normalized = _OBLAST_RE.sub("", normalize_name(name))
+    if normalized in _REGION_INDEX:
+        return _REGION_INDEX[normalized]
+    city = find_city(name)
+    return CITIES[city][0] if city else None
+
+
+def resolve_location(text: Optional[str]) -> Dict[str, Any]:
+    """
+    Розпізнає місцезнаходження оголошення
+
+    Повертає поля для збереження: region_code, region та geo. Якщо відомий лише
+    регіон, точкою стає його адміністративний центр; нерозпізнаний текст дає None.
+    """
+    parts = [part for part in re.split(r"[,()/]", text or "") if part.strip()]
+
+    for part in parts:
+        city = find_city(part)
+        if city:
+            code, lat, lon = CITIES[city]
+            return {"region_code": code, "region": REGIONS[code][0], "geo": geo_point(lat, lon)}
+
+    for part in parts:
+        code = find_region(part)
+        if code:
+            _, lat, lon = CITIES[REGIONS[code][2]]
+            return {"region_code": code, "region": REGIONS[code][0], "geo": geo_point(lat, lon)}
+
+    return {"region_code": None, "region": None, "geo": None}
+
+
+def within_radius_query(place: str, radius_km: float) -> Dict[str, Any]:
+    """Фільтр MongoDB "в межах radius_km від населеного пункту" (використовує індекс 2dsphere)"""
+    city = find_city(place)
+    if city is None:
+        raise ValueError(f"Невідомий населений пункт: {place}")
+    _, lat, lon = CITIES[city]
+    return {"$geoWithin": {"$centerSphere": [[lon, lat], radius_km / EARTH_RADIUS_KM]}}
+
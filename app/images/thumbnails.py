@@ -0,0 +1,348 @@
+import asyncio
+import functools
+import hashlib
+import io
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+from app.config import settings
+
+# Ширина мініатюр для кожного розміру, пікселі
+THUMBNAIL_SIZES = {"small": 320, "medium": 640, "large": 1280}
+# Під цим "розміром" у кеші зберігається завантажене зображення-джерело
+ORIGINAL = "original"
+
+_EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp", "image/gif": ".gif"}
+
+
+def _load_pillow():
+    """Модуль PIL.Image або None; Pillow імпортується лише при створенні першої мініатюри"""
+    try:
+        from PIL import Image
+    except ImportError:  # pragma: no cover - Pillow є необов'язковою залежністю
+        return None
+    return Image
+
+
+def is_allowed_image_url(image_url: str) -> bool:
+    """
+    Чи можна завантажувати зображення за цим URL
+
+    image_url записують і клієнти API, тож завантажуються лише зображення з хостів
+    IMAGE_ALLOWED_HOSTS (сайту-джерела), а не з довільних адрес, зокрема внутрішніх.
+    """
+    try:
+        parts = urlsplit(image_url)
+        host = (parts.hostname or "").lower()
+    except ValueError:
+        return False
+    if parts.scheme not in ("http", "https") or not host:
+        return False
+    return any(host == allowed or host.endswith("." + allowed) for allowed in settings.IMAGE_ALLOWED_HOSTS)
+
+
+def make_thumbnail(data: bytes, width: int, content_type: str = "image/jpeg") -> Tuple[bytes, str]:
+    """
+    Зменшує зображення до заданої ширини зі збереженням пропорцій
+
+    Без Pillow зображення повертається без змін.
+
+    Returns:
+        Байти мініатюри та її MIME-тип
+    """
+    Image = _load_pillow()
+    if Image is None:
+        return data, content_type
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGB")
+        if image.width > width:
+            height = max(1, round(image.height * width / image.width))
+            image = image.resize((width, height), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=82, optimize=True, progressive=True)
+    return output.getvalue(), "image/jpeg"
+
+
+class ThumbnailCache:
+    """
+    Дисковий кеш мініатюр з адресацією за вмістом
+
+    Файл мініатюри називається за sha256 від її байтів, тож однакові зображення
+    зберігаються один раз. Окремий індекс зіставляє пару (URL джерела, розмір)
+    з хешем вмісту. Час модифікації файлу мініатюри оновлюється при кожному
+    зверненні й використовується для LRU-витіснення. Зображення-джерело
+    зберігається так само, під розміром ORIGINAL.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 500 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # Поточний розмір кешу рахуємо ліниво при першому записі
+        self._size: Optional[int] = None
+
+    def _blob_path(self, digest: str, content_type: str) -> str:
+        extension = _EXTENSIONS.get(content_type, ".bin")
+        return os.path.join(self.directory, "blobs", digest[:2], digest + extension)
+
+    def _index_path(self, image_url: str, size: str) -> str:
+        key = hashlib.sha256(f"{size}:{image_url}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, "index", key[:2], key + ".json")
+
+    def lookup(self, image_url: str, size: str) -> Optional[Dict[str, Any]]:
+        """Повертає запис мініатюри (шлях, хеш, MIME-тип) або None"""
+        try:
+            with open(self._index_path(image_url, size), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        path = self._blob_path(entry["digest"], entry["content_type"])
+        try:
+            # Оновлюємо час доступу для LRU-витіснення
+            os.utime(path, None)
+        except OSError:
+            # Файл мініатюри вже витіснено
+            return None
+        entry["path"] = path
+        return entry
+
+    def read(self, image_url: str, size: str) -> Optional[Tuple[bytes, str]]:
+        """Повертає байти та MIME-тип збереженого зображення або None"""
+        entry = self.lookup(image_url, size)
+        if entry is None:
+            return None
+        try:
+            with open(entry["path"], "rb") as f:
+                return f.read(), entry["content_type"]
+        except OSError:
+            return None
+
+    def store(self, image_url: str, size: str, data: bytes, content_type: str) -> Dict[str, Any]:
+        """Зберігає мініатюру та запис індексу"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest, content_type)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if os.path.exists(path):
+            os.utime(path, None)
+        else:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            if self._size is not None:
+                self._size += len(data)
+
+        entry = {"digest": digest, "content_type": content_type, "source": image_url, "size": size}
+        index_path = self._index_path(image_url, size)
+        os.makedirs(os.path.dirname(index_path), exist_ok=True)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, index_path)
+
+        self._evict_if_needed()
+        entry["path"] = path
+        return entry
+
+    def _scan(self) -> List[tuple]:
+        """Повертає список (час доступу, розмір, шлях) файлів мініатюр"""
+        entries = []
+        blobs_dir = os.path.join(self.directory, "blobs")
+        if not os.path.isdir(blobs_dir):
+            return entries
+        for root, _, files in os.walk(blobs_dir):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict_if_needed(self):
+        """Витісняє найдавніше використані мініатюри, якщо кеш перевищив ліміт розміру"""
+        if self._size is None:
+            self._size = sum(entry[1] for entry in self._scan())
+        if self._size <= self.max_bytes:
+            return
+
+        # Записи індексу на витіснені файли стають недійсними і перевіряються в lookup()
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for _, size, path in sorted(self._scan()):
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._size -= size
+            evicted += 1
+        logger.info(f"Витіснено {evicted} мініатюр з кешу зображень")
+
+
+class ThumbnailService:
+    """
+    Завантажує зображення автомобілів і віддає їх мініатюри з кешу
+
+    Кожне зображення завантажується з сайту-джерела лише один раз на URL: джерело
+    зберігається в кеші, і всі розміри мініатюр створюються з нього. Паралельні
+    запити того ж зображення чекають на перше завантаження.
+    """
+
+    def __init__(self, cache: ThumbnailCache, prefetch_concurrency: int = 4):
+        self.cache = cache
+        self.session: Optional["aiohttp.ClientSession"] = None
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._downloads: Dict[str, asyncio.Future] = {}
+        self._prefetch_semaphore = asyncio.Semaphore(prefetch_concurrency)
+
+    async def _run_sync(self, func, *args):
+        """Виконує блокуючу функцію (диск, стиснення зображення) у пулі потоків"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args))
+
+    async def _init_session(self) -> "aiohttp.ClientSession":
+        # aiohttp імпортується при першому завантаженні, а не при запуску процесу API
+        import aiohttp
+
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=settings.IMAGE_REQUEST_TIMEOUT),
+                headers={
+                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+                },
+            )
+        return self.session
+
+    async def close(self):
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    async def _download(self, image_url: str) -> Optional[Tuple[bytes, str]]:
+        """Завантажує зображення-джерело (лише з дозволених хостів, не більше IMAGE_MAX_BYTES)"""
+        import aiohttp
+
+        if not is_allowed_image_url(image_url):
+            logger.warning(f"Зображення з недозволеного хоста не завантажується: {image_url}")
+            return None
+
+        limit = settings.IMAGE_MAX_BYTES
+        session = await self._init_session()
+        try:
+            # Переадресації не виконуються: вони могли б вивести за межі дозволених хостів
+            async with session.get(image_url, allow_redirects=False) as response:
+                if response.status != 200:
+                    logger.warning(f"Не вдалося завантажити зображення {image_url}: {response.status}")
+                    return None
+                if not response.content_type.startswith("image/"):
+                    logger.warning(f"Відповідь не є зображенням {image_url}: {response.content_type}")
+                    return None
+                if (response.content_length or 0) > limit:
+                    logger.warning(f"Зображення завелике {image_url}: {response.content_length} байт")
+                    return None
+
+                # Тіло читається частинами, щоб не тримати в пам'яті більше за ліміт
+                chunks = []
+                received = 0
+                async for chunk in response.content.iter_chunked(64 * 1024):
+                    received += len(chunk)
+                    if received > limit:
+                        logger.warning(f"Зображення завелике {image_url}: понад {limit} байт")
+                        return None
+                    chunks.append(chunk)
+                return b"".join(chunks), response.content_type
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.warning(f"Помилка з'єднання при завантаженні зображення {image_url}: {e!r}")
+            return None
+
+    async def get(self, image_url: str, size: str = "small") -> Optional[Dict[str, Any]]:
+        """
+        Повертає запис мініатюри, за потреби завантажуючи й зменшуючи зображення
+
+        Returns:
+            Словник з полями path, digest, content_type або None, якщо зображення недоступне
+        """
+        entry = await self._run_sync(self.cache.lookup, image_url, size)
+        if entry:
+            return entry
+
+        # Паралельні запити тієї ж мініатюри чекають на одне завантаження
+        key = (image_url, size)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._create(image_url, size))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _original(self, image_url: str) -> Optional[Tuple[bytes, str]]:
+        """Повертає зображення-джерело з кешу або завантажує його (один раз для всіх розмірів)"""
+        original = await self._run_sync(self.cache.read, image_url, ORIGINAL)
+        if original:
+            return original
+
+        # Паралельні запити різних розмірів того ж зображення чекають на одне завантаження
+        task = self._downloads.get(image_url)
+        if task is None:
+            task = asyncio.ensure_future(self._download_original(image_url))
+            self._downloads[image_url] = task
+            task.add_done_callback(lambda _: self._downloads.pop(image_url, None))
+        return await asyncio.shield(task)
+
+    async def _download_original(self, image_url: str) -> Optional[Tuple[bytes, str]]:
+        """Завантажує зображення-джерело і зберігає його в кеш"""
+        downloaded = await self._download(image_url)
+        if downloaded:
+            try:
+                await self._run_sync(self.cache.store, image_url, ORIGINAL, *downloaded)
+            except OSError as e:
+                logger.warning(f"Не вдалося зберегти зображення {image_url} в кеш: {e}")
+        return downloaded
+
+    async def _create(self, image_url: str, size: str) -> Optional[Dict[str, Any]]:
+        """Отримує зображення-джерело, зменшує його та зберігає мініатюру в кеш"""
+        original = await self._original(image_url)
+        if not original:
+            return None
+        data, content_type = original
+        try:
+            thumbnail, content_type = await self._run_sync(
+                make_thumbnail, data, THUMBNAIL_SIZES[size], content_type
+            )
+        except Exception as e:
+            logger.warning(f"Не вдалося створити мініатюру {image_url}: {e}")
+            return None
+        return await self._run_sync(self.cache.store, image_url, size, thumbnail, content_type)
+
+    async def prefetch(self, image_url: str, sizes: Iterable[str] = ("small",)):
+        """Заздалегідь створює мініатюри (помилка не перериває роботу скрапера)"""
+        async with self._prefetch_semaphore:
+            for size in sizes:
+                try:
+                    await self.get(image_url, size)
+                except Exception as e:
+                    logger.error(f"Помилка при попередньому завантаженні зображення {image_url}: {e}")
+
+
+_service: Optional[ThumbnailService] = None
+
+
+def get_thumbnail_service() -> ThumbnailService:
+    """Повертає спільний для процесу сервіс мініатюр"""
+    global _service
+    if _service is None:
+        _service = ThumbnailService(
+            ThumbnailCache(settings.IMAGE_CACHE_DIR, max_bytes=settings.IMAGE_CACHE_MAX_BYTES),
+            prefetch_concurrency=settings.IMAGE_PREFETCH_CONCURRENCY,
+        )
+    return _service
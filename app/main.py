@@ -1,17 +1,43 @@
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, Query
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
-from loguru import logger
-import uvicorn
-import os
-import asyncio
-from typing import List, Dict, Any, Optional
-from datetime import datetime
-from bson import ObjectId
-
-from app.db.database import get_database, init_db, close_db
-from app.scraper.auto_ria import AutoRiaScraper
+from app.startup import LazyImport, startup_profile
+
+with startup_profile.phase("fastapi"):
+    from fastapi import FastAPI, Depends, HTTPException, Query, Request
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
+    from loguru import logger
+    import os
+    import asyncio
+    from typing import List, Dict, Any, Optional, Tuple
+    from datetime import datetime
+    from bson import ObjectId
+
+with startup_profile.phase("db"):
+    from app.db.database import get_database, get_mongo_database, init_db, close_db
+    from app.db.archive import run_archiver
+    from app.db.changes import notify_removed, notify_upserted, run_refresher
+    from app.db.compact import decode_car, value_filter
+    from app.db.models import CarsBatchRequest, FuelType, PriceEstimateRequest, TransmissionType
+    from app.db.repository import CarRepository, DuplicateCarError, MongoCarRepository, get_repository
+    from app.db.singleflight import SingleFlight, make_key
+
+with startup_profile.phase("app"):
+    from app.assets.staticfiles import PrecompressedStaticFiles
+    from app.middleware.admission import READ, SCRAPER, SEARCH, WRITE, AdmissionMiddleware, ConcurrencyLimiter
+    from app.middleware.compression import CompressionMiddleware, CompressionStats
+    from app.events.broker import CAR_CREATED, PRICE_CHANGED, car_payload, get_event_broker
+    from app.events.sse import event_stream
+    from app.geo.gazetteer import find_region, resolve_location, within_radius_query
+    from app.images.thumbnails import THUMBNAIL_SIZES, get_thumbnail_service
+    from app.scraper.checkpoint import ScrapeCheckpoint
+    from app.scraper.utils import compute_content_hash
+    from app.config import settings
+
+# Важкі підсистеми (NumPy, pyarrow, aiohttp, BeautifulSoup) імпортуються при першому використанні
+get_columnar_catalog = LazyImport("app.analytics.columnar", "get_columnar_catalog")
+get_price_models = LazyImport("app.analytics.pricing", "get_price_models")
+get_similar_index = LazyImport("app.analytics.similar", "get_similar_index")
+run_snapshots = LazyImport("app.analytics.snapshot", "run_snapshots")
+AutoRiaScraper = LazyImport("app.scraper.auto_ria", "AutoRiaScraper")
 
 # Налаштування логування
 os.makedirs("logs", exist_ok=True)
@@ -33,44 +59,265 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Стиснення відповідей (zstd / brotli / gzip за Accept-Encoding)
+compression_stats = CompressionStats()
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        levels={
+            "zstd": settings.COMPRESSION_ZSTD_LEVEL,
+            "br": settings.COMPRESSION_BROTLI_LEVEL,
+            "gzip": settings.COMPRESSION_GZIP_LEVEL,
+        },
+        stats=compression_stats,
+    )
+
+# Контроль допуску (додається останнім, тож обробляє запит першим)
+admission_limiters = {
+    group: ConcurrencyLimiter(group, concurrency, queue_size, settings.ADMISSION_QUEUE_TIMEOUT)
+    for group, concurrency, queue_size in (
+        (READ, settings.ADMISSION_READ_CONCURRENCY, settings.ADMISSION_READ_QUEUE),
+        (SEARCH, settings.ADMISSION_SEARCH_CONCURRENCY, settings.ADMISSION_SEARCH_QUEUE),
+        (WRITE, settings.ADMISSION_WRITE_CONCURRENCY, settings.ADMISSION_WRITE_QUEUE),
+        (SCRAPER, settings.ADMISSION_SCRAPER_CONCURRENCY, settings.ADMISSION_SCRAPER_QUEUE),
+    )
+}
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionMiddleware, limiters=admission_limiters, retry_after=settings.ADMISSION_RETRY_AFTER)
+
+# Об'єднання однакових одночасних запитів на читання
+read_coalescer = SingleFlight(enabled=settings.COALESCING_ENABLED)
+
 # Монтування статичних файлів
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+static_files = PrecompressedStaticFiles(directory=settings.STATIC_DIR)
+app.mount("/static", static_files, name="static")
 
 @app.on_event("startup")
 async def startup_event():
     """Функція, що виконується при запуску додатку"""
     logger.info("Запуск додатку...")
-    await init_db()
+    with startup_profile.phase("init_db"):
+        await init_db()
     logger.info("База даних успішно ініціалізована")
+    
+    # Архів, індекси в пам'яті та знімки каталогу читають MongoDB
+    if settings.DATABASE_BACKEND == "mongodb":
+        start_background_tasks()
+    
+    startup_profile.ready()
+    logger.info(startup_profile.summary())
+
+def start_background_tasks():
+    """Запускає фонові завдання, що працюють з MongoDB"""
+    # Фонове перенесення застарілих оголошень в архів
+    if settings.ARCHIVE_ENABLED:
+        app.state.archiver = asyncio.create_task(run_archiver(
+            get_database, settings.ARCHIVE_INTERVAL, settings.ARCHIVE_AFTER_DAYS, settings.ARCHIVE_BATCH_SIZE
+        ))
+    
+    # Індекси в пам'яті підтягують зміни, зроблені іншими процесами
+    app.state.index_refresher = asyncio.create_task(run_refresher(get_database, settings.INDEX_REFRESH_INTERVAL))
+    
+    # Фоновий запис колонкових знімків каталогу
+    if settings.SNAPSHOT_ENABLED:
+        app.state.snapshots = asyncio.create_task(run_snapshots(get_database, settings.SNAPSHOT_INTERVAL))
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Функція, що виконується при зупинці додатку"""
     logger.info("Завершення роботи додатку...")
+    for name in ("archiver", "snapshots", "index_refresher", "scraper"):
+        task = getattr(app.state, name, None)
+        if task:
+            task.cancel()
     await close_db()
+    await get_thumbnail_service().close()
     logger.info("З'єднання з базою даних закрито")
 
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Базовий маршрут для відображення HTML сторінки"""
-    return FileResponse("app/static/index.html")
+    # Зібрана сторінка посилається на хешовані та стиснуті файли, без збірки віддається вихідна
+    build_index = os.path.join(settings.STATIC_BUILD_DIR, "index.html")
+    if os.path.exists(build_index):
+        index_path = os.path.relpath(build_index, settings.STATIC_DIR)
+    else:
+        index_path = "index.html"
+    return await static_files.get_response(index_path, request.scope)
 
 @app.get("/health")
 async def health_check():
     """Ендпоінт для перевірки стану додатку"""
     return {"status": "ok"}
 
+@app.get("/api/v1/metrics")
+async def get_metrics():
+    """Метрики сервера: стиснення відповідей, підписники на події, контроль допуску, об'єднання запитів, колонковий каталог"""
+    return {
+        "compression": compression_stats.as_dict(),
+        "events": get_event_broker().stats(),
+        "admission": {group: limiter.stats() for group, limiter in admission_limiters.items()},
+        "coalescing": read_coalescer.stats(),
+        "columnar": get_columnar_catalog().stats() if get_columnar_catalog.loaded else None,
+        "startup": startup_profile.as_dict(),
+    }
+
 # Допоміжна функція для конвертації документу MongoDB у JSON з ObjectId
 def convert_mongo_doc(doc):
     """Конвертує документ MongoDB у JSON-сумісний формат"""
+    decode_car(doc)
     if doc.get("_id"):
         doc["id"] = str(doc.pop("_id"))
     return doc
 
+# Допоміжна функція для побудови проєкції за списком полів
+def build_projection(fields: Optional[List[str]]) -> Optional[Dict[str, int]]:
+    """Проєкція MongoDB для параметра fields; None - повертати всі поля"""
+    names = [name.strip() for name in fields or [] if name.strip() and name.strip() not in ("id", "_id")]
+    if not names:
+        return None
+    return {name: 1 for name in names}
+
+# Допоміжна функція для розбору списку полів з рядка запиту
+def split_list_param(value: Optional[str]) -> List[str]:
+    """Розбирає параметр виду "a,b,c" у список"""
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+async def fetch_cars_by_ids(repository: CarRepository, ids: List[str], fields: Optional[List[str]] = None,
+                            include_archived: bool = False) -> Dict[str, Any]:
+    """
+    Отримує кілька автомобілів одним запитом $in
+    
+    Результати повертаються в порядку запиту; для відсутніх автомобілів
+    повертається позначка {"id": ..., "found": false}.
+    """
+    if not ids:
+        raise HTTPException(status_code=400, detail="Не вказано жодного ID")
+    if len(ids) > settings.BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"Забагато ID, максимум {settings.BATCH_MAX_IDS}")
+    
+    # Перевіряємо всі ID одразу, щоб повідомити про всі помилки в одній відповіді
+    invalid = [car_id for car_id in ids if not ObjectId.is_valid(car_id)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Невірний формат ID: {', '.join(invalid)}")
+    
+    unique_ids = list(dict.fromkeys(ids))
+    found = {}
+    for car in await repository.get_many(unique_ids, build_projection(fields)):
+        car = convert_mongo_doc(car)
+        found[car["id"]] = car
+    
+    # Відсутні в основній колекції шукаємо в архіві лише на вимогу
+    missing = [car_id for car_id in unique_ids if car_id not in found]
+    if include_archived and missing:
+        for car in await repository.get_many_archived(missing, build_projection(fields)):
+            car = convert_mongo_doc(car)
+            found[car["id"]] = car
+    
+    return {
+        "data": [found.get(car_id, {"id": car_id, "found": False}) for car_id in ids],
+        "found": sum(1 for car_id in unique_ids if car_id in found),
+        "missing": [car_id for car_id in unique_ids if car_id not in found],
+    }
+
+# Допоміжна функція для побудови фільтру автомобілів
+def build_cars_query(
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    min_year: Optional[int] = None,
+    max_year: Optional[int] = None,
+    make: Optional[str] = None,
+    region: Optional[str] = None,
+    near: Optional[str] = None,
+    radius_km: float = 50,
+    min_mileage: Optional[int] = None,
+    max_mileage: Optional[int] = None,
+    engine_type: Optional[str] = None,
+    transmission: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Будує фільтр MongoDB за параметрами запиту"""
+    query = {}
+    
+    # Фільтр за ціною
+    if min_price is not None or max_price is not None:
+        query["price"] = {}
+        if min_price is not None:
+            query["price"]["$gte"] = min_price
+        if max_price is not None:
+            query["price"]["$lte"] = max_price
+            
+    # Фільтр за роком
+    if min_year is not None or max_year is not None:
+        query["year"] = {}
+        if min_year is not None:
+            query["year"]["$gte"] = min_year
+        if max_year is not None:
+            query["year"]["$lte"] = max_year
+            
+    # Фільтр за пробігом
+    if min_mileage is not None or max_mileage is not None:
+        query["mileage"] = {}
+        if min_mileage is not None:
+            query["mileage"]["$gte"] = min_mileage
+        if max_mileage is not None:
+            query["mileage"]["$lte"] = max_mileage
+    
+    # Фільтри за типом пального та коробкою передач
+    if engine_type:
+        query["engine_type"] = value_filter("engine_type", engine_type)
+    if transmission:
+        query["transmission"] = value_filter("transmission", transmission)
+            
+    # Фільтр за маркою
+    if make:
+        query["make"] = {"$regex": make, "$options": "i"}
+    
+    # Фільтр за областю (код ISO 3166-2:UA або назва) - пошук за індексом region_code
+    if region:
+        region_code = find_region(region)
+        if region_code is None:
+            raise HTTPException(status_code=400, detail=f"Невідома область: {region}")
+        query["region_code"] = region_code
+    
+    # Пошук у радіусі від населеного пункту - за індексом 2dsphere
+    if near:
+        try:
+            query["geo"] = within_radius_query(near, radius_km)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    return query
+
+async def find_cars_page(repository: CarRepository, query: Dict[str, Any], sort_by: str, sort_order: int,
+                         skip: int, limit: int) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    Кількість автомобілів за фільтром і сторінка результатів
+    
+    Якщо ввімкнений колонковий каталог і він може виконати запит, фільтр, сортування
+    та підрахунок виконуються в пам'яті, а з бази читаються лише документи сторінки.
+    """
+    # Каталог завантажується з MongoDB; SQLite виконує фільтри за власними індексами
+    if settings.COLUMNAR_ENABLED and isinstance(repository, MongoCarRepository):
+        catalog = get_columnar_catalog()
+        catalog.start_loading(repository.db)
+        result = catalog.query(query, sort_by, sort_order, skip, limit)
+        if result is not None:
+            total, ids = result
+            docs = {str(car["_id"]): car for car in await repository.get_many(ids)}
+            missing = [car_id for car_id in ids if car_id not in docs]
+            if not missing:
+                return total, [convert_mongo_doc(docs[car_id]) for car_id in ids]
+            # Автомобілі видалені іншим процесом - каталог виправляється, запит виконує MongoDB
+            catalog.remove(missing)
+    
+    total, cars = await repository.find_page(query, sort_by, sort_order, skip, limit)
+    return total, [convert_mongo_doc(car) for car in cars]
+
 # API для роботи з автомобілями
 @app.get("/api/v1/cars")
 async def get_cars(
-    db = Depends(get_database), 
+    repository: CarRepository = Depends(get_repository),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
     sort_by: str = Query("created_at"),
@@ -80,6 +327,14 @@ async def get_cars(
     min_year: Optional[int] = None,
     max_year: Optional[int] = None,
     make: Optional[str] = None,
+    region: Optional[str] = None,
+    near: Optional[str] = Query(None, description="Населений пункт для пошуку в радіусі"),
+    radius_km: float = Query(50, gt=0, le=1000),
+    min_mileage: Optional[int] = None,
+    max_mileage: Optional[int] = None,
+    engine_type: Optional[FuelType] = None,
+    transmission: Optional[TransmissionType] = None,
+    include_archived: bool = Query(False, description="Включити архівовані (продані та зняті) оголошення"),
 ):
     """Отримати список всіх автомобілів з пагінацією та фільтрацією"""
     try:
@@ -88,48 +343,210 @@ async def get_cars(
             sort_order = -1  # Значення за замовчуванням
 
         # Створюємо фільтр на основі параметрів
-        query = {}
-        
-        # Фільтр за ціною
-        if min_price is not None or max_price is not None:
-            query["price"] = {}
-            if min_price is not None:
-                query["price"]["$gte"] = min_price
-            if max_price is not None:
-                query["price"]["$lte"] = max_price
-                
-        # Фільтр за роком
-        if min_year is not None or max_year is not None:
-            query["year"] = {}
-            if min_year is not None:
-                query["year"]["$gte"] = min_year
-            if max_year is not None:
-                query["year"]["$lte"] = max_year
-                
-        # Фільтр за маркою
-        if make:
-            query["make"] = {"$regex": make, "$options": "i"}
-        
-        # Рахуємо загальну кількість документів
-        total = await db.cars.count_documents(query)
-        
-        # Отримуємо документи з бази даних з пагінацією
-        cursor = db.cars.find(query).sort(sort_by, sort_order).skip((page - 1) * limit).limit(limit)
-        cars = [convert_mongo_doc(car) async for car in cursor]
+        query = build_cars_query(
+            min_price, max_price, min_year, max_year, make, region, near, radius_km,
+            min_mileage, max_mileage, engine_type and engine_type.value, transmission and transmission.value,
+        )
+        
+        async def fetch_cars():
+            if include_archived:
+                # Архів читається лише на вимогу, разом з основною колекцією одним запитом
+                total, docs = await repository.find_page_with_archive(query, sort_by, sort_order, (page - 1) * limit, limit)
+                cars = [convert_mongo_doc(car) for car in docs]
+            else:
+                total, cars = await find_cars_page(repository, query, sort_by, sort_order, (page - 1) * limit, limit)
+            
+            return {
+                "page": page,
+                "limit": limit,
+                "total": total,
+                "total_pages": (total // limit) + (1 if total % limit > 0 else 0),
+                "data": cars
+            }
+        
+        # Однакові одночасні запити отримують результат одного запиту до бази
+        key = make_key(
+            "cars", page=page, limit=limit, sort_by=sort_by, sort_order=sort_order,
+            min_price=min_price, max_price=max_price, min_year=min_year, max_year=max_year, make=make,
+            region=region, near=near, radius_km=radius_km if near else None, min_mileage=min_mileage,
+            max_mileage=max_mileage, engine_type=engine_type, transmission=transmission, include_archived=include_archived or None,
+        )
+        return await read_coalescer.do(key, fetch_cars)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Помилка при отриманні списку автомобілів: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/cars/stats")
+async def get_cars_stats(repository: CarRepository = Depends(get_repository)):
+    """Отримати статистику по автомобілях в базі даних"""
+    try:
+        return await read_coalescer.do("cars_stats", repository.stats)
+    except Exception as e:
+        logger.error(f"Помилка при отриманні статистики: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/dashboard")
+async def get_dashboard(
+    repository: CarRepository = Depends(get_repository),
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=100),
+    sort_by: str = Query("created_at"),
+    sort_order: int = Query(-1),
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    min_year: Optional[int] = None,
+    max_year: Optional[int] = None,
+    make: Optional[str] = None,
+    region: Optional[str] = None,
+    near: Optional[str] = Query(None, description="Населений пункт для пошуку в радіусі"),
+    radius_km: float = Query(50, gt=0, le=1000),
+    min_mileage: Optional[int] = None,
+    max_mileage: Optional[int] = None,
+    engine_type: Optional[FuelType] = None,
+    transmission: Optional[TransmissionType] = None,
+):
+    """
+    Отримати дані головної сторінки одним запитом
+    
+    Повертає сторінку автомобілів (як /api/v1/cars), загальну статистику (як /api/v1/cars/stats)
+    і кількість автомобілів за значеннями фільтрів. Незалежні запити до бази виконуються паралельно.
+    """
+    try:
+        if sort_order not in [1, -1]:
+            sort_order = -1
         
+        query = build_cars_query(
+            min_price, max_price, min_year, max_year, make, region, near, radius_km,
+            min_mileage, max_mileage, engine_type and engine_type.value, transmission and transmission.value,
+        )
+        
+        async def fetch_dashboard():
+            (total, cars), stats, facets = await asyncio.gather(
+                find_cars_page(repository, query, sort_by, sort_order, (page - 1) * limit, limit),
+                # Загальна статистика однакова для всіх фільтрів - об'єднуємо її окремо
+                read_coalescer.do("cars_stats", repository.stats),
+                repository.facets(query),
+            )
+            
+            return {
+                "cars": {
+                    "page": page,
+                    "limit": limit,
+                    "total": total,
+                    "total_pages": (total // limit) + (1 if total % limit > 0 else 0),
+                    "data": cars
+                },
+                "stats": stats,
+                "facets": facets
+            }
+        
+        key = make_key(
+            "dashboard", page=page, limit=limit, sort_by=sort_by, sort_order=sort_order,
+            min_price=min_price, max_price=max_price, min_year=min_year, max_year=max_year, make=make,
+            region=region, near=near, radius_km=radius_km if near else None, min_mileage=min_mileage,
+            max_mileage=max_mileage, engine_type=engine_type, transmission=transmission,
+        )
+        return await read_coalescer.do(key, fetch_dashboard)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Помилка при отриманні даних головної сторінки: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/events/cars")
+async def stream_car_events(
+    request: Request,
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    min_year: Optional[int] = None,
+    max_year: Optional[int] = None,
+    make: Optional[str] = None,
+):
+    """
+    Потік подій про нові автомобілі та зміни цін (Server-Sent Events)
+    
+    Події: car_created, price_changed. Фільтри такі ж, як у /api/v1/cars.
+    Події надходять від скрапера та API через брокер у пам'яті процесу, без запитів до бази.
+    """
+    subscription = get_event_broker().subscribe({
+        "make": make,
+        "min_price": min_price,
+        "max_price": max_price,
+        "min_year": min_year,
+        "max_year": max_year,
+    })
+    return StreamingResponse(
+        event_stream(subscription, request, settings.EVENTS_HEARTBEAT),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/v1/cars/batch")
+async def get_cars_batch(
+    ids: str = Query(..., description="ID автомобілів через кому"),
+    fields: Optional[str] = Query(None, description="Поля, які потрібно повернути, через кому"),
+    include_archived: bool = Query(False, description="Шукати відсутні автомобілі в архіві"),
+    repository: CarRepository = Depends(get_repository),
+):
+    """Отримати кілька автомобілів за ID одним запитом (для порівняння та обраного)"""
+    try:
+        return await fetch_cars_by_ids(repository, split_list_param(ids), split_list_param(fields) or None, include_archived)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Помилка при отриманні автомобілів за списком ID: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/v1/cars/batch")
+async def post_cars_batch(request: CarsBatchRequest,
+                          repository: CarRepository = Depends(get_repository)):
+    """Отримати кілька автомобілів за ID; варіант для довгих списків, що не вміщуються в URL"""
+    try:
+        return await fetch_cars_by_ids(repository, request.ids, request.fields, request.include_archived)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Помилка при отриманні автомобілів за списком ID: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/cars/search")
+async def search_cars(
+    q: str = Query(..., min_length=1, description="Слова для пошуку в марці, моделі та місцезнаходженні"),
+    page: int = Query(1, ge=1),
+    limit: int = Query(10, ge=1, le=100),
+    repository: CarRepository = Depends(get_repository),
+):
+    """
+    Пошук автомобілів за словами (наприклад, "bmw x5 київ")
+    
+    Кожне слово має знайтися в марці, моделі або місцезнаходженні. У SQLite пошук
+    виконується за повнотекстовим індексом FTS5 і сортується за релевантністю,
+    у MongoDB - від найновіших оголошень.
+    """
+    try:
+        total, docs = await repository.search(q, (page - 1) * limit, limit)
         return {
             "page": page,
             "limit": limit,
             "total": total,
             "total_pages": (total // limit) + (1 if total % limit > 0 else 0),
-            "data": cars
+            "data": [convert_mongo_doc(car) for car in docs]
         }
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Помилка при отриманні списку автомобілів: {e}")
+        logger.error(f"Помилка при пошуку автомобілів: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/v1/cars/{car_id}")
-async def get_car(car_id: str, db = Depends(get_database)):
+async def get_car(
+    car_id: str,
+    fields: Optional[str] = Query(None, description="Поля, які потрібно повернути, через кому"),
+    include_archived: bool = Query(False, description="Шукати автомобіль також в архіві"),
+    repository: CarRepository = Depends(get_repository),
+):
     """Отримати інформацію про конкретний автомобіль"""
     try:
         # Перевіряємо валідність ID
@@ -137,7 +554,10 @@ async def get_car(car_id: str, db = Depends(get_database)):
             raise HTTPException(status_code=400, detail="Невірний формат ID")
         
         # Знаходимо автомобіль
-        car = await db.cars.find_one({"_id": ObjectId(car_id)})
+        projection = build_projection(split_list_param(fields))
+        car = await repository.get(car_id, projection)
+        if not car and include_archived:
+            car = await repository.get_archived(car_id, projection)
         
         if not car:
             raise HTTPException(status_code=404, detail="Автомобіль не знайдено")
@@ -149,10 +569,197 @@ async def get_car(car_id: str, db = Depends(get_database)):
         logger.error(f"Помилка при отриманні автомобіля: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/v1/cars/{car_id}/history")
+async def get_car_price_history(car_id: str, repository: CarRepository = Depends(get_repository)):
+    """Отримати історію зміни ціни автомобіля"""
+    try:
+        # Перевіряємо валідність ID
+        if not ObjectId.is_valid(car_id):
+            raise HTTPException(status_code=400, detail="Невірний формат ID")
+        
+        car = await repository.get(car_id, {"price": 1})
+        if not car:
+            raise HTTPException(status_code=404, detail="Автомобіль не знайдено")
+        
+        points = await repository.price_history(car_id)
+        
+        return {
+            "car_id": car_id,
+            "current_price": car.get("price"),
+            "history": points
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Помилка при отриманні історії цін: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/cars/{car_id}/similar")
+async def get_similar_cars(
+    car_id: str,
+    limit: int = Query(10, ge=1, le=50),
+    same_make: bool = Query(False, description="Шукати лише серед автомобілів тієї ж марки"),
+    db = Depends(get_mongo_database),
+    repository: CarRepository = Depends(get_repository),
+):
+    """
+    Отримати схожі автомобілі
+    
+    Схожість визначається за ціною, роком, пробігом, об'ємом двигуна, типом пального
+    та коробкою передач. Пошук виконується в індексі в пам'яті, з бази читаються лише
+    знайдені автомобілі.
+    """
+    try:
+        # Перевіряємо валідність ID
+        if not ObjectId.is_valid(car_id):
+            raise HTTPException(status_code=400, detail="Невірний формат ID")
+        
+        index = get_similar_index()
+        await index.ensure_loaded(db)
+        neighbours = index.similar(car_id, limit, same_make)
+        if neighbours is None:
+            # Автомобіль міг з'явитися після останнього оновлення індексу
+            from app.analytics.similar import PROJECTION as SIMILAR_PROJECTION
+            car = await repository.get(car_id, SIMILAR_PROJECTION)
+            if not car:
+                raise HTTPException(status_code=404, detail="Автомобіль не знайдено")
+            index.upsert([car])
+            neighbours = index.similar(car_id, limit, same_make) or []
+        
+        ids = [neighbour_id for neighbour_id, _ in neighbours]
+        cars = {str(car["_id"]): car for car in await repository.get_many(ids)}
+        data = []
+        for neighbour_id, distance in neighbours:
+            if neighbour_id in cars:
+                data.append({**convert_mongo_doc(cars[neighbour_id]), "distance": round(distance, 4)})
+        # Автомобілі, видалені іншим процесом, прибираються з індексу
+        index.remove(neighbour_id for neighbour_id, _ in neighbours if neighbour_id not in cars)
+        
+        return {"car_id": car_id, "data": data}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Помилка при пошуку схожих автомобілів: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Допоміжна функція для оцінки ціни за моделями сегментів
+async def estimate_price(db, car: Dict[str, Any]) -> Dict[str, Any]:
+    """Оцінка ринкової ціни; 503, якщо моделі ще не розраховані"""
+    models = get_price_models()
+    await models.ensure_loaded(db)
+    estimate = models.estimate(car)
+    if estimate is None:
+        raise HTTPException(status_code=503, detail="Моделі оцінки ціни ще не розраховані")
+    return estimate
+
+@app.get("/api/v1/cars/{car_id}/price-estimate")
+async def get_car_price_estimate(car_id: str, db = Depends(get_mongo_database),
+                                 repository: CarRepository = Depends(get_repository)):
+    """
+    Оцінити, чи справедлива ціна автомобіля
+    
+    Ціна оцінюється за регресійною моделлю сегмента (модель, марка або весь ринок)
+    з урахуванням року, пробігу та об'єму двигуна.
+    """
+    try:
+        # Перевіряємо валідність ID
+        if not ObjectId.is_valid(car_id):
+            raise HTTPException(status_code=400, detail="Невірний формат ID")
+        
+        from app.analytics.pricing import PROJECTION as PRICE_PROJECTION
+        car = await repository.get(car_id, PRICE_PROJECTION)
+        if not car:
+            raise HTTPException(status_code=404, detail="Автомобіль не знайдено")
+        
+        return {"car_id": car_id, **await estimate_price(db, car)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Помилка при оцінці ціни автомобіля: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/v1/price-estimate")
+async def post_price_estimate(request: PriceEstimateRequest, db = Depends(get_mongo_database)):
+    """Оцінити ринкову ціну за характеристиками автомобіля (без збереження оголошення)"""
+    try:
+        return await estimate_price(db, request.dict())
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Помилка при оцінці ціни: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/price-trends")
+async def get_cars_price_trends(
+    repository: CarRepository = Depends(get_repository),
+    make: Optional[str] = None,
+    model: Optional[str] = None,
+    since: Optional[str] = Query(None, regex=r"^\d{4}-\d{2}$", description="Перший місяць у форматі РРРР-ММ"),
+):
+    """Отримати помісячний тренд цін (за маркою та моделлю)"""
+    try:
+        trends = await repository.price_trends(make=make, model=model, since_month=since)
+        return {"make": make, "model": model, "data": trends}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Помилка при отриманні трендів цін: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/images/{car_id}")
+async def get_car_image(
+    car_id: str,
+    request: Request,
+    size: str = Query("small", description=f"Розмір мініатюри: {', '.join(THUMBNAIL_SIZES)}"),
+    v: Optional[str] = Query(None, description="content_hash оголошення (версія мініатюри)"),
+    repository: CarRepository = Depends(get_repository)
+):
+    """
+    Отримати мініатюру зображення автомобіля
+    
+    Зображення завантажується з сайту-джерела один раз і далі віддається з локального кешу.
+    Відповідь кешується браузером назавжди лише тоді, коли v збігається з поточним content_hash
+    оголошення: при зміні оголошення (зокрема image_url) змінюється й URL мініатюри. Без v
+    браузер перевіряє мініатюру за ETag.
+    """
+    try:
+        if size not in THUMBNAIL_SIZES:
+            raise HTTPException(status_code=400, detail="Невідомий розмір мініатюри")
+        
+        # Перевіряємо валідність ID
+        if not ObjectId.is_valid(car_id):
+            raise HTTPException(status_code=400, detail="Невірний формат ID")
+        
+        car = await repository.get(car_id, {"image_url": 1, "content_hash": 1})
+        if not car:
+            raise HTTPException(status_code=404, detail="Автомобіль не знайдено")
+        if not car.get("image_url"):
+            raise HTTPException(status_code=404, detail="Автомобіль не має зображення")
+        
+        entry = await get_thumbnail_service().get(car["image_url"], size)
+        if not entry:
+            raise HTTPException(status_code=502, detail="Не вдалося отримати зображення")
+        
+        versioned = v is not None and v == car.get("content_hash")
+        headers = {
+            "Cache-Control": "public, max-age=31536000, immutable" if versioned else "public, no-cache",
+            "ETag": f'"{entry["digest"]}"',
+        }
+        if request.headers.get("if-none-match") == headers["ETag"]:
+            return Response(status_code=304, headers=headers)
+        
+        # Файл віддається з диска частинами, без завантаження в пам'ять
+        return FileResponse(entry["path"], media_type=entry["content_type"], headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Помилка при отриманні зображення автомобіля: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/v1/cars/make/{make}")
 async def get_cars_by_make(
     make: str, 
-    db = Depends(get_database),
+    repository: CarRepository = Depends(get_repository),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
     sort_by: str = Query("created_at"),
@@ -167,12 +774,9 @@ async def get_cars_by_make(
         # Створюємо регулярний вираз для пошуку нечутливого до регістру
         query = {"make": {"$regex": f"^{make}$", "$options": "i"}}
         
-        # Рахуємо загальну кількість документів
-        total = await db.cars.count_documents(query)
-        
-        # Отримуємо документи з бази даних з пагінацією
-        cursor = db.cars.find(query).sort(sort_by, sort_order).skip((page - 1) * limit).limit(limit)
-        cars = [convert_mongo_doc(car) async for car in cursor]
+        # Загальна кількість і сторінка результатів
+        total, docs = await repository.find_page(query, sort_by, sort_order, (page - 1) * limit, limit)
+        cars = [convert_mongo_doc(car) for car in docs]
         
         return {
             "page": page,
@@ -188,7 +792,7 @@ async def get_cars_by_make(
 @app.get("/api/v1/cars/year/{year}")
 async def get_cars_by_year(
     year: int, 
-    db = Depends(get_database),
+    repository: CarRepository = Depends(get_repository),
     page: int = Query(1, ge=1),
     limit: int = Query(10, ge=1, le=100),
     sort_by: str = Query("created_at"),
@@ -203,12 +807,9 @@ async def get_cars_by_year(
         # Створюємо запит
         query = {"year": year}
         
-        # Рахуємо загальну кількість документів
-        total = await db.cars.count_documents(query)
-        
-        # Отримуємо документи з бази даних з пагінацією
-        cursor = db.cars.find(query).sort(sort_by, sort_order).skip((page - 1) * limit).limit(limit)
-        cars = [convert_mongo_doc(car) async for car in cursor]
+        # Загальна кількість і сторінка результатів
+        total, docs = await repository.find_page(query, sort_by, sort_order, (page - 1) * limit, limit)
+        cars = [convert_mongo_doc(car) for car in docs]
         
         return {
             "page": page,
@@ -222,11 +823,12 @@ async def get_cars_by_year(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/v1/cars")
-async def create_car(car_data: dict, db = Depends(get_database)):
+async def create_car(car_data: dict, repository: CarRepository = Depends(get_repository)):
     """Додати новий автомобіль в базу даних"""
     try:
-        # Додаємо дату створення
-        car_data["created_at"] = datetime.utcnow()
+        # Додаємо дату створення; last_seen_at не дає архіватору прибрати оголошення, додане вручну
+        car_data["created_at"] = car_data["last_seen_at"] = datetime.utcnow()
+        car_data["content_hash"] = compute_content_hash(car_data)
         
         # Перевіряємо обов'язкові поля
         required_fields = ["make", "model", "year", "price", "mileage", "engine_type", "engine_volume", "transmission", "location", "image_url", "url"]
@@ -235,15 +837,24 @@ async def create_car(car_data: dict, db = Depends(get_database)):
                 raise HTTPException(status_code=400, detail=f"Відсутнє обов'язкове поле: {field}")
         
         # Перевіряємо, чи вже існує автомобіль з таким URL
-        existing_car = await db.cars.find_one({"url": car_data["url"]})
+        existing_car = await repository.find_by_url(car_data["url"])
         if existing_car:
             raise HTTPException(status_code=400, detail="Автомобіль з таким URL вже існує")
         
-        # Додаємо автомобіль
-        result = await db.cars.insert_one(car_data)
+        # Область і координати за офлайн-довідником
+        car_data.update(resolve_location(car_data["location"]))
+        
+        # Додаємо автомобіль (унікальність URL перевіряє і саме сховище)
+        try:
+            car_id = await repository.insert(car_data)
+        except DuplicateCarError:
+            raise HTTPException(status_code=400, detail="Автомобіль з таким URL вже існує")
+        await repository.record_price(car_id, car_data.get("price"), car_data)
         
         # Отримуємо доданий автомобіль
-        inserted_car = await db.cars.find_one({"_id": result.inserted_id})
+        inserted_car = await repository.get(car_id)
+        get_event_broker().publish(CAR_CREATED, car_payload(inserted_car))
+        notify_upserted([inserted_car])
         
         return convert_mongo_doc(inserted_car)
     except HTTPException:
@@ -253,7 +864,7 @@ async def create_car(car_data: dict, db = Depends(get_database)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.put("/api/v1/cars/{car_id}")
-async def update_car(car_id: str, car_data: dict, db = Depends(get_database)):
+async def update_car(car_id: str, car_data: dict, repository: CarRepository = Depends(get_repository)):
     """Оновити інформацію про автомобіль"""
     try:
         # Перевіряємо валідність ID
@@ -261,18 +872,29 @@ async def update_car(car_id: str, car_data: dict, db = Depends(get_database)):
             raise HTTPException(status_code=400, detail="Невірний формат ID")
         
         # Перевіряємо чи існує автомобіль
-        existing_car = await db.cars.find_one({"_id": ObjectId(car_id)})
+        existing_car = await repository.get(car_id)
         if not existing_car:
             raise HTTPException(status_code=404, detail="Автомобіль не знайдено")
         
-        # Додаємо дату оновлення
-        car_data["updated_at"] = datetime.utcnow()
+        # Додаємо дату оновлення (змінене оголошення вважається актуальним)
+        car_data["updated_at"] = car_data["last_seen_at"] = datetime.utcnow()
+        if "location" in car_data:
+            car_data.update(resolve_location(car_data["location"]))
+        # Хеш вмісту - також версія URL мініатюри
+        car_data["content_hash"] = compute_content_hash({**existing_car, **car_data})
         
         # Оновлюємо автомобіль
-        await db.cars.update_one({"_id": ObjectId(car_id)}, {"$set": car_data})
+        await repository.update(car_id, car_data)
+        
+        # Фіксуємо зміну ціни в історії
+        if "price" in car_data and car_data["price"] != existing_car.get("price"):
+            await repository.record_price(existing_car["_id"], car_data["price"], {**existing_car, **car_data})
         
         # Отримуємо оновлений автомобіль
-        updated_car = await db.cars.find_one({"_id": ObjectId(car_id)})
+        updated_car = await repository.get(car_id)
+        notify_upserted([updated_car])
+        if "price" in car_data and car_data["price"] != existing_car.get("price"):
+            get_event_broker().publish(PRICE_CHANGED, car_payload(updated_car, old_price=existing_car.get("price")))
         
         return convert_mongo_doc(updated_car)
     except HTTPException:
@@ -282,7 +904,7 @@ async def update_car(car_id: str, car_data: dict, db = Depends(get_database)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.delete("/api/v1/cars/{car_id}")
-async def delete_car(car_id: str, db = Depends(get_database)):
+async def delete_car(car_id: str, repository: CarRepository = Depends(get_repository)):
     """Видалити автомобіль"""
     try:
         # Перевіряємо валідність ID
@@ -290,12 +912,13 @@ async def delete_car(car_id: str, db = Depends(get_database)):
             raise HTTPException(status_code=400, detail="Невірний формат ID")
         
         # Перевіряємо чи існує автомобіль
-        existing_car = await db.cars.find_one({"_id": ObjectId(car_id)})
+        existing_car = await repository.get(car_id, {"_id": 1})
         if not existing_car:
             raise HTTPException(status_code=404, detail="Автомобіль не знайдено")
         
         # Видаляємо автомобіль
-        await db.cars.delete_one({"_id": ObjectId(car_id)})
+        await repository.delete(car_id)
+        notify_removed([car_id])
         
         return {"status": "success", "message": "Автомобіль успішно видалено"}
     except HTTPException:
@@ -305,77 +928,156 @@ async def delete_car(car_id: str, db = Depends(get_database)):
         raise HTTPException(status_code=500, detail=str(e))
 
 # Запуск скрапера як фонової задачі
-async def run_scraper_task(pages: int):
-    """Запускає скрапер як фонову задачу"""
+async def run_scraper_task(run_id: str):
+    """Запускає (або продовжує) скрапер як фонову задачу"""
     scraper = AutoRiaScraper()
-    await scraper.scrape_cars(pages)
+    try:
+        await scraper.resume(run_id)
+    except Exception as e:
+        logger.error(f"Помилка при виконанні запуску скрапера {run_id}: {e}")
+
+async def run_scraper_once(pages: int, incremental: bool):
+    """Запускає скрапер без контрольних точок (вони зберігаються лише в MongoDB)"""
+    try:
+        await AutoRiaScraper().scrape_cars(pages, incremental)
+    except Exception as e:
+        logger.error(f"Помилка при виконанні запуску скрапера: {e}")
+
+def scraper_running() -> bool:
+    """Чи виконується зараз запуск скрапера в цьому процесі"""
+    task = getattr(app.state, "scraper", None)
+    return task is not None and not task.done()
+
+def start_scraper(coro):
+    """
+    Запускає скрапер як фонову задачу процесу
+    
+    Задача не прив'язана до запиту (на відміну від BackgroundTasks, які виконуються
+    всередині обробки запиту), тож місце в групі допуску scraper звільняється одразу
+    після відповіді, а не після завершення скрапінгу.
+    """
+    app.state.scraper = asyncio.create_task(coro)
+
+def ensure_scraper_idle():
+    """Відхиляє новий запуск, поки попередній ще виконується"""
+    if scraper_running():
+        raise HTTPException(status_code=409, detail="Скрапер вже запущено, дочекайтесь завершення поточного запуску")
 
 @app.post("/api/v1/scraper/run")
-async def run_scraper(background_tasks: BackgroundTasks, pages: int = Query(1, ge=1, le=10)):
+async def run_scraper(
+    db = Depends(get_database),
+    pages: int = Query(1, ge=1, le=settings.SCRAPER_MAX_PAGES),
+    incremental: bool = Query(False),
+):
     """Запускає скрапер у фоновому режимі для збору даних з auto.ria.com"""
     try:
-        # Додаємо задачу скрапінгу у фоновий режим
-        background_tasks.add_task(run_scraper_task, pages)
+        ensure_scraper_idle()
+        if settings.DATABASE_BACKEND == "sqlite":
+            start_scraper(run_scraper_once(pages, incremental))
+            return {
+                "status": "success",
+                "run_id": None,
+                "message": f"Скрапер запущено для обробки {pages} сторінок. Результати будуть доступні через API."
+            }
+        
+        # Створюємо запис запуску, щоб його можна було продовжити після перезапуску
+        checkpoint = await ScrapeCheckpoint.create(db, pages, incremental)
+        
+        # Запускаємо скрапінг у фоновому режимі
+        start_scraper(run_scraper_task(checkpoint.run_id))
         
         return {
             "status": "success",
+            "run_id": checkpoint.run_id,
             "message": f"Скрапер запущено для обробки {pages} сторінок. Результати будуть доступні через API."
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Помилка при запуску скрапера: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/v1/cars/stats")
-async def get_cars_stats(db = Depends(get_database)):
-    """Отримати статистику по автомобілях в базі даних"""
+@app.post("/api/v1/scraper/runs/{run_id}/resume")
+async def resume_scraper_run(run_id: str, db = Depends(get_mongo_database)):
+    """Продовжує перерваний запуск скрапера з останньої контрольної точки"""
     try:
-        # Отримуємо загальну кількість автомобілів
-        total_cars = await db.cars.count_documents({})
-        
-        # Агрегація для отримання середньої ціни
-        avg_price_pipeline = [
-            {"$match": {"price": {"$gt": 0}}},  # Фільтруємо лише автомобілі з ціною
-            {"$group": {"_id": None, "avg_price": {"$avg": "$price"}}}
-        ]
-        avg_price_result = await db.cars.aggregate(avg_price_pipeline).to_list(1)
-        avg_price = int(avg_price_result[0]["avg_price"]) if avg_price_result else 0
-        
-        # Агрегація для отримання середнього року
-        avg_year_pipeline = [
-            {"$match": {"year": {"$gt": 1900}}},  # Фільтруємо валідні роки
-            {"$group": {"_id": None, "avg_year": {"$avg": "$year"}}}
-        ]
-        avg_year_result = await db.cars.aggregate(avg_year_pipeline).to_list(1)
-        avg_year = int(avg_year_result[0]["avg_year"]) if avg_year_result else 0
-        
-        # Агрегація для отримання середнього пробігу
-        avg_mileage_pipeline = [
-            {"$match": {"mileage": {"$gt": 0}}},  # Фільтруємо валідний пробіг
-            {"$group": {"_id": None, "avg_mileage": {"$avg": "$mileage"}}}
-        ]
-        avg_mileage_result = await db.cars.aggregate(avg_mileage_pipeline).to_list(1)
-        avg_mileage = int(avg_mileage_result[0]["avg_mileage"]) if avg_mileage_result else 0
-        
-        # Агрегація для отримання популярних марок
-        popular_makes_pipeline = [
-            {"$group": {"_id": "$make", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}},
-            {"$limit": 5}
-        ]
-        popular_makes = await db.cars.aggregate(popular_makes_pipeline).to_list(5)
-        popular_makes = [{"make": item["_id"], "count": item["count"]} for item in popular_makes]
+        ensure_scraper_idle()
+        checkpoint = await ScrapeCheckpoint.load(db, run_id)
+        if not checkpoint:
+            raise HTTPException(status_code=404, detail="Запуск скрапера не знайдено")
+        if checkpoint.status == ScrapeCheckpoint.COMPLETED:
+            raise HTTPException(status_code=400, detail="Запуск скрапера вже завершено")
+        
+        start_scraper(run_scraper_task(run_id))
         
         return {
-            "total_cars": total_cars,
-            "avg_price": avg_price,
-            "avg_year": avg_year,
-            "avg_mileage": avg_mileage,
-            "popular_makes": popular_makes
+            "status": "success",
+            "run_id": run_id,
+            "message": f"Запуск продовжено зі сторінки {checkpoint.last_page + 1} з {checkpoint.pages}."
         }
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Помилка при отриманні статистики: {e}")
+        logger.error(f"Помилка при продовженні запуску скрапера: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/scraper/runs")
+async def list_scraper_runs(
+    limit: int = Query(20, ge=1, le=100, description="Кількість останніх запусків"),
+    db = Depends(get_mongo_database)
+):
+    """Отримати останні запуски скрапера з підсумками метрик"""
+    try:
+        projection = {
+            "pending": 0,
+            # Гістограми доступні через окремий ендпоінт метрик запуску
+            "metrics.fetch_latency.buckets": 0,
+            "metrics.parse_time.buckets": 0,
+            "metrics.detail_parse_time.buckets": 0,
+            "metrics.db_write_latency.buckets": 0,
+        }
+        runs = await db.scrape_runs.find({}, projection).sort("created_at", -1).limit(limit).to_list(limit)
+        for run in runs:
+            run["run_id"] = run.pop("_id")
+        return runs
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Помилка при отриманні запусків скрапера: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/scraper/runs/{run_id}/metrics")
+async def get_scraper_run_metrics(run_id: str, db = Depends(get_mongo_database)):
+    """Отримати метрики запуску скрапера: затримки, обсяг даних, швидкість етапів"""
+    try:
+        run = await db.scrape_runs.find_one({"_id": run_id}, {"status": 1, "metrics": 1})
+        if not run:
+            raise HTTPException(status_code=404, detail="Запуск скрапера не знайдено")
+        
+        return {"run_id": run_id, "status": run.get("status"), "metrics": run.get("metrics", {})}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Помилка при отриманні метрик запуску скрапера: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/v1/scraper/runs/{run_id}")
+async def get_scraper_run(run_id: str, db = Depends(get_mongo_database)):
+    """Отримати стан запуску скрапера"""
+    try:
+        run = await db.scrape_runs.find_one({"_id": run_id}, {"pending": 0})
+        if not run:
+            raise HTTPException(status_code=404, detail="Запуск скрапера не знайдено")
+        
+        run["run_id"] = run.pop("_id")
+        return run
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Помилка при отриманні стану запуску скрапера: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 # Запуск сервера для локальної розробки
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,156 @@
+import asyncio
+import collections
+from typing import Any, Callable, Deque, Dict, Optional
+
+from loguru import logger
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Групи маршрутів
+READ = "read"
+SEARCH = "search"
+WRITE = "write"
+SCRAPER = "scraper"
+
+# Дешеві службові маршрути та довготривалі потоки подій не обмежуються
+UNLIMITED_PATHS = ("/health", "/api/v1/metrics", "/api/v1/events/", "/static/", "/docs", "/redoc", "/openapi.json")
+BATCH_PATH = "/api/v1/cars/batch"
+PRICE_ESTIMATE_PATH = "/api/v1/price-estimate"
+SEARCH_PATHS = ("/api/v1/cars/make/", "/api/v1/cars/year/", "/api/v1/cars/search", "/api/v1/dashboard", "/api/v1/price-trends")
+
+
+def classify_request(scope: Scope) -> Optional[str]:
+    """Визначає групу маршруту; None - запит не обмежується"""
+    path = scope["path"]
+    method = scope["method"]
+    if method == "OPTIONS" or path == "/" or path.startswith(UNLIMITED_PATHS):
+        return None
+    if path.startswith("/api/v1/scraper/") and method == "POST":
+        return SCRAPER
+    if path in (BATCH_PATH, PRICE_ESTIMATE_PATH):
+        # POST-варіанти пакетного отримання та оцінки ціни лише читають дані
+        return READ
+    if method not in ("GET", "HEAD"):
+        return WRITE
+    if path == "/api/v1/cars" or path.startswith(SEARCH_PATHS):
+        return SEARCH
+    return READ
+
+
+class ConcurrencyLimiter:
+    """
+    Обмеження кількості одночасних запитів з обмеженою чергою очікування
+
+    Якщо всі місця зайняті, запит чекає в черзі FIFO не довше за queue_timeout.
+    Якщо черга заповнена або час очікування вичерпано, запит відхиляється одразу,
+    не створюючи навантаження на базу даних.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, queue_timeout: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+
+    async def acquire(self) -> bool:
+        """Займає місце. Повертає False, якщо запит слід відхилити"""
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            self.admitted += 1
+            return True
+
+        if len(self._waiters) >= self.queue_size:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._remove_waiter(waiter)
+            self.timed_out += 1
+            self.rejected += 1
+            return False
+        except asyncio.CancelledError:
+            # Клієнт відключився; якщо місце вже передане - повертаємо його
+            self._remove_waiter(waiter)
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        self.admitted += 1
+        return True
+
+    def _remove_waiter(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self):
+        """Звільняє місце, передаючи його першому запиту в черзі"""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "queue_size": self.queue_size,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+class AdmissionMiddleware:
+    """
+    Контроль допуску запитів за групами маршрутів
+
+    Кожна група (читання, пошук, запис, запуск скрапера) має власний ліміт
+    одночасних запитів і чергу, тож сплеск запитів однієї групи не вичерпує
+    пул з'єднань з базою для інших. Надлишкові запити швидко отримують
+    503 з заголовком Retry-After.
+    """
+
+    def __init__(self, app: ASGIApp, limiters: Dict[str, ConcurrencyLimiter], retry_after: int = 2,
+                 classify: Callable[[Scope], Optional[str]] = classify_request):
+        self.app = app
+        self.limiters = limiters
+        self.retry_after = retry_after
+        self.classify = classify
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters.get(self.classify(scope))
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not await limiter.acquire():
+            logger.warning(f"Запит {scope['method']} {scope['path']} відхилено: перевантаження групи {limiter.name}")
+            response = JSONResponse(
+                {"detail": "Сервер перевантажений, спробуйте пізніше"},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
@@ -0,0 +1,222 @@
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.assets.staticfiles import accepted_encodings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli є необов'язковою залежністю
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard є необов'язковою залежністю
+    zstandard = None
+
+# Типи вмісту, які має сенс стискати
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/", "application/javascript", "application/xml", "image/svg+xml")
+# Потоки подій мають доходити до клієнта одразу, без буферизації компресором
+SKIPPED_TYPES = ("text/event-stream",)
+
+
+class _Compressor:
+    """Потоковий компресор з єдиним інтерфейсом для zstd, brotli та gzip"""
+
+    def __init__(self, encoding: str, levels: Dict[str, int]):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=levels["zstd"]).compressobj()
+        elif encoding == "br":
+            self._obj = brotli.Compressor(quality=levels["br"])
+        else:
+            # wbits=31 - формат gzip (заголовок і контрольна сума)
+            self._obj = zlib.compressobj(levels["gzip"], zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        """Стискає частину даних; flush=True віддає все накопичене (для потокових відповідей)"""
+        if self.encoding == "zstd":
+            output = self._obj.compress(data)
+            if flush:
+                output += self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        elif self.encoding == "br":
+            output = self._obj.process(data)
+            if flush:
+                output += self._obj.flush()
+        else:
+            output = self._obj.compress(data)
+            if flush:
+                output += self._obj.flush(zlib.Z_SYNC_FLUSH)
+        return output
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._obj.finish()
+        return self._obj.flush()
+
+
+class CompressionStats:
+    """Статистика стиснення відповідей: обсяг до і після, витрачений час"""
+
+    def __init__(self):
+        self.responses: Dict[str, int] = {}
+        self.bytes_in: Dict[str, int] = {}
+        self.bytes_out: Dict[str, int] = {}
+        self.seconds: Dict[str, float] = {}
+        self.skipped = 0
+
+    def record(self, encoding: str, bytes_in: int, bytes_out: int, seconds: float):
+        self.responses[encoding] = self.responses.get(encoding, 0) + 1
+        self.bytes_in[encoding] = self.bytes_in.get(encoding, 0) + bytes_in
+        self.bytes_out[encoding] = self.bytes_out.get(encoding, 0) + bytes_out
+        self.seconds[encoding] = self.seconds.get(encoding, 0.0) + seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        encodings = {}
+        for encoding, count in self.responses.items():
+            bytes_in = self.bytes_in.get(encoding, 0)
+            bytes_out = self.bytes_out.get(encoding, 0)
+            seconds = self.seconds.get(encoding, 0.0)
+            encodings[encoding] = {
+                "responses": count,
+                "bytes_in": bytes_in,
+                "bytes_out": bytes_out,
+                "ratio": round(bytes_in / bytes_out, 2) if bytes_out else None,
+                "cpu_seconds": round(seconds, 4),
+                "cpu_ms_per_mb": round(seconds * 1000 / (bytes_in / 1024 / 1024), 2) if bytes_in else None,
+            }
+        return {"encodings": encodings, "skipped": self.skipped}
+
+
+class CompressionMiddleware:
+    """
+    Стиснення динамічних відповідей з узгодженням кодування
+
+    Кодування вибирається за Accept-Encoding у порядку переваги zstd, br, gzip
+    (zstd і br - якщо встановлені відповідні модулі). Відповіді, менші за
+    minimum_size, вже стиснуті (Content-Encoding), без тіла (304, 204, HEAD) та
+    нестисновані типи вмісту пропускаються без змін. Потокові відповіді
+    стискаються частинами, кожна частина одразу передається клієнту.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, levels: Optional[Dict[str, int]] = None,
+                 stats: Optional[CompressionStats] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {"zstd": 3, "br": 4, "gzip": 5, **(levels or {})}
+        self.stats = stats or CompressionStats()
+        self.encodings: List[str] = []
+        if zstandard is not None:
+            self.encodings.append("zstd")
+        if brotli is not None:
+            self.encodings.append("br")
+        self.encodings.append("gzip")
+
+    def choose_encoding(self, accept_encoding: str) -> Optional[str]:
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in self.encodings:
+            if encoding in accepted:
+                return encoding
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self.choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Перехоплює повідомлення відповіді та стискає її тіло"""
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start_message: Optional[Message] = None
+        # None - рішення ще не прийнято, False - відповідь передається без змін
+        self.compressor: Optional[Any] = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def _should_compress(self, headers: Headers) -> bool:
+        status = self.start_message["status"]
+        if status < 200 or status in (204, 304):
+            return False
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        if content_type.startswith(SKIPPED_TYPES):
+            return False
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _compress(self, data: bytes, flush: bool = False, finish: bool = False) -> bytes:
+        started = time.perf_counter()
+        output = self.compressor.compress(data, flush=flush) if data else b""
+        if finish:
+            output += self.compressor.finish()
+        self.seconds += time.perf_counter() - started
+        self.bytes_in += len(data)
+        self.bytes_out += len(output)
+        return output
+
+    def _record(self):
+        self.middleware.stats.record(self.encoding, self.bytes_in, self.bytes_out, self.seconds)
+
+    async def send(self, message: Message):
+        if message["type"] == "http.response.start":
+            # Заголовки відправляються разом з першою частиною тіла, коли відомий її розмір
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.start_message is None:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            headers = Headers(raw=self.start_message["headers"])
+            too_small = not more_body and len(body) < self.middleware.minimum_size
+            if too_small or not self._should_compress(headers):
+                self.compressor = False
+                self.middleware.stats.skipped += 1
+                await self._send(self.start_message)
+                await self._send(message)
+                return
+
+            self.compressor = _Compressor(self.encoding, self.middleware.levels)
+            mutable_headers = MutableHeaders(raw=self.start_message["headers"])
+            mutable_headers["Content-Encoding"] = self.encoding
+            mutable_headers.add_vary_header("Accept-Encoding")
+            if not more_body:
+                body = self._compress(body, finish=True)
+                mutable_headers["Content-Length"] = str(len(body))
+                self._record()
+                await self._send(self.start_message)
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            # Розмір потокової відповіді після стиснення невідомий
+            del mutable_headers["Content-Length"]
+            await self._send(self.start_message)
+        elif not self.compressor:
+            await self._send(message)
+            return
+
+        if more_body:
+            await self._send({"type": "http.response.body", "body": self._compress(body, flush=True), "more_body": True})
+        else:
+            await self._send({"type": "http.response.body", "body": self._compress(body, finish=True)})
+            self._record()
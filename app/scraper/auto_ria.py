@@ -3,20 +3,66 @@ import asyncio
 from bs4 import BeautifulSoup
 from loguru import logger
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, List, Any, Optional
 import re
+import functools
+import codecs
+import time
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from app.db.database import get_database
+from app.analytics.pricing import get_price_models
+from app.db.changes import notify_upserted
+from app.db.repository import CarRepository, DuplicateCarError, repository_for
+from app.events.broker import CAR_CREATED, PRICE_CHANGED, car_payload, get_event_broker
+from app.geo.gazetteer import resolve_location
+from app.images.thumbnails import get_thumbnail_service
+from app.config import settings
+from app.scraper.cache import PageCache
+from app.scraper.utils import compute_content_hash, parse_transmission, clean_text
+from app.scraper.stream_parser import CarBlockParser
+from app.scraper.pipeline import STAGE_DONE, StageStats, run_stage, log_stage_stats
+from app.scraper.checkpoint import ScrapeCheckpoint, PageProgress
+from app.scraper.metrics import ScrapeMetrics
+from app.scraper.resilience import CircuitBreaker, RETRYABLE_STATUSES, backoff_delay, parse_retry_after
+from urllib.parse import urlsplit
+
+
+class PageFetchError(Exception):
+    """Сторінку пошуку не вдалося отримати після всіх спроб"""
+
 
 class AutoRiaScraper:
     """
     Скрапер для збору даних про автомобілі з сайту auto.ria.com
     """
     
-    def __init__(self):
+    def __init__(self, cache: Optional[PageCache] = None):
         self.base_url = "https://auto.ria.com/uk/legkovie/"
         self.session = None
         self.db = None
+        
+        # Кеш сторінок (None - кешування вимкнено)
+        if cache is None and settings.SCRAPER_CACHE_ENABLED:
+            cache = PageCache(
+                settings.SCRAPER_CACHE_DIR,
+                max_age=settings.SCRAPER_CACHE_MAX_AGE,
+                max_bytes=settings.SCRAPER_CACHE_MAX_BYTES,
+                replay=settings.SCRAPER_CACHE_REPLAY,
+            )
+        self.cache = cache
+        # URL сторінок, вміст яких не змінився з попереднього завантаження
+        self._not_modified = set()
+        # Статистика етапів конвеєра останнього запуску
+        self.stage_stats: Dict[str, StageStats] = {}
+        # Метрики останнього запуску
+        self.metrics = ScrapeMetrics()
+        # Запобіжники для кожного хоста
+        self._breakers: Dict[str, CircuitBreaker] = {}
+    
+    async def _run_sync(self, func, *args):
+        """Виконує блокуючу функцію (дискові операції кешу) у пулі потоків"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args))
     
     async def _get_db(self):
         """Отримує з'єднання з базою даних"""
@@ -24,10 +70,33 @@ class AutoRiaScraper:
             self.db = await get_database()
         return self.db
     
+    async def _get_repository(self) -> CarRepository:
+        """Отримує сховище автомобілів (MongoDB - через з'єднання _get_db)"""
+        return repository_for(await self._get_db())
+    
+    async def _refresh_analytics(self):
+        """Перераховує моделі ціни на оновленому каталозі"""
+        if settings.DATABASE_BACKEND != "mongodb":
+            # Моделі ціни зберігаються в MongoDB
+            return
+        try:
+            await get_price_models().fit(await self._get_db())
+        except Exception as e:
+            logger.error(f"Помилка при перерахунку моделей ціни: {e}")
+    
     async def _init_session(self):
-        """Ініціалізує асинхронну сесію"""
+        """Ініціалізує асинхронну сесію з пулом з'єднань"""
         if self.session is None:
+            connector = aiohttp.TCPConnector(
+                limit=settings.SCRAPER_CONNECTION_LIMIT,
+                limit_per_host=settings.SCRAPER_CONNECTION_LIMIT_PER_HOST,
+                keepalive_timeout=settings.SCRAPER_KEEPALIVE_TIMEOUT,
+                use_dns_cache=True,
+                ttl_dns_cache=settings.SCRAPER_DNS_CACHE_TTL,
+            )
             self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=settings.SCRAPER_REQUEST_TIMEOUT),
                 headers={
                     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
                 }
@@ -40,19 +109,103 @@ class AutoRiaScraper:
             await self.session.close()
             self.session = None
     
+    def _get_breaker(self, url: str) -> CircuitBreaker:
+        """Повертає запобіжник для хоста URL"""
+        host = urlsplit(url).netloc
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker(
+                host,
+                window=settings.SCRAPER_BREAKER_WINDOW,
+                min_requests=settings.SCRAPER_BREAKER_MIN_REQUESTS,
+                error_threshold=settings.SCRAPER_BREAKER_ERROR_THRESHOLD,
+                cooldown=settings.SCRAPER_BREAKER_COOLDOWN,
+            )
+        return self._breakers[host]
+    
     async def _fetch_page(self, url: str) -> Optional[str]:
-        """Отримує HTML-контент сторінки"""
+        """
+        Отримує HTML-контент сторінки
+        
+        Якщо увімкнено кеш, свіжі сторінки віддаються без звернення до мережі,
+        а застарілі перевіряються умовним запитом (If-None-Match / If-Modified-Since).
+        Тимчасові помилки (5xx, 429, обрив з'єднання) повторюються з експоненційною
+        затримкою, а запобіжник хоста призупиняє обхід при сплеску помилок.
+        """
+        self._not_modified.discard(url)
+        entry = None
+        
+        if self.cache:
+            entry = await self._run_sync(self.cache.get, url)
+            if entry and (self.cache.replay or self.cache.is_fresh(entry)):
+                self.metrics.cache_hits += 1
+                self._not_modified.add(url)
+                return entry["body"]
+            if self.cache.replay:
+                logger.warning(f"Сторінки {url} немає в кеші (режим відтворення)")
+                return None
+        
         session = await self._init_session()
-        try:
-            async with session.get(url, timeout=30) as response:
-                if response.status == 200:
-                    return await response.text()
-                else:
-                    logger.error(f"Помилка запиту до {url}: {response.status}")
-                    return None
-        except Exception as e:
-            logger.error(f"Помилка при отриманні сторінки {url}: {e}")
-            return None
+        breaker = self._get_breaker(url)
+        headers = self.cache.conditional_headers(entry) if self.cache else {}
+        attempts = settings.SCRAPER_MAX_RETRIES + 1
+        
+        for attempt in range(attempts):
+            await breaker.wait_if_open()
+            retry_after = None
+            self.metrics.requests += 1
+            if attempt:
+                self.metrics.retries += 1
+            started = time.perf_counter()
+            try:
+                async with session.get(url, headers=headers) as response:
+                    if response.status == 304 and entry:
+                        # Сторінка не змінилась - використовуємо кешовану копію
+                        self.metrics.fetch_latency.observe(time.perf_counter() - started)
+                        self.metrics.not_modified += 1
+                        breaker.record_success()
+                        await self._run_sync(self.cache.touch, url)
+                        self._not_modified.add(url)
+                        return entry["body"]
+                    elif response.status == 200:
+                        body = await response.read()
+                        # Декодуємо вже прочитані байти, а не читаємо відповідь удруге
+                        html = body.decode(response.get_encoding())
+                        self.metrics.fetch_latency.observe(time.perf_counter() - started)
+                        self.metrics.bytes_downloaded += len(body)
+                        breaker.record_success()
+                        if self.cache:
+                            changed = await self._run_sync(
+                                self.cache.store, url, html,
+                                response.headers.get("ETag"), response.headers.get("Last-Modified")
+                            )
+                            if not changed:
+                                self._not_modified.add(url)
+                        return html
+                    elif response.status in RETRYABLE_STATUSES:
+                        self.metrics.errors += 1
+                        breaker.record_failure()
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                        logger.warning(f"Тимчасова помилка запиту до {url}: {response.status} (спроба {attempt + 1}/{attempts})")
+                    else:
+                        self.metrics.errors += 1
+                        logger.error(f"Помилка запиту до {url}: {response.status}")
+                        return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.metrics.errors += 1
+                breaker.record_failure()
+                logger.warning(f"Помилка з'єднання з {url}: {e!r} (спроба {attempt + 1}/{attempts})")
+            except Exception as e:
+                self.metrics.errors += 1
+                logger.error(f"Помилка при отриманні сторінки {url}: {e}")
+                return None
+            
+            if attempt + 1 < attempts:
+                await asyncio.sleep(backoff_delay(
+                    attempt, settings.SCRAPER_RETRY_BASE_DELAY, settings.SCRAPER_RETRY_MAX_DELAY, retry_after
+                ))
+        
+        logger.error(f"Не вдалося отримати сторінку {url} після {attempts} спроб")
+        return None
     
     async def _get_car_links(self, page_num: int) -> List[Dict[str, Any]]:
         """
@@ -64,8 +217,17 @@ class AutoRiaScraper:
         html = await self._fetch_page(url)
         
         if not html:
-            return []
+            # Порожній список не відрізнити від порожньої видачі - сторінку не можна вважати обробленою
+            raise PageFetchError(f"Не вдалося отримати сторінку {url}")
+        
+        # Якщо сторінка не змінилась, повертаємо результат попереднього розбору
+        if self.cache and url in self._not_modified:
+            cached_items = await self._run_sync(self.cache.get_parsed, url)
+            if cached_items is not None:
+                logger.info(f"Сторінка {page_num} не змінилась, використано кешовані дані ({len(cached_items)} автомобілів)")
+                return cached_items
         
+        started = time.perf_counter()
         soup = BeautifulSoup(html, 'html.parser')
         car_items = []
         
@@ -74,179 +236,606 @@ class AutoRiaScraper:
         
         for car_block in car_blocks:
             try:
-                # Отримуємо URL оголошення
-                link_elem = car_block.select_one('a.m-link-ticket')
-                car_url = link_elem.get('href') if link_elem else None
-                
-                if not car_url:
+                car_data = self._parse_car_block(car_block)
+                if not car_data:
                     continue
                 
-                # Отримуємо URL зображення
-                photo_elem = car_block.select_one('div.ticket-photo img')
-                image_url = photo_elem.get('src') if photo_elem else None
-                
-                if not image_url and photo_elem:
-                    # Перевіряємо альтернативні атрибути для зображення
-                    image_url = photo_elem.get('data-src') or photo_elem.get('data-srcset')
-                
-                # Отримуємо заголовок (марка, модель)
-                title_elem = car_block.select_one('div.head-ticket span.blue.bold')
-                title_text = title_elem.text.strip() if title_elem else ""
-                
-                # Розділяємо заголовок на марку і модель
-                parts = title_text.split(' ', 1)
-                make = parts[0] if parts else ""
-                model = parts[1] if len(parts) > 1 else ""
-                
-                # Отримуємо рік
-                year_elem = car_block.select_one('div.head-ticket')
-                year_text = year_elem.text if year_elem else ""
-                year_match = re.search(r'\b(19|20)\d{2}\b', year_text)
-                year = int(year_match.group(0)) if year_match else 0
-                
-                # Отримуємо ціну
-                price_elem = car_block.select_one('div.price-ticket')
-                price = 0
-                if price_elem:
-                    price_attr = price_elem.get('data-main-price')
-                    if price_attr:
-                        price = int(price_attr)
-                    else:
-                        price_text = price_elem.text.strip()
-                        price_digits = ''.join(filter(str.isdigit, price_text))
-                        price = int(price_digits) if price_digits else 0
-                
-                # Отримуємо інформацію про двигун
-                engine_elem = car_block.select_one('div.definition-data')
-                engine_text = engine_elem.text.strip() if engine_elem else ""
-                
-                # Шукаємо об'єм двигуна
-                engine_volume_match = re.search(r'(\d+(?:\.\d+)?)\s*(?:л|AT|MT)', engine_text)
-                engine_volume = float(engine_volume_match.group(1)) if engine_volume_match else 0.0
-                
-                # Визначаємо тип двигуна
-                engine_type = "бензин"  # За замовчуванням
-                if "дизель" in engine_text.lower():
-                    engine_type = "дизель"
-                elif "газ" in engine_text.lower():
-                    engine_type = "газ"
-                elif "електро" in engine_text.lower():
-                    engine_type = "електро"
-                elif "гібрид" in engine_text.lower():
-                    engine_type = "гібрид"
-                
-                # Визначаємо тип трансмісії
-                transmission = "механіка"  # За замовчуванням
-                if "автомат" in engine_text.lower():
-                    transmission = "автомат"
-                elif "AT" in engine_text:
-                    transmission = "автомат"
-                elif "MT" in engine_text:
-                    transmission = "механіка"
-                
-                # Отримуємо пробіг
-                mileage_match = re.search(r'(\d+)\s*тис\.?\s*км', engine_text)
-                mileage = int(mileage_match.group(1)) * 1000 if mileage_match else 0
-                
-                # Отримуємо розташування
-                location_elem = car_block.select_one('div.region')
-                location = location_elem.text.strip() if location_elem else "Невідоме місцезнаходження"
-                
-                # Формуємо дані про автомобіль
-                car_data = {
-                    "make": make,
-                    "model": model,
-                    "year": year,
-                    "price": price,
-                    "mileage": mileage,
-                    "engine_type": engine_type,
-                    "engine_volume": engine_volume,
-                    "transmission": transmission,
-                    "location": location,
-                    "image_url": image_url,
-                    "url": car_url
-                }
-                
                 car_items.append(car_data)
-                logger.info(f"Знайдено автомобіль: {make} {model} {year}")
+                logger.info(f"Знайдено автомобіль: {car_data['make']} {car_data['model']} {car_data['year']}")
                 
             except Exception as e:
                 logger.error(f"Помилка при обробці картки автомобіля: {e}")
                 continue
         
+        self.metrics.parse_time.observe(time.perf_counter() - started)
         logger.info(f"Знайдено {len(car_items)} автомобілів на сторінці {page_num}")
+        
+        if self.cache:
+            await self._run_sync(self.cache.store_parsed, url, car_items)
         return car_items
     
+    async def stream_car_items(self, page_num: int) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Потоково отримує дані про автомобілі зі сторінки пошуку
+        
+        Відповідь читається частинами й подається в інкрементальний парсер;
+        кожне оголошення повертається одразу після завершення його блоку
+        div.content-bar. Пам'ять обмежена одним блоком, а не всією сторінкою.
+        Кеш сторінок у цьому режимі не використовується.
+        Якщо сторінку не отримано повністю, викидає PageFetchError.
+        """
+        url = f"{self.base_url}?page={page_num}"
+        logger.info(f"Потокове отримання списку автомобілів зі сторінки: {url}")
+        session = await self._init_session()
+        breaker = self._get_breaker(url)
+        attempts = settings.SCRAPER_MAX_RETRIES + 1
+        found = 0
+        
+        for attempt in range(attempts):
+            await breaker.wait_if_open()
+            retry_after = None
+            self.metrics.requests += 1
+            if attempt:
+                self.metrics.retries += 1
+            started = time.perf_counter()
+            try:
+                async with session.get(url) as response:
+                    if response.status in RETRYABLE_STATUSES:
+                        self.metrics.errors += 1
+                        breaker.record_failure()
+                        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                        logger.warning(f"Тимчасова помилка запиту до {url}: {response.status} (спроба {attempt + 1}/{attempts})")
+                    elif response.status != 200:
+                        self.metrics.errors += 1
+                        logger.error(f"Помилка запиту до {url}: {response.status}")
+                        raise PageFetchError(f"Помилка запиту до {url}: {response.status}")
+                    else:
+                        parser = CarBlockParser()
+                        decoder = codecs.getincrementaldecoder(response.charset or "utf-8")(errors="replace")
+                        # Час розбору сторінки - сума часу обробки її частин
+                        parse_time = 0.0
+                        
+                        async for chunk in response.content.iter_chunked(settings.SCRAPER_STREAM_CHUNK_SIZE):
+                            self.metrics.bytes_downloaded += len(chunk)
+                            parse_started = time.perf_counter()
+                            parser.feed(decoder.decode(chunk))
+                            blocks = parser.pop_blocks()
+                            parse_time += time.perf_counter() - parse_started
+                            for block_html in blocks:
+                                parse_started = time.perf_counter()
+                                car_data = self._parse_block_html(block_html)
+                                parse_time += time.perf_counter() - parse_started
+                                if car_data:
+                                    found += 1
+                                    yield car_data
+                        
+                        parser.feed(decoder.decode(b"", final=True))
+                        parser.close()
+                        for block_html in parser.pop_blocks():
+                            car_data = self._parse_block_html(block_html)
+                            if car_data:
+                                found += 1
+                                yield car_data
+                        
+                        self.metrics.fetch_latency.observe(time.perf_counter() - started)
+                        self.metrics.parse_time.observe(parse_time)
+                        breaker.record_success()
+                        logger.info(f"Знайдено {found} автомобілів на сторінці {page_num}")
+                        return
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.metrics.errors += 1
+                breaker.record_failure()
+                if found:
+                    # Частину оголошень вже віддано - повтор продублював би їх
+                    logger.error(f"Обрив з'єднання з {url} після {found} оголошень: {e!r}")
+                    raise PageFetchError(f"Сторінку {url} отримано не повністю") from e
+                logger.warning(f"Помилка з'єднання з {url}: {e!r} (спроба {attempt + 1}/{attempts})")
+            
+            if attempt + 1 < attempts:
+                await asyncio.sleep(backoff_delay(
+                    attempt, settings.SCRAPER_RETRY_BASE_DELAY, settings.SCRAPER_RETRY_MAX_DELAY, retry_after
+                ))
+        
+        logger.error(f"Не вдалося отримати сторінку {url} після {attempts} спроб")
+        raise PageFetchError(f"Не вдалося отримати сторінку {url}")
+    
+    def _parse_block_html(self, block_html: str) -> Optional[Dict[str, Any]]:
+        """Розбирає HTML одного блоку оголошення"""
+        try:
+            car_block = BeautifulSoup(block_html, 'html.parser').select_one('div.content-bar')
+            return self._parse_car_block(car_block) if car_block else None
+        except Exception as e:
+            logger.error(f"Помилка при обробці картки автомобіля: {e}")
+            return None
+    
+    def _parse_car_block(self, car_block) -> Optional[Dict[str, Any]]:
+        """Витягує дані про автомобіль з картки на сторінці пошуку"""
+        # Отримуємо URL оголошення
+        link_elem = car_block.select_one('a.m-link-ticket')
+        car_url = link_elem.get('href') if link_elem else None
+        
+        if not car_url:
+            return None
+        
+        # Отримуємо URL зображення
+        photo_elem = car_block.select_one('div.ticket-photo img')
+        image_url = photo_elem.get('src') if photo_elem else None
+        
+        if not image_url and photo_elem:
+            # Перевіряємо альтернативні атрибути для зображення
+            image_url = photo_elem.get('data-src') or photo_elem.get('data-srcset')
+        
+        # Отримуємо заголовок (марка, модель)
+        title_elem = car_block.select_one('div.head-ticket span.blue.bold')
+        title_text = title_elem.text.strip() if title_elem else ""
+        
+        # Розділяємо заголовок на марку і модель
+        parts = title_text.split(' ', 1)
+        make = parts[0] if parts else ""
+        model = parts[1] if len(parts) > 1 else ""
+        
+        # Отримуємо рік
+        year_elem = car_block.select_one('div.head-ticket')
+        year_text = year_elem.text if year_elem else ""
+        year_match = re.search(r'\b(19|20)\d{2}\b', year_text)
+        year = int(year_match.group(0)) if year_match else 0
+        
+        # Отримуємо ціну
+        price_elem = car_block.select_one('div.price-ticket')
+        price = 0
+        if price_elem:
+            price_attr = price_elem.get('data-main-price')
+            if price_attr:
+                price = int(price_attr)
+            else:
+                price_text = price_elem.text.strip()
+                price_digits = ''.join(filter(str.isdigit, price_text))
+                price = int(price_digits) if price_digits else 0
+        
+        # Отримуємо інформацію про двигун
+        engine_elem = car_block.select_one('div.definition-data')
+        engine_text = engine_elem.text.strip() if engine_elem else ""
+        
+        # Шукаємо об'єм двигуна (наприклад "2.0 л", "1.6 AT" або "3.0 дизель")
+        engine_volume_match = re.search(r'(\d+(?:\.\d+)?)\s*(?:л|AT|MT|дизель|бензин|газ|електро|гібрид)', engine_text)
+        engine_volume = float(engine_volume_match.group(1)) if engine_volume_match else 0.0
+        
+        # Визначаємо тип двигуна
+        engine_type = "бензин"  # За замовчуванням
+        if "дизель" in engine_text.lower():
+            engine_type = "дизель"
+        elif "газ" in engine_text.lower():
+            engine_type = "газ"
+        elif "електро" in engine_text.lower():
+            engine_type = "електро"
+        elif "гібрид" in engine_text.lower():
+            engine_type = "гібрид"
+        
+        # Визначаємо тип трансмісії
+        transmission = "механіка"  # За замовчуванням
+        if "автомат" in engine_text.lower():
+            transmission = "автомат"
+        elif "AT" in engine_text:
+            transmission = "автомат"
+        elif "MT" in engine_text:
+            transmission = "механіка"
+        
+        # Отримуємо пробіг
+        mileage_match = re.search(r'(\d+)\s*тис\.?\s*км', engine_text)
+        mileage = int(mileage_match.group(1)) * 1000 if mileage_match else 0
+        
+        # Отримуємо розташування
+        location_elem = car_block.select_one('div.region')
+        location = self._extract_location(location_elem.text if location_elem else None)
+        
+        # Формуємо дані про автомобіль
+        return {
+            "make": make,
+            "model": model,
+            "year": year,
+            "price": price,
+            "mileage": mileage,
+            "engine_type": engine_type,
+            "engine_volume": engine_volume,
+            "transmission": transmission,
+            "drive_type": self._extract_drive_type(engine_text),
+            "location": location,
+            "image_url": image_url,
+            "url": car_url
+        }
+    
+    def _extract_location(self, text: Optional[str]) -> str:
+        """Нормалізує місцезнаходження автомобіля"""
+        location = clean_text(text) if text else ""
+        return location or "Невідоме місцезнаходження"
+    
+    def _extract_drive_type(self, text: Optional[str]) -> str:
+        """Визначає тип приводу за текстом (за замовчуванням - передній)"""
+        if not text:
+            return "передній"
+        
+        lower_text = text.lower()
+        if "повний" in lower_text or "4wd" in lower_text or "awd" in lower_text or "4x4" in lower_text:
+            return "повний"
+        if "задній" in lower_text or "rwd" in lower_text:
+            return "задній"
+        return "передній"
+    
+    def _parse_car_details(self, html: str) -> Dict[str, Any]:
+        """
+        Витягує додаткові дані зі сторінки оголошення
+        Повертає лише ті поля, що знайдені на сторінці
+        """
+        started = time.perf_counter()
+        soup = BeautifulSoup(html, 'html.parser')
+        details = {}
+        
+        for item in soup.select('div.item_inner'):
+            label_elem = item.select_one('span')
+            value_elem = item.select_one('strong')
+            if not label_elem or not value_elem:
+                continue
+            
+            label = clean_text(label_elem.text).lower()
+            value = clean_text(value_elem.text)
+            
+            if label.startswith("місто"):
+                details["location"] = self._extract_location(value)
+            elif label.startswith("привід"):
+                details["drive_type"] = self._extract_drive_type(value)
+            elif label.startswith("коробка"):
+                details["transmission"] = parse_transmission(value).value
+        
+        self.metrics.detail_parse_time.observe(time.perf_counter() - started)
+        return details
+    
+    async def _get_known_hashes(self, urls: List[str]) -> Dict[str, str]:
+        """Повертає хеші вмісту вже збережених оголошень для переданих URL"""
+        if not urls:
+            return {}
+        repository = await self._get_repository()
+        return await repository.known_hashes(urls)
+    
+    async def _mark_seen(self, urls: List[str]):
+        """Оновлює last_seen_at оголошень, які є у видачі, але не змінились (помилка не перериває скрапінг)"""
+        repository = await self._get_repository()
+        try:
+            await repository.mark_seen(urls, datetime.utcnow())
+        except Exception as e:
+            logger.error(f"Помилка при оновленні часу останньої появи оголошень: {e}")
+    
     async def _save_car_to_db(self, car_data: Dict[str, Any]) -> bool:
-        """Зберігає дані про автомобіль в базу даних"""
-        db = await self._get_db()
+        """
+        Зберігає дані про автомобіль в базу даних
+        
+        Якщо оголошення вже збережене і його вміст не змінився, запис не виконується.
+        Повертає True, якщо запис додано чи оновлено, і False, якщо вміст не змінився;
+        помилка збереження логується і прокидається далі, щоб її не сплутали з "без змін".
+        """
+        repository = await self._get_repository()
         
         try:
-            # Додаємо дату створення запису
-            car_data["created_at"] = datetime.utcnow()
+            if "content_hash" not in car_data:
+                car_data["content_hash"] = compute_content_hash(car_data)
+            
+            # Область і координати за офлайн-довідником (не входять у хеш вмісту)
+            car_data.update(resolve_location(car_data.get("location")))
+            car_data["last_seen_at"] = datetime.utcnow()
             
             # Перевіряємо наявність дублікатів за URL
-            existing_car = await db.cars.find_one({"url": car_data["url"]})
+            existing_car = await repository.find_by_url(car_data["url"])
+            if not existing_car:
+                # Оголошення могло повернутися у видачу після архівування
+                existing_car = await repository.restore_archived(car_data["url"])
             
-            if existing_car:
-                # Оновлюємо існуючий запис
-                car_data["updated_at"] = datetime.utcnow()
-                result = await db.cars.update_one(
-                    {"url": car_data["url"]},
-                    {"$set": car_data}
-                )
-                logger.info(f"Оновлено існуючий запис: {car_data['make']} {car_data['model']} {car_data['year']}")
-                return result.modified_count > 0
-            else:
+            if not existing_car:
                 # Створюємо новий запис
-                result = await db.cars.insert_one(car_data)
-                logger.info(f"Додано новий автомобіль: {car_data['make']} {car_data['model']} {car_data['year']}")
-                return result.inserted_id is not None
+                car_data["created_at"] = datetime.utcnow()
+                started = time.perf_counter()
+                try:
+                    car_id = await repository.insert(car_data)
+                except DuplicateCarError:
+                    # Оголошення вже збережене паралельним або попереднім (перерваним) запуском -
+                    # унікальний індекс за URL гарантує єдиний запис, тож один раз переходимо до оновлення
+                    logger.info(f"Оголошення вже існує, оновлюємо: {car_data['url']}")
+                    existing_car = await repository.find_by_url(car_data["url"])
+                    if not existing_car:
+                        # Обмеження порушене не дублікатом URL - повторна вставка не допоможе
+                        raise
+                else:
+                    self.metrics.db_write_latency.observe(time.perf_counter() - started)
+                    car_data["_id"] = car_id
+                    logger.info(f"Додано новий автомобіль: {car_data['make']} {car_data['model']} {car_data['year']}")
+                    notify_upserted([car_data])
+                    await self._record_price(car_id, car_data)
+                    get_event_broker().publish(CAR_CREATED, car_payload(car_data))
+                    return car_id is not None
+            
+            return await self._update_existing_car(repository, existing_car, car_data)
                 
         except Exception as e:
             logger.error(f"Помилка при збереженні даних в базу: {e}")
+            raise
+    
+    async def _update_existing_car(self, repository: CarRepository, existing_car: Dict[str, Any],
+                                   car_data: Dict[str, Any]) -> bool:
+        """Оновлює збережене оголошення, якщо його вміст змінився"""
+        if existing_car.get("content_hash") == car_data["content_hash"]:
+            # Вміст не змінився, але оголошення є у видачі - інакше його заархівують
+            logger.debug(f"Оголошення не змінилось, пропускаємо: {car_data['url']}")
+            await self._mark_seen([car_data["url"]])
             return False
+        
+        # Оновлюємо існуючий запис, зберігаючи початкову дату створення
+        car_data.pop("_id", None)
+        car_data.pop("created_at", None)
+        car_data["updated_at"] = datetime.utcnow()
+        started = time.perf_counter()
+        modified = await repository.update(existing_car["_id"], car_data)
+        self.metrics.db_write_latency.observe(time.perf_counter() - started)
+        logger.info(f"Оновлено існуючий запис: {car_data['make']} {car_data['model']} {car_data['year']}")
+        notify_upserted([{**existing_car, **car_data, "_id": existing_car["_id"]}])
+        
+        # Історія цін поповнюється лише при зміні ціни
+        if existing_car.get("price") != car_data.get("price"):
+            await self._record_price(existing_car["_id"], car_data)
+            get_event_broker().publish(PRICE_CHANGED, car_payload(
+                {**car_data, "_id": existing_car["_id"]}, old_price=existing_car.get("price")
+            ))
+        return modified
+    
+    async def _record_price(self, car_id, car_data: Dict[str, Any]):
+        """Додає ціну в історію цін (помилка не перериває збереження автомобіля)"""
+        repository = await self._get_repository()
+        try:
+            await repository.record_price(car_id, car_data.get("price"), car_data)
+        except Exception as e:
+            logger.error(f"Помилка при записі історії цін: {e}")
     
-    async def scrape_cars(self, pages: int = 5) -> int:
+    async def _fetch_car_details(self, car_data: Dict[str, Any]):
+        """Етап конвеєра: завантажує сторінку оголошення"""
+        if not car_data.get("url"):
+            return car_data, None
+        html = await self._fetch_page(car_data["url"])
+        return car_data, html
+    
+    async def _enrich_car(self, item) -> Dict[str, Any]:
+        """Етап конвеєра: доповнює дані автомобіля полями зі сторінки оголошення"""
+        car_data, html = item
+        if html:
+            car_data.update(self._parse_car_details(html))
+        return car_data
+    
+    async def resume(self, run_id: str) -> int:
+        """
+        Продовжує перерваний запуск скрапера з останньої контрольної точки
+        
+        Returns:
+            Кількість збережених автомобілів за весь запуск
+        """
+        db = await self._get_db()
+        checkpoint = await ScrapeCheckpoint.load(db, run_id)
+        if checkpoint is None:
+            raise ValueError(f"Запуск скрапера {run_id} не знайдено")
+        if checkpoint.status == ScrapeCheckpoint.COMPLETED:
+            logger.info(f"Запуск скрапера {run_id} вже завершено")
+            return checkpoint.counters.get("saved", 0)
+        
+        logger.info(f"Продовження запуску {run_id} зі сторінки {checkpoint.last_page + 1}")
+        return await self.scrape_cars(checkpoint.pages, checkpoint.incremental, checkpoint=checkpoint)
+    
+    async def scrape_cars(self, pages: int = 5, incremental: bool = False,
+                          checkpoint: Optional[ScrapeCheckpoint] = None) -> int:
         """
         Основний метод для скрапінгу автомобілів з auto.ria.com
         
+        Скрапінг виконується конвеєром етапів, з'єднаних обмеженими чергами:
+        сторінки пошуку -> завантаження оголошень -> розбір -> пакетне збереження.
+        
         Args:
             pages: Кількість сторінок для скрапінгу
+            incremental: Інкрементальний режим - обхід зупиняється після
+                SCRAPER_INCREMENTAL_STOP_AFTER поспіль вже відомих і незмінених оголошень
+            checkpoint: Контрольна точка запуску. Якщо передана, прогрес зберігається
+                на межах сторінок, а обхід продовжується з останньої завершеної сторінки
             
         Returns:
             Кількість успішно збережених автомобілів
         """
         if pages < 1:
             pages = 1
-        if pages > 20:
+        if pages > settings.SCRAPER_MAX_PAGES:
             # Обмежуємо кількість сторінок для запобігання надмірному навантаженню на сайт
-            pages = 20
+            pages = settings.SCRAPER_MAX_PAGES
         
-        saved_count = 0
+        detail_workers = max(1, settings.SCRAPER_DETAIL_CONCURRENCY)
+        detail_queue = asyncio.Queue(maxsize=settings.SCRAPER_QUEUE_SIZE)
+        parse_queue = asyncio.Queue(maxsize=settings.SCRAPER_QUEUE_SIZE)
+        save_queue = asyncio.Queue(maxsize=settings.SCRAPER_QUEUE_SIZE)
         
-        try:
-            logger.info(f"Початок скрапінгу {pages} сторінок з auto.ria.com")
+        self.stage_stats = {
+            name: StageStats(name) for name in ("list", "detail", "parse", "save")
+        }
+        counters = {"saved": 0, "unchanged": 0}
+        self.metrics = ScrapeMetrics()
+        progress = PageProgress()
+        if checkpoint:
+            counters.update(checkpoint.counters)
+            progress = PageProgress(checkpoint.last_page)
+        
+        def metrics_snapshot() -> Dict[str, Any]:
+            self.metrics.cars_saved = counters["saved"]
+            self.metrics.cars_unchanged = counters["unchanged"]
+            return self.metrics.as_dict(self.stage_stats)
+        
+        # Мініатюри нових і змінених оголошень створюються у фоні, паралельно зі скрапінгом
+        prefetch_tasks = set()
+        
+        def prefetch_image(car_data: Dict[str, Any]):
+            if settings.IMAGE_PREFETCH and car_data.get("image_url"):
+                task = asyncio.ensure_future(get_thumbnail_service().prefetch(car_data["image_url"]))
+                prefetch_tasks.add(task)
+                task.add_done_callback(prefetch_tasks.discard)
+        
+        async def save_checkpoint():
+            if checkpoint:
+                await checkpoint.save(progress.last_completed, progress.pending(), counters, metrics_snapshot())
+        
+        async def list_stage():
+            stats = self.stage_stats["list"]
+            stats.start()
+            state = {"unchanged_streak": 0}
+            stop_after = settings.SCRAPER_INCREMENTAL_STOP_AFTER
+            # URL, вже передані в конвеєр (для запобігання дублям при продовженні запуску)
+            seen_urls = set()
             
-            # Обробляємо вказану кількість сторінок
-            for page in range(1, pages + 1):
-                logger.info(f"Обробка сторінки {page} з {pages}")
+            async def emit(page: int, car_items: List[Dict[str, Any]]) -> bool:
+                """Передає в конвеєр нові та змінені оголошення. Повертає True, якщо обхід слід зупинити"""
+                # Одним запитом отримуємо хеші вже відомих оголошень
+                urls = [car["url"] for car in car_items if car.get("url")]
+                known_hashes = await self._get_known_hashes(urls) if urls else {}
+                unchanged_urls = []
+                stop = False
                 
-                # Отримуємо дані про автомобілі зі сторінки пошуку
-                car_items = await self._get_car_links(page)
+                for car_data in car_items:
+                    url = car_data.get("url")
+                    if url and url in seen_urls:
+                        continue
+                    
+                    # Хеш рахується за даними картки, до доповнення деталями
+                    car_data["content_hash"] = compute_content_hash(car_data)
+                    if known_hashes.get(url) == car_data["content_hash"]:
+                        # Оголошення не змінилось - не завантажуємо деталі і не записуємо
+                        counters["unchanged"] += 1
+                        state["unchanged_streak"] += 1
+                        unchanged_urls.append(url)
+                        if incremental and state["unchanged_streak"] >= stop_after:
+                            stop = True
+                            break
+                        continue
+                    state["unchanged_streak"] = 0
+                    if url:
+                        seen_urls.add(url)
+                    progress.add(page, car_data)
+                    await detail_queue.put(car_data)
                 
-                # Зберігаємо кожен автомобіль в базу даних
-                for i, car_data in enumerate(car_items):
-                    logger.info(f"Обробка автомобіля {i+1}/{len(car_items)}: {car_data['make']} {car_data['model']}")
+                # Незмінені оголошення не записуються, але лишаються актуальними для архівування
+                if unchanged_urls:
+                    await self._mark_seen(unchanged_urls)
+                return stop
+            
+            try:
+                # Спершу повертаємо в конвеєр оголошення, не збережені до перерви
+                if checkpoint and checkpoint.pending:
+                    logger.info(f"Повторна обробка {len(checkpoint.pending)} незбережених оголошень")
+                    for item in checkpoint.pending:
+                        progress.add(item["page"], item["car"])
+                        seen_urls.add(item["car"].get("url"))
+                        await detail_queue.put(item["car"])
+                
+                for page in range(progress.last_completed + 1, pages + 1):
+                    logger.info(f"Обробка сторінки {page} з {pages}")
+                    
+                    if settings.SCRAPER_STREAMING:
+                        # Потоковий режим: оголошення передаються в конвеєр невеликими групами
+                        # по мірі розбору сторінки, без буферизації всієї сторінки
+                        stop = False
+                        chunk = []
+                        car_stream = self.stream_car_items(page)
+                        try:
+                            async for car_data in car_stream:
+                                chunk.append(car_data)
+                                if len(chunk) >= settings.SCRAPER_SAVE_BATCH_SIZE:
+                                    stop = await emit(page, chunk)
+                                    chunk = []
+                                    if stop:
+                                        break
+                        finally:
+                            await car_stream.aclose()
+                        if chunk and not stop:
+                            stop = await emit(page, chunk)
+                    else:
+                        # Отримуємо дані про автомобілі зі сторінки пошуку
+                        car_items = await self._get_car_links(page)
+                        stop = await emit(page, car_items)
+                    stats.items += 1
                     
-                    success = await self._save_car_to_db(car_data)
-                    if success:
-                        saved_count += 1
+                    # Межа сторінки: фіксуємо прогрес. Сторінка, яку не вдалося отримати,
+                    # сюди не доходить (PageFetchError), тож продовження почне саме з неї
+                    progress.page_emitted(page)
+                    progress.advance()
+                    await save_checkpoint()
+                    
+                    if stop:
+                        logger.info(f"Знайдено {state['unchanged_streak']} незмінених оголошень поспіль, зупиняємо обхід на сторінці {page}")
+                        break
+                    
+                    # Затримка між запитами для дотримання етики скрапінгу
+                    if page < pages:
+                        await asyncio.sleep(settings.SCRAPER_PAGE_DELAY)
+            except Exception as e:
+                stats.errors += 1
+                logger.error(f"Помилка при обробці сторінок пошуку: {e}")
+            finally:
+                stats.finish()
+                for _ in range(detail_workers):
+                    await detail_queue.put(STAGE_DONE)
+        
+        async def save_stage():
+            stats = self.stage_stats["save"]
+            stats.start()
+            batch = []
+            while True:
+                item = await save_queue.get()
+                done = item is STAGE_DONE
+                if not done:
+                    batch.append(item)
                 
-                # Затримка між запитами для дотримання етики скрапінгу
-                await asyncio.sleep(2)
+                # Зберігаємо пакет, коли він заповнений або черга тимчасово порожня
+                if batch and (done or len(batch) >= settings.SCRAPER_SAVE_BATCH_SIZE or save_queue.empty()):
+                    started = time.perf_counter()
+                    for car_data in batch:
+                        logger.info(f"Збереження автомобіля: {car_data.get('make')} {car_data.get('model')}")
+                        try:
+                            saved = await self._save_car_to_db(car_data)
+                        except Exception:
+                            # Оголошення лишається незбереженим у стані запуску - продовження повторить запис
+                            stats.errors += 1
+                            continue
+                        if saved:
+                            counters["saved"] += 1
+                            prefetch_image(car_data)
+                        progress.done(car_data)
+                    stats.items += len(batch)
+                    stats.busy_time += time.perf_counter() - started
+                    batch = []
+                    
+                    # Якщо завершилась ще одна сторінка - фіксуємо прогрес
+                    if progress.advance():
+                        await save_checkpoint()
                 
-            logger.info(f"Скрапінг завершено. Збережено {saved_count} автомобілів.")
+                if done:
+                    break
+            stats.finish()
+        
+        status = ScrapeCheckpoint.FAILED
+        try:
+            logger.info(f"Початок скрапінгу {pages} сторінок з auto.ria.com")
+            
+            await asyncio.gather(
+                list_stage(),
+                run_stage(self.stage_stats["detail"], self._fetch_car_details, detail_queue, parse_queue,
+                          concurrency=detail_workers),
+                run_stage(self.stage_stats["parse"], self._enrich_car, parse_queue, save_queue),
+                save_stage(),
+            )
+            # Якщо обхід сторінок перервався помилкою або частину оголошень не записано,
+            # запуск можна буде продовжити
+            if not self.stage_stats["list"].errors and not self.stage_stats["save"].errors:
+                status = ScrapeCheckpoint.COMPLETED
+            
+            logger.info(f"Скрапінг завершено. Збережено {counters['saved']} автомобілів, без змін: {counters['unchanged']}.")
+            log_stage_stats(self.stage_stats)
             
         except Exception as e:
             logger.error(f"Помилка при скрапінгу: {e}")
@@ -254,5 +843,22 @@ class AutoRiaScraper:
         finally:
             # Закриваємо сесію після завершення
             await self._close_session()
+            if prefetch_tasks:
+                await asyncio.gather(*prefetch_tasks, return_exceptions=True)
+            self.metrics.finish()
+            metrics = metrics_snapshot()
+            logger.info(
+                f"Метрики запуску: {metrics['duration_seconds']} с, {metrics['cars_per_second']} авто/с, "
+                f"запитів {metrics['requests']} (повторів {metrics['retries']}, помилок {metrics['errors']}), "
+                f"завантажено {metrics['bytes_downloaded']} байт, "
+                f"p95 запиту {metrics['fetch_latency']['p95']} с, p95 запису в БД {metrics['db_write_latency']['p95']} с"
+            )
+            if checkpoint:
+                try:
+                    await checkpoint.finish(status, counters, metrics)
+                except Exception as e:
+                    logger.error(f"Помилка при збереженні стану запуску {checkpoint.run_id}: {e}")
+            if counters["saved"]:
+                await self._refresh_analytics()
             
-        return saved_count
\ No newline at end of file
+        return counters["saved"]
@@ -0,0 +1,207 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+
+class PageCache:
+    """
+    Дисковий кеш сторінок скрапера.
+
+    Тіло сторінки зберігається стиснутим (gzip), поруч лежить JSON з метаданими:
+    ETag, Last-Modified, час завантаження, хеш вмісту та (опціонально) вже
+    розібрані дані сторінки. Ключ кешу - sha256 від URL.
+
+    Записи виконуються з пулу потоків кількох воркерів одночасно, тому зміни
+    файлів, лічильника розміру та витіснення серіалізуються одним замком.
+    """
+
+    def __init__(self, directory: str, max_age: int = 3600, max_bytes: int = 200 * 1024 * 1024,
+                 replay: bool = False):
+        self.directory = directory
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.replay = replay
+        # Поточний розмір кешу рахуємо ліниво при першому записі
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _paths(self, url: str):
+        """Повертає шляхи до файлу тіла та файлу метаданих для URL"""
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key[:2], key)
+        return base + ".html.gz", base + ".json"
+
+    def _read_meta(self, meta_path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, meta_path: str, meta: Dict[str, Any]):
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, meta_path)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Повертає запис кешу (метадані + тіло сторінки) або None, якщо запису немає
+        """
+        body_path, meta_path = self._paths(url)
+        meta = self._read_meta(meta_path)
+        if meta is None:
+            return None
+
+        try:
+            with gzip.open(body_path, "rt", encoding="utf-8") as f:
+                meta["body"] = f.read()
+        except (OSError, EOFError):
+            return None
+
+        # Оновлюємо час доступу для LRU-витіснення
+        try:
+            os.utime(meta_path, None)
+        except OSError:
+            pass
+        return meta
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        """Перевіряє, чи запис ще не застарів (молодший за max_age)"""
+        return time.time() - entry.get("fetched_at", 0) < self.max_age
+
+    def conditional_headers(self, entry: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """Формує заголовки умовного запиту для повторної валідації запису"""
+        headers = {}
+        if not entry:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url: str, body: str, etag: Optional[str] = None,
+              last_modified: Optional[str] = None) -> bool:
+        """
+        Зберігає сторінку в кеш
+
+        Returns:
+            True, якщо вміст сторінки змінився (або її не було в кеші)
+        """
+        body_path, meta_path = self._paths(url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+
+        body_hash = hashlib.sha256(body.encode("utf-8")).hexdigest()
+        with self._lock:
+            old_meta = self._read_meta(meta_path)
+            changed = old_meta is None or old_meta.get("body_hash") != body_hash
+
+            meta = {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "fetched_at": time.time(),
+                "body_hash": body_hash,
+            }
+            # Якщо вміст не змінився, розібрані дані залишаються актуальними
+            if not changed and old_meta.get("parsed") is not None:
+                meta["parsed"] = old_meta["parsed"]
+
+            old_size = self._entry_size(body_path, meta_path)
+            if changed:
+                tmp_path = body_path + ".tmp"
+                with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+                    f.write(body)
+                os.replace(tmp_path, body_path)
+            self._write_meta(meta_path, meta)
+
+            if self._size is not None:
+                self._size += self._entry_size(body_path, meta_path) - old_size
+            self._evict_if_needed()
+        return changed
+
+    def touch(self, url: str):
+        """Позначає запис як щойно перевірений (відповідь 304 Not Modified)"""
+        _, meta_path = self._paths(url)
+        with self._lock:
+            meta = self._read_meta(meta_path)
+            if meta is None:
+                return
+            meta["fetched_at"] = time.time()
+            self._write_meta(meta_path, meta)
+
+    def get_parsed(self, url: str) -> Optional[List[Dict[str, Any]]]:
+        """Повертає збережені результати розбору сторінки"""
+        _, meta_path = self._paths(url)
+        meta = self._read_meta(meta_path)
+        return meta.get("parsed") if meta else None
+
+    def store_parsed(self, url: str, items: List[Dict[str, Any]]):
+        """Зберігає результати розбору сторінки разом із записом кешу"""
+        body_path, meta_path = self._paths(url)
+        with self._lock:
+            meta = self._read_meta(meta_path)
+            if meta is None:
+                return
+            meta["parsed"] = items
+            old_size = self._entry_size(body_path, meta_path)
+            self._write_meta(meta_path, meta)
+            # Розібрані дані теж займають місце і враховуються в ліміті кешу
+            if self._size is not None:
+                self._size += self._entry_size(body_path, meta_path) - old_size
+
+    def _entry_size(self, body_path: str, meta_path: str) -> int:
+        size = 0
+        for path in (body_path, meta_path):
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        return size
+
+    def _scan(self) -> List[tuple]:
+        """Повертає список (час доступу, розмір, шлях до тіла, шлях до метаданих)"""
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                meta_path = os.path.join(root, name)
+                body_path = meta_path[:-len(".json")] + ".html.gz"
+                try:
+                    accessed = os.path.getmtime(meta_path)
+                except OSError:
+                    continue
+                entries.append((accessed, self._entry_size(body_path, meta_path), body_path, meta_path))
+        return entries
+
+    def _evict_if_needed(self):
+        """Витісняє найдавніше використані записи, якщо кеш перевищив ліміт розміру (викликається під замком)"""
+        if self._size is None:
+            self._size = sum(entry[1] for entry in self._scan())
+        if self._size <= self.max_bytes:
+            return
+
+        # Звільняємо місце із запасом, щоб не сканувати директорію на кожному записі
+        target = int(self.max_bytes * 0.9)
+        evicted = 0
+        for _, size, body_path, meta_path in sorted(self._scan()):
+            if self._size <= target:
+                break
+            for path in (body_path, meta_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size -= size
+            evicted += 1
+        logger.info(f"Витіснено {evicted} записів з кешу сторінок")
@@ -0,0 +1,140 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from loguru import logger
+
+
+class ScrapeCheckpoint:
+    """
+    Контрольна точка запуску скрапера, що зберігається в колекції scrape_runs
+
+    Містить номер останньої повністю збереженої сторінки, оголошення, які вже
+    передані в конвеєр, але ще не збережені, та лічильники запуску.
+    """
+
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+    def __init__(self, db, doc: Dict[str, Any]):
+        self.db = db
+        self.run_id: str = doc["_id"]
+        self.pages: int = doc.get("pages", 1)
+        self.incremental: bool = doc.get("incremental", False)
+        self.status: str = doc.get("status", self.RUNNING)
+        self.last_page: int = doc.get("last_page", 0)
+        self.pending: List[Dict[str, Any]] = doc.get("pending", [])
+        self.counters: Dict[str, int] = doc.get("counters", {})
+        self.metrics: Dict[str, Any] = doc.get("metrics", {})
+
+    @classmethod
+    async def create(cls, db, pages: int, incremental: bool = False) -> "ScrapeCheckpoint":
+        """Створює запис нового запуску"""
+        now = datetime.utcnow()
+        doc = {
+            "_id": str(ObjectId()),
+            "pages": pages,
+            "incremental": incremental,
+            "status": cls.RUNNING,
+            "last_page": 0,
+            "pending": [],
+            "counters": {},
+            "created_at": now,
+            "updated_at": now,
+        }
+        await db.scrape_runs.insert_one(doc)
+        return cls(db, doc)
+
+    @classmethod
+    async def load(cls, db, run_id: str) -> Optional["ScrapeCheckpoint"]:
+        """Завантажує контрольну точку запуску за ID"""
+        doc = await db.scrape_runs.find_one({"_id": run_id})
+        return cls(db, doc) if doc else None
+
+    async def save(self, last_page: int, pending: List[Dict[str, Any]], counters: Dict[str, int],
+                   metrics: Optional[Dict[str, Any]] = None):
+        """Зберігає прогрес запуску на межі сторінки"""
+        self.last_page = last_page
+        self.pending = pending
+        self.counters = dict(counters)
+        update = {
+            "status": self.RUNNING,
+            "last_page": last_page,
+            "pending": pending,
+            "counters": self.counters,
+            "updated_at": datetime.utcnow(),
+        }
+        if metrics is not None:
+            self.metrics = metrics
+            update["metrics"] = metrics
+        await self.db.scrape_runs.update_one({"_id": self.run_id}, {"$set": update})
+
+    async def finish(self, status: str, counters: Dict[str, int], metrics: Optional[Dict[str, Any]] = None):
+        """Позначає запуск завершеним (або невдалим)"""
+        self.status = status
+        self.counters = dict(counters)
+        update = {"status": status, "counters": self.counters, "updated_at": datetime.utcnow()}
+        if metrics is not None:
+            self.metrics = metrics
+            update["metrics"] = metrics
+        if status == self.COMPLETED:
+            update["pending"] = []
+        await self.db.scrape_runs.update_one({"_id": self.run_id}, {"$set": update})
+        logger.info(f"Запуск скрапера {self.run_id} завершено зі статусом {status}")
+
+
+class PageProgress:
+    """
+    Відстежує, які сторінки пошуку вже повністю збережені
+
+    Оголошення сторінки потрапляють у конвеєр і зберігаються в довільному
+    порядку, тому сторінка вважається завершеною лише тоді, коли збережені
+    всі її оголошення і всі попередні сторінки.
+    """
+
+    def __init__(self, last_completed: int = 0):
+        self.last_completed = last_completed
+        self.last_emitted = last_completed
+        self.in_flight: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        self.page_of: Dict[str, int] = {}
+
+    def add(self, page: int, car_data: Dict[str, Any]):
+        """Реєструє оголошення, передане в конвеєр"""
+        url = car_data.get("url")
+        if not url:
+            return
+        self.in_flight.setdefault(page, {})[url] = car_data
+        self.page_of[url] = page
+
+    def page_emitted(self, page: int):
+        """Позначає, що всі оголошення сторінки передані в конвеєр"""
+        self.in_flight.setdefault(page, {})
+        self.last_emitted = max(self.last_emitted, page)
+
+    def done(self, car_data: Dict[str, Any]):
+        """Позначає оголошення обробленим етапом збереження"""
+        url = car_data.get("url")
+        page = self.page_of.pop(url, None)
+        if page is not None:
+            self.in_flight.get(page, {}).pop(url, None)
+
+    def advance(self) -> bool:
+        """Просуває номер останньої завершеної сторінки. Повертає True, якщо він змінився"""
+        changed = False
+        while self.last_completed < self.last_emitted:
+            next_page = self.last_completed + 1
+            if self.in_flight.get(next_page):
+                break
+            self.in_flight.pop(next_page, None)
+            self.last_completed = next_page
+            changed = True
+        return changed
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Оголошення, передані в конвеєр, але ще не збережені"""
+        return [
+            {"page": page, "car": car_data}
+            for page, cars in sorted(self.in_flight.items())
+            for car_data in cars.values()
+        ]
@@ -0,0 +1,103 @@
+import bisect
+import time
+from typing import Any, Dict, Optional, Sequence
+
+# Межі кошиків гістограм затримок, секунди
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Гістограма з фіксованими межами кошиків"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        # Останній кошик - для значень, більших за найбільшу межу
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Оцінка квантиля за верхньою межею кошика"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return self.buckets[i] if i < len(self.buckets) else self.max
+        return self.max
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.total, 4),
+            "avg": round(self.total / self.count, 4) if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": {
+                **{str(bound): count for bound, count in zip(self.buckets, self.counts)},
+                "+Inf": self.counts[-1],
+            },
+        }
+
+
+class ScrapeMetrics:
+    """Метрики одного запуску скрапера"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.finished_at: Optional[float] = None
+        self.fetch_latency = Histogram()
+        self.parse_time = Histogram()
+        self.detail_parse_time = Histogram()
+        self.db_write_latency = Histogram()
+        self.bytes_downloaded = 0
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.not_modified = 0
+        self.cars_saved = 0
+        self.cars_unchanged = 0
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    def as_dict(self, stage_stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        duration = self.duration
+        data = {
+            "duration_seconds": round(duration, 3),
+            "cars_saved": self.cars_saved,
+            "cars_unchanged": self.cars_unchanged,
+            "cars_per_second": round(self.cars_saved / duration, 3) if duration > 0 else 0.0,
+            "requests": self.requests,
+            "retries": self.retries,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "not_modified": self.not_modified,
+            "bytes_downloaded": self.bytes_downloaded,
+            "fetch_latency": self.fetch_latency.as_dict(),
+            "parse_time": self.parse_time.as_dict(),
+            "detail_parse_time": self.detail_parse_time.as_dict(),
+            "db_write_latency": self.db_write_latency.as_dict(),
+        }
+        if stage_stats:
+            data["stages"] = {name: stats.as_dict() for name, stats in stage_stats.items()}
+        return data
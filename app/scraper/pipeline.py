@@ -0,0 +1,101 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from loguru import logger
+
+# Маркер завершення потоку даних між етапами конвеєра
+STAGE_DONE = object()
+
+
+class StageStats:
+    """Статистика роботи одного етапу конвеєра"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.errors = 0
+        self.busy_time = 0.0
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def start(self):
+        if self.started_at is None:
+            self.started_at = time.perf_counter()
+
+    def finish(self):
+        self.finished_at = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        """Кількість оброблених елементів за секунду"""
+        return self.items / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "items": self.items,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_time, 3),
+            "elapsed_seconds": round(self.elapsed, 3),
+            "items_per_second": round(self.throughput, 2),
+        }
+
+
+async def run_stage(
+    stats: StageStats,
+    handler: Callable[[Any], Awaitable[Any]],
+    in_queue: asyncio.Queue,
+    out_queue: Optional[asyncio.Queue],
+    concurrency: int = 1,
+    downstream_workers: int = 1,
+):
+    """
+    Запускає етап конвеєра з заданою кількістю паралельних обробників
+
+    Кожен обробник читає елементи з in_queue до маркера STAGE_DONE. Результат
+    handler (якщо не None) передається в out_queue. Після завершення всіх
+    обробників етап надсилає STAGE_DONE кожному обробнику наступного етапу.
+    """
+    stats.start()
+
+    async def worker():
+        while True:
+            item = await in_queue.get()
+            if item is STAGE_DONE:
+                break
+            started = time.perf_counter()
+            try:
+                result = await handler(item)
+            except Exception as e:
+                stats.errors += 1
+                logger.error(f"Помилка на етапі {stats.name}: {e}")
+                result = None
+            stats.busy_time += time.perf_counter() - started
+            stats.items += 1
+            if result is not None and out_queue is not None:
+                await out_queue.put(result)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    stats.finish()
+
+    if out_queue is not None:
+        for _ in range(downstream_workers):
+            await out_queue.put(STAGE_DONE)
+
+
+def log_stage_stats(stages: Dict[str, StageStats]):
+    """Виводить у лог пропускну здатність кожного етапу"""
+    for stats in stages.values():
+        data = stats.as_dict()
+        logger.info(
+            f"Етап {stats.name}: {data['items']} елементів, помилок {data['errors']}, "
+            f"зайнятість {data['busy_seconds']} с з {data['elapsed_seconds']} с, "
+            f"{data['items_per_second']} ел./с"
+        )
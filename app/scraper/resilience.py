@@ -0,0 +1,145 @@
+import asyncio
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Optional
+
+from loguru import logger
+
+# HTTP-статуси, після яких має сенс повторити запит
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Парсить заголовок Retry-After
+
+    Args:
+        value: Кількість секунд або HTTP-дата
+
+    Returns:
+        Затримка в секундах або None, якщо заголовок відсутній чи некоректний
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: Optional[float] = None) -> float:
+    """
+    Обчислює затримку перед повторною спробою (експоненційна затримка з "повним" джитером)
+
+    Якщо сервер вказав Retry-After, чекаємо не менше за нього (але не довше за cap).
+    """
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+
+class CircuitBreaker:
+    """
+    Запобіжник для одного хоста
+
+    Рахує частку помилок у ковзному вікні останніх запитів. Якщо частка
+    перевищує поріг, запобіжник "розмикається" і всі запити до хоста
+    призупиняються на cooldown секунд. Після паузи пропускається один пробний
+    запит, решта чекають на його результат: успіх замикає запобіжник, помилка
+    розмикає його знову. Якщо пробний запит не повідомив результат за cooldown
+    секунд (наприклад, 404 або скасування), пропускається наступний.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, host: str, window: int = 20, min_requests: int = 5,
+                 error_threshold: float = 0.5, cooldown: float = 30.0):
+        self.host = host
+        self.window = deque(maxlen=window)
+        self.min_requests = min_requests
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self.probe_started = 0.0
+        # Подія зміни стану для запитів, що чекають на пробний запит
+        self._changed: Optional[asyncio.Event] = None
+
+    @property
+    def error_rate(self) -> float:
+        if not self.window:
+            return 0.0
+        return self.window.count(False) / len(self.window)
+
+    def record_success(self):
+        self.window.append(True)
+        if self.state == self.HALF_OPEN:
+            logger.info(f"Запобіжник для {self.host} замкнено")
+            self.state = self.CLOSED
+            self.window.clear()
+            self._notify()
+
+    def record_failure(self):
+        self.window.append(False)
+        if self.state == self.HALF_OPEN:
+            self._open()
+        elif (self.state == self.CLOSED and len(self.window) >= self.min_requests
+              and self.error_rate >= self.error_threshold):
+            self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.trips += 1
+        logger.warning(
+            f"Запобіжник для {self.host} розімкнено (частка помилок {self.error_rate:.0%}), "
+            f"пауза {self.cooldown} с"
+        )
+        self._notify()
+
+    def _notify(self):
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    async def _wait_for_change(self, timeout: float):
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def wait_if_open(self):
+        """Призупиняє виконання, поки запобіжник розімкнений або триває пробний запит"""
+        while self.state != self.CLOSED:
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                remaining = self.cooldown - (now - self.opened_at)
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+                    continue
+                # Цей запит стає пробним
+                self.state = self.HALF_OPEN
+                self.probe_started = now
+                return
+
+            remaining = self.cooldown - (now - self.probe_started)
+            if remaining <= 0:
+                # Пробний запит не повідомив результат - пропускаємо наступний
+                self.probe_started = now
+                return
+            await self._wait_for_change(remaining)
@@ -0,0 +1,67 @@
+from html.parser import HTMLParser
+from typing import List
+
+
+class CarBlockParser(HTMLParser):
+    """
+    Інкрементальний парсер сторінки пошуку
+
+    Отримує HTML частинами через feed() і виділяє з потоку блоки
+    div.content-bar. Кожен завершений блок доступний як окремий фрагмент
+    HTML, тож у пам'яті тримається лише поточний блок, а не вся сторінка.
+    """
+
+    def __init__(self, block_class: str = "content-bar"):
+        super().__init__(convert_charrefs=False)
+        self.block_class = block_class
+        self._depth = 0
+        self._parts: List[str] = []
+        self._blocks: List[str] = []
+
+    def _is_block_start(self, tag: str, attrs) -> bool:
+        if tag != "div":
+            return False
+        for name, value in attrs:
+            if name == "class" and value and self.block_class in value.split():
+                return True
+        return False
+
+    def handle_starttag(self, tag, attrs):
+        if self._depth:
+            self._parts.append(self.get_starttag_text())
+            if tag == "div":
+                self._depth += 1
+        elif self._is_block_start(tag, attrs):
+            self._depth = 1
+            self._parts = [self.get_starttag_text()]
+
+    def handle_startendtag(self, tag, attrs):
+        if self._depth:
+            self._parts.append(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        if not self._depth:
+            return
+        self._parts.append(f"</{tag}>")
+        if tag == "div":
+            self._depth -= 1
+            if self._depth == 0:
+                self._blocks.append("".join(self._parts))
+                self._parts = []
+
+    def handle_data(self, data):
+        if self._depth:
+            self._parts.append(data)
+
+    def handle_entityref(self, name):
+        if self._depth:
+            self._parts.append(f"&{name};")
+
+    def handle_charref(self, name):
+        if self._depth:
+            self._parts.append(f"&#{name};")
+
+    def pop_blocks(self) -> List[str]:
+        """Повертає завершені блоки та очищує внутрішній буфер"""
+        blocks, self._blocks = self._blocks, []
+        return blocks
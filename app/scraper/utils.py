@@ -1,4 +1,6 @@
 import re
+import json
+import hashlib
 from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
 from app.api.models import FuelType, TransmissionType
@@ -131,4 +133,34 @@ def clean_text(text: str) -> str:
     cleaned = re.sub(r'\s+', ' ', text)
     
     # Прибираємо пробіли з початку та кінця рядка
-    return cleaned.strip()
\ No newline at end of file
+    return cleaned.strip()
+
+
+# Поля оголошення, що входять у хеш вмісту (службові дати не враховуються)
+CONTENT_HASH_FIELDS = (
+    "make", "model", "year", "price", "mileage", "engine_type", "engine_volume",
+    "transmission", "drive_type", "location", "image_url", "url",
+)
+
+
+def compute_content_hash(car_data: Dict[str, Any]) -> str:
+    """
+    Обчислює хеш нормалізованих полів оголошення
+    
+    Args:
+        car_data: Дані про автомобіль
+        
+    Returns:
+        Хеш вмісту у шістнадцятковому форматі
+    """
+    normalized = {}
+    for field in CONTENT_HASH_FIELDS:
+        value = car_data.get(field)
+        if isinstance(value, str):
+            value = clean_text(value)
+        elif isinstance(value, float):
+            value = round(value, 3)
+        normalized[field] = value
+    
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
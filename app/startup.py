@@ -0,0 +1,87 @@
+"""
+Швидкий запуск процесу API
+
+Профіль запуску: час імпорту за групами модулів, ініціалізації бази та
+загальний час до готовності приймати запити. Профіль пишеться в лог після
+старту і доступний у /api/v1/metrics.
+
+Важкі підсистеми (скрапер з aiohttp і BeautifulSoup, аналітика з NumPy)
+імпортуються при першому використанні через LazyImport, тож новий процес
+не витрачає на них час, поки вони не потрібні.
+"""
+import importlib
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Tuple
+
+# Модулі, які не повинні завантажуватися при запуску процесу API
+LAZY_MODULES = ("numpy", "pyarrow", "aiohttp", "bs4", "PIL")
+
+
+class LazyImport:
+    """
+    Функція або клас з модуля, що імпортується при першому виклику
+
+    Виклик обгортки передається оригіналу; loaded показує, чи модуль вже імпортований.
+    """
+
+    def __init__(self, module: str, name: str):
+        self.module = module
+        self.name = name
+        self._target = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.module in sys.modules
+
+    def __call__(self, *args, **kwargs):
+        if self._target is None:
+            self._target = getattr(importlib.import_module(self.module), self.name)
+        return self._target(*args, **kwargs)
+
+    def __repr__(self) -> str:
+        return f"<lazy {self.module}.{self.name}>"
+
+
+class StartupProfile:
+    """Тривалість етапів запуску процесу"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[Tuple[str, float]] = []
+        self.ready_after = None
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def ready(self) -> Dict[str, Any]:
+        """Фіксує готовність процесу і повертає профіль"""
+        self.ready_after = time.perf_counter() - self.started
+        return self.as_dict()
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "phases_ms": {name: round(duration * 1000, 1) for name, duration in self.phases},
+            "ready_ms": round(self.ready_after * 1000, 1) if self.ready_after is not None else None,
+            "modules": len(sys.modules),
+            "eager_heavy_modules": [name for name in LAZY_MODULES if name in sys.modules],
+        }
+
+    def summary(self) -> str:
+        """Рядок профілю для логу"""
+        profile = self.as_dict()
+        phases = ", ".join(f"{name} {duration} мс" for name, duration in profile["phases_ms"].items())
+        text = f"Профіль запуску: {phases}; готовий за {profile['ready_ms']} мс, модулів {profile['modules']}"
+        if profile["eager_heavy_modules"]:
+            text += f"; важкі модулі завантажені при запуску: {', '.join(profile['eager_heavy_modules'])}"
+        return text
+
+
+# Профіль поточного процесу; відлік починається з першого імпорту модуля
+startup_profile = StartupProfile()
@@ -4,6 +4,9 @@ let totalPages = 1;
 let currentView = 'grid'; // або 'list'
 let currentFilters = {};
 let currentSort = { sort_by: 'created_at', sort_order: -1 };
+let currentCars = [];
+let totalCount = 0;
+let carEvents = null;
 
 // DOM елементи, до яких будемо звертатися часто
 const carsList = document.getElementById('carsList');
@@ -20,11 +23,11 @@ const startSearchBtn = document.getElementById('startSearch');
 document.addEventListener('DOMContentLoaded', () => {
     console.log('Сторінка завантажена, ініціалізація...');
     
-    // Завантаження автомобілів
+    // Завантаження автомобілів та статистики одним запитом
     loadCars();
     
-    // Завантаження статистики
-    loadStats();
+    // Підписка на нові оголошення та зміни цін
+    subscribeToCarEvents();
     
     // Додаємо обробники подій
     setupEventListeners();
@@ -76,13 +79,13 @@ function setupEventListeners() {
     });
 }
 
-// Завантаження списку автомобілів з API
+// Завантаження списку автомобілів і статистики з API (один запит до /api/v1/dashboard)
 async function loadCars() {
     showLoading();
     
     try {
         // Формуємо URL з параметрами
-        let url = `/api/v1/cars?page=${currentPage}&limit=10&sort_by=${currentSort.sort_by}&sort_order=${currentSort.sort_order}`;
+        let url = `/api/v1/dashboard?page=${currentPage}&limit=10&sort_by=${currentSort.sort_by}&sort_order=${currentSort.sort_order}`;
         
         // Додаємо параметри фільтрації, якщо вони є
         if (currentFilters.make) url += `&make=${encodeURIComponent(currentFilters.make)}`;
@@ -100,8 +103,14 @@ async function loadCars() {
             throw new Error(`HTTP помилка: ${response.status}`);
         }
         
-        const data = await response.json();
-        console.log('Отримано відповідь від API:', data);
+        const dashboard = await response.json();
+        console.log('Отримано відповідь від API:', dashboard);
+        const data = dashboard.cars;
+        currentCars = data.data;
+        totalCount = data.total;
+        
+        // Оновлюємо статистику
+        displayStats(dashboard.stats);
         
         // Зберігаємо дані пагінації
         currentPage = data.page;
@@ -131,26 +140,12 @@ async function loadCars() {
     }
 }
 
-// Завантаження статистики
-async function loadStats() {
-    try {
-        const response = await fetch('/api/v1/cars/stats');
-        
-        if (!response.ok) {
-            throw new Error(`HTTP помилка: ${response.status}`);
-        }
-        
-        const stats = await response.json();
-        
-        // Оновлюємо статистику на сторінці
-        document.getElementById('totalCarsCount').textContent = stats.total_cars;
-        document.getElementById('avgPrice').textContent = '$' + formatNumber(stats.avg_price);
-        document.getElementById('avgYear').textContent = stats.avg_year;
-        document.getElementById('avgMileage').textContent = formatNumber(stats.avg_mileage) + ' км';
-        
-    } catch (error) {
-        console.error('Помилка при завантаженні статистики:', error);
-    }
+// Відображення статистики
+function displayStats(stats) {
+    document.getElementById('totalCarsCount').textContent = stats.total_cars;
+    document.getElementById('avgPrice').textContent = '$' + formatNumber(stats.avg_price);
+    document.getElementById('avgYear').textContent = stats.avg_year;
+    document.getElementById('avgMileage').textContent = formatNumber(stats.avg_mileage) + ' км';
 }
 
 // Відображення автомобілів
@@ -193,7 +188,7 @@ function displayGridView(cars) {
         carCard.innerHTML = `
             <div class="car-card">
                 <div class="car-image-wrapper">
-                    <img src="${car.image_url || 'https://via.placeholder.com/300x200?text=Немає+фото'}" 
+                    <img src="${carImageUrl(car)}" loading="lazy" 
                          class="car-image" alt="${car.make} ${car.model}">
                     <span class="car-year">${car.year}</span>
                 </div>
@@ -249,7 +244,7 @@ function displayListView(cars) {
         carCard.innerHTML = `
             <div class="car-list-item">
                 <a href="${car.url}" target="_blank" class="car-image-container">
-                    <img src="${car.image_url || 'https://via.placeholder.com/300x200?text=Немає+фото'}" 
+                    <img src="${carImageUrl(car)}" loading="lazy" 
                          class="car-image" alt="${car.make} ${car.model}">
                     <div class="car-image-overlay">
                         <i class="fas fa-external-link-alt"></i>
@@ -321,6 +316,7 @@ function applyFilters() {
     
     // Завантажуємо автомобілі з новими фільтрами
     loadCars();
+    subscribeToCarEvents();
 }
 
 // Скидання фільтрів
@@ -337,6 +333,38 @@ function clearFilters() {
     
     // Завантажуємо автомобілі без фільтрів
     loadCars();
+    subscribeToCarEvents();
+}
+
+// Підписка на події про нові автомобілі та зміни цін (Server-Sent Events)
+function subscribeToCarEvents() {
+    if (carEvents) {
+        carEvents.close();
+    }
+    
+    const params = new URLSearchParams(currentFilters);
+    carEvents = new EventSource(`/api/v1/events/cars?${params}`);
+    
+    carEvents.addEventListener('car_created', (e) => {
+        const car = JSON.parse(e.data);
+        totalCount += 1;
+        totalCars.textContent = `Знайдено: ${totalCount}`;
+        
+        // Нові оголошення з'являються на першій сторінці при сортуванні від нових до старих
+        if (currentPage === 1 && currentSort.sort_by === 'created_at' && currentSort.sort_order === -1) {
+            currentCars = [car, ...currentCars.filter(item => item.id !== car.id)].slice(0, 10);
+            displayCars(currentCars);
+        }
+    });
+    
+    carEvents.addEventListener('price_changed', (e) => {
+        const car = JSON.parse(e.data);
+        const index = currentCars.findIndex(item => item.id === car.id);
+        if (index !== -1) {
+            currentCars[index] = { ...currentCars[index], ...car };
+            displayCars(currentCars);
+        }
+    });
 }
 
 // Оновлення пагінації
@@ -435,15 +463,9 @@ async function runScraper() {
         
         const result = await response.json();
         
-        // Показуємо повідомлення про успіх
+        // Показуємо повідомлення про успіх; нові автомобілі з'являться в списку через потік подій
         showMessage(result.message, 'success');
         
-        // Через 5 секунд оновлюємо список автомобілів
-        setTimeout(() => {
-            loadCars();
-            loadStats();
-        }, 5000);
-        
     } catch (error) {
         console.error('Помилка при запуску скрапера:', error);
         showMessage(`Помилка при запуску скрапера: ${error.message}`, 'danger');
@@ -459,7 +481,7 @@ function showCarDetails(car) {
     modalContent.innerHTML = `
         <div class="row">
             <div class="col-md-6">
-                <img src="${car.image_url || 'https://via.placeholder.com/300x200?text=Немає+фото'}" 
+                <img src="${carImageUrl(car, 'medium')}" 
                      class="img-fluid rounded mb-3" alt="${car.make} ${car.model}">
             </div>
             <div class="col-md-6">
@@ -499,6 +521,16 @@ function showCarDetails(car) {
 }
 
 // Допоміжні функції
+// URL мініатюри з локального кешу; content_hash змінюється разом з оголошенням,
+// тож браузер може кешувати мініатюру без повторної перевірки
+function carImageUrl(car, size = 'small') {
+    if (!car.image_url || !car.id) {
+        return 'https://via.placeholder.com/300x200?text=Немає+фото';
+    }
+    const version = car.content_hash ? `&v=${car.content_hash}` : '';
+    return `/api/v1/images/${car.id}?size=${size}${version}`;
+}
+
 function formatNumber(num) {
     return new Intl.NumberFormat('uk-UA').format(num);
 }
@@ -0,0 +1,143 @@
+import pytest
+import asyncio
+import httpx
+from fastapi import FastAPI
+from unittest.mock import patch, MagicMock
+
+from app.db.database import get_database
+from app.main import admission_limiters, app as main_app
+
+from app.middleware.admission import (
+    READ, SCRAPER, SEARCH, WRITE, AdmissionMiddleware, ConcurrencyLimiter, classify_request,
+)
+
+# Тест визначення групи маршруту
+def test_classify_request():
+    def classify(method, path):
+        return classify_request({"method": method, "path": path})
+
+    assert classify("GET", "/health") is None
+    assert classify("GET", "/api/v1/metrics") is None
+    assert classify("GET", "/api/v1/events/cars") is None
+    assert classify("GET", "/static/js/app.js") is None
+    assert classify("GET", "/api/v1/cars") == SEARCH
+    assert classify("GET", "/api/v1/dashboard") == SEARCH
+    assert classify("GET", "/api/v1/cars/make/BMW") == SEARCH
+    assert classify("GET", "/api/v1/cars/search") == SEARCH
+    assert classify("GET", "/api/v1/cars/64a3b5c7890d12e3f456a789") == READ
+    assert classify("POST", "/api/v1/cars") == WRITE
+    assert classify("POST", "/api/v1/cars/batch") == READ
+    assert classify("GET", "/api/v1/cars/batch") == READ
+    assert classify("POST", "/api/v1/price-estimate") == READ
+    assert classify("DELETE", "/api/v1/cars/64a3b5c7890d12e3f456a789") == WRITE
+    assert classify("POST", "/api/v1/scraper/run") == SCRAPER
+    assert classify("GET", "/api/v1/scraper/runs") == READ
+
+# Тест черги обмежувача
+@pytest.mark.asyncio
+async def test_concurrency_limiter_queue():
+    limiter = ConcurrencyLimiter("read", concurrency=1, queue_size=1, queue_timeout=1)
+
+    assert await limiter.acquire()
+    waiting = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.stats()["queued"] == 1
+
+    # Черга заповнена - запит відхиляється одразу
+    assert not await limiter.acquire()
+
+    # Звільнене місце передається першому запиту в черзі
+    limiter.release()
+    assert await waiting
+    assert limiter.stats()["active"] == 1
+    limiter.release()
+    assert limiter.stats() == {
+        "concurrency": 1, "active": 0, "queue_size": 1, "queued": 0,
+        "admitted": 2, "rejected": 1, "timed_out": 0,
+    }
+
+# Тест відхилення після вичерпання часу очікування
+@pytest.mark.asyncio
+async def test_concurrency_limiter_timeout():
+    limiter = ConcurrencyLimiter("search", concurrency=1, queue_size=5, queue_timeout=0.05)
+    assert await limiter.acquire()
+    assert not await limiter.acquire()
+    assert limiter.timed_out == 1
+    assert limiter.stats()["queued"] == 0
+
+    # Відключення клієнта під час очікування не займає місце
+    waiting = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    limiter.release()
+    assert limiter.active == 0
+
+# Тест: перевантажена група відповідає 503, інші групи працюють
+@pytest.mark.asyncio
+async def test_admission_middleware_sheds_load():
+    release = asyncio.Event()
+    app = FastAPI()
+    limiters = {SEARCH: ConcurrencyLimiter(SEARCH, concurrency=1, queue_size=0, queue_timeout=1)}
+    app.add_middleware(AdmissionMiddleware, limiters=limiters, retry_after=3)
+
+    @app.get("/api/v1/cars")
+    async def cars():
+        await release.wait()
+        return {"data": []}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        slow = asyncio.ensure_future(client.get("/api/v1/cars"))
+        await asyncio.sleep(0.05)
+
+        response = await client.get("/api/v1/cars")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "3"
+
+        # Службові маршрути не обмежуються
+        assert (await client.get("/health")).status_code == 200
+
+        release.set()
+        assert (await slow).status_code == 200
+
+    assert limiters[SEARCH].stats()["rejected"] == 1
+    assert limiters[SEARCH].stats()["active"] == 0
+
+# Тест: запуск скрапера не тримає місце в групі допуску, повторний запуск отримує 409
+@pytest.mark.asyncio
+async def test_scraper_run_releases_admission_slot():
+    release = asyncio.Event()
+    runs = []
+
+    async def fake_run(pages, incremental):
+        runs.append(pages)
+        await release.wait()
+
+    main_app.dependency_overrides[get_database] = lambda: MagicMock()
+    try:
+        with patch("app.main.settings.DATABASE_BACKEND", "sqlite"), \
+             patch("app.main.run_scraper_once", fake_run):
+            async with httpx.AsyncClient(app=main_app, base_url="http://test") as client:
+                response = await client.post("/api/v1/scraper/run?pages=2")
+                assert response.status_code == 200
+                await asyncio.sleep(0)
+                assert runs == [2]
+                assert admission_limiters[SCRAPER].stats()["active"] == 0
+
+                # Поки скрапінг триває, новий запуск відхиляється одразу, без очікування в черзі
+                response = await client.post("/api/v1/scraper/run")
+                assert response.status_code == 409
+                assert runs == [2]
+
+                release.set()
+                await main_app.state.scraper
+                assert (await client.post("/api/v1/scraper/run")).status_code == 200
+                await main_app.state.scraper
+                assert runs == [2, 1]
+    finally:
+        main_app.dependency_overrides.clear()
@@ -123,6 +123,62 @@ async def test_get_nonexistent_car(async_client):
     assert response.status_code == 404
     assert "Автомобіль не знайдено" in response.json()["detail"]
 
+# Тест пакетного отримання автомобілів за ID
+@pytest.mark.asyncio
+async def test_get_cars_batch(async_client, test_db):
+    cars = await test_db.cars.find().to_list(2)
+    if not cars:
+        pytest.skip("Немає автомобілів для тестування")
+    
+    car_ids = [str(car["_id"]) for car in cars]
+    missing_id = str(ObjectId())
+    ids = [missing_id] + car_ids
+    
+    response = await async_client.get(f"/api/v1/cars/batch?ids={','.join(ids)}&fields=make,price")
+    assert response.status_code == 200
+    result = response.json()
+    # Результати йдуть у порядку запиту, відсутні позначені явно
+    assert [car["id"] for car in result["data"]] == ids
+    assert result["data"][0] == {"id": missing_id, "found": False}
+    assert set(result["data"][1]) <= {"id", "make", "price"}
+    assert result["missing"] == [missing_id]
+    assert result["found"] == len(car_ids)
+    
+    # POST-варіант для довгих списків
+    response = await async_client.post("/api/v1/cars/batch", json={"ids": car_ids})
+    assert response.status_code == 200
+    assert [car["id"] for car in response.json()["data"]] == car_ids
+
+# Тест пакетного отримання з невалідними ID
+@pytest.mark.asyncio
+async def test_get_cars_batch_invalid_ids(async_client):
+    response = await async_client.get(f"/api/v1/cars/batch?ids={ObjectId()},bad1,bad2")
+    assert response.status_code == 400
+    assert "bad1, bad2" in response.json()["detail"]
+
+# Тест статистики (маршрут не перекривається /api/v1/cars/{car_id})
+@pytest.mark.asyncio
+async def test_get_cars_stats(async_client):
+    response = await async_client.get("/api/v1/cars/stats")
+    assert response.status_code == 200
+    stats = response.json()
+    for key in ("total_cars", "avg_price", "avg_year", "avg_mileage", "popular_makes"):
+        assert key in stats
+
+# Тест агрегованого ендпоінту головної сторінки
+@pytest.mark.asyncio
+async def test_get_dashboard(async_client):
+    response = await async_client.get("/api/v1/dashboard?min_year=2010&limit=5")
+    assert response.status_code == 200
+    dashboard = response.json()
+    assert dashboard["cars"]["limit"] == 5
+    assert len(dashboard["cars"]["data"]) <= 5
+    for car in dashboard["cars"]["data"]:
+        assert car["year"] >= 2010
+    assert "total_cars" in dashboard["stats"]
+    assert set(dashboard["facets"]) == {"make", "year", "engine_type", "transmission"}
+    assert sum(item["count"] for item in dashboard["facets"]["make"]) <= dashboard["cars"]["total"]
+
 # Тест отримання автомобілів за маркою
 @pytest.mark.asyncio
 async def test_get_cars_by_make(async_client):
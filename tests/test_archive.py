@@ -0,0 +1,115 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from app.db.archive import archive_stale, backfill_last_seen, restore_car, stale_query
+from app.scraper.auto_ria import AutoRiaScraper
+
+# Заглушка курсора MongoDB
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def limit(self, *args):
+        return self
+
+    async def to_list(self, length):
+        return self.docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+# Тест умови відбору застарілих оголошень
+def test_stale_query():
+    cutoff = datetime(2024, 1, 1)
+    # Записи без last_seen_at не відбираються ($lt не збігається з відсутнім полем)
+    assert stale_query(cutoff) == {"last_seen_at": {"$lt": cutoff}}
+
+# Тест заповнення last_seen_at для старих записів
+@pytest.mark.asyncio
+async def test_backfill_last_seen():
+    mock_db = MagicMock()
+    mock_db.cars.update_many = AsyncMock(return_value=MagicMock(modified_count=3))
+
+    assert await backfill_last_seen(mock_db) == 3
+
+    query, update = mock_db.cars.update_many.await_args.args
+    assert query == {"last_seen_at": {"$exists": False}}
+    assert update["$set"]["last_seen_at"] > datetime.utcnow() - timedelta(minutes=1)
+
+# Тест перенесення застарілих оголошень в архів
+@pytest.mark.asyncio
+async def test_archive_stale():
+    stale = [{"_id": 1, "url": "a"}, {"_id": 2, "url": "b"}]
+    mock_db = MagicMock()
+    mock_db.cars.find.side_effect = [
+        Cursor(stale),
+        # Оголошення 2 побачили знову між копіюванням і видаленням
+        Cursor([{"_id": 2}]),
+        Cursor([]),
+    ]
+    mock_db.cars.delete_many = AsyncMock(return_value=MagicMock(deleted_count=1))
+    mock_db.cars_archive.bulk_write = AsyncMock()
+    mock_db.cars_archive.delete_many = AsyncMock()
+
+    assert await archive_stale(mock_db, max_age_days=30) == 1
+
+    copies = mock_db.cars_archive.bulk_write.await_args.args[0]
+    assert [copy._doc["_id"] for copy in copies] == [1, 2]
+    assert "archived_at" in copies[0]._doc
+    # Видалення з cars повторно перевіряє, що оголошення досі застаріле
+    delete_filter = mock_db.cars.delete_many.await_args.args[0]
+    assert delete_filter["_id"] == {"$in": [1, 2]}
+    assert delete_filter["last_seen_at"]["$lt"] < datetime.utcnow() - timedelta(days=29)
+    # Копія знову актуального оголошення прибирається з архіву
+    mock_db.cars_archive.delete_many.assert_awaited_once_with({"_id": {"$in": [2]}})
+
+# Тест повернення оголошення з архіву
+@pytest.mark.asyncio
+async def test_restore_car():
+    mock_db = MagicMock()
+    mock_db.cars_archive.find_one = AsyncMock(return_value={"_id": 7, "url": "a", "archived_at": datetime(2024, 1, 1)})
+    mock_db.cars_archive.delete_one = AsyncMock()
+    mock_db.cars.replace_one = AsyncMock()
+
+    with patch("app.db.archive.notify_upserted") as notify, \
+         patch("app.db.archive.decode_car", side_effect=lambda car: {**car, "decoded": True}):
+        car = await restore_car(mock_db, "a")
+
+    # Індекси в пам'яті отримують розкодований документ
+    assert notify.call_args.args[0][0]["decoded"] is True
+
+    restored = mock_db.cars.replace_one.await_args.args[1]
+    assert "archived_at" not in restored
+    assert "last_seen_at" in restored
+    mock_db.cars_archive.delete_one.assert_awaited_once_with({"_id": 7})
+    assert car["_id"] == 7
+
+    mock_db.cars_archive.find_one.return_value = None
+    assert await restore_car(mock_db, "b") is None
+
+# Тест: оголошення, що повернулось у видачу, відновлюється з архіву з тим самим ID
+@pytest.mark.asyncio
+async def test_scraper_restores_archived_car():
+    scraper = AutoRiaScraper()
+    car_data = {"make": "BMW", "model": "X5", "year": 2020, "price": 45000, "url": "https://auto.ria.com/uk/auto_1.html"}
+    archived = {"_id": "old_id", **car_data, "price": 50000, "content_hash": "old"}
+
+    mock_db = MagicMock()
+    mock_db.cars.find_one = AsyncMock(return_value=None)
+    mock_db.cars.replace_one = AsyncMock()
+    mock_db.cars.update_one = AsyncMock(return_value=MagicMock(modified_count=1))
+    mock_db.cars_archive.find_one = AsyncMock(return_value=archived)
+    mock_db.cars_archive.delete_one = AsyncMock()
+    mock_db.price_history = AsyncMock()
+
+    with patch.object(scraper, '_get_db', return_value=mock_db):
+        assert await scraper._save_car_to_db(dict(car_data)) is True
+
+    mock_db.cars.insert_one.assert_not_called()
+    assert mock_db.cars.update_one.await_args.args[0] == {"_id": "old_id"}
+    assert "last_seen_at" in mock_db.cars.update_one.await_args.args[1]["$set"]
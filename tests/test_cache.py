@@ -0,0 +1,149 @@
+import pytest
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.scraper.auto_ria import AutoRiaScraper
+from app.scraper.cache import PageCache
+
+# Фікстура для створення кешу в тимчасовій директорії
+@pytest.fixture
+def page_cache(tmp_path):
+    return PageCache(str(tmp_path / "pages"), max_age=3600, max_bytes=10 * 1024 * 1024)
+
+# Тестова сторінка пошуку
+@pytest.fixture
+def sample_html():
+    return """
+    <div class="content-bar">
+        <a class="m-link-ticket" href="https://auto.ria.com/uk/auto_bmw_x5_123.html"></a>
+        <div class="head-ticket">
+            <span class="blue bold">BMW X5</span>
+            2020
+        </div>
+        <div class="price-ticket" data-main-price="50000">50 000 $</div>
+        <div class="definition-data">3.0 дизель • 25 тис. км • автомат • повний</div>
+        <div class="region">Київ</div>
+    </div>
+    """
+
+# Тест збереження та читання сторінки з кешу
+def test_cache_store_and_get(page_cache):
+    url = "https://auto.ria.com/uk/legkovie/?page=1"
+    assert page_cache.get(url) is None
+
+    changed = page_cache.store(url, "<html>test</html>", etag='"abc"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+    assert changed is True
+
+    entry = page_cache.get(url)
+    assert entry["body"] == "<html>test</html>"
+    assert page_cache.is_fresh(entry)
+    assert page_cache.conditional_headers(entry) == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+    }
+
+    # Повторне збереження того ж вмісту не вважається зміною, розібрані дані зберігаються
+    page_cache.store_parsed(url, [{"make": "BMW"}])
+    assert page_cache.store(url, "<html>test</html>") is False
+    assert page_cache.get_parsed(url) == [{"make": "BMW"}]
+
+    # Зміна вмісту скидає розібрані дані
+    assert page_cache.store(url, "<html>changed</html>") is True
+    assert page_cache.get_parsed(url) is None
+
+# Тест застарівання запису
+def test_cache_max_age(tmp_path):
+    cache = PageCache(str(tmp_path), max_age=10)
+    cache.store("https://example.com/", "body")
+    entry = cache.get("https://example.com/")
+    assert cache.is_fresh(entry)
+
+    entry["fetched_at"] = time.time() - 11
+    assert not cache.is_fresh(entry)
+
+# Тест витіснення записів при перевищенні ліміту розміру
+def test_cache_eviction(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=20 * 1024)
+    for i in range(20):
+        # Випадковий вміст погано стискається, тож кожен запис займає кілька КБ
+        cache.store(f"https://example.com/{i}", os.urandom(2048).hex())
+
+    total = sum(entry[1] for entry in cache._scan())
+    assert total <= 20 * 1024
+    # Останній записаний запис залишається в кеші
+    assert cache.get("https://example.com/19") is not None
+
+# Тест: паралельні записи з кількох потоків не розсинхронізують розмір кешу
+def test_cache_concurrent_store(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=40 * 1024)
+
+    def store(i):
+        url = f"https://example.com/{i % 10}"
+        cache.store(url, os.urandom(2048).hex())
+        cache.store_parsed(url, [{"index": i}])
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(store, range(200)))
+
+    assert cache._size == sum(entry[1] for entry in cache._scan())
+    assert cache._size <= 40 * 1024
+
+# Тест повторної валідації сторінки через ETag
+@pytest.mark.asyncio
+async def test_fetch_page_revalidation(page_cache):
+    requests_seen = []
+
+    async def handler(request):
+        requests_seen.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return web.Response(status=304, headers={"ETag": '"v1"'})
+        return web.Response(text="<html>page</html>", content_type="text/html", headers={"ETag": '"v1"'})
+
+    app = web.Application()
+    app.router.add_get("/", handler)
+
+    async with TestServer(app) as server:
+        url = str(server.make_url("/"))
+        scraper = AutoRiaScraper(cache=page_cache)
+        try:
+            assert await scraper._fetch_page(url) == "<html>page</html>"
+            assert url not in scraper._not_modified
+
+            # Свіжий запис віддається без звернення до мережі
+            assert await scraper._fetch_page(url) == "<html>page</html>"
+            assert len(requests_seen) == 1
+
+            # Застарілий запис перевіряється умовним запитом
+            page_cache.max_age = 0
+            assert await scraper._fetch_page(url) == "<html>page</html>"
+            assert requests_seen == [None, '"v1"']
+            assert url in scraper._not_modified
+        finally:
+            await scraper._close_session()
+
+# Тест режиму відтворення: незмінена сторінка не розбирається повторно
+@pytest.mark.asyncio
+async def test_replay_skips_parsing(page_cache, sample_html):
+    scraper = AutoRiaScraper(cache=page_cache)
+    url = f"{scraper.base_url}?page=1"
+    page_cache.store(url, sample_html)
+    page_cache.replay = True
+
+    # Перший прохід розбирає сторінку з кешу та зберігає результат
+    car_items = await scraper._get_car_links(1)
+    assert len(car_items) == 1
+    assert car_items[0]["make"] == "BMW"
+
+    # Другий прохід не викликає парсер взагалі
+    with patch("app.scraper.auto_ria.BeautifulSoup") as mock_soup:
+        cached_items = await scraper._get_car_links(1)
+        mock_soup.assert_not_called()
+    assert cached_items == car_items
+
+    # Сторінки, якої немає в кеші, в режимі відтворення немає
+    assert await scraper._fetch_page(f"{scraper.base_url}?page=2") is None
+    assert scraper.session is None
@@ -0,0 +1,181 @@
+import pytest
+import random
+import httpx
+from bson import ObjectId
+from datetime import datetime, timedelta
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from app.analytics.columnar import ColumnarCatalog
+from app.db import changes
+from app.db.compact import encode_car
+from app.db.database import get_database
+from app.main import app, build_cars_query
+
+MAKES = ["BMW", "Audi", "Skoda", "Mercedes-Benz"]
+
+# Випадковий каталог, зокрема з відсутніми значеннями
+def make_catalog(count=300, seed=1):
+    rng = random.Random(seed)
+    cars = []
+    for i in range(count):
+        car = {
+            "_id": f"{i:024x}",
+            "make": rng.choice(MAKES),
+            "price": rng.randint(5, 60) * 1000,
+            "year": rng.randint(2000, 2023),
+            "mileage": rng.randint(0, 300) * 1000,
+            "engine_type": rng.choice(["бензин", "дизель", "газ"]),
+            "transmission": rng.choice(["механіка", "автомат"]),
+            "created_at": datetime(2024, 1, 1) + timedelta(minutes=i),
+        }
+        if i % 17 == 0:
+            del car["mileage"]
+        cars.append(car)
+    return cars
+
+# Еталонна реалізація запиту (як у MongoDB) для порівняння
+def reference(cars, predicate, sort_by, sort_order, skip, limit):
+    matched = [car for car in cars if predicate(car)]
+    # Відсутні значення менші за будь-яке число
+    matched.sort(key=lambda car: (sort_by in car, car.get(sort_by, 0)), reverse=sort_order < 0)
+    keys = [(car.get(sort_by) if sort_by in car else None) for car in matched[skip:skip + limit]]
+    return len(matched), keys
+
+def page_keys(catalog, cars, ids, sort_by):
+    by_id = {car["_id"]: car for car in cars}
+    return [by_id[car_id].get(sort_by) for car_id in ids]
+
+# Тест: фільтри, сортування, сторінки та кількість збігаються з еталоном
+@pytest.mark.parametrize("sort_by,sort_order", [("price", 1), ("price", -1), ("mileage", 1), ("created_at", -1)])
+def test_query_matches_reference(sort_by, sort_order):
+    cars = make_catalog()
+    catalog = ColumnarCatalog()
+    catalog.build(cars)
+
+    query = build_cars_query(min_price=10000, max_price=40000, min_year=2005, make="b", max_mileage=250000)
+    def predicate(car):
+        return (10000 <= car["price"] <= 40000 and car["year"] >= 2005 and "b" in car["make"].lower()
+                and car.get("mileage") is not None and car["mileage"] <= 250000)
+
+    total, ids = catalog.query(query, sort_by, sort_order, 5, 20)
+    expected_total, expected_keys = reference(cars, predicate, sort_by, sort_order, 5, 20)
+    assert total == expected_total
+    assert page_keys(catalog, cars, ids, sort_by) == expected_keys
+
+# Тест: відсутні значення сортуються як null у MongoDB
+def test_missing_values_sort_first():
+    cars = make_catalog(40)
+    catalog = ColumnarCatalog()
+    catalog.build(cars)
+
+    total, ids = catalog.query({}, "mileage", 1, 0, 3)
+    assert total == 40
+    assert page_keys(catalog, cars, ids, "mileage") == [None, None, None]
+    _, ids = catalog.query({}, "mileage", -1, 0, 1)
+    assert page_keys(catalog, cars, ids, "mileage")[0] == max(car.get("mileage", 0) for car in cars)
+
+# Тест: зміни після побудови перестановок враховуються без повної перебудови
+def test_upsert_and_remove():
+    cars = make_catalog(200)
+    catalog = ColumnarCatalog()
+    catalog.build(cars)
+    catalog.query({}, "price", 1, 0, 1)
+
+    cheapest = {**cars[10], "price": 1}
+    new_car = {**cars[0], "_id": "new", "price": 2, "make": "Tesla"}
+    catalog.upsert([cheapest, new_car])
+    catalog.remove([cars[20]["_id"]])
+
+    total, ids = catalog.query({}, "price", 1, 0, 2)
+    assert total == 200
+    assert ids == [cars[10]["_id"], "new"]
+    assert catalog.query({"make": {"$regex": "tes", "$options": "i"}}, "price", 1, 0, 10) == (1, ["new"])
+    assert cars[20]["_id"] not in catalog.query({}, "price", 1, 0, 300)[1]
+
+    # Змінені рядки вливаються в перестановку в правильному місці
+    updated = [{**car, "price": car["price"] + 500} for car in cars[30:60]]
+    catalog.upsert(updated)
+    _, ids = catalog.query({}, "price", -1, 0, 300)
+    prices = {car["_id"]: car["price"] for car in cars + updated + [cheapest, new_car]}
+    ordered = [prices[car_id] for car_id in ids]
+    assert ordered == sorted(ordered, reverse=True)
+
+# Тест: непідтримувані запити виконує MongoDB
+def test_unsupported_queries():
+    catalog = ColumnarCatalog()
+    assert catalog.query({}, "price", 1, 0, 10) is None
+
+    catalog.build(make_catalog(10))
+    assert catalog.query({}, "model", 1, 0, 10) is None
+    assert catalog.query(build_cars_query(near="Львів"), "price", 1, 0, 10) is None
+    assert catalog.query({"make": {"$regex": "(", "$options": "i"}}, "price", 1, 0, 10) is None
+    assert catalog.query({"price": {"$ne": 1}}, "price", 1, 0, 10) is None
+    assert catalog.fallbacks == 5
+
+# Тест: документи в компактній формі та фільтри за обома формами значень
+def test_compact_values():
+    cars = make_catalog(50)
+    catalog = ColumnarCatalog()
+    catalog.build([encode_car(car, enabled=True) for car in cars])
+
+    with patch("app.db.compact.settings.COMPACT_STORAGE", True):
+        query = build_cars_query(engine_type="дизель", transmission="автомат")
+    assert query["engine_type"] == {"$in": ["дизель", 2]}
+
+    total, _ = catalog.query(query, "price", 1, 0, 10)
+    assert total == sum(1 for car in cars if car["engine_type"] == "дизель" and car["transmission"] == "автомат")
+
+# Тест: каталог отримує сповіщення про зміни
+def test_change_notifications():
+    catalog = ColumnarCatalog()
+    catalog.build(make_catalog(5))
+    changes.add_listener(catalog)
+    try:
+        changes.notify_upserted([{"_id": "new", "price": 1, "make": "BMW"}])
+        changes.notify_removed(["new"])
+        changes.notify_upserted([{"_id": "other", "price": 2, "make": "Audi"}])
+    finally:
+        changes.remove_listener(catalog)
+
+    assert catalog.query({}, "price", 1, 0, 1) == (6, ["other"])
+
+# Заглушка курсора MongoDB
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+# Тест: список автомобілів з колонкового каталогу без підрахунку в MongoDB
+@pytest.mark.asyncio
+async def test_list_served_from_catalog():
+    cars = [{"_id": ObjectId(), "make": "BMW", "model": "X5", "price": price, "year": 2020} for price in (30000, 10000, 20000)]
+    catalog = ColumnarCatalog()
+    catalog.build(cars)
+    expected = [str(cars[1]["_id"]), str(cars[2]["_id"])]
+
+    mock_db = MagicMock()
+    mock_db.cars.find.return_value = Cursor([dict(car) for car in cars])
+    mock_db.cars.count_documents = AsyncMock()
+
+    app.dependency_overrides[get_database] = lambda: mock_db
+    try:
+        with patch("app.main.settings.COLUMNAR_ENABLED", True), \
+             patch("app.main.get_columnar_catalog", return_value=catalog):
+            async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                response = await client.get("/api/v1/cars", params={"sort_by": "price", "sort_order": 1, "limit": 2})
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 3
+    assert body["total_pages"] == 2
+    assert [car["id"] for car in body["data"]] == expected
+    mock_db.cars.count_documents.assert_not_called()
+    assert mock_db.cars.find.call_args[0][0] == {"_id": {"$in": [ObjectId(car_id) for car_id in expected]}}
@@ -0,0 +1,134 @@
+import pytest
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from app.db.compact import (
+    decode_car, decode_url, encode_car, encode_url, migrate, url_filter, url_variants,
+)
+
+# Тестовий автомобіль у звичайній формі
+def make_car(**fields):
+    car = {
+        "make": "BMW",
+        "model": "X5",
+        "engine_type": "гібрид плагін",
+        "transmission": "механіка",
+        "drive_type": "повний",
+        "image_url": "https://cdn.riastatic.com/photosnew/auto/photo/bmw_x5__123f.jpg",
+        "url": "https://auto.ria.com/uk/auto_bmw_x5_123.html",
+    }
+    car.update(fields)
+    return car
+
+# Заглушка курсора MongoDB
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+# Тест стиснення та відновлення документа
+def test_encode_decode_roundtrip():
+    car = make_car()
+    compact = encode_car(car, enabled=True)
+
+    assert compact["engine_type"] == 6
+    assert compact["transmission"] == 1
+    assert compact["drive_type"] == 3
+    assert compact["url"] == "~abmw_x5_123.html"
+    assert compact["image_url"] == "~cbmw_x5__123f.jpg"
+    assert compact["make"] == "BMW"
+    # Вхідний документ не змінюється
+    assert car == make_car()
+
+    assert decode_car(compact) == make_car()
+
+# Тест: невідомі значення та URL зберігаються як є
+def test_unknown_values_kept():
+    car = make_car(engine_type="водень", url="https://example.com/car/1")
+    compact = encode_car(car, enabled=True)
+    assert compact["engine_type"] == "водень"
+    assert compact["url"] == "https://example.com/car/1"
+    assert decode_car(compact) == car
+
+    # Вимкнене стиснення повертає копію без змін
+    assert encode_car(car, enabled=False) == car
+
+# Тест: найдовший префікс URL має пріоритет
+def test_url_prefix_priority():
+    assert encode_url("https://auto.ria.com/uk/auto_x.html") == "~ax.html"
+    assert encode_url("https://auto.ria.com/auto_x.html") == "~bx.html"
+    assert encode_url("https://auto.ria.com/news/") == "~enews/"
+    assert decode_url("~enews/") == "https://auto.ria.com/news/"
+    assert decode_url(None) is None
+
+# Тест умов пошуку за URL під час міграції
+def test_url_filter():
+    url = "https://auto.ria.com/uk/auto_bmw_x5_123.html"
+    with patch("app.db.compact.settings.COMPACT_STORAGE", False):
+        assert url_filter(url) == url
+        assert url_variants([url]) == [url]
+    with patch("app.db.compact.settings.COMPACT_STORAGE", True):
+        assert url_filter(url) == {"$in": [url, "~abmw_x5_123.html"]}
+        assert url_variants([url]) == [url, "~abmw_x5_123.html"]
+
+# Тест онлайн-міграції
+@pytest.mark.asyncio
+async def test_migrate():
+    already_compact = {"_id": 2, **encode_car(make_car(url="https://auto.ria.com/uk/auto_2.html"), enabled=True)}
+    mock_db = MagicMock()
+    mock_db.cars.find.return_value = Cursor([{"_id": 1, **make_car()}, already_compact])
+    mock_db.cars.bulk_write = AsyncMock(return_value=MagicMock(modified_count=1))
+
+    assert await migrate(mock_db, compact=True) == 1
+
+    operations = mock_db.cars.bulk_write.await_args.args[0]
+    assert len(operations) == 1
+    # Оновлення застосовується лише якщо документ не змінився після читання
+    assert operations[0]._filter["_id"] == 1
+    assert operations[0]._filter["engine_type"] == "гібрид плагін"
+    assert operations[0]._doc["$set"]["engine_type"] == 6
+    assert operations[0]._doc["$set"]["url"] == "~abmw_x5_123.html"
+    assert "make" not in operations[0]._doc["$set"]
+
+    # Зворотна міграція
+    mock_db.cars.find.return_value = Cursor([already_compact])
+    assert await migrate(mock_db, compact=False) == 1
+    operations = mock_db.cars.bulk_write.await_args.args[0]
+    assert operations[0]._doc["$set"]["url"] == "https://auto.ria.com/uk/auto_2.html"
+
+# Тест: скрапер записує компактну форму, а події містять звичайні значення
+@pytest.mark.asyncio
+async def test_scraper_writes_compact_documents():
+    from app.events.broker import EventBroker
+    from app.scraper.auto_ria import AutoRiaScraper
+
+    scraper = AutoRiaScraper()
+    broker = EventBroker()
+    subscription = broker.subscribe()
+    mock_db = MagicMock()
+    mock_db.cars.find_one = AsyncMock(return_value=None)
+    mock_db.cars.insert_one = AsyncMock(return_value=MagicMock(inserted_id="new_id"))
+    mock_db.cars_archive.find_one = AsyncMock(return_value=None)
+    mock_db.price_history = AsyncMock()
+
+    with patch("app.db.compact.settings.COMPACT_STORAGE", True), \
+         patch.object(scraper, '_get_db', return_value=mock_db), \
+         patch("app.scraper.auto_ria.get_event_broker", return_value=broker):
+        assert await scraper._save_car_to_db(make_car(year=2020, price=50000)) is True
+
+    stored = mock_db.cars.insert_one.call_args[0][0]
+    assert stored["transmission"] == 1
+    assert stored["url"] == "~abmw_x5_123.html"
+    assert mock_db.cars.find_one.call_args[0][0]["url"]["$in"][1] == "~abmw_x5_123.html"
+
+    event = await subscription.get()
+    assert event["data"]["id"] == "new_id"
+    assert event["data"]["transmission"] == "механіка"
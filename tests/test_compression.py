@@ -0,0 +1,110 @@
+import pytest
+import gzip
+import json
+import zstandard
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.middleware.compression import CompressionMiddleware, CompressionStats
+
+CARS = [{"make": "BMW", "model": f"X{i}", "year": 2020, "price": 50000 + i} for i in range(100)]
+
+# Фікстура для тестового додатку з middleware стиснення
+@pytest.fixture
+def stats():
+    return CompressionStats()
+
+@pytest.fixture
+def client(stats):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500, stats=stats)
+
+    @app.get("/cars")
+    async def cars():
+        return {"data": CARS}
+
+    @app.get("/small")
+    async def small():
+        return {"status": "ok"}
+
+    @app.get("/export")
+    async def export():
+        async def rows():
+            for car in CARS:
+                yield json.dumps(car) + "\n"
+        return StreamingResponse(rows(), media_type="application/x-ndjson; charset=utf-8")
+
+    @app.get("/events")
+    async def events():
+        return Response("data: 1\n\n" * 200, media_type="text/event-stream")
+
+    @app.get("/not-modified")
+    async def not_modified():
+        return Response(status_code=304)
+
+    @app.get("/precompressed")
+    async def precompressed():
+        body = gzip.compress(json.dumps(CARS).encode())
+        return Response(body, media_type="application/json", headers={"Content-Encoding": "gzip"})
+
+    return TestClient(app)
+
+# Тест вибору кодування за Accept-Encoding
+def test_choose_encoding():
+    middleware = CompressionMiddleware(None)
+    assert middleware.choose_encoding("gzip, deflate, br, zstd") == "zstd"
+    assert middleware.choose_encoding("gzip, br") == "br"
+    assert middleware.choose_encoding("gzip") == "gzip"
+    assert middleware.choose_encoding("br;q=0, gzip") == "gzip"
+    assert middleware.choose_encoding("identity") is None
+
+# Тест стиснення JSON-відповіді
+def test_compress_json_response(client, stats):
+    expected = {"data": CARS}
+
+    response = client.get("/cars", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json() == expected
+
+    response = client.get("/cars", headers={"Accept-Encoding": "zstd"}, stream=True)
+    assert response.headers["content-encoding"] == "zstd"
+    raw = response.raw.read()
+    assert int(response.headers["content-length"]) == len(raw)
+    assert json.loads(zstandard.ZstdDecompressor().decompressobj().decompress(raw)) == expected
+
+    metrics = stats.as_dict()
+    assert metrics["encodings"]["gzip"]["responses"] == 1
+    assert metrics["encodings"]["gzip"]["ratio"] > 2
+
+# Тест потокового стиснення
+def test_compress_streaming_response(client):
+    response = client.get("/export", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    lines = response.text.splitlines()
+    assert [json.loads(line) for line in lines] == CARS
+
+# Тест відповідей, що не стискаються
+def test_skip_uncompressible_responses(client, stats):
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+    response = client.get("/events", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+    response = client.get("/not-modified", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 304
+    assert "content-encoding" not in response.headers
+
+    response = client.get("/cars", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+
+    # Вже стиснута відповідь не стискається повторно
+    response = client.get("/precompressed", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json() == CARS
+
+    assert stats.as_dict()["encodings"] == {}
+    assert stats.skipped == 4
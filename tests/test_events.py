@@ -0,0 +1,114 @@
+import pytest
+import asyncio
+import json
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from app.events.broker import CAR_CREATED, PRICE_CHANGED, EventBroker, car_payload
+from app.events.sse import event_stream, format_event
+from app.scraper.auto_ria import AutoRiaScraper
+
+# Тестовий автомобіль
+def make_car(**fields):
+    car = {"make": "BMW", "model": "X5", "year": 2020, "price": 50000, "url": "https://auto.ria.com/uk/auto_1.html"}
+    car.update(fields)
+    return car
+
+# Заглушка запиту, що ніколи не відключається
+class ConnectedRequest:
+    async def is_disconnected(self):
+        return False
+
+# Тест фільтрів підписників
+@pytest.mark.asyncio
+async def test_broker_filters():
+    broker = EventBroker()
+    all_cars = broker.subscribe()
+    bmw = broker.subscribe({"make": "bmw", "max_price": 40000})
+    recent = broker.subscribe({"min_year": 2021, "make": None})
+
+    broker.publish(CAR_CREATED, make_car(price=30000))
+    broker.publish(CAR_CREATED, make_car(make="Audi", year=2022))
+
+    assert all_cars.queue.qsize() == 2
+    assert bmw.queue.qsize() == 1
+    assert (await bmw.get())["data"]["price"] == 30000
+    assert recent.queue.qsize() == 1
+    assert (await recent.get())["data"]["make"] == "Audi"
+
+    # Відписані клієнти більше не отримують подій
+    async with bmw:
+        pass
+    assert broker.stats()["subscribers"] == 2
+
+# Тест: повільний клієнт втрачає найстаріші події, не блокуючи видавця
+@pytest.mark.asyncio
+async def test_broker_drops_oldest_events():
+    broker = EventBroker(queue_size=3)
+    subscription = broker.subscribe()
+
+    for price in range(5):
+        broker.publish(PRICE_CHANGED, make_car(price=price))
+
+    event = await subscription.get()
+    assert event["data"]["price"] == 2
+    assert event["dropped"] == 2
+    assert "dropped" not in await subscription.get()
+    assert broker.stats() == {"subscribers": 1, "published": 5, "dropped": 2}
+
+# Тест форматування подій Server-Sent Events
+def test_format_event():
+    data = car_payload({"_id": "abc", "make": "BMW", "price": 1}, old_price=2)
+    message = format_event({"id": 7, "type": PRICE_CHANGED, "data": data})
+    lines = message.split("\n")
+    assert lines[0] == "id: 7"
+    assert lines[1] == "event: price_changed"
+    assert json.loads(lines[2][len("data: "):]) == {"id": "abc", "make": "BMW", "price": 1, "old_price": 2}
+    assert message.endswith("\n\n")
+
+# Тест потоку подій для клієнта
+@pytest.mark.asyncio
+async def test_event_stream():
+    broker = EventBroker()
+    subscription = broker.subscribe()
+    stream = event_stream(subscription, ConnectedRequest(), heartbeat=0.05)
+
+    assert (await stream.__anext__()).startswith("retry:")
+    # Без подій надсилається службовий коментар
+    assert await stream.__anext__() == ": ping\n\n"
+
+    broker.publish(CAR_CREATED, make_car())
+    assert (await stream.__anext__()).startswith("id: 1\nevent: car_created\n")
+
+    await stream.aclose()
+    assert broker.stats()["subscribers"] == 0
+
+# Тест публікації подій при збереженні автомобіля скрапером
+@pytest.mark.asyncio
+async def test_scraper_publishes_events():
+    scraper = AutoRiaScraper()
+    broker = EventBroker()
+    subscription = broker.subscribe()
+
+    mock_db = MagicMock()
+    mock_db.cars = AsyncMock()
+    mock_db.cars.find_one = AsyncMock(return_value=None)
+    mock_db.cars_archive.find_one = AsyncMock(return_value=None)
+    mock_db.cars.insert_one = AsyncMock(return_value=MagicMock(inserted_id="new_id"))
+    mock_db.price_history = AsyncMock()
+
+    with patch.object(scraper, '_get_db', return_value=mock_db), \
+         patch("app.scraper.auto_ria.get_event_broker", return_value=broker):
+        assert await scraper._save_car_to_db(make_car()) is True
+        event = await asyncio.wait_for(subscription.get(), 1)
+        assert event["type"] == CAR_CREATED
+        assert event["data"]["model"] == "X5"
+
+        # Зміна ціни відомого автомобіля
+        mock_db.cars.find_one.return_value = {"_id": "new_id", **make_car(), "content_hash": "old"}
+        mock_db.cars.update_one = AsyncMock(return_value=MagicMock(modified_count=1))
+        await scraper._save_car_to_db(make_car(price=45000))
+        event = await asyncio.wait_for(subscription.get(), 1)
+        assert event["type"] == PRICE_CHANGED
+        assert event["data"]["id"] == "new_id"
+        assert event["data"]["price"] == 45000
+        assert event["data"]["old_price"] == 50000
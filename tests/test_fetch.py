@@ -0,0 +1,292 @@
+import pytest
+import asyncio
+import time
+from unittest.mock import patch
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from app.scraper.auto_ria import AutoRiaScraper, PageFetchError
+from app.scraper.resilience import CircuitBreaker, backoff_delay, parse_retry_after
+from app.scraper.metrics import Histogram
+
+# Фікстура для скрапера без кешу та з короткими затримками
+@pytest.fixture
+def scraper():
+    with patch("app.scraper.auto_ria.settings.SCRAPER_CACHE_ENABLED", False), \
+         patch("app.scraper.auto_ria.settings.SCRAPER_RETRY_BASE_DELAY", 0.01), \
+         patch("app.scraper.auto_ria.settings.SCRAPER_RETRY_MAX_DELAY", 0.05), \
+         patch("app.scraper.auto_ria.settings.SCRAPER_BREAKER_COOLDOWN", 0.2):
+        yield AutoRiaScraper()
+
+# Запуск локального сервера, що імітує auto.ria.com
+async def start_server(handler):
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+# Тест парсингу заголовка Retry-After
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after("not a date") is None
+    assert parse_retry_after("Mon, 01 Jan 2001 00:00:00 GMT") == 0.0
+
+# Тест експоненційної затримки з джитером
+def test_backoff_delay():
+    for attempt in range(5):
+        delay = backoff_delay(attempt, base=1.0, cap=10.0)
+        assert 0 <= delay <= min(10.0, 2 ** attempt)
+
+    # Retry-After задає мінімальну затримку, але не більше за cap
+    assert backoff_delay(0, base=0.1, cap=10.0, retry_after=3) >= 3
+    assert backoff_delay(0, base=0.1, cap=2.0, retry_after=60) <= 2.0
+
+# Тест повторних спроб після тимчасових помилок
+@pytest.mark.asyncio
+async def test_fetch_page_retries_transient_errors(scraper):
+    calls = []
+
+    async def handler(request):
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            return web.Response(status=503, headers={"Retry-After": "0"})
+        return web.Response(text="<html>ok</html>", content_type="text/html")
+
+    server = await start_server(handler)
+    try:
+        html = await scraper._fetch_page(str(server.make_url("/page")))
+        assert html == "<html>ok</html>"
+        assert len(calls) == 3
+    finally:
+        await scraper._close_session()
+        await server.close()
+
+# Тест: сторінка декодується за кодуванням з Content-Type
+@pytest.mark.asyncio
+async def test_fetch_page_decodes_charset(scraper):
+    page = "<html>Київ, автомат</html>"
+
+    async def handler(request):
+        return web.Response(body=page.encode("cp1251"), headers={"Content-Type": "text/html; charset=windows-1251"})
+
+    server = await start_server(handler)
+    try:
+        assert await scraper._fetch_page(str(server.make_url("/page"))) == page
+        assert scraper.metrics.bytes_downloaded == len(page.encode("cp1251"))
+    finally:
+        await scraper._close_session()
+        await server.close()
+
+# Тест: помилки клієнта (404) не повторюються
+@pytest.mark.asyncio
+async def test_fetch_page_does_not_retry_client_errors(scraper):
+    calls = []
+
+    async def handler(request):
+        calls.append(request.path)
+        return web.Response(status=404)
+
+    server = await start_server(handler)
+    try:
+        assert await scraper._fetch_page(str(server.make_url("/missing"))) is None
+        assert len(calls) == 1
+    finally:
+        await scraper._close_session()
+        await server.close()
+
+# Тест: сторінка пропускається після вичерпання спроб
+@pytest.mark.asyncio
+async def test_fetch_page_gives_up(scraper):
+    calls = []
+
+    async def handler(request):
+        calls.append(request.path)
+        return web.Response(status=500)
+
+    server = await start_server(handler)
+    try:
+        with patch("app.scraper.auto_ria.settings.SCRAPER_MAX_RETRIES", 2), \
+             patch("app.scraper.auto_ria.settings.SCRAPER_BREAKER_MIN_REQUESTS", 100):
+            assert await scraper._fetch_page(str(server.make_url("/broken"))) is None
+        assert len(calls) == 3
+    finally:
+        await scraper._close_session()
+        await server.close()
+
+# Тест роботи запобіжника
+@pytest.mark.asyncio
+async def test_circuit_breaker_pauses_requests():
+    breaker = CircuitBreaker("auto.ria.com", window=10, min_requests=4, error_threshold=0.5, cooldown=0.2)
+
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.trips == 1
+
+    # Розімкнений запобіжник призупиняє запити до кінця паузи
+    started = time.monotonic()
+    await breaker.wait_if_open()
+    assert time.monotonic() - started >= 0.15
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    # Невдала пробна спроба знову розмикає запобіжник, успішна - замикає
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    await breaker.wait_if_open()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+# Тест: після паузи проходить лише один пробний запит, решта чекають на його результат
+@pytest.mark.asyncio
+async def test_circuit_breaker_single_probe():
+    breaker = CircuitBreaker("auto.ria.com", window=10, min_requests=1, error_threshold=0.5, cooldown=0.1)
+    breaker.record_failure()
+    passed = []
+
+    async def request(i):
+        await breaker.wait_if_open()
+        passed.append(i)
+
+    tasks = [asyncio.ensure_future(request(i)) for i in range(5)]
+    await asyncio.sleep(0.15)
+    assert len(passed) == 1
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    # Невдала проба: решта чекають нову паузу, після неї знову проходить один запит
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    await asyncio.sleep(0.05)
+    assert len(passed) == 1
+    await asyncio.sleep(0.1)
+    assert len(passed) == 2
+
+    # Успішна проба замикає запобіжник і пропускає всіх
+    breaker.record_success()
+    await asyncio.wait_for(asyncio.gather(*tasks), 1)
+    assert sorted(passed) == list(range(5))
+
+# Тест: проба без результату (наприклад, 404) не блокує запити назавжди
+@pytest.mark.asyncio
+async def test_circuit_breaker_stalled_probe():
+    breaker = CircuitBreaker("auto.ria.com", window=10, min_requests=1, error_threshold=0.5, cooldown=0.05)
+    breaker.record_failure()
+    await breaker.wait_if_open()
+
+    started = time.monotonic()
+    await asyncio.wait_for(breaker.wait_if_open(), 1)
+    assert time.monotonic() - started >= 0.04
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+# Тест: запобіжник хоста розмикається при сплеску помилок сервера
+@pytest.mark.asyncio
+async def test_fetch_page_trips_breaker(scraper):
+    async def handler(request):
+        return web.Response(status=502)
+
+    server = await start_server(handler)
+    url = str(server.make_url("/page"))
+    try:
+        with patch("app.scraper.auto_ria.settings.SCRAPER_MAX_RETRIES", 5):
+            assert await scraper._fetch_page(url) is None
+        breaker = scraper._get_breaker(url)
+        assert breaker.trips >= 1
+    finally:
+        await scraper._close_session()
+        await server.close()
+
+# Тест потокового розбору сторінки пошуку
+@pytest.mark.asyncio
+async def test_stream_car_items(scraper):
+    block = """
+    <div class="content-bar">
+        <a class="m-link-ticket" href="https://auto.ria.com/uk/auto_{i}.html"></a>
+        <div class="head-ticket"><span class="blue bold">BMW X{i}</span> 2020</div>
+        <div class="price-ticket" data-main-price="5000{i}">5000{i} $</div>
+        <div class="definition-data">2.0 бензин • 100 тис. км • автомат</div>
+        <div class="region">Одеса</div>
+    </div>
+    """
+
+    async def handler(request):
+        response = web.StreamResponse(headers={"Content-Type": "text/html; charset=utf-8"})
+        await response.prepare(request)
+        await response.write("<html><body>".encode("utf-8"))
+        for i in range(5):
+            await response.write(block.format(i=i).encode("utf-8"))
+        await response.write("</body></html>".encode("utf-8"))
+        await response.write_eof()
+        return response
+
+    server = await start_server(handler)
+    scraper.base_url = str(server.make_url("/legkovie/"))
+    try:
+        with patch("app.scraper.auto_ria.settings.SCRAPER_STREAM_CHUNK_SIZE", 64):
+            cars = [car async for car in scraper.stream_car_items(1)]
+        assert [car["model"] for car in cars] == [f"X{i}" for i in range(5)]
+        assert cars[3]["price"] == 50003
+        assert cars[0]["location"] == "Одеса"
+        assert cars[0]["engine_volume"] == 2.0
+    finally:
+        await scraper._close_session()
+        await server.close()
+
+# Тест оцінки квантилів гістограми
+def test_histogram_quantiles():
+    histogram = Histogram(buckets=(0.1, 0.5, 1.0))
+    assert histogram.quantile(0.5) is None
+
+    for value in (0.05, 0.05, 0.3, 0.3, 0.3, 0.7, 2.0):
+        histogram.observe(value)
+
+    assert histogram.count == 7
+    assert histogram.quantile(0.5) == 0.5
+    assert histogram.quantile(0.95) == 2.0
+    data = histogram.as_dict()
+    assert data["buckets"] == {"0.1": 2, "0.5": 3, "1.0": 1, "+Inf": 1}
+    assert data["min"] == 0.05 and data["max"] == 2.0
+
+# Тест збору метрик при завантаженні сторінки
+@pytest.mark.asyncio
+async def test_fetch_page_records_metrics(scraper):
+    calls = []
+    body = "<html>" + "x" * 1000 + "</html>"
+
+    async def handler(request):
+        calls.append(request.path)
+        if len(calls) == 1:
+            return web.Response(status=503, headers={"Retry-After": "0"})
+        return web.Response(text=body, content_type="text/html")
+
+    server = await start_server(handler)
+    try:
+        assert await scraper._fetch_page(str(server.make_url("/page"))) == body
+        metrics = scraper.metrics.as_dict()
+        assert metrics["requests"] == 2
+        assert metrics["retries"] == 1
+        assert metrics["errors"] == 1
+        assert metrics["bytes_downloaded"] == len(body)
+        assert metrics["fetch_latency"]["count"] == 1
+    finally:
+        await scraper._close_session()
+        await server.close()
+
+# Тест: потокове отримання сторінки з помилкою не завершується мовчки
+@pytest.mark.asyncio
+async def test_stream_car_items_fetch_failure(scraper):
+    async def handler(request):
+        return web.Response(status=404)
+
+    server = await start_server(handler)
+    scraper.base_url = str(server.make_url("/legkovie/"))
+    try:
+        with pytest.raises(PageFetchError):
+            [car async for car in scraper.stream_car_items(1)]
+    finally:
+        await scraper._close_session()
+        await server.close()
@@ -0,0 +1,82 @@
+import pytest
+from unittest.mock import MagicMock, AsyncMock
+
+from fastapi import HTTPException
+
+from app.geo.backfill import backfill_regions
+from app.geo.gazetteer import EARTH_RADIUS_KM, find_region, resolve_location, within_radius_query
+from app.main import build_cars_query
+
+# Тест розпізнавання місцезнаходження
+@pytest.mark.parametrize("text, region_code", [
+    ("Львів", "UA-46"),
+    ("м. Бровари, Київська обл.", "UA-32"),
+    ("Київ", "UA-30"),
+    ("Кам’янець-Подільський", "UA-68"),
+    ("Одесса", "UA-51"),
+    ("Харківська область", "UA-63"),
+])
+def test_resolve_location(text, region_code):
+    result = resolve_location(text)
+    assert result["region_code"] == region_code
+    assert result["geo"]["type"] == "Point"
+
+# Тест: координати у порядку GeoJSON (довгота, широта)
+def test_resolve_location_coordinates():
+    result = resolve_location("Львів")
+    assert result["region"] == "Львівська область"
+    assert result["geo"]["coordinates"] == [24.0297, 49.8397]
+
+# Тест: нерозпізнане місцезнаходження не отримує координат
+def test_resolve_unknown_location():
+    assert resolve_location("Невідоме місцезнаходження") == {"region_code": None, "region": None, "geo": None}
+    assert resolve_location(None)["geo"] is None
+
+# Тест пошуку області за кодом, назвою та обласним центром
+def test_find_region():
+    assert find_region("ua-46") == "UA-46"
+    assert find_region("Львівська обл.") == "UA-46"
+    assert find_region("Дніпро") == "UA-12"
+    assert find_region("Атлантида") is None
+
+# Тест фільтрів за областю та радіусом
+def test_build_cars_query_geo_filters():
+    query = build_cars_query(region="Львівська", near="Львів", radius_km=50)
+    assert query["region_code"] == "UA-46"
+    center, radius = query["geo"]["$geoWithin"]["$centerSphere"]
+    assert center == [24.0297, 49.8397]
+    assert radius == pytest.approx(50 / EARTH_RADIUS_KM)
+
+    with pytest.raises(HTTPException) as error:
+        build_cars_query(near="Атлантида")
+    assert error.value.status_code == 400
+
+    with pytest.raises(ValueError):
+        within_radius_query("Атлантида", 10)
+
+# Тест заповнення регіону для збережених автомобілів
+@pytest.mark.asyncio
+async def test_backfill_regions():
+    class Cursor:
+        def __init__(self, docs):
+            self.docs = docs
+
+        def __aiter__(self):
+            return self._iterate()
+
+        async def _iterate(self):
+            for doc in self.docs:
+                yield doc
+
+    mock_db = MagicMock()
+    mock_db.cars.find.return_value = Cursor([
+        {"_id": 1, "location": "Львів"},
+        {"_id": 2, "location": "Одеса"},
+        {"_id": 3},
+    ])
+    mock_db.cars.bulk_write = AsyncMock(side_effect=lambda ops, ordered: MagicMock(modified_count=len(ops)))
+
+    assert await backfill_regions(mock_db, batch_size=2) == 3
+    assert mock_db.cars.bulk_write.await_count == 2
+    first_batch = mock_db.cars.bulk_write.await_args_list[0].args[0]
+    assert first_batch[0]._doc["$set"]["region_code"] == "UA-46"
@@ -0,0 +1,186 @@
+import pytest
+import pytest_asyncio
+import asyncio
+import httpx
+import io
+import os
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from bson import ObjectId
+from PIL import Image
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from app.db.repository import get_repository
+from app.images.thumbnails import ThumbnailCache, ThumbnailService, is_allowed_image_url, make_thumbnail
+from app.main import app
+
+# Тестове зображення JPEG заданого розміру
+def make_jpeg(width=800, height=600):
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), (200, 30, 30)).save(output, format="JPEG")
+    return output.getvalue()
+
+# Фікстура для кешу мініатюр у тимчасовій директорії
+@pytest.fixture
+def cache(tmp_path):
+    return ThumbnailCache(str(tmp_path / "images"), max_bytes=10 * 1024 * 1024)
+
+# Тест зменшення зображення
+def test_make_thumbnail():
+    data, content_type = make_thumbnail(make_jpeg(800, 600), 320)
+    assert content_type == "image/jpeg"
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.size == (320, 240)
+
+    # Маленькі зображення не збільшуються
+    data, _ = make_thumbnail(make_jpeg(200, 100), 320)
+    with Image.open(io.BytesIO(data)) as image:
+        assert image.size == (200, 100)
+
+# Тест збереження та пошуку мініатюри
+def test_thumbnail_cache_store_and_lookup(cache):
+    assert cache.lookup("https://example.com/a.jpg", "small") is None
+
+    entry = cache.store("https://example.com/a.jpg", "small", b"thumbnail", "image/jpeg")
+    assert os.path.exists(entry["path"])
+    assert entry["path"].endswith(entry["digest"] + ".jpg")
+
+    found = cache.lookup("https://example.com/a.jpg", "small")
+    assert found["digest"] == entry["digest"]
+    assert cache.lookup("https://example.com/a.jpg", "medium") is None
+
+    # Однаковий вміст з різних URL зберігається один раз
+    other = cache.store("https://example.com/b.jpg", "small", b"thumbnail", "image/jpeg")
+    assert other["path"] == entry["path"]
+
+# Тест LRU-витіснення мініатюр
+def test_thumbnail_cache_eviction(tmp_path):
+    cache = ThumbnailCache(str(tmp_path / "images"), max_bytes=3500)
+
+    for i in range(3):
+        entry = cache.store(f"https://example.com/{i}.jpg", "small", bytes([i]) * 1000, "image/jpeg")
+        os.utime(entry["path"], (1000 + i, 1000 + i))
+
+    # Звернення до першої мініатюри робить її найсвіжішою
+    assert cache.lookup("https://example.com/0.jpg", "small") is not None
+    cache.store("https://example.com/3.jpg", "small", bytes([3]) * 1000, "image/jpeg")
+
+    assert cache.lookup("https://example.com/0.jpg", "small") is not None
+    assert cache.lookup("https://example.com/1.jpg", "small") is None
+    assert cache.lookup("https://example.com/3.jpg", "small") is not None
+
+# Тест-сервер зображень (локальний хост додається до дозволених)
+@pytest_asyncio.fixture
+async def image_server():
+    routes = {}
+
+    async def handler(request):
+        return await routes[request.path](request)
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    server = TestServer(app)
+    await server.start_server()
+    with patch("app.config.settings.IMAGE_ALLOWED_HOSTS", ["127.0.0.1"]):
+        yield server, routes
+    await server.close()
+
+# Тест: зображення завантажується один раз для всіх запитів і розмірів
+@pytest.mark.asyncio
+async def test_thumbnail_service_downloads_once(cache, image_server):
+    server, routes = image_server
+    calls = []
+    image = make_jpeg()
+
+    async def handler(request):
+        calls.append(request.path)
+        await asyncio.sleep(0.05)
+        return web.Response(body=image, content_type="image/jpeg")
+
+    routes["/car.jpg"] = handler
+    service = ThumbnailService(cache)
+    image_url = str(server.make_url("/car.jpg"))
+    try:
+        entries = await asyncio.gather(*[service.get(image_url, "small") for _ in range(5)])
+        assert len(calls) == 1
+        assert len({entry["digest"] for entry in entries}) == 1
+
+        # Повторний запит обслуговується з кешу
+        await service.get(image_url, "small")
+        assert len(calls) == 1
+
+        # Інші розміри створюються із збереженого джерела без повторного завантаження
+        await service.prefetch(image_url, sizes=("medium",))
+        assert len(calls) == 1
+        assert cache.lookup(image_url, "medium") is not None
+
+        # Паралельні запити різних розмірів нового зображення теж завантажують його один раз
+        routes["/other.jpg"] = handler
+        other_url = str(server.make_url("/other.jpg"))
+        entries = await asyncio.gather(*[service.get(other_url, size) for size in ("small", "medium", "large")])
+        assert calls.count("/other.jpg") == 1
+        assert all(entries)
+    finally:
+        await service.close()
+
+# Тест: зображення завантажуються лише з дозволених хостів
+def test_allowed_image_url():
+    assert is_allowed_image_url("https://cdn4.riastatic.com/photosnew/auto/photo/x.jpg")
+    assert not is_allowed_image_url("https://riastatic.com.evil.example/x.jpg")
+    assert not is_allowed_image_url("http://mongodb:27017/")
+    assert not is_allowed_image_url("file:///etc/passwd")
+    assert not is_allowed_image_url("not a url")
+
+# Тест: не-зображення, завеликі відповіді та переадресації відхиляються
+@pytest.mark.asyncio
+async def test_download_rejects_unsafe_responses(cache, image_server):
+    server, routes = image_server
+
+    async def html(request):
+        return web.Response(text="<html></html>", content_type="text/html")
+
+    async def huge(request):
+        # Потокова відповідь без Content-Length
+        response = web.StreamResponse(headers={"Content-Type": "image/jpeg"})
+        await response.prepare(request)
+        for _ in range(10):
+            await response.write(b"x" * 1024)
+        return response
+
+    async def redirect(request):
+        raise web.HTTPFound("http://169.254.169.254/latest/meta-data")
+
+    routes.update({"/page.jpg": html, "/huge.jpg": huge, "/redirect.jpg": redirect})
+    service = ThumbnailService(cache)
+    try:
+        with patch("app.config.settings.IMAGE_MAX_BYTES", 4096):
+            for path in ("/page.jpg", "/huge.jpg", "/redirect.jpg"):
+                assert await service.get(str(server.make_url(path)), "small") is None
+        assert await service.get("http://localhost:27017/car.jpg", "small") is None
+    finally:
+        await service.close()
+
+# Тест: immutable лише для URL мініатюри з актуальною версією
+@pytest.mark.asyncio
+async def test_image_cache_control(cache):
+    car_id = str(ObjectId())
+    entry = cache.store("https://cdn.riastatic.com/a.jpg", "small", make_jpeg(10, 10), "image/jpeg")
+    repository = MagicMock()
+    repository.get = AsyncMock(return_value={"_id": car_id, "image_url": "https://cdn.riastatic.com/a.jpg", "content_hash": "h1"})
+    service = MagicMock()
+    service.get = AsyncMock(return_value=entry)
+
+    app.dependency_overrides[get_repository] = lambda: repository
+    try:
+        with patch("app.main.get_thumbnail_service", return_value=service):
+            async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                current = await client.get(f"/api/v1/images/{car_id}", params={"v": "h1"})
+                stale = await client.get(f"/api/v1/images/{car_id}", params={"v": "old"})
+                unversioned = await client.get(f"/api/v1/images/{car_id}")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert current.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert stale.headers["cache-control"] == "public, no-cache"
+    assert unversioned.headers["cache-control"] == "public, no-cache"
+    assert unversioned.headers["etag"] == f'"{entry["digest"]}"'
@@ -0,0 +1,63 @@
+import pytest
+from unittest.mock import MagicMock
+
+from app.db.price_history import TrendBuilder, get_price_trends, next_month
+
+# Заглушка курсора MongoDB
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+def bucket(car_id, month, price, low=None, high=None, count=1):
+    return {"car_id": car_id, "month": month, "last_price": price,
+            "min_price": low or price, "max_price": high or price, "count": count}
+
+# Тест ключа наступного місяця
+def test_next_month():
+    assert next_month("2024-05") == "2024-06"
+    assert next_month("2024-12") == "2025-01"
+
+# Тест: ціна без змін переноситься в наступні місяці
+def test_trend_builder_carries_prices_forward():
+    builder = TrendBuilder()
+    for item in [
+        bucket(1, "2024-01", 10000),
+        bucket(2, "2024-01", 20000),
+        # У лютому змін немає, у березні змінилась лише ціна автомобіля 1
+        bucket(1, "2024-03", 8000, low=8000, high=9000, count=2),
+    ]:
+        builder.add(item)
+
+    trends = builder.result()
+    assert [item["month"] for item in trends] == ["2024-01", "2024-02", "2024-03"]
+    assert [item["avg_price"] for item in trends] == [15000, 15000, 14000]
+    assert [item["cars"] for item in trends] == [2, 2, 2]
+    assert [item["price_changes"] for item in trends] == [2, 0, 2]
+    assert (trends[2]["min_price"], trends[2]["max_price"]) == (8000, 20000)
+
+    # Ранні кошики враховуються, але не повертаються
+    assert [item["month"] for item in builder.result("2024-02")] == ["2024-02", "2024-03"]
+
+# Тест: тренди читають кошики за маркою в порядку місяців
+@pytest.mark.asyncio
+async def test_get_price_trends():
+    mock_db = MagicMock()
+    mock_db.price_history.find.return_value = Cursor([bucket(1, "2023-12", 5000), bucket(2, "2024-01", 7000)])
+
+    trends = await get_price_trends(mock_db, make="BMW", since_month="2024-01")
+
+    query, projection = mock_db.price_history.find.call_args.args
+    assert query == {"make": "BMW"}
+    assert "points" not in projection
+    assert trends == [{"month": "2024-01", "avg_price": 6000, "min_price": 5000, "max_price": 7000,
+                       "cars": 2, "price_changes": 1}]
@@ -0,0 +1,120 @@
+import pytest
+import httpx
+import numpy as np
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from app.analytics.pricing import (
+    GLOBAL_KEY, RATING_FAIR, RATING_HIGH, RATING_LOW, PriceModels, fit_models, segment_key,
+)
+from app.db.database import get_database
+from app.main import app
+
+# Синтетичний ринок: ціна залежить від марки, року, пробігу та об'єму двигуна
+def make_market(count=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    base = {("BMW", "X5"): 30000, ("BMW", "X3"): 24000, ("Skoda", "Octavia"): 12000}
+    segments = list(base)
+    cars = []
+    for _ in range(count):
+        make, model = segments[rng.integers(len(segments))]
+        year = int(rng.integers(2005, 2024))
+        mileage = int(rng.integers(1, 300)) * 1000
+        engine_volume = float(rng.choice([1.6, 2.0, 3.0]))
+        log_price = (np.log(base[(make, model)]) + 0.08 * (year - 2015)
+                     - 0.1 * np.log1p(mileage / 1000) + 0.1 * engine_volume + rng.normal(0, 0.05))
+        cars.append({"make": make, "model": model, "year": year, "mileage": mileage,
+                     "engine_volume": engine_volume, "price": int(np.exp(log_price))})
+    return cars
+
+def fitted(cars, min_samples=30):
+    models = PriceModels()
+    models._set(fit_models(cars, min_samples), None)
+    return models
+
+# Тест: коефіцієнти сегмента відповідають залежності в даних
+def test_fit_recovers_coefficients():
+    models = fit_models(make_market(), min_samples=30)
+
+    assert set(models) == {GLOBAL_KEY, "bmw", "skoda", "bmw|x5", "bmw|x3", "skoda|octavia"}
+    year, mileage, volume = models["bmw|x5"]["coefficients"][1:]
+    assert year == pytest.approx(0.08, abs=0.01)
+    assert mileage == pytest.approx(-0.1, abs=0.02)
+    assert volume == pytest.approx(0.1, abs=0.03)
+    assert models["bmw|x5"]["rmse"] == pytest.approx(0.05, abs=0.01)
+
+# Тест оцінки та рейтингу ціни
+def test_estimate_rating():
+    models = fitted(make_market())
+    car = {"make": "BMW", "model": "X5", "year": 2015, "mileage": 100000, "engine_volume": 2.0}
+    # 30000 · e^(-0.1·ln(101) + 0.2) ≈ 23100
+    expected = 30000 * np.exp(-0.1 * np.log1p(100) + 0.2)
+
+    estimate = models.estimate(car)
+    assert estimate["estimate"] == pytest.approx(expected, rel=0.03)
+    assert estimate["segment"] == "model"
+    assert estimate["range"]["low"] < estimate["estimate"] < estimate["range"]["high"]
+    assert "rating" not in estimate
+
+    assert models.estimate({**car, "price": round(expected)})["rating"] == RATING_FAIR
+    assert models.estimate({**car, "price": round(expected * 0.7)})["rating"] == RATING_LOW
+    high = models.estimate({**car, "price": round(expected * 1.3)})
+    assert high["rating"] == RATING_HIGH
+    assert high["difference_percent"] == pytest.approx(30, abs=4)
+
+# Тест: малі та невідомі сегменти оцінюються за батьківським сегментом
+def test_segment_fallback():
+    cars = make_market() + [
+        {"make": "BMW", "model": "M8", "year": 2020, "mileage": 10000, "engine_volume": 4.4, "price": 120000}
+    ]
+    models = fitted(cars)
+
+    assert segment_key("BMW", "M8") not in models._models
+    assert models.estimate({"make": "BMW", "model": "M8", "year": 2020})["segment"] == "make"
+    assert models.estimate({"make": "Tesla", "model": "3", "year": 2020})["segment"] == "all"
+    # Без року оцінка неможлива
+    assert models.estimate({"make": "BMW", "model": "X5"}) is None
+    # Без розрахованих моделей оцінки немає
+    assert PriceModels().estimate({"make": "BMW", "year": 2020}) is None
+
+# Тест перерахунку і збереження таблиці моделей
+@pytest.mark.asyncio
+async def test_fit_stores_models():
+    mock_db = MagicMock()
+    mock_db.cars.find.return_value.to_list = AsyncMock(return_value=make_market(500))
+    mock_db.price_models.bulk_write = AsyncMock()
+    mock_db.price_models.delete_many = AsyncMock()
+    models = PriceModels()
+
+    assert await models.fit(mock_db) == 6
+
+    stored = {operation._filter["_id"]: operation._doc for operation in mock_db.price_models.bulk_write.await_args.args[0]}
+    assert len(stored["bmw|x5"]["coefficients"]) == 4
+    assert "defaults" in stored[GLOBAL_KEY]
+    fitted_at = stored["bmw"]["fitted_at"]
+    mock_db.price_models.delete_many.assert_awaited_once_with({"fitted_at": {"$lt": fitted_at}})
+    assert models.estimate({"make": "Skoda", "model": "Octavia", "year": 2018})["segment"] == "model"
+
+# Тест ендпоінту оцінки ціни за характеристиками
+@pytest.mark.asyncio
+async def test_price_estimate_endpoint():
+    models = fitted(make_market())
+    models.loaded_at = float("inf")
+    empty = PriceModels()
+    empty.loaded_at = float("inf")
+
+    app.dependency_overrides[get_database] = lambda: MagicMock()
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            body = {"make": "BMW", "model": "X5", "year": 2015, "mileage": 100000, "price": 50000}
+            with patch("app.main.get_price_models", return_value=models):
+                response = await client.post("/api/v1/price-estimate", json=body)
+                invalid = await client.get("/api/v1/cars/invalid/price-estimate")
+            with patch("app.main.get_price_models", return_value=empty):
+                unavailable = await client.post("/api/v1/price-estimate", json=body)
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json()["rating"] == RATING_HIGH
+    assert invalid.status_code == 400
+    assert unavailable.status_code == 503
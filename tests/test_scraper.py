@@ -4,12 +4,18 @@ from unittest.mock import patch, MagicMock, AsyncMock
 from bs4 import BeautifulSoup
 import pytest_asyncio
 
-from app.scraper.auto_ria import AutoRiaScraper
+from app.scraper.auto_ria import AutoRiaScraper, PageFetchError
+from app.db.repository import DuplicateCarError
+from app.scraper.utils import compute_content_hash
+from app.scraper.checkpoint import ScrapeCheckpoint, PageProgress
+from app.scraper.stream_parser import CarBlockParser
 
 # Фікстура для створення скрапера
 @pytest.fixture
 def scraper():
-    return AutoRiaScraper()
+    # Оновлення аналітики після запуску звертається до бази
+    with patch.object(AutoRiaScraper, '_refresh_analytics', new_callable=AsyncMock):
+        yield AutoRiaScraper()
 
 # Тестові HTML дані
 @pytest.fixture
@@ -123,6 +129,7 @@ async def test_save_car_to_db(scraper):
     mock_db = MagicMock()
     mock_db.cars = AsyncMock()
     mock_db.cars.find_one = AsyncMock(return_value=None)  # Припускаємо, що автомобіля ще немає в базі
+    mock_db.cars_archive.find_one = AsyncMock(return_value=None)  # І в архіві теж
     mock_db.cars.insert_one = AsyncMock(return_value=MagicMock(inserted_id="test_id"))
     
     with patch.object(scraper, '_get_db', return_value=mock_db):
@@ -135,6 +142,36 @@ async def test_save_car_to_db(scraper):
         
         # Перевіряємо, що дата створення додана
         assert "created_at" in mock_db.cars.insert_one.call_args[0][0]
+        
+        # Місцезнаходження розпізнане за довідником
+        assert mock_db.cars.insert_one.call_args[0][0]["region_code"] == "UA-30"
+        assert mock_db.cars.insert_one.call_args[0][0]["geo"]["type"] == "Point"
+
+# Тест: незмінене оголошення не перезаписується, але позначається як побачене
+@pytest.mark.asyncio
+async def test_unchanged_car_marked_seen(scraper):
+    car_data = {
+        "make": "BMW",
+        "model": "X5",
+        "year": 2020,
+        "price": 50000,
+        "location": "Київ",
+        "url": "https://auto.ria.com/uk/auto_bmw_x5_123.html"
+    }
+    
+    mock_db = MagicMock()
+    mock_db.cars = AsyncMock()
+    mock_db.cars.find_one = AsyncMock(return_value={"_id": "existing_id", **car_data,
+                                                    "content_hash": compute_content_hash(car_data)})
+    mock_db.cars.update_many = AsyncMock()
+    
+    with patch.object(scraper, '_get_db', return_value=mock_db):
+        assert await scraper._save_car_to_db(dict(car_data)) is False
+    
+    mock_db.cars.update_one.assert_not_called()
+    query, update = mock_db.cars.update_many.await_args.args
+    assert car_data["url"] in query["url"]["$in"]
+    assert "last_seen_at" in update["$set"]
 
 # Тест оновлення існуючого автомобіля
 @pytest.mark.asyncio
@@ -216,4 +253,310 @@ async def test_scrape_cars_limit_pages(scraper):
         
         # Перевірка обмеження максимальної кількості сторінок
         await scraper.scrape_cars(30)  # Має стати 20
-        assert mock_get_links.call_count == 20
\ No newline at end of file
+        assert mock_get_links.call_count == 20
+
+# Тест пропуску незміненого оголошення
+@pytest.mark.asyncio
+async def test_skip_unchanged_car(scraper):
+    car_data = {
+        "make": "BMW",
+        "model": "X5",
+        "year": 2020,
+        "price": 50000,
+        "mileage": 25000,
+        "engine_type": "дизель",
+        "engine_volume": 3.0,
+        "transmission": "автомат",
+        "drive_type": "повний",
+        "location": "Київ",
+        "image_url": "https://example.com/bmw_x5.jpg",
+        "url": "https://auto.ria.com/uk/auto_bmw_x5_123.html"
+    }
+    
+    # Хеш не залежить від службових полів і зайвих пробілів
+    content_hash = compute_content_hash(car_data)
+    assert compute_content_hash({**car_data, "location": " Київ ", "created_at": "2024-01-01"}) == content_hash
+    assert compute_content_hash({**car_data, "price": 49000}) != content_hash
+    
+    mock_db = MagicMock()
+    mock_db.cars = AsyncMock()
+    mock_db.cars.find_one = AsyncMock(return_value={"_id": "existing_id", **car_data, "content_hash": content_hash})
+    mock_db.cars.update_one = AsyncMock()
+    mock_db.cars.insert_one = AsyncMock()
+    
+    with patch.object(scraper, '_get_db', return_value=mock_db):
+        result = await scraper._save_car_to_db(dict(car_data))
+        
+        # Незмінене оголошення не записується в базу
+        assert result is False
+        mock_db.cars.update_one.assert_not_called()
+        mock_db.cars.insert_one.assert_not_called()
+
+# Тест зупинки інкрементального скрапінгу на відомих оголошеннях
+@pytest.mark.asyncio
+async def test_scrape_cars_incremental_early_stop(scraper):
+    known_cars = [
+        {"make": "BMW", "model": f"X{i}", "url": f"https://auto.ria.com/uk/auto_{i}.html"}
+        for i in range(3)
+    ]
+    new_car = {"make": "Audi", "model": "Q7", "url": "https://auto.ria.com/uk/auto_new.html"}
+    known_hashes = {car["url"]: compute_content_hash(car) for car in known_cars}
+    
+    with patch.object(scraper, '_get_car_links', new_callable=AsyncMock) as mock_get_links, \
+         patch.object(scraper, '_get_known_hashes', new_callable=AsyncMock) as mock_known, \
+         patch.object(scraper, '_mark_seen', new_callable=AsyncMock) as mock_mark_seen, \
+         patch.object(scraper, '_fetch_page', new_callable=AsyncMock, return_value=None), \
+         patch.object(scraper, '_save_car_to_db', new_callable=AsyncMock) as mock_save_car, \
+         patch.object(scraper, '_close_session', new_callable=AsyncMock), \
+         patch('app.scraper.auto_ria.settings.SCRAPER_INCREMENTAL_STOP_AFTER', 2), \
+         patch('app.scraper.auto_ria.asyncio.sleep', new_callable=AsyncMock):
+        
+        mock_get_links.return_value = [new_car] + known_cars
+        mock_known.return_value = known_hashes
+        mock_save_car.return_value = True
+        
+        saved_count = await scraper.scrape_cars(5, incremental=True)
+        
+        # Зберігається лише нове оголошення, обхід зупиняється на першій сторінці
+        assert saved_count == 1
+        assert mock_get_links.call_count == 1
+        mock_save_car.assert_called_once_with(new_car)
+        
+        # Незмінені оголошення позначаються як актуальні одним запитом
+        mock_mark_seen.assert_called_once_with([car["url"] for car in known_cars[:2]])
+
+# Тест розбору сторінки оголошення
+def test_parse_car_details(scraper, sample_details_html):
+    details = scraper._parse_car_details(sample_details_html)
+    assert details == {"location": "Київ", "drive_type": "повний"}
+
+# Тест доповнення даних деталями оголошення в конвеєрі
+@pytest.mark.asyncio
+async def test_scrape_cars_pipeline_enrichment(scraper):
+    details_html = """
+    <div class="item_inner"><span>Місто</span><strong>Львів</strong></div>
+    <div class="item_inner"><span>Привід</span><strong>Задній</strong></div>
+    """
+    car_items = [
+        {"make": "BMW", "model": f"X{i}", "url": f"https://auto.ria.com/uk/auto_{i}.html", "location": "Київ"}
+        for i in range(5)
+    ]
+    
+    with patch.object(scraper, '_get_car_links', new_callable=AsyncMock, return_value=car_items), \
+         patch.object(scraper, '_get_known_hashes', new_callable=AsyncMock, return_value={}), \
+         patch.object(scraper, '_fetch_page', new_callable=AsyncMock, return_value=details_html) as mock_fetch, \
+         patch.object(scraper, '_save_car_to_db', new_callable=AsyncMock, return_value=True) as mock_save_car, \
+         patch.object(scraper, '_close_session', new_callable=AsyncMock):
+        
+        saved_count = await scraper.scrape_cars(1)
+        
+        assert saved_count == 5
+        assert mock_fetch.call_count == 5
+        saved_cars = [call.args[0] for call in mock_save_car.call_args_list]
+        assert sorted(car["model"] for car in saved_cars) == [f"X{i}" for i in range(5)]
+        for car in saved_cars:
+            assert car["location"] == "Львів"
+            assert car["drive_type"] == "задній"
+        
+        # Статистика пропускної здатності етапів
+        assert scraper.stage_stats["list"].items == 1
+        assert scraper.stage_stats["detail"].items == 5
+        assert scraper.stage_stats["parse"].items == 5
+        assert scraper.stage_stats["save"].items == 5
+
+# Тест відстеження завершених сторінок
+def test_page_progress():
+    progress = PageProgress()
+    progress.add(1, {"url": "a"})
+    progress.add(1, {"url": "b"})
+    progress.page_emitted(1)
+    progress.add(2, {"url": "c"})
+    progress.page_emitted(2)
+    
+    # Сторінка 2 не може бути завершена раніше за сторінку 1
+    progress.done({"url": "c"})
+    assert progress.advance() is False
+    assert progress.last_completed == 0
+    assert [item["car"]["url"] for item in progress.pending()] == ["a", "b"]
+    
+    progress.done({"url": "a"})
+    progress.done({"url": "b"})
+    assert progress.advance() is True
+    assert progress.last_completed == 2
+    assert progress.pending() == []
+
+# Тест продовження перерваного запуску з контрольної точки
+@pytest.mark.asyncio
+async def test_scrape_cars_resume_from_checkpoint(scraper):
+    checkpoint = ScrapeCheckpoint(MagicMock(), {
+        "_id": "run_1",
+        "pages": 4,
+        "last_page": 2,
+        "pending": [{"page": 3, "car": {"make": "BMW", "model": "X5", "url": "https://auto.ria.com/a.html"}}],
+        "counters": {"saved": 10, "unchanged": 0},
+    })
+    checkpoint.save = AsyncMock()
+    checkpoint.finish = AsyncMock()
+    
+    pages = {
+        3: [{"make": "BMW", "model": "X5", "url": "https://auto.ria.com/a.html"},
+            {"make": "Audi", "model": "Q7", "url": "https://auto.ria.com/b.html"}],
+        4: [{"make": "Skoda", "model": "Octavia", "url": "https://auto.ria.com/c.html"}],
+    }
+    
+    with patch.object(scraper, '_get_car_links', new_callable=AsyncMock, side_effect=lambda page: pages[page]) as mock_get_links, \
+         patch.object(scraper, '_get_known_hashes', new_callable=AsyncMock, return_value={}), \
+         patch.object(scraper, '_fetch_page', new_callable=AsyncMock, return_value=None), \
+         patch.object(scraper, '_save_car_to_db', new_callable=AsyncMock, return_value=True) as mock_save_car, \
+         patch.object(scraper, '_close_session', new_callable=AsyncMock), \
+         patch('app.scraper.auto_ria.asyncio.sleep', new_callable=AsyncMock):
+        
+        saved_count = await scraper.scrape_cars(checkpoint.pages, checkpoint=checkpoint)
+        
+        # Обхід продовжується з третьої сторінки, кожне оголошення зберігається один раз
+        assert [call.args[0] for call in mock_get_links.call_args_list] == [3, 4]
+        saved_urls = sorted(call.args[0]["url"] for call in mock_save_car.call_args_list)
+        assert saved_urls == ["https://auto.ria.com/a.html", "https://auto.ria.com/b.html", "https://auto.ria.com/c.html"]
+        assert saved_count == 13
+        
+        # Прогрес фіксується на межах сторінок, запуск позначається завершеним
+        assert checkpoint.save.call_args_list[-1].args[0] == 4
+        checkpoint.finish.assert_called_once()
+        assert checkpoint.finish.call_args.args[0] == ScrapeCheckpoint.COMPLETED
+
+# Тест: сторінка, яку не вдалося отримати, не позначається обробленою
+@pytest.mark.asyncio
+async def test_scrape_cars_page_fetch_failure(scraper):
+    checkpoint = ScrapeCheckpoint(MagicMock(), {"_id": "run_1", "pages": 3, "last_page": 0, "pending": [], "counters": {}})
+    checkpoint.save = AsyncMock()
+    checkpoint.finish = AsyncMock()
+    
+    def get_links(page):
+        if page == 2:
+            raise PageFetchError("Не вдалося отримати сторінку")
+        return [{"make": "BMW", "model": f"X{page}", "url": f"https://auto.ria.com/{page}.html"}]
+    
+    with patch.object(scraper, '_get_car_links', new_callable=AsyncMock, side_effect=get_links) as mock_get_links, \
+         patch.object(scraper, '_get_known_hashes', new_callable=AsyncMock, return_value={}), \
+         patch.object(scraper, '_fetch_page', new_callable=AsyncMock, return_value=None), \
+         patch.object(scraper, '_save_car_to_db', new_callable=AsyncMock, return_value=True), \
+         patch.object(scraper, '_close_session', new_callable=AsyncMock), \
+         patch('app.scraper.auto_ria.asyncio.sleep', new_callable=AsyncMock):
+        
+        await scraper.scrape_cars(checkpoint.pages, checkpoint=checkpoint)
+        
+        # Обхід зупиняється, контрольна точка не заходить далі першої сторінки
+        assert [call.args[0] for call in mock_get_links.call_args_list] == [1, 2]
+        assert max(call.args[0] for call in checkpoint.save.call_args_list) == 1
+        assert checkpoint.finish.call_args.args[0] == ScrapeCheckpoint.FAILED
+
+# Тест: оголошення з помилкою збереження лишається незбереженим у стані запуску
+@pytest.mark.asyncio
+async def test_scrape_cars_failed_save_stays_pending(scraper):
+    checkpoint = ScrapeCheckpoint(MagicMock(), {"_id": "run_1", "pages": 1, "last_page": 0, "pending": [], "counters": {}})
+    checkpoint.save = AsyncMock()
+    checkpoint.finish = AsyncMock()
+    car_items = [
+        {"make": "BMW", "model": "X5", "url": "https://auto.ria.com/a.html"},
+        {"make": "Audi", "model": "Q7", "url": "https://auto.ria.com/b.html"},
+    ]
+    
+    async def save_car(car_data):
+        if car_data["url"].endswith("b.html"):
+            raise RuntimeError("База даних недоступна")
+        return True
+    
+    with patch.object(scraper, '_get_car_links', new_callable=AsyncMock, return_value=car_items), \
+         patch.object(scraper, '_get_known_hashes', new_callable=AsyncMock, return_value={}), \
+         patch.object(scraper, '_fetch_page', new_callable=AsyncMock, return_value=None), \
+         patch.object(scraper, '_save_car_to_db', side_effect=save_car), \
+         patch.object(scraper, '_close_session', new_callable=AsyncMock):
+        
+        saved_count = await scraper.scrape_cars(1, checkpoint=checkpoint)
+        
+        assert saved_count == 1
+        assert scraper.stage_stats["save"].errors == 1
+        
+        # Сторінка не завершена, продовження повторить запис невдалого оголошення
+        last_page, pending = checkpoint.save.call_args_list[-1].args[:2]
+        assert last_page == 0
+        assert "https://auto.ria.com/b.html" in [item["car"]["url"] for item in pending]
+        assert checkpoint.finish.call_args.args[0] == ScrapeCheckpoint.FAILED
+
+# Тест: конфлікт унікального URL один раз переходить до оновлення запису
+@pytest.mark.asyncio
+async def test_save_car_duplicate_updates_once(scraper):
+    car_data = {"make": "BMW", "model": "X5", "year": 2020, "price": 50000, "url": "https://auto.ria.com/a.html"}
+    repository = MagicMock()
+    repository.find_by_url = AsyncMock(side_effect=[None, {"_id": "existing_id", **car_data, "mileage": 1000}])
+    repository.restore_archived = AsyncMock(return_value=None)
+    repository.insert = AsyncMock(side_effect=DuplicateCarError)
+    repository.update = AsyncMock(return_value=True)
+    
+    with patch.object(scraper, '_get_repository', new_callable=AsyncMock, return_value=repository):
+        assert await scraper._save_car_to_db(dict(car_data)) is True
+        repository.update.assert_called_once()
+        assert repository.update.call_args.args[0] == "existing_id"
+        
+        # Якщо запису за URL все одно немає, повторної вставки не буде
+        repository.find_by_url = AsyncMock(return_value=None)
+        repository.update.reset_mock()
+        repository.insert.reset_mock()
+        with pytest.raises(DuplicateCarError):
+            await scraper._save_car_to_db(dict(car_data))
+        repository.insert.assert_called_once()
+        repository.update.assert_not_called()
+
+# Тест запису історії цін лише при зміні ціни
+@pytest.mark.asyncio
+async def test_price_history_on_price_change(scraper):
+    car_data = {
+        "make": "BMW",
+        "model": "X5",
+        "year": 2020,
+        "price": 48000,
+        "mileage": 25000,
+        "url": "https://auto.ria.com/uk/auto_bmw_x5_123.html"
+    }
+    
+    mock_db = MagicMock()
+    mock_db.cars = AsyncMock()
+    mock_db.cars.find_one = AsyncMock(return_value={"_id": "existing_id", **car_data, "price": 50000})
+    mock_db.cars.update_one = AsyncMock(return_value=MagicMock(modified_count=1))
+    mock_db.price_history = AsyncMock()
+    
+    with patch.object(scraper, '_get_db', return_value=mock_db):
+        assert await scraper._save_car_to_db(dict(car_data)) is True
+        
+        # Нова ціна додається в місячний кошик автомобіля
+        mock_db.price_history.update_one.assert_called_once()
+        bucket_filter, update = mock_db.price_history.update_one.call_args[0]
+        assert bucket_filter["car_id"] == "existing_id"
+        assert update["$push"]["points"]["price"] == 48000
+        assert update["$set"]["last_price"] == 48000
+        assert mock_db.price_history.update_one.call_args[1]["upsert"] is True
+        
+        # Якщо ціна не змінилась, історія не поповнюється
+        mock_db.price_history.update_one.reset_mock()
+        mock_db.cars.find_one.return_value = {"_id": "existing_id", **car_data, "mileage": 26000}
+        await scraper._save_car_to_db(dict(car_data))
+        mock_db.price_history.update_one.assert_not_called()
+
+# Тест інкрементального виділення блоків оголошень
+def test_car_block_parser(sample_html):
+    page_html = "<html><body><div class='header'>Шапка</div>" + sample_html * 3 + "</body></html>"
+    parser = CarBlockParser()
+    blocks = []
+    
+    # Подаємо сторінку дрібними частинами, що розрізають теги
+    for i in range(0, len(page_html), 7):
+        parser.feed(page_html[i:i + 7])
+        blocks.extend(parser.pop_blocks())
+    parser.close()
+    blocks.extend(parser.pop_blocks())
+    
+    assert len(blocks) == 3
+    for block in blocks:
+        assert block.startswith('<div class="content-bar">')
+        assert block.endswith("</div>")
+        assert "Шапка" not in block
@@ -0,0 +1,150 @@
+import pytest
+import httpx
+from bson import ObjectId
+from datetime import datetime
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from app.analytics.similar import SimilarCarsIndex
+from app.db.compact import encode_car
+from app.db.database import get_database
+from app.main import app
+
+# Тестовий автомобіль
+def make_car(car_id, make="BMW", price=20000, year=2015, mileage=100000, **fields):
+    car = {
+        "_id": car_id,
+        "make": make,
+        "price": price,
+        "year": year,
+        "mileage": mileage,
+        "engine_volume": 2.0,
+        "engine_type": "дизель",
+        "transmission": "автомат",
+    }
+    car.update(fields)
+    return car
+
+def make_catalog():
+    return [
+        make_car("a"),
+        make_car("b", price=21000),
+        make_car("c", price=20000, year=2005),
+        make_car("d", make="Audi", price=20500),
+        make_car("e", price=90000, year=2022, mileage=5000, transmission="механіка"),
+    ]
+
+def ids(result):
+    return [car_id for car_id, _ in result]
+
+# Тест: сусіди впорядковані за відстанню, сам автомобіль не повертається
+def test_similar_ordering():
+    index = SimilarCarsIndex()
+    index.build(make_catalog())
+
+    result = index.similar("a", k=3)
+    assert ids(result) == ["d", "b", "c"]
+    distances = [distance for _, distance in result]
+    assert distances == sorted(distances)
+    assert index.similar("missing") is None
+
+# Тест пошуку серед автомобілів тієї ж марки
+def test_similar_same_make():
+    index = SimilarCarsIndex()
+    index.build(make_catalog())
+
+    assert "d" not in ids(index.similar("a", k=10, same_make=True))
+    assert index.similar("d", k=10, same_make=True) == []
+
+# Тест інкрементального оновлення індексу
+def test_upsert_and_remove():
+    index = SimilarCarsIndex()
+    index.build(make_catalog())
+
+    # Новий автомобіль, майже ідентичний "a"
+    index.upsert([make_car("f", price=20001)])
+    assert ids(index.similar("a", k=1)) == ["f"]
+
+    # Зміна наявного автомобіля переміщує його в просторі ознак
+    index.upsert([make_car("f", price=95000, year=2022, mileage=5000, transmission="механіка")])
+    assert ids(index.similar("e", k=1)) == ["f"]
+
+    index.remove(["f"])
+    assert "f" not in ids(index.similar("a", k=10))
+    assert index.similar("f") is None
+    assert len(index) == 5
+
+# Тест: до завантаження зміни ігноруються
+def test_changes_ignored_before_load():
+    index = SimilarCarsIndex()
+    index.upsert([make_car("a")])
+    index.remove(["a"])
+    assert not index.loaded
+    assert index.similar("a") is None
+
+# Тест: значення в компактній формі зберігання рівнозначні звичайним
+def test_compact_values():
+    plain = SimilarCarsIndex()
+    plain.build(make_catalog())
+    compact = SimilarCarsIndex()
+    compact.build([encode_car(car, enabled=True) for car in make_catalog()])
+
+    assert plain.similar("a", k=4) == compact.similar("a", k=4)
+
+# Тест оновлення індексу змінами з бази
+@pytest.mark.asyncio
+async def test_refresh():
+    index = SimilarCarsIndex()
+    index.build(make_catalog())
+    index.refreshed_at = datetime(2024, 1, 1)
+
+    mock_db = MagicMock()
+    mock_db.cars.find.return_value.to_list = AsyncMock(return_value=[make_car("f", price=20001)])
+    mock_db.cars_archive.find.return_value.to_list = AsyncMock(return_value=[{"_id": "b"}])
+
+    await index.refresh(mock_db)
+
+    query = mock_db.cars.find.call_args[0][0]
+    assert query["$or"][0] == {"created_at": {"$gte": datetime(2024, 1, 1)}}
+    assert index.refreshed_at > datetime(2024, 1, 1)
+    result = ids(index.similar("a", k=10))
+    assert result[0] == "f"
+    assert "b" not in result
+
+# Заглушка курсора MongoDB
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+# Тест ендпоінту схожих автомобілів
+@pytest.mark.asyncio
+async def test_similar_endpoint():
+    catalog = [make_car(ObjectId(), price=20000 + i * 1000) for i in range(4)]
+    index = SimilarCarsIndex()
+    index.build(catalog)
+    target, *expected = [str(car["_id"]) for car in catalog[:3]]
+
+    mock_db = MagicMock()
+    # Документи з бази повертаються в довільному порядку
+    mock_db.cars.find.return_value = Cursor(list(reversed(catalog[1:])))
+
+    app.dependency_overrides[get_database] = lambda: mock_db
+    try:
+        with patch("app.main.get_similar_index", return_value=index):
+            async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+                response = await client.get(f"/api/v1/cars/{target}/similar", params={"limit": 2})
+                invalid = await client.get("/api/v1/cars/invalid/similar")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert [car["id"] for car in data] == expected
+    assert data[0]["distance"] < data[1]["distance"]
+    assert invalid.status_code == 400
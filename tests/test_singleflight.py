@@ -0,0 +1,123 @@
+import pytest
+import asyncio
+import httpx
+from unittest.mock import MagicMock, AsyncMock
+
+from app.db.database import get_database
+from app.db.singleflight import SingleFlight, make_key
+from app.main import app, read_coalescer
+
+# Тест нормалізації ключа запиту
+def test_make_key():
+    assert make_key("cars", page=1, make="BMW") == make_key("cars", make="BMW", page=1, max_price=None)
+    assert make_key("cars", page=1) != make_key("cars", page=2)
+    assert make_key("cars", page=1) != make_key("dashboard", page=1)
+
+# Тест: однакові одночасні запити виконуються один раз
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_result():
+    coalescer = SingleFlight()
+    calls = 0
+
+    async def query():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"total": 3}
+
+    results = await asyncio.gather(*(coalescer.do("key", query) for _ in range(5)))
+    assert results == [{"total": 3}] * 5
+    assert calls == 1
+    assert coalescer.stats() == {"in_flight": 0, "leaders": 1, "shared": 4}
+
+    # Результат не кешується
+    await coalescer.do("key", query)
+    assert calls == 2
+
+# Тест: помилка передається всім клієнтам
+@pytest.mark.asyncio
+async def test_error_propagates_to_all_waiters():
+    coalescer = SingleFlight()
+
+    async def query():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("база недоступна")
+
+    results = await asyncio.gather(*(coalescer.do("key", query) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert coalescer.stats()["in_flight"] == 0
+
+# Тест: відключення першого клієнта не скасовує запит для інших
+@pytest.mark.asyncio
+async def test_leader_cancellation_keeps_query_running():
+    coalescer = SingleFlight()
+    release = asyncio.Event()
+
+    async def query():
+        await release.wait()
+        return "ok"
+
+    leader = asyncio.ensure_future(coalescer.do("key", query))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(coalescer.do("key", query))
+    await asyncio.sleep(0)
+
+    leader.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await leader
+
+    release.set()
+    assert await follower == "ok"
+
+# Тест: запит скасовується, коли на нього більше ніхто не чекає
+@pytest.mark.asyncio
+async def test_query_cancelled_without_waiters():
+    coalescer = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def query():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiter = asyncio.ensure_future(coalescer.do("key", query))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert coalescer.stats()["in_flight"] == 0
+
+# Тест: вимкнене об'єднання виконує кожен запит окремо
+@pytest.mark.asyncio
+async def test_disabled_coalescing():
+    coalescer = SingleFlight(enabled=False)
+    query = AsyncMock(return_value=1)
+    await asyncio.gather(coalescer.do("key", query), coalescer.do("key", query))
+    assert query.await_count == 2
+
+# Тест: одночасні запити статистики виконують один набір запитів до бази
+@pytest.mark.asyncio
+async def test_stats_endpoint_coalesces_requests():
+    async def count_documents(query):
+        await asyncio.sleep(0.05)
+        return 7
+
+    mock_db = MagicMock()
+    mock_db.cars.count_documents = AsyncMock(side_effect=count_documents)
+    mock_db.cars.aggregate.return_value.to_list = AsyncMock(return_value=[])
+
+    app.dependency_overrides[get_database] = lambda: mock_db
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            responses = await asyncio.gather(*(client.get("/api/v1/cars/stats") for _ in range(4)))
+    finally:
+        app.dependency_overrides.clear()
+
+    assert all(response.status_code == 200 for response in responses)
+    assert all(response.json()["total_cars"] == 7 for response in responses)
+    assert mock_db.cars.count_documents.await_count == 1
+    assert read_coalescer.stats()["in_flight"] == 0
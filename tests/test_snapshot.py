@@ -0,0 +1,102 @@
+import pytest
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+
+pa = pytest.importorskip("pyarrow")
+
+from app.analytics.snapshot import export_snapshot, list_snapshots, open_snapshot
+from app.db.compact import encode_car
+
+# Заглушка курсора MongoDB
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def batch_size(self, size):
+        return self
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+def make_cars(count):
+    makes = ["BMW", "Audi", "Skoda"]
+    return [
+        {
+            "_id": f"{i:024x}",
+            "make": makes[i % 3],
+            "model": f"M{i % 5}",
+            "year": 2010 + i % 10,
+            "price": 10000 + i,
+            "mileage": 1000 * i,
+            "engine_type": "дизель",
+            "engine_volume": 2.0,
+            "transmission": "автомат",
+            "url": f"https://auto.ria.com/uk/auto_{i}.html",
+            "created_at": datetime(2024, 1, 1),
+        }
+        for i in range(count)
+    ]
+
+def mock_db(cars):
+    db = MagicMock()
+    db.cars.with_options.return_value.find.return_value = Cursor(cars)
+    return db
+
+# Тест запису та читання знімка у форматі Arrow
+@pytest.mark.asyncio
+async def test_export_arrow_snapshot(tmp_path):
+    cars = make_cars(25)
+    # Старий запис з рядком замість числа
+    cars[0]["mileage"] = "невідомо"
+
+    result = await export_snapshot(mock_db(cars), directory=str(tmp_path), fmt="arrow", batch_size=10)
+
+    assert result["rows"] == 25
+    snapshot_date = result["snapshot_at"].date().isoformat()
+    assert list_snapshots(str(tmp_path)) == [snapshot_date]
+    assert result["path"].endswith(f"snapshot_date={snapshot_date}/cars.arrow")
+
+    table = open_snapshot(directory=str(tmp_path))
+    assert table.num_rows == 25
+    assert table.schema.field("make").type == pa.dictionary(pa.int32(), pa.string())
+    assert table.schema.field("year").type == pa.int16()
+    assert table.column("make").to_pylist()[:4] == ["BMW", "Audi", "Skoda", "BMW"]
+    assert table.column("mileage").to_pylist()[:2] == [None, 1000]
+    assert table.column("id").to_pylist()[-1] == cars[-1]["_id"]
+    assert b"snapshot_at" in table.schema.metadata
+
+# Тест: знімок Parquet містить звичайні значення для компактних документів
+@pytest.mark.asyncio
+async def test_export_parquet_snapshot(tmp_path):
+    cars = [encode_car(car, enabled=True) for car in make_cars(5)]
+
+    await export_snapshot(mock_db(cars), directory=str(tmp_path), fmt="parquet", batch_size=2)
+
+    table = open_snapshot(directory=str(tmp_path))
+    assert table.column("transmission").to_pylist() == ["автомат"] * 5
+    assert table.column("url").to_pylist()[0] == "https://auto.ria.com/uk/auto_0.html"
+
+# Тест: невдалий запис не залишає часткового знімка, старі знімки видаляються
+@pytest.mark.asyncio
+async def test_failed_export_and_retention(tmp_path):
+    for old in ("2024-01-01", "2024-01-02"):
+        (tmp_path / f"snapshot_date={old}").mkdir()
+
+    db = mock_db(make_cars(3))
+    db.cars.with_options.return_value.find.side_effect = RuntimeError("з'єднання втрачено")
+    with pytest.raises(RuntimeError):
+        await export_snapshot(db, directory=str(tmp_path), fmt="arrow")
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["snapshot_date=2024-01-01", "snapshot_date=2024-01-02"]
+
+    with patch("app.analytics.snapshot.settings.SNAPSHOT_KEEP", 2):
+        await export_snapshot(mock_db(make_cars(3)), directory=str(tmp_path), fmt="arrow")
+    snapshots = list_snapshots(str(tmp_path))
+    assert len(snapshots) == 2
+    assert snapshots[0] == "2024-01-02"
+
+    with pytest.raises(FileNotFoundError):
+        open_snapshot("2023-12-31", directory=str(tmp_path))
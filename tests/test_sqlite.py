@@ -0,0 +1,256 @@
+import pytest
+import random
+import httpx
+import pytest_asyncio
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from app.db.repository import CarRepository, DuplicateCarError
+from app.db.sqlite import SQLiteCarRepository, where_clause
+from app.geo.gazetteer import resolve_location
+from app.main import app, build_cars_query
+from app.scraper.auto_ria import AutoRiaScraper
+
+MAKES = ["BMW", "Audi", "Skoda", "Volkswagen"]
+PLACES = ["Київ", "Львів", "Одеса", "Бровари"]
+
+def make_car(i, rng):
+    location = rng.choice(PLACES)
+    return {
+        "make": rng.choice(MAKES),
+        "model": rng.choice(["X5", "A4", "Octavia", "Passat"]),
+        "year": rng.randint(2005, 2023),
+        "price": rng.randint(5, 60) * 1000,
+        "mileage": rng.randint(0, 300) * 1000,
+        "engine_type": rng.choice(["бензин", "дизель"]),
+        "engine_volume": 2.0,
+        "transmission": rng.choice(["механіка", "автомат"]),
+        "location": location,
+        "url": f"https://auto.ria.com/uk/auto_{i}.html",
+        "image_url": f"https://cdn.riastatic.com/photos/{i}.jpg",
+        "content_hash": f"hash{i}",
+        "created_at": datetime(2024, 1, 1) + timedelta(minutes=i),
+        **resolve_location(location),
+    }
+
+@pytest_asyncio.fixture
+async def repository(tmp_path):
+    repository = SQLiteCarRepository(str(tmp_path / "cars.db"), threads=2)
+    await repository.open()
+    yield repository
+    repository.close()
+
+async def fill(repository, count=60, seed=1):
+    rng = random.Random(seed)
+    cars = [make_car(i, rng) for i in range(count)]
+    for car in cars:
+        car["_id"] = await repository.insert(car)
+    return cars
+
+# Тест: запис, читання, оновлення та видалення автомобіля
+@pytest.mark.asyncio
+async def test_crud(repository):
+    car = make_car(1, random.Random(1))
+    car_id = await repository.insert(car)
+
+    stored = await repository.get(car_id)
+    assert stored["_id"] == car_id
+    assert stored["created_at"] == car["created_at"]
+    assert stored["geo"] == car["geo"]
+    assert (await repository.find_by_url(car["url"]))["_id"] == car_id
+    assert await repository.get(car_id, {"price": 1}) == {"_id": car_id, "price": car["price"]}
+
+    with pytest.raises(DuplicateCarError):
+        await repository.insert(dict(car))
+
+    assert await repository.update(car_id, {"price": 1234, "make": "Tesla"}) is True
+    assert await repository.update(car_id, {"price": 1234}) is False
+    assert (await repository.get(car_id))["price"] == 1234
+    assert (await repository.search("tesla", 0, 10))[0] == 1
+
+    assert await repository.delete(car_id) is True
+    assert await repository.get(car_id) is None
+    assert await repository.search("tesla", 0, 10) == (0, [])
+
+# Тест: фільтри, сортування та сторінки збігаються з еталоном
+@pytest.mark.asyncio
+@pytest.mark.parametrize("sort_by,sort_order", [("price", 1), ("year", -1), ("created_at", -1)])
+async def test_find_page_matches_reference(repository, sort_by, sort_order):
+    cars = await fill(repository)
+    query = build_cars_query(min_price=10000, max_price=50000, make="w", engine_type="дизель", near="Київ", radius_km=30)
+
+    def predicate(car):
+        return (10000 <= car["price"] <= 50000 and "w" in car["make"].lower()
+                and car["engine_type"] == "дизель" and car["location"] in ("Київ", "Бровари"))
+
+    expected = sorted((car for car in cars if predicate(car)), key=lambda car: car[sort_by], reverse=sort_order < 0)
+    total, page = await repository.find_page(query, sort_by, sort_order, 2, 5)
+    assert total == len(expected)
+    assert [car[sort_by] for car in page] == [car[sort_by] for car in expected[2:7]]
+
+    total, page = await repository.find_page(build_cars_query(make="^bmw$"), "price", 1, 0, 100)
+    assert total == sum(1 for car in cars if car["make"] == "BMW")
+
+# Тест: непідтримувані фільтри не виконуються мовчки
+def test_unsupported_filters():
+    where, params = where_clause({"price": {"$gte": 1, "$ne": 5}, "_id": {"$in": []}})
+    assert where == "price >= ? AND (price IS NULL OR price != ?) AND 0"
+    assert params == [1, 5]
+    with pytest.raises(ValueError):
+        where_clause({"price": {"$elemMatch": {}}})
+    with pytest.raises(ValueError):
+        where_clause({"doc": "x"})
+
+# Тест: повнотекстовий пошук за словами та префіксами
+@pytest.mark.asyncio
+async def test_search(repository):
+    cars = await fill(repository)
+
+    total, found = await repository.search("skoda льві", 0, 100)
+    assert total == sum(1 for car in cars if car["make"] == "Skoda" and car["location"] == "Львів")
+    assert {car["_id"] for car in found} == {car["_id"] for car in cars if car["make"] == "Skoda" and car["location"] == "Львів"}
+    assert await repository.search("   ", 0, 10) == (0, [])
+
+# Тест: хеші вмісту та час останньої появи для інкрементального скрапінгу
+@pytest.mark.asyncio
+async def test_known_hashes_and_mark_seen(repository):
+    cars = await fill(repository, 3)
+    urls = [car["url"] for car in cars[:2]] + ["https://auto.ria.com/uk/unknown.html"]
+
+    assert await repository.known_hashes(urls) == {cars[0]["url"]: "hash0", cars[1]["url"]: "hash1"}
+
+    seen_at = datetime(2024, 6, 1, 12, 0)
+    await repository.mark_seen(urls, seen_at)
+    assert (await repository.get(cars[0]["_id"]))["last_seen_at"] == seen_at
+    assert "last_seen_at" not in await repository.get(cars[2]["_id"])
+    total, _ = await repository.find_page({"last_seen_at": {"$gte": seen_at}}, "price", 1, 0, 10)
+    assert total == 2
+
+# Тест: статистика і кількість за значеннями фільтрів
+@pytest.mark.asyncio
+async def test_stats_and_facets(repository):
+    cars = await fill(repository)
+
+    stats = await repository.stats()
+    assert stats["total_cars"] == len(cars)
+    assert stats["avg_price"] == int(sum(car["price"] for car in cars) / len(cars))
+    assert sum(item["count"] for item in stats["popular_makes"]) == len(cars)
+
+    facets = await repository.facets(build_cars_query(min_year=2015))
+    recent = [car for car in cars if car["year"] >= 2015]
+    assert sum(item["count"] for item in facets["make"]) == len(recent)
+    assert facets["transmission"][0]["count"] == max(
+        sum(1 for car in recent if car["transmission"] == value) for value in ("механіка", "автомат")
+    )
+
+# Тест: режим WAL, підрахунок за фільтром ціни читає лише індекс
+@pytest.mark.asyncio
+async def test_wal_and_covering_index(repository):
+    await fill(repository, 5)
+    where, params = where_clause(build_cars_query(min_price=10000, min_year=2010))
+
+    def inspect(conn):
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        plan = conn.execute(f"EXPLAIN QUERY PLAN SELECT count(*) FROM cars WHERE {where}", params).fetchall()
+        return mode, " ".join(row[-1] for row in plan)
+
+    mode, plan = await repository._run(inspect)
+    assert mode == "wal"
+    assert "COVERING INDEX" in plan
+
+# Тест: скрапер зберігає оголошення в SQLite і пропускає незмінені
+@pytest.mark.asyncio
+async def test_scraper_saves_to_sqlite(repository):
+    car = make_car(7, random.Random(7))
+    del car["content_hash"]
+    scraper = AutoRiaScraper(cache=None)
+
+    with patch("app.config.settings.DATABASE_BACKEND", "sqlite"), \
+         patch("app.db.sqlite._repository", repository):
+        assert await scraper._save_car_to_db(dict(car)) is True
+        assert await scraper._save_car_to_db(dict(car)) is False
+        assert await scraper._save_car_to_db({**car, "price": 1}) is True
+        hashes = await scraper._get_known_hashes([car["url"]])
+
+    stored = await repository.find_by_url(car["url"])
+    assert stored["price"] == 1
+    assert hashes == {car["url"]: stored["content_hash"]}
+
+# Тест: історія цін у місячних кошиках і тренди з перенесенням ціни
+@pytest.mark.asyncio
+async def test_price_history(repository):
+    cars = await fill(repository, 2)
+    moments = [datetime(2024, 1, 5), datetime(2024, 1, 20), datetime(2024, 3, 2)]
+    car = {"make": "BMW", "model": "X5"}
+    for moment, price in zip(moments, (10000, 9000, 8000)):
+        await repository._run(repository._record_price, cars[0]["_id"], price, car, moment)
+    await repository._run(repository._record_price, cars[1]["_id"], 20000, car, datetime(2024, 1, 10))
+
+    history = await repository.price_history(cars[0]["_id"])
+    assert history == [{"t": moment, "price": price} for moment, price in zip(moments, (10000, 9000, 8000))]
+
+    trends = await repository.price_trends(make="BMW")
+    assert [item["month"] for item in trends] == ["2024-01", "2024-02", "2024-03"]
+    assert trends[0] == {"month": "2024-01", "avg_price": 14500, "min_price": 9000, "max_price": 20000,
+                         "cars": 2, "price_changes": 3}
+    assert [item["avg_price"] for item in trends[1:]] == [14500, 14000]
+    assert await repository.price_trends(make="Audi") == []
+
+# Тест: сховище без усіх методів CarRepository не створюється
+def test_repository_contract():
+    class Incomplete(CarRepository):
+        async def get(self, car_id, projection=None):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+# Тест: API працює зі сховищем SQLite, функції лише для MongoDB відповідають 501
+@pytest.mark.asyncio
+async def test_sqlite_backend_api(repository):
+    car = make_car(3, random.Random(3))
+    del car["created_at"]
+
+    with patch("app.config.settings.DATABASE_BACKEND", "sqlite"), \
+         patch("app.db.sqlite._repository", repository):
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            created = await client.post("/api/v1/cars", json=car)
+            duplicate = await client.post("/api/v1/cars", json=car)
+            car_id = created.json()["id"]
+            listing = await client.get("/api/v1/cars", params={"make": car["make"]})
+            search = await client.get("/api/v1/cars/search", params={"q": car["model"]})
+            updated = await client.put(f"/api/v1/cars/{car_id}", json={"price": 999})
+            dashboard = await client.get("/api/v1/dashboard")
+            history = await client.get(f"/api/v1/cars/{car_id}/history")
+            trends = await client.get("/api/v1/price-trends", params={"make": car["make"]})
+            with_archive = await client.get("/api/v1/cars", params={"make": car["make"], "include_archived": True})
+            single = await client.get(f"/api/v1/cars/{car_id}", params={"include_archived": True})
+            batch = await client.get("/api/v1/cars/batch", params={"ids": car_id, "include_archived": True})
+            mongo_only = [
+                await client.get(f"/api/v1/cars/{car_id}/similar"),
+                await client.get(f"/api/v1/cars/{car_id}/price-estimate"),
+                await client.get("/api/v1/scraper/runs"),
+            ]
+            deleted = await client.delete(f"/api/v1/cars/{car_id}")
+
+    assert created.status_code == 200
+    assert created.json()["region_code"] == car["region_code"]
+    # Оголошення, додане вручну, не потрапляє під архівування
+    assert created.json()["last_seen_at"] and updated.json()["last_seen_at"] > created.json()["last_seen_at"]
+    assert duplicate.status_code == 400
+    assert [item["id"] for item in listing.json()["data"]] == [car_id]
+    assert search.json()["total"] == 1
+    assert updated.json()["price"] == 999
+    assert dashboard.json()["stats"]["total_cars"] == 1
+    assert dashboard.json()["facets"]["make"] == [{"value": car["make"], "count": 1}]
+    assert [point["price"] for point in history.json()["history"]] == [car["price"], 999]
+    assert history.json()["current_price"] == 999
+    assert trends.json()["data"][0]["cars"] == 1
+    assert [item["id"] for item in with_archive.json()["data"]] == [car_id]
+    assert single.json()["id"] == car_id
+    assert batch.json()["found"] == 1
+    # Аналітика в пам'яті та запуски скрапера явно позначені як функції MongoDB
+    assert [response.status_code for response in mongo_only] == [501, 501, 501]
+    assert mongo_only[0].json()["detail"] == "Функція доступна лише зі сховищем MongoDB"
+    assert deleted.status_code == 200
+    assert await repository.get(car_id) is None
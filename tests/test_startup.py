@@ -0,0 +1,51 @@
+import subprocess
+import sys
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.db.indexes import ensure_indexes
+from app.startup import LAZY_MODULES, LazyImport, StartupProfile
+
+# Тест: імпорт додатку не завантажує важкі підсистеми
+def test_import_does_not_load_heavy_modules():
+    code = (
+        "import sys, app.main\n"
+        "from app.startup import LAZY_MODULES\n"
+        "print(','.join(name for name in LAZY_MODULES + ('uvicorn',) if name in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
+
+# Тест: LazyImport імпортує модуль при першому виклику
+def test_lazy_import():
+    lazy = LazyImport("json", "dumps")
+    assert lazy({"a": 1}) == '{"a": 1}'
+    assert lazy.loaded
+    assert not LazyImport("app.not_a_module", "x").loaded
+    with pytest.raises(ModuleNotFoundError):
+        LazyImport("app.not_a_module", "x")()
+
+# Тест: профіль запуску містить етапи та час до готовності
+def test_startup_profile():
+    profile = StartupProfile()
+    with profile.phase("init_db"):
+        pass
+    assert profile.as_dict()["ready_ms"] is None
+
+    result = profile.ready()
+    assert list(result["phases_ms"]) == ["init_db"]
+    assert result["ready_ms"] >= result["phases_ms"]["init_db"]
+    assert set(result["eager_heavy_modules"]) <= set(LAZY_MODULES)
+    assert profile.summary().startswith("Профіль запуску: init_db ")
+
+# Тест: індекси створюються окремим кроком
+@pytest.mark.asyncio
+async def test_ensure_indexes():
+    db = MagicMock()
+    for name in ("cars", "cars_archive", "price_history", "scrape_runs"):
+        getattr(db, name).create_index = AsyncMock()
+
+    await ensure_indexes(db)
+
+    db.cars.create_index.assert_any_await("url", unique=True)
+    db.scrape_runs.create_index.assert_awaited_with("created_at")
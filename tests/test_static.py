@@ -0,0 +1,81 @@
+import pytest
+import gzip
+import json
+import os
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.assets.build import build, fingerprint
+from app.assets.staticfiles import PrecompressedStaticFiles, accepted_encodings
+
+# Фікстура з вихідними статичними файлами та результатом їх збірки
+@pytest.fixture
+def static_dir(tmp_path):
+    source = tmp_path / "static"
+    (source / "css").mkdir(parents=True)
+    (source / "js").mkdir()
+    (source / "css" / "styles.css").write_text("body { color: red; }\n" * 50)
+    (source / "js" / "app.js").write_text("console.log('ok');\n" * 50)
+    (source / "index.html").write_text(
+        '<link rel="stylesheet" href="/static/css/styles.css">\n'
+        '<script src="/static/js/app.js"></script>\n'
+    )
+    build(str(source), str(source / "dist"))
+    return source
+
+# Фікстура для клієнта з підключеними статичними файлами
+@pytest.fixture
+def client(static_dir):
+    app = FastAPI()
+    app.mount("/static", PrecompressedStaticFiles(directory=str(static_dir)), name="static")
+    return TestClient(app)
+
+# Тест розбору заголовка Accept-Encoding
+def test_accepted_encodings():
+    assert accepted_encodings("gzip, deflate, br") == {"gzip", "deflate", "br"}
+    assert accepted_encodings("br;q=0, gzip;q=0.8") == {"gzip"}
+    assert accepted_encodings("") == set()
+
+# Тест збірки статичних файлів
+def test_build_static(static_dir):
+    dist = static_dir / "dist"
+    manifest = json.loads((dist / "manifest.json").read_text())
+    styles = manifest["css/styles.css"]
+    assert styles == fingerprint("css/styles.css", (static_dir / "css" / "styles.css").read_bytes())
+
+    for suffix in ("", ".gz", ".br"):
+        assert os.path.exists(dist / (styles + suffix))
+    assert gzip.decompress((dist / (styles + ".gz")).read_bytes()) == (static_dir / "css" / "styles.css").read_bytes()
+
+    # index.html посилається на хешовані імена
+    index_html = (dist / "index.html").read_text()
+    assert f"/static/dist/{styles}" in index_html
+    assert f"/static/dist/{manifest['js/app.js']}" in index_html
+    assert "/static/css/styles.css" not in index_html
+
+# Тест вибору стиснутого варіанту та заголовків кешування
+def test_precompressed_static_files(client, static_dir):
+    manifest = json.loads((static_dir / "dist" / "manifest.json").read_text())
+    url = f"/static/dist/{manifest['css/styles.css']}"
+    original = (static_dir / "css" / "styles.css").read_bytes()
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip, br"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["content-type"].startswith("text/css")
+    assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == original
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == original
+
+    response = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert response.content == original
+
+    # Сторінка без хешу в імені перевіряється при кожному відкритті
+    response = client.get("/static/dist/index.html", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["cache-control"] == "no-cache"
+    assert response.headers["content-type"].startswith("text/html")